@@ -0,0 +1,86 @@
+-- ===================================================================
+-- NGÀY SINH CHUẨN HÓA: voters.dob_date / voters.birth_year
+-- ===================================================================
+-- Cột dob là TEXT tự do ('DD/MM/YYYY', 'YYYY-MM-DD', '2003-02-20 00:00:00',
+-- chỉ năm 'YYYY'...). Thêm hai cột đã chuẩn hóa để thống kê độ tuổi chỉ
+-- còn là phép so sánh số nguyên, không phải chạy regex/to_date mỗi lần gọi:
+--   dob_date    DATE      (NULL nếu chỉ biết năm hoặc không đọc được)
+--   birth_year  SMALLINT  (NULL nếu không đọc được)
+--
+-- Thứ tự chạy:
+--   1. File này
+--   2. python backfill_birth_dates.py      (điền cho dữ liệu đã có, theo lô)
+--   3. voter_counters.sql, rpc_aggregation.sql (chạy lại để bộ đếm dùng birth_year)
+--
+-- Các importer Python/JS ghi sẵn dob_date/birth_year; trigger bên dưới chỉ
+-- điền khi client không gửi (ví dụ trang Nhập cử tri) hoặc khi sửa dob.
+--
+-- Lưu ý: nhóm tuổi KHÔNG trùng hoàn toàn với cách tính cũ trong
+-- rpc_aggregation.sql (regex + to_date trên dob). Cách cũ chỉ đọc
+-- 'DD/MM/YYYY', 'YYYY-MM-DD' (không có giờ) và 'YYYY'; quy tắc mới giống
+-- normalize.parse_dob nên các dòng sau đổi nhóm:
+--   'YYYY-MM-DD 00:00:00' (ô ngày của Excel)  trước không đọc được, nay có năm sinh
+--   'D/M/YYYY', 'DD.MM.YYYY', 'DD-MM-YYYY'    trước không đọc được, nay có năm sinh
+--   'YYYY' ngoài 19xx/20xx                    trước được tính, nay là NULL
+-- Dòng nào trước không đọc được thì không rơi vào nhóm tuổi nào, nên sau khi
+-- backfill tổng các nhóm tuổi có thể tăng lên.
+-- ===================================================================
+
+ALTER TABLE voters ADD COLUMN IF NOT EXISTS dob_date DATE;
+ALTER TABLE voters ADD COLUMN IF NOT EXISTS birth_year SMALLINT;
+
+COMMENT ON COLUMN voters.dob_date IS 'Ngày sinh chuẩn hóa từ dob (NULL nếu chỉ có năm)';
+COMMENT ON COLUMN voters.birth_year IS 'Năm sinh chuẩn hóa từ dob';
+
+CREATE INDEX IF NOT EXISTS idx_voters_birth_year ON voters(birth_year);
+
+-- Cùng quy tắc với normalize.dob_key / parse_dob (Python)
+CREATE OR REPLACE FUNCTION dob_birth_year(p_dob TEXT)
+RETURNS INTEGER AS $$
+  SELECT CASE
+    WHEN TRIM(p_dob) ~ '^\d{1,2}[/.-]\d{1,2}[/.-]\d{4}$' THEN RIGHT(TRIM(p_dob), 4)::int
+    WHEN TRIM(p_dob) ~ '^\d{4}-\d{2}-\d{2}([ T]00:00:00)?$' THEN LEFT(TRIM(p_dob), 4)::int
+    WHEN TRIM(p_dob) ~ '^(19|20)\d{2}$' THEN TRIM(p_dob)::int
+  END
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION parse_dob_date(p_dob TEXT)
+RETURNS DATE AS $$
+DECLARE
+  v TEXT := TRIM(p_dob);
+  m TEXT[];
+BEGIN
+  m := regexp_match(v, '^(\d{1,2})[/.-](\d{1,2})[/.-](\d{4})$');
+  IF m IS NOT NULL THEN
+    RETURN make_date(m[3]::int, m[2]::int, m[1]::int);
+  END IF;
+  m := regexp_match(v, '^(\d{4})-(\d{2})-(\d{2})([ T]00:00:00)?$');
+  IF m IS NOT NULL THEN
+    RETURN make_date(m[1]::int, m[2]::int, m[3]::int);
+  END IF;
+  RETURN NULL;
+EXCEPTION WHEN datetime_field_overflow OR invalid_datetime_format THEN
+  -- Ngày không tồn tại (31/02/1980): chỉ giữ năm
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION voters_fill_birth_date()
+RETURNS TRIGGER AS $$
+BEGIN
+  IF (TG_OP = 'INSERT' AND NEW.dob_date IS NULL AND NEW.birth_year IS NULL)
+     OR (TG_OP = 'UPDATE' AND NEW.dob IS DISTINCT FROM OLD.dob
+         AND NEW.dob_date IS NOT DISTINCT FROM OLD.dob_date
+         AND NEW.birth_year IS NOT DISTINCT FROM OLD.birth_year) THEN
+    NEW.dob_date := parse_dob_date(NEW.dob);
+    NEW.birth_year := dob_birth_year(NEW.dob);
+  END IF;
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS voters_fill_birth_date ON voters;
+CREATE TRIGGER voters_fill_birth_date BEFORE INSERT OR UPDATE OF dob ON voters
+  FOR EACH ROW EXECUTE FUNCTION voters_fill_birth_date();
+
+NOTIFY pgrst, 'reload config';
@@ -0,0 +1,317 @@
+"""Local caching front for the dashboard RPCs (get_election_summary, get_aggregated_stats).
+
+Every open Dashboard / ResultCalculation page calls these RPCs on load and
+again on every realtime event, so one check-in makes every browser hit
+the database at the same moment. This service answers those calls
+instead:
+
+- identical concurrent requests are coalesced into one upstream call;
+- results are cached per RPC + view mode and stay valid until the
+  change counter of stats_version.sql (get_stats_version) moves; one
+  poller reads the counter for all clients;
+- responses carry an ETag (hash of the body), so a client whose data has
+  not changed gets 304 Not Modified with no body;
+- GET /metrics reports hits, misses, coalesced waits, 304s, upstream
+  calls and latency percentiles.
+
+Browsers use it when VITE_AGGREGATE_URL is set (lib/aggregateClient.ts):
+
+    GET /rpc/get_election_summary
+    GET /rpc/get_aggregated_stats?p_view_mode=unit
+    GET /metrics
+
+Usage: python aggregate_cache.py [--port 8787] [--url SUPABASE_URL] [--key ANON_KEY] [--poll 0.5]
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import statistics
+import sys
+import time
+import urllib.request
+from collections import deque
+from urllib.parse import parse_qsl, urlsplit
+
+from config import SUPABASE_KEY, SUPABASE_URL
+
+# RPC name -> {parameter: allowed values}; anything else is rejected, which
+# also keeps the number of cache entries bounded
+ALLOWED_RPCS = {
+    'get_election_summary': {},
+    'get_aggregated_stats': {'p_view_mode': {'area', 'unit', 'neighborhood', 'group'}},
+}
+POLL_INTERVAL = 0.5
+# Safety net when the version cannot be read: cached entries expire anyway
+MAX_AGE = 30.0
+LATENCY_WINDOW = 10_000
+
+
+def rest_rpc(url, key, timeout=30):
+    """Blocking PostgREST RPC caller: call(name, params) -> decoded JSON."""
+    def call(name, params=None):
+        req = urllib.request.Request(
+            f"{url}/rest/v1/rpc/{name}", data=json.dumps(params or {}).encode('utf-8'), method='POST',
+            headers={'apikey': key, 'Authorization': f'Bearer {key}', 'Content-Type': 'application/json'})
+        with urllib.request.urlopen(req, timeout=timeout) as response:
+            return json.loads(response.read() or b'null')
+    return call
+
+
+class Entry:
+    __slots__ = ('version', 'body', 'etag', 'stored_at')
+
+    def __init__(self, version, body, etag):
+        self.version = version
+        self.body = body
+        self.etag = etag
+        self.stored_at = time.monotonic()
+
+
+class Metrics:
+    def __init__(self):
+        self.counts = dict.fromkeys(
+            ('requests', 'hits', 'misses', 'coalesced', 'not_modified', 'stale_served',
+             'upstream_calls', 'upstream_errors', 'invalidations', 'rejected'), 0)
+        self.latency = deque(maxlen=LATENCY_WINDOW)
+        self.upstream_latency = deque(maxlen=LATENCY_WINDOW)
+
+    def count(self, name, n=1):
+        self.counts[name] += n
+
+    @staticmethod
+    def _percentiles(samples):
+        if len(samples) < 2:
+            return {'p50': samples[0] if samples else None, 'p95': None, 'p99': None}
+        q = statistics.quantiles(samples, n=100)
+        return {'p50': round(q[49], 3), 'p95': round(q[94], 3), 'p99': round(q[98], 3)}
+
+    def snapshot(self, **extra):
+        return dict(self.counts, **extra,
+                    latency_ms=self._percentiles(list(self.latency)),
+                    upstream_latency_ms=self._percentiles(list(self.upstream_latency)))
+
+
+class AggregateCache:
+    """Version-validated, request-coalescing cache around an RPC caller.
+
+    ``fetch(name, params)`` and ``fetch_version()`` may be plain (blocking)
+    or async callables; blocking ones run in the default thread pool.
+    """
+
+    def __init__(self, fetch, fetch_version, poll_interval=POLL_INTERVAL, max_age=MAX_AGE):
+        self.fetch = fetch
+        self.fetch_version = fetch_version
+        self.poll_interval = poll_interval
+        self.max_age = max_age
+        self.version = None
+        self.metrics = Metrics()
+        self._entries = {}
+        self._inflight = {}
+        self._poller = None
+
+    async def _call(self, fn, *args):
+        if asyncio.iscoroutinefunction(fn):
+            return await fn(*args)
+        return await asyncio.to_thread(fn, *args)
+
+    async def refresh_version(self):
+        try:
+            version = await self._call(self.fetch_version)
+        except Exception as e:
+            print(f"⚠ get_stats_version failed: {e}", file=sys.stderr)
+            return
+        if version != self.version:
+            if self.version is not None:
+                self.metrics.count('invalidations')
+            self.version = version
+
+    async def _poll(self):
+        while True:
+            await self.refresh_version()
+            await asyncio.sleep(self.poll_interval)
+
+    async def start(self):
+        await self.refresh_version()
+        self._poller = asyncio.create_task(self._poll())
+
+    async def stop(self):
+        if self._poller:
+            self._poller.cancel()
+            try:
+                await self._poller
+            except asyncio.CancelledError:
+                pass
+
+    def _fresh(self, entry):
+        if entry is None or time.monotonic() - entry.stored_at > self.max_age:
+            return False
+        return self.version is not None and entry.version == self.version
+
+    async def get(self, name, params):
+        key = (name, tuple(sorted(params.items())))
+        entry = self._entries.get(key)
+        if self._fresh(entry):
+            self.metrics.count('hits')
+            return entry
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.metrics.count('coalesced')
+            return await asyncio.shield(pending)
+
+        self.metrics.count('misses')
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            # Tag the result with the version read *before* the upstream call:
+            # the data is at least that new, so it is never cached as fresher
+            # than it is (at worst one extra refetch).
+            version = self.version
+            started = time.perf_counter()
+            self.metrics.count('upstream_calls')
+            data = await self._call(self.fetch, name, params)
+            self.metrics.upstream_latency.append((time.perf_counter() - started) * 1000)
+            body = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+            etag = f'"{hashlib.sha1(body).hexdigest()[:20]}"'
+            entry = self._entries[key] = Entry(version, body, etag)
+            future.set_result(entry)
+        except Exception as e:
+            self.metrics.count('upstream_errors')
+            if entry is not None:
+                # Upstream down: keep dashboards alive with the last good answer
+                self.metrics.count('stale_served')
+                future.set_result(entry)
+            else:
+                future.set_exception(e)
+                # Mark retrieved so a request with no coalesced waiters does not log
+                future.exception()
+                raise
+        finally:
+            del self._inflight[key]
+        return entry
+
+
+class AggregateServer:
+    """Minimal HTTP/1.1 (keep-alive) front end for an AggregateCache."""
+
+    def __init__(self, cache, host='127.0.0.1', port=8787):
+        self.cache = cache
+        self.host = host
+        self.port = port
+        self._server = None
+
+    async def start(self):
+        await self.cache.start()
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+        await self.cache.stop()
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}"
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, _ = request_line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                started = time.perf_counter()
+                status, extra, body = await self._respond(method, target, headers)
+                self._write(writer, status, extra, body)
+                await writer.drain()
+                self.cache.metrics.latency.append((time.perf_counter() - started) * 1000)
+                if headers.get('connection', '').lower() == 'close':
+                    break
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, method, target, headers):
+        metrics = self.cache.metrics
+        if method == 'OPTIONS':
+            return 204, {}, b''
+        if method != 'GET':
+            return 405, {}, b''
+        parts = urlsplit(target)
+        if parts.path == '/metrics':
+            body = json.dumps(metrics.snapshot(version=self.cache.version, entries=len(self.cache._entries)))
+            return 200, {'Cache-Control': 'no-store'}, body.encode('utf-8')
+        if parts.path == '/health':
+            return 200, {}, b'{"ok":true}'
+        name = parts.path.rsplit('/', 1)[-1] if parts.path.startswith('/rpc/') else None
+        params = dict(parse_qsl(parts.query))
+        allowed = ALLOWED_RPCS.get(name)
+        if allowed is None or set(params) - set(allowed) or any(
+                params[p] not in allowed[p] for p in params):
+            metrics.count('rejected')
+            return 404, {}, b'{"message":"unknown rpc or parameter"}'
+
+        metrics.count('requests')
+        try:
+            entry = await self.cache.get(name, params)
+        except Exception as e:
+            return 502, {}, json.dumps({'message': f"upstream error: {e}"}).encode('utf-8')
+        cache_headers = {'ETag': entry.etag, 'Cache-Control': 'no-cache'}
+        if headers.get('if-none-match') == entry.etag:
+            metrics.count('not_modified')
+            return 304, cache_headers, b''
+        return 200, cache_headers, entry.body
+
+    @staticmethod
+    def _write(writer, status, extra, body):
+        reason = {200: 'OK', 204: 'No Content', 304: 'Not Modified', 404: 'Not Found',
+                  405: 'Method Not Allowed', 502: 'Bad Gateway'}[status]
+        lines = [f"HTTP/1.1 {status} {reason}",
+                 'Access-Control-Allow-Origin: *',
+                 'Access-Control-Allow-Headers: If-None-Match',
+                 'Access-Control-Expose-Headers: ETag',
+                 f"Content-Length: {len(body)}"]
+        if body:
+            lines.append('Content-Type: application/json; charset=utf-8')
+        lines.extend(f"{k}: {v}" for k, v in extra.items())
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body)
+
+
+async def serve(args):
+    call = rest_rpc(args.url, args.key)
+    cache = AggregateCache(call, lambda: call('get_stats_version'), poll_interval=args.poll)
+    server = await AggregateServer(cache, args.host, args.port).start()
+    print(f"Aggregate cache listening on {server.url} (upstream {args.url}, version poll {args.poll}s)")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Coalescing, ETag-aware cache for the dashboard RPCs.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8787)
+    parser.add_argument('--url', default=os.environ.get('SUPABASE_URL', SUPABASE_URL))
+    parser.add_argument('--key', default=os.environ.get('SUPABASE_KEY', SUPABASE_KEY))
+    parser.add_argument('--poll', type=float, default=POLL_INTERVAL, help='seconds between version checks')
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    sys.exit(main())
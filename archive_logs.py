@@ -0,0 +1,166 @@
+"""Archive and prune the day partitions of system_logs (system_logs_partitions.sql).
+
+Meant to run every night. In order:
+
+    1. ensure_system_log_partitions: partitions for today and the next --ahead days
+    2. every closed day (before today, Vietnam time) without an archive is
+       exported to DIR/system_logs_YYYYMMDD.ndjson.gz, one JSON object per
+       row in created_at order; the file is written under a temporary name
+       and only renamed once complete
+    3. days older than --keep-days are detached and dropped, but only when
+       their archive holds exactly the rows of the partition. Rows that
+       arrived after the export (a browser flushing old buffered events)
+       trigger a fresh export first
+
+Rows in system_logs_default belong to days without a partition (usually
+days already dropped); they are counted and reported, never dropped.
+
+Usage: python archive_logs.py [--dsn ...] [--dir log_archive] [--keep-days 30] [--ahead 7] [--dry-run] [--metrics run.json]
+"""
+import argparse
+import datetime
+import gzip
+import json
+import os
+import re
+import sys
+
+import db
+import instrumentation
+from bulk_uploader import json_default
+
+ARCHIVE_DIR = 'log_archive'
+KEEP_DAYS = 30
+AHEAD_DAYS = 7
+FETCH_SIZE = 5000
+PARTITION_RE = re.compile(r'^system_logs_(\d{8})$')
+COLUMNS = ('id', 'user_name', 'action', 'details', 'ip_address', 'status', 'created_at')
+# DETACH takes an exclusive lock on system_logs: give up instead of queueing behind long readers
+LOCK_TIMEOUT = '5s'
+
+
+def today(conn):
+    return conn.execute("SELECT (NOW() AT TIME ZONE 'Asia/Ho_Chi_Minh')::DATE").fetchone()[0]
+
+
+def partitions(conn):
+    """[(partition name, day)] of system_logs, oldest first (the default partition excluded)."""
+    rows = conn.execute(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = 'system_logs'::regclass").fetchall()
+    days = []
+    for (name,) in rows:
+        match = PARTITION_RE.match(name)
+        if match:
+            days.append((name, datetime.datetime.strptime(match.group(1), '%Y%m%d').date()))
+    return sorted(days, key=lambda p: p[1])
+
+
+def row_count(conn, name):
+    return conn.execute(f'SELECT count(*) FROM "{name}"').fetchone()[0]
+
+
+def archive_path(directory, name):
+    return os.path.join(directory, f"{name}.ndjson.gz")
+
+
+def archived_rows(path):
+    """Rows in an archive file, or None when there is none."""
+    if not os.path.exists(path):
+        return None
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        return sum(1 for _ in f)
+
+
+def export(conn, name, path):
+    """Write partition ``name`` to ``path``; returns the number of rows."""
+    columns = ', '.join('id::text' if c == 'id' else c for c in COLUMNS)
+    tmp = f"{path}.tmp"
+    count = 0
+    with conn.transaction(), conn.cursor(name=f"archive_{name}") as cur, \
+            gzip.open(tmp, 'wt', encoding='utf-8') as f:
+        cur.itersize = FETCH_SIZE
+        cur.execute(f'SELECT {columns} FROM "{name}" ORDER BY created_at, id')
+        for row in cur:
+            f.write(json.dumps(dict(zip(COLUMNS, row)), ensure_ascii=False, default=json_default))
+            f.write('\n')
+            count += 1
+    os.replace(tmp, path)
+    return count
+
+
+def drop(conn, name, expected):
+    """Detach and drop partition ``name`` if it still holds ``expected`` rows; returns whether it did."""
+    from psycopg import Rollback
+
+    dropped = False
+    with conn.transaction():
+        conn.execute(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'")
+        conn.execute(f'ALTER TABLE system_logs DETACH PARTITION "{name}"')
+        # Detached, nothing can be added any more: this count is final
+        if row_count(conn, name) != expected:
+            raise Rollback()
+        conn.execute(f'DROP TABLE "{name}"')
+        dropped = True
+    return dropped
+
+
+def run(dsn=None, directory=ARCHIVE_DIR, keep_days=KEEP_DAYS, ahead=AHEAD_DAYS, dry_run=False):
+    """Returns (partitions archived, partitions dropped, rows in the default partition)."""
+    archived = dropped = 0
+    with db.connect(dsn, autocommit=True) as conn:
+        current = today(conn)
+        if not dry_run:
+            created = conn.execute("SELECT ensure_system_log_partitions(NULL, %s)", (ahead + 1,)).fetchone()[0]
+            print(f"{created} partitions created ahead")
+        os.makedirs(directory, exist_ok=True)
+        cutoff = current - datetime.timedelta(days=keep_days)
+
+        for name, day in partitions(conn):
+            if day >= current:
+                continue
+            path = archive_path(directory, name)
+            with instrumentation.stage('count'):
+                rows, saved = row_count(conn, name), archived_rows(path)
+            expired = day < cutoff
+            if saved != rows:
+                action = 'export' if saved is None else f"re-export ({saved} archived, {rows} now)"
+                print(f"  {name}: {rows} rows, {action}{' [dry run]' if dry_run else ''}")
+                if not dry_run:
+                    with instrumentation.stage('export'):
+                        saved = export(conn, name, path)
+                    instrumentation.count('rows_archived', saved)
+                    archived += 1
+            if expired:
+                print(f"  {name}: older than {keep_days} days, drop{' [dry run]' if dry_run else ''}")
+                if not dry_run:
+                    with instrumentation.stage('drop'):
+                        if drop(conn, name, saved):
+                            dropped += 1
+                        else:
+                            print(f"  {name}: rows arrived after the export, kept until the next run")
+
+        stray = row_count(conn, 'system_logs_default')
+    if stray:
+        print(f"system_logs_default holds {stray} rows of days without a partition")
+    return archived, dropped, stray
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Export closed system_logs day partitions and drop expired ones.')
+    parser.add_argument('--dsn', help='PostgreSQL connection string (default: $DATABASE_URL)')
+    parser.add_argument('--dir', default=ARCHIVE_DIR, help='directory for the NDJSON archives')
+    parser.add_argument('--keep-days', type=int, default=KEEP_DAYS, help='days kept in the database')
+    parser.add_argument('--ahead', type=int, default=AHEAD_DAYS, help='days of partitions created in advance')
+    parser.add_argument('--dry-run', action='store_true', help='print what would be archived and dropped')
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    sys.stdout.reconfigure(encoding='utf-8')
+    with instrumentation.Run('archive_logs', args):
+        archived, dropped, _ = run(args.dsn, args.dir, args.keep_days, args.ahead, args.dry_run)
+    print(f"Done: {archived} days archived, {dropped} dropped{' [dry run]' if args.dry_run else ''}.")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
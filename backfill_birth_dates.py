@@ -0,0 +1,105 @@
+"""Fill voters.dob_date / voters.birth_year from the free-text dob column.
+
+Walks voters in primary-key order (keyset pagination), parses each page's
+dob values with normalize.parse_dob_series (every distinct value once,
+dates converted by pandas in one call) and writes the page back with COPY
+into a staging table plus a single UPDATE ... FROM, one transaction per
+page. The voter_counters triggers move the birth_year counters as pages
+are written.
+
+Run add_birth_date.sql first. By default only rows without a birth year
+are touched; --all recomputes every row.
+
+Usage: python backfill_birth_dates.py [--dsn ...] [--page 20000] [--all] [--dry-run] [--metrics run.json]
+"""
+import argparse
+import sys
+import time
+
+import pandas as pd
+
+import db
+import instrumentation
+from load_sinks import CopySink
+from normalize import parse_dob_series
+
+PAGE_SIZE = 20_000
+MIN_UUID = '00000000-0000-0000-0000-000000000000'
+
+
+class BirthDateSink(CopySink):
+    """COPY (id, dob_date, birth_year) rows and apply them as one UPDATE."""
+
+    def __init__(self, dsn=None):
+        super().__init__('voters', dsn=dsn, columns=['id', 'dob_date', 'birth_year'])
+
+    def merge(self, cur, columns):
+        cur.execute(
+            "UPDATE voters v SET dob_date = s.dob_date, birth_year = s.birth_year "
+            f"FROM {self.stage} s WHERE v.id = s.id "
+            "AND (v.dob_date, v.birth_year) IS DISTINCT FROM (s.dob_date, s.birth_year)")
+        return cur.rowcount
+
+
+def fetch_page(conn, after, limit, recompute=False):
+    missing = '' if recompute else 'AND birth_year IS NULL '
+    return conn.execute(
+        f"SELECT id, dob FROM voters WHERE id > %s AND dob IS NOT NULL {missing}ORDER BY id LIMIT %s",
+        (after, limit)).fetchall()
+
+
+def page_updates(rows):
+    """Parsed (id, dob_date, birth_year) dicts for the rows whose dob could be read."""
+    ids, dobs = zip(*rows)
+    parsed = parse_dob_series(pd.Series(dobs, dtype=object))
+    parsed['id'] = ids
+    parsed = parsed[parsed['birth_year'].notna()]
+    return [{'id': row_id, 'dob_date': date.date() if not pd.isna(date) else None, 'birth_year': int(year)}
+            for row_id, date, year in zip(parsed['id'], parsed['dob_date'], parsed['birth_year'])]
+
+
+def backfill(dsn=None, page_size=PAGE_SIZE, recompute=False, dry_run=False):
+    sink = BirthDateSink(dsn)
+    after = MIN_UUID
+    scanned = parsed = updated = 0
+    started = time.perf_counter()
+    progress = instrumentation.Progress('voters', unit='rows read')
+    with db.connect(dsn, autocommit=True) as conn:
+        while True:
+            with instrumentation.stage('fetch'):
+                rows = fetch_page(conn, after, page_size, recompute)
+            if not rows:
+                break
+            after = rows[-1][0]
+            with instrumentation.stage('parse'):
+                updates = page_updates(rows)
+            scanned += len(rows)
+            parsed += len(updates)
+            if updates and not dry_run:
+                with instrumentation.stage('write'):
+                    updated += sink.write(updates).merged
+            progress.update(len(rows), parsed=parsed, updated=updated)
+    progress.close()
+    instrumentation.count('rows_scanned', scanned)
+    instrumentation.count('rows_parsed', parsed)
+    instrumentation.count('rows_updated', updated)
+    return scanned, parsed, updated, time.perf_counter() - started
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Backfill voters.dob_date / birth_year from dob.')
+    parser.add_argument('--dsn', help='PostgreSQL connection string (default: $DATABASE_URL)')
+    parser.add_argument('--page', type=int, default=PAGE_SIZE, help='rows per page / transaction')
+    parser.add_argument('--all', action='store_true', help='recompute rows that already have a birth year')
+    parser.add_argument('--dry-run', action='store_true', help='parse only, write nothing')
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    with instrumentation.Run('backfill_birth_dates', args):
+        scanned, parsed, updated, elapsed = backfill(args.dsn, args.page, recompute=args.all, dry_run=args.dry_run)
+    print(f"Done: {scanned} rows read, {parsed} with a readable dob, {updated} updated in {elapsed:.1f}s"
+          f"{' [dry run]' if args.dry_run else ''}. {scanned - parsed} rows have no readable dob.")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
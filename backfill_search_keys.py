@@ -0,0 +1,119 @@
+"""Fill voters.search_name / voters.search_text for the voter search.
+
+Walks voters in primary-key order (keyset pagination), computes both keys
+with normalize.search_key / voter_search_text (the rules voter_search.sql
+uses in its trigger) and writes each page back with COPY into a staging
+table plus a single UPDATE ... FROM, one transaction per page.
+
+Run voter_search.sql first. By default only rows without keys are touched;
+--all recomputes every row. --verify compares the Python keys with the SQL
+functions on a sample instead of writing anything.
+
+Usage: python backfill_search_keys.py [--dsn ...] [--page 20000] [--all] [--dry-run] [--verify 10000] [--metrics run.json]
+"""
+import argparse
+import sys
+import time
+
+import db
+import instrumentation
+from load_sinks import CopySink
+from normalize import search_key, voter_search_text
+
+PAGE_SIZE = 20_000
+MIN_UUID = '00000000-0000-0000-0000-000000000000'
+SOURCE_COLUMNS = ('name', 'address', 'permanent_address', 'temporary_address', 'cccd', 'voter_card_number')
+
+
+class SearchKeySink(CopySink):
+    """COPY (id, search_name, search_text) rows and apply them as one UPDATE."""
+
+    def __init__(self, dsn=None):
+        super().__init__('voters', dsn=dsn, columns=['id', 'search_name', 'search_text'])
+
+    def merge(self, cur, columns):
+        cur.execute(
+            "UPDATE voters v SET search_name = s.search_name, search_text = s.search_text "
+            f"FROM {self.stage} s WHERE v.id = s.id "
+            "AND (v.search_name, v.search_text) IS DISTINCT FROM (s.search_name, s.search_text)")
+        return cur.rowcount
+
+
+def fetch_page(conn, after, limit, recompute=False):
+    missing = '' if recompute else 'AND (search_name IS NULL OR search_text IS NULL) '
+    return conn.execute(
+        f"SELECT id, {', '.join(SOURCE_COLUMNS)} FROM voters WHERE id > %s {missing}ORDER BY id LIMIT %s",
+        (after, limit)).fetchall()
+
+
+def page_keys(rows):
+    return [{'id': row[0], 'search_name': search_key(row[1]), 'search_text': voter_search_text(*row[1:])}
+            for row in rows]
+
+
+def backfill(dsn=None, page_size=PAGE_SIZE, recompute=False, dry_run=False):
+    sink = SearchKeySink(dsn)
+    after = MIN_UUID
+    scanned = updated = 0
+    started = time.perf_counter()
+    progress = instrumentation.Progress('voters', unit='rows read')
+    with db.connect(dsn, autocommit=True) as conn:
+        while True:
+            with instrumentation.stage('fetch'):
+                rows = fetch_page(conn, after, page_size, recompute)
+            if not rows:
+                break
+            after = rows[-1][0]
+            with instrumentation.stage('normalize'):
+                keys = page_keys(rows)
+            scanned += len(rows)
+            if not dry_run:
+                with instrumentation.stage('write'):
+                    updated += sink.write(keys).merged
+            progress.update(len(rows), updated=updated)
+    progress.close()
+    instrumentation.count('rows_scanned', scanned)
+    instrumentation.count('rows_updated', updated)
+    return scanned, updated, time.perf_counter() - started
+
+
+def verify(dsn=None, sample=10_000):
+    """Compare the Python keys with search_key()/voter_search_text() in SQL; returns mismatching rows."""
+    columns = ', '.join(SOURCE_COLUMNS)
+    with db.connect(dsn) as conn:
+        rows = conn.execute(
+            f"SELECT id, {columns}, search_key(name), voter_search_text({columns}) "
+            "FROM voters ORDER BY random() LIMIT %s", (sample,)).fetchall()
+    mismatches = []
+    for row_id, *source, name_sql, text_sql in rows:
+        text_python = voter_search_text(*source)
+        if text_python != text_sql or search_key(source[0]) != name_sql:
+            mismatches.append((row_id, source[0], text_python, text_sql))
+    return len(rows), mismatches
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Backfill voters.search_name / search_text.')
+    parser.add_argument('--dsn', help='PostgreSQL connection string (default: $DATABASE_URL)')
+    parser.add_argument('--page', type=int, default=PAGE_SIZE, help='rows per page / transaction')
+    parser.add_argument('--all', action='store_true', help='recompute rows that already have keys')
+    parser.add_argument('--dry-run', action='store_true', help='compute only, write nothing')
+    parser.add_argument('--verify', type=int, metavar='N', help='compare Python and SQL keys on N random voters')
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    sys.stdout.reconfigure(encoding='utf-8')
+    if args.verify:
+        checked, mismatches = verify(args.dsn, args.verify)
+        for row_id, name, python_text, sql_text in mismatches[:20]:
+            print(f"  {row_id} {name!r}: python {python_text!r} / sql {sql_text!r}")
+        print(f"{checked} voters checked, {len(mismatches)} with different keys")
+        return 1 if mismatches else 0
+
+    with instrumentation.Run('backfill_search_keys', args):
+        scanned, updated, elapsed = backfill(args.dsn, args.page, recompute=args.all, dry_run=args.dry_run)
+    print(f"Done: {scanned} rows read, {updated} updated in {elapsed:.1f}s{' [dry run]' if args.dry_run else ''}.")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,164 @@
+"""Load test for aggregate_cache.py: many dashboards, one burst per realtime event.
+
+Starts the cache service in-process in front of a fake upstream (fixed
+latency, call counter, a stats version that moves on every simulated
+check-in). Each of ``--clients`` dashboards keeps one keep-alive
+connection and, after every event, fetches the summary plus the unit
+and area lists like Dashboard.tsx#fetchRealtimeStats, sending the ETag it
+got last time. Every third event changes the counter without changing
+the data (e.g. a re-saved area_stats row), which should come back as 304s.
+
+Without the cache every request would be an upstream call; the report
+shows how many actually reached it.
+
+Usage: python bench_aggregate_cache.py [--clients 300] [--events 10] [--latency 0.05]
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import sys
+import time
+
+from aggregate_cache import AggregateCache, AggregateServer
+
+DASHBOARD_CALLS = ('/rpc/get_election_summary',
+                   '/rpc/get_aggregated_stats?p_view_mode=unit',
+                   '/rpc/get_aggregated_stats?p_view_mode=area')
+
+
+class FakeUpstream:
+    """Stands in for PostgREST: counts calls and serves data derived from `voted`."""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.calls = 0
+        self.version = 1
+        self.voted = 0
+
+    async def fetch(self, name, params):
+        self.calls += 1
+        voted = self.voted
+        await asyncio.sleep(self.latency)
+        if name == 'get_election_summary':
+            return {'total': 100_000, 'voted': voted, 'ageStats': {'18-30': voted // 3}}
+        n = 9 if params.get('p_view_mode') == 'unit' else 45
+        return [{'id': f"{params['p_view_mode']}{i}", 'total': 2000, 'voted': (voted + i) // n} for i in range(n)]
+
+    async def fetch_version(self):
+        await asyncio.sleep(self.latency / 10)
+        return self.version
+
+    def event(self, changes_data):
+        self.version += 1
+        if changes_data:
+            self.voted += 7
+
+
+async def request(reader, writer, path, etag):
+    headers = f"GET {path} HTTP/1.1\r\nHost: bench\r\n"
+    if etag:
+        headers += f"If-None-Match: {etag}\r\n"
+    writer.write((headers + "\r\n").encode('latin-1'))
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length, new_etag = 0, etag
+    while (line := await reader.readline()) not in (b'\r\n', b''):
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.lower() == 'content-length':
+            length = int(value)
+        elif name.lower() == 'etag':
+            new_etag = value.strip()
+    body = await reader.readexactly(length) if length else b''
+    if status == 200:
+        json.loads(body)
+    return status, new_etag
+
+
+async def dashboard(port, events, latencies, statuses, jitter):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    etags = {}
+    try:
+        async for _ in events:
+            await asyncio.sleep(random.uniform(0, jitter))
+            for path in DASHBOARD_CALLS:
+                started = time.perf_counter()
+                status, etags[path] = await request(reader, writer, path, etags.get(path))
+                latencies.append((time.perf_counter() - started) * 1000)
+                statuses[status] = statuses.get(status, 0) + 1
+    finally:
+        writer.close()
+
+
+class Broadcast:
+    """Async iterator per client; every client sees every event."""
+
+    def __init__(self):
+        self.queues = []
+
+    def subscribe(self):
+        queue = asyncio.Queue()
+        self.queues.append(queue)
+
+        async def events():
+            while (item := await queue.get()) is not None:
+                yield item
+        return events()
+
+    def publish(self, item):
+        for queue in self.queues:
+            queue.put_nowait(item)
+
+
+async def run(args):
+    upstream = FakeUpstream(args.latency)
+    cache = AggregateCache(upstream.fetch, upstream.fetch_version, poll_interval=args.poll)
+    server = await AggregateServer(cache, port=0).start()
+    broadcast = Broadcast()
+    latencies, statuses = [], {}
+    clients = [asyncio.create_task(dashboard(server.port, broadcast.subscribe(), latencies, statuses, args.jitter))
+               for _ in range(args.clients)]
+
+    started = time.perf_counter()
+    for i in range(args.events):
+        if i:
+            upstream.event(changes_data=i % 3 != 0)
+            # Let the version poller see the change before clients react,
+            # as realtime events arrive after the commit
+            await asyncio.sleep(args.poll * 1.5)
+        broadcast.publish(i)
+        await asyncio.sleep(args.interval)
+    broadcast.publish(None)
+    await asyncio.gather(*clients)
+    elapsed = time.perf_counter() - started
+    metrics = cache.metrics.snapshot()
+    await server.stop()
+
+    total = sum(statuses.values())
+    q = statistics.quantiles(latencies, n=100)
+    print(f"{args.clients} dashboards x {args.events} events x {len(DASHBOARD_CALLS)} calls = {total} requests "
+          f"in {elapsed:.1f} s")
+    print(f"upstream RPC calls: {upstream.calls} (without the cache: {total}), "
+          f"{total / max(upstream.calls, 1):.0f}x fewer")
+    print(f"hits {metrics['hits']}, coalesced {metrics['coalesced']}, misses {metrics['misses']}, "
+          f"304 {statuses.get(304, 0)}, 200 {statuses.get(200, 0)}, errors {total - statuses.get(200, 0) - statuses.get(304, 0)}")
+    print(f"client latency: p50 {q[49]:.2f} ms, p95 {q[94]:.2f} ms, p99 {q[98]:.2f} ms "
+          f"(upstream latency {args.latency * 1000:.0f} ms)")
+    return 0 if total == args.clients * args.events * len(DASHBOARD_CALLS) else 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--clients', type=int, default=300)
+    parser.add_argument('--events', type=int, default=10)
+    parser.add_argument('--latency', type=float, default=0.05, help='fake upstream RPC latency, seconds')
+    parser.add_argument('--poll', type=float, default=0.1, help='version poll interval, seconds')
+    parser.add_argument('--jitter', type=float, default=0.2, help='max client reaction delay, seconds')
+    parser.add_argument('--interval', type=float, default=0.5, help='seconds between events')
+    args = parser.parse_args(argv)
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
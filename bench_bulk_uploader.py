@@ -0,0 +1,88 @@
+"""Compare the old sequential 50-row upload loop with BulkUploader.
+
+Both run against a local PostgREST stub with injected latency, transient
+5xx errors and a handful of poison rows, and report rows/s.
+
+Usage: python bench_bulk_uploader.py [--rows 20000] [--latency 0.02] [--error-rate 0.02] [--bad 10]
+"""
+import argparse
+import json
+import random
+import sys
+import time
+import urllib.request
+
+from bulk_uploader import BulkUploader
+from postgrest_stub import PostgrestStub
+
+KEY = 'stub-key'
+
+
+def synthetic_rows(n, bad, seed=7):
+    rng = random.Random(seed)
+    bad_idx = set(rng.sample(range(n), bad)) if bad else set()
+    for i in range(n):
+        yield {
+            'name': f"CỬ TRI {i}",
+            'cccd': ('BAD' if i in bad_idx else '') + f"{i:012d}",
+            'area_id': f"kv{i % 45 + 1:02d}",
+        }
+
+
+def naive_upload(base_url, rows, chunk_size=50):
+    """The loop used by import_candidates.py: one connection per chunk, failed
+    chunks retried row by row (as VoterImport.tsx does)."""
+    rows = list(rows)
+    requests = ok = 0
+    started = time.perf_counter()
+
+    def post(chunk):
+        req = urllib.request.Request(f"{base_url}/rest/v1/voters", data=json.dumps(chunk).encode('utf-8'),
+                                     headers={'Content-Type': 'application/json'}, method='POST')
+        with urllib.request.urlopen(req) as response:
+            return response.getcode()
+
+    for i in range(0, len(rows), chunk_size):
+        chunk = rows[i:i + chunk_size]
+        requests += 1
+        try:
+            post(chunk)
+            ok += len(chunk)
+        except Exception:
+            for row in chunk:
+                requests += 1
+                try:
+                    post([row])
+                    ok += 1
+                except Exception:
+                    pass
+    elapsed = time.perf_counter() - started
+    return ok, requests, elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=20_000)
+    parser.add_argument('--latency', type=float, default=0.02)
+    parser.add_argument('--per-row-latency', type=float, default=0.00002)
+    parser.add_argument('--error-rate', type=float, default=0.02)
+    parser.add_argument('--bad', type=int, default=10)
+    parser.add_argument('--concurrency', type=int, default=8)
+    args = parser.parse_args(argv)
+
+    stub_args = dict(latency=args.latency, per_row_latency=args.per_row_latency, error_rate=args.error_rate,
+                     reject=lambda row: str(row.get('cccd', '')).startswith('BAD'))
+
+    with PostgrestStub(**stub_args) as stub:
+        ok, requests, elapsed = naive_upload(stub.url, synthetic_rows(args.rows, args.bad))
+        print(f"naive     : {ok} rows ok, {requests} requests in {elapsed:.2f}s -> {ok / elapsed:,.0f} rows/s")
+
+    with PostgrestStub(**stub_args) as stub:
+        uploader = BulkUploader(stub.url, KEY, 'voters', concurrency=args.concurrency)
+        report = uploader.upload(synthetic_rows(args.rows, args.bad))
+        print(f"bulk      : {report.summary()}")
+        print(f"stub saw {stub.requests} requests, stored {len(stub.tables.get('voters', []))} rows")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
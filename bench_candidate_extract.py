@@ -0,0 +1,115 @@
+"""Compare the old row-by-row candidate extraction with the vectorized,
+process-parallel extract_candidates().
+
+Builds a synthetic candidate book with many "Tổ N" sheets (12 title rows
+followed by candidate rows, like the official workbook), checks that both
+implementations return identical records and prints their timings. Sheets
+cycle through the units of locations.json (extract_candidates rejects
+unknown units); past the last unit they are named "Lần 2 Tổ N" and so on.
+
+Usage: python bench_candidate_extract.py [--sheets 40] [--rows 400] [--file bench_candidates.xlsx]
+"""
+import argparse
+import datetime
+import os
+import random
+import sys
+import time
+
+import pandas as pd
+from openpyxl import Workbook
+
+import locations
+from import_candidates import extract_candidates, format_date
+from synthetic_data import HO, vietnamese_name
+
+
+def sheet_names(sheets):
+    """``sheets`` unique sheet names whose unit (last word) is in locations.json."""
+    units = [u.rsplit('_', 1)[-1] for u in locations.load().by_type['unit']]
+    names = []
+    for n in range(sheets):
+        unit, copy = units[n % len(units)], n // len(units) + 1
+        names.append(f"Tổ {unit}" if copy == 1 else f"Lần {copy} Tổ {unit}")
+    return names
+
+
+def write_candidate_book(path, sheets, rows, seed=3):
+    rng = random.Random(seed)
+    wb = Workbook(write_only=True)
+    for name in sheet_names(sheets):
+        ws = wb.create_sheet(name)
+        for i in range(12):
+            ws.append([f"DANH SÁCH NGƯỜI ỨNG CỬ - dòng tiêu đề {i}"])
+        for stt in range(1, rows + 1):
+            dob = datetime.datetime(rng.randint(1950, 2000), rng.randint(1, 12), rng.randint(1, 28))
+            ws.append([
+                stt,
+                vietnamese_name(rng).title(),
+                dob if rng.random() < 0.8 else dob.strftime('%d/%m/%Y'),
+                rng.choice(['Nam', 'Nữ']),
+                'Kinh', 'Không', '12/12',
+                f"Xã {rng.choice(HO).title()}, tỉnh Bình Dương",
+                'Đại học', 'Cử nhân',
+                rng.choice(['Bí thư Chi bộ', 'Trưởng khu phố', 'Cán bộ hưu trí', None]),
+            ])
+        ws.append([None, None])
+        ws.append(['', 'nan'])
+    wb.save(path)
+
+
+def legacy_extract(path):
+    """The original import_candidates() loop, without the upload."""
+    xl = pd.ExcelFile(path)
+    sheets = [s for s in xl.sheet_names if "Tổ" in s]
+    all_candidates = []
+    for sheet in sheets:
+        unit_id = f"unit_{sheet.split(' ')[-1]}"
+        df = pd.read_excel(xl, sheet_name=sheet, header=None)
+        for i in range(12, len(df)):
+            row = df.iloc[i]
+            if pd.isna(row[0]) or str(row[0]).strip() == "":
+                continue
+            try:
+                candidate = {
+                    "name": str(row[1]).strip().upper(),
+                    "level": "phuong",
+                    "unit_id": unit_id,
+                    "dob": format_date(row[2]),
+                    "gender": str(row[3]).strip(),
+                    "title": str(row[10]).strip() if not pd.isna(row[10]) else "",
+                    "hometown": str(row[7]).strip() if not pd.isna(row[7]) else ""
+                }
+                if not candidate["name"] or candidate["name"] == "NAN" or len(candidate["name"]) < 2:
+                    continue
+                all_candidates.append(candidate)
+            except Exception as e:
+                print(f"  Error mapping row {i} in {sheet}: {e}")
+    return all_candidates
+
+
+def timed(label, fn, *args, **kwargs):
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    print(f"{label:<24} {time.perf_counter() - started:8.2f}s  ({len(result)} candidates)")
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sheets', type=int, default=40)
+    parser.add_argument('--rows', type=int, default=400)
+    parser.add_argument('--file', default='bench_candidates.xlsx')
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.file):
+        write_candidate_book(args.file, args.sheets, args.rows)
+
+    legacy = timed('legacy row loop', legacy_extract, args.file)
+    serial = timed('vectorized, 1 process', extract_candidates, args.file, workers=1)
+    parallel = timed('vectorized, pool', extract_candidates, args.file)
+    print('identical output:', legacy == serial == parallel)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
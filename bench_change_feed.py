@@ -0,0 +1,94 @@
+"""Bytes per update: change_log deltas vs. refetching like the pages do today.
+
+Needs change_log.sql applied and a populated voters table. Runs ``--ticks``
+rounds of ``--checkins`` committed check-ins (random voters flipped to
+'da-bau', plus one area_stats row touched every few rounds). After each
+round it measures:
+
+    delta    get_changes_since since the previous round (change_feed.ChangeFeed)
+    list     VoterList.fetchVoters: select('*') of one area ordered by name
+    quick    Reports.fetchQuickStats: area_id of every voter who has voted
+
+At the end the delta-maintained aggregates are checked against a full
+reload, and the touched voters are put back to their original status.
+
+Usage: python bench_change_feed.py [--dsn ...] [--ticks 20] [--checkins 50]
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+
+import db
+from change_feed import ChangeFeed, verify
+
+
+def payload_bytes(conn, sql, params=()):
+    return len(conn.execute(f"SELECT COALESCE(json_agg(q), '[]')::text FROM ({sql}) q", params).fetchone()[0].encode('utf-8'))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--dsn', help='PostgreSQL connection string (default: $DATABASE_URL)')
+    parser.add_argument('--ticks', type=int, default=20)
+    parser.add_argument('--checkins', type=int, default=50, help='check-ins committed per tick')
+    args = parser.parse_args(argv)
+
+    rng = random.Random(16)
+    with db.connect(args.dsn, autocommit=True) as conn:
+        pending = conn.execute("SELECT id::text, area_id, voting_status FROM voters "
+                               "WHERE voting_status IS DISTINCT FROM 'da-bau'").fetchall()
+        areas = [r[0] for r in conn.execute("SELECT area_id FROM area_stats ORDER BY area_id").fetchall()]
+        if len(pending) < args.ticks * args.checkins:
+            print("Not enough voters still to vote for this many check-ins")
+            return 1
+        rng.shuffle(pending)
+        original = {}
+
+        feed = ChangeFeed(conn)
+        started = time.perf_counter()
+        feed.poll()
+        print(f"initial sync: {len(feed.voters)} voters, {len(feed.area_stats)} area_stats rows, "
+              f"{len(feed.results)} results in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+        delta_bytes, delta_ms, list_bytes, quick_bytes = [], [], [], []
+        try:
+            for tick in range(args.ticks):
+                batch = pending[tick * args.checkins:(tick + 1) * args.checkins]
+                for voter_id, _, status in batch:
+                    original[voter_id] = status
+                    # One statement per check-in, as the check-in screen does
+                    conn.execute("UPDATE voters SET voting_status = 'da-bau' WHERE id = %s", (voter_id,))
+                if areas and tick % 5 == 4:
+                    conn.execute("UPDATE area_stats SET updated_at = NOW() WHERE area_id = %s", (rng.choice(areas),))
+
+                before = feed.stats['bytes']
+                started = time.perf_counter()
+                feed.poll()
+                delta_ms.append((time.perf_counter() - started) * 1000)
+                delta_bytes.append(feed.stats['bytes'] - before)
+
+                area = batch[0][1]
+                list_bytes.append(payload_bytes(conn, "SELECT * FROM voters WHERE area_id = %s ORDER BY name", (area,)))
+                quick_bytes.append(payload_bytes(conn, "SELECT area_id FROM voters WHERE voting_status = 'da-bau'"))
+
+            bad = verify(feed)
+        finally:
+            with conn.transaction():
+                for voter_id, status in original.items():
+                    conn.execute("UPDATE voters SET voting_status = %s WHERE id = %s", (status, voter_id))
+
+    def kb(values):
+        return f"median {statistics.median(values) / 1024:8.1f} KB"
+    print(f"{args.ticks} ticks x {args.checkins} check-ins")
+    print(f"delta (all 3 tables):          {kb(delta_bytes)}, {statistics.median(delta_ms):.1f} ms per poll")
+    print(f"VoterList refetch (one area):  {kb(list_bytes)}")
+    print(f"Reports quick stats refetch:   {kb(quick_bytes)}")
+    print(f"resyncs: {feed.stats['resyncs']} (1 = initial load only); "
+          + (f"⚠ state differs from a full reload: {', '.join(bad)}" if bad else "✓ state matches a full reload"))
+    return 1 if bad else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,47 @@
+"""Throughput benchmark for the streaming voter importer.
+
+Generates (once) a synthetic 200k-row roll and parses it with
+import_voters.iter_voters, printing the rate and peak RSS for every
+segment so a steady rate and flat memory are visible at a glance.
+
+Usage: python bench_import_voters.py [--rows 200000] [--file bench_voters.xlsx]
+"""
+import argparse
+import os
+import sys
+import time
+
+from import_voters import iter_voters
+from instrumentation import peak_rss_mb
+from synthetic_data import write_voter_workbook
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--file', default='bench_voters.xlsx')
+    parser.add_argument('--segment', type=int, default=20_000)
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.file):
+        print(f"Generating {args.rows} synthetic voters -> {args.file}")
+        t0 = time.perf_counter()
+        write_voter_workbook(args.file, args.rows)
+        print(f"  generated in {time.perf_counter() - t0:.1f}s")
+
+    print(f"{'rows':>10} {'segment rows/s':>15} {'peak RSS MB':>12}")
+    start = seg_start = time.perf_counter()
+    count = 0
+    for _ in iter_voters(args.file):
+        count += 1
+        if count % args.segment == 0:
+            now = time.perf_counter()
+            print(f"{count:>10} {args.segment / (now - seg_start):>15,.0f} {peak_rss_mb():>12.1f}")
+            seg_start = now
+
+    elapsed = time.perf_counter() - start
+    print(f"Total: {count} voters in {elapsed:.2f}s ({count / elapsed:,.0f} rows/s), peak RSS {peak_rss_mb():.1f} MB")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+"""Benchmark the load sinks on a synthetic voter roll.
+
+Always runs the local sinks (ndjson, sqlite) and the REST sink against the
+in-process PostgREST stub. With --dsn (or DATABASE_URL) it also runs both
+COPY sinks against that database, loading into a scratch ``bench_voters``
+table that is dropped afterwards.
+
+Usage: python bench_load_sinks.py [--rows 100000] [--dsn postgresql://postgres@localhost/postgres]
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+from import_voters import is_stt, map_voter_row
+from load_sinks import CopySink, NdjsonSink, RestSink, SqliteSink
+from postgrest_stub import PostgrestStub
+from synthetic_data import voter_sheet_rows
+
+# voters as defined by setup.sql plus add_election_levels.sql / fix_voter_addresses.sql / add_birth_date.sql / voter_search.sql
+BENCH_TABLE_DDL = """
+CREATE TABLE IF NOT EXISTS bench_voters (
+  id UUID DEFAULT gen_random_uuid() PRIMARY KEY,
+  name TEXT NOT NULL,
+  dob TEXT,
+  dob_date DATE,
+  birth_year SMALLINT,
+  gender TEXT,
+  ethnic TEXT DEFAULT 'Kinh',
+  cccd TEXT,
+  voter_card_number TEXT,
+  address TEXT,
+  neighborhood_id TEXT,
+  unit_id TEXT,
+  area_id TEXT,
+  group_name TEXT,
+  residence_status TEXT DEFAULT 'thuong-tru',
+  voting_status TEXT DEFAULT 'chua-bau',
+  created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+  vote_qh BOOLEAN DEFAULT TRUE,
+  vote_t BOOLEAN DEFAULT TRUE,
+  vote_p BOOLEAN DEFAULT TRUE,
+  permanent_address TEXT,
+  temporary_address TEXT,
+  search_name TEXT COLLATE "C",
+  search_text TEXT COLLATE "C"
+)
+"""
+
+
+def synthetic_voters(n):
+    voters = []
+    area = 'kv01'
+    for index, row in enumerate(voter_sheet_rows(n)):
+        if not is_stt(row[0]):
+            if len(row) > 1 and isinstance(row[1], str) and row[1].startswith('Khu vực'):
+                area = f"kv{int(row[1].rsplit(' ', 1)[-1]):02d}"
+            continue
+        voters.append(map_voter_row(row, index, area))
+    return voters
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--dsn', default=os.environ.get('DATABASE_URL'))
+    args = parser.parse_args(argv)
+
+    voters = synthetic_voters(args.rows)
+    print(f"{len(voters)} synthetic voters")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(NdjsonSink(os.path.join(tmp, 'voters.ndjson')).write(voters).summary())
+        print(NdjsonSink(os.path.join(tmp, 'voters.ndjson.gz')).write(voters).summary())
+        print(SqliteSink(os.path.join(tmp, 'voters.sqlite3'), 'voters').write(voters).summary())
+
+    with PostgrestStub() as stub:
+        print(RestSink('voters', stub.url, 'stub-key', concurrency=8).write(voters).summary())
+
+    if not args.dsn:
+        print("(skipping COPY sinks: pass --dsn or set DATABASE_URL)")
+        return
+
+    import db
+    with db.connect(args.dsn, autocommit=True) as conn:
+        conn.execute(BENCH_TABLE_DDL)
+        try:
+            for fmt in ('binary', 'csv'):
+                conn.execute('TRUNCATE bench_voters')
+                print(CopySink('bench_voters', dsn=args.dsn, fmt=fmt).write(voters).summary())
+            count = conn.execute('SELECT count(*) FROM bench_voters').fetchone()[0]
+            print(f"bench_voters holds {count} rows")
+        finally:
+            conn.execute('DROP TABLE IF EXISTS bench_voters')
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,154 @@
+"""Benchmark reimport_voters.ReimportSink against the delete-everything re-import.
+
+Loads a synthetic ward (bench_rpc_suite: schema files, generator, 65%
+turnout) into a scratch database, then re-imports the same roll with a
+few hundred edits mixed in:
+
+    edited      address changed (search keys recomputed)
+    renumbered  new card number, same CCCD (matched on CCCD)
+    removed     left out of the roll (only voters without a check-in)
+    added       new voters with card numbers the area does not use yet
+
+and checks that exactly those rows change, that every check-in survives
+and that a second run changes nothing. The old way (DELETE every voter,
+insert the roll again) is timed last for comparison.
+
+Usage: python bench_reimport_voters.py [--dsn ...] [--voters 100000] [--edits 400] [--keep]
+"""
+import argparse
+import random
+import sys
+import time
+
+import db
+from bench_rpc_suite import apply_schema, load_ward, recreate_database, scratch_dsn, synthetic_ward
+from load_sinks import CopySink
+from normalize import voter_search_text
+from reimport_voters import ReimportSink, describe
+
+DATABASE = 'baucu_reimport_bench'
+# Share of --edits per kind of change
+MIX = (('edited', 0.6), ('renumbered', 0.1), ('removed', 0.15), ('added', 0.15))
+
+
+def edited_roll(n, seed, edits, voted_cards):
+    """(roll rows, {kind: count}): the loaded ward with ``edits`` changes applied."""
+    rng = random.Random(seed + 1)
+    roll = []
+    for voter in synthetic_ward(n, seed):
+        # The roll has no check-ins; the bench ward does
+        voter['voting_status'] = 'chua-bau'
+        roll.append(voter)
+    counts = {kind: int(edits * share) for kind, share in MIX}
+    picked = rng.sample(range(len(roll)), sum(counts.values()) - counts['added'])
+    removable = [i for i in picked if (roll[i]['area_id'], roll[i]['voter_card_number']) not in voted_cards]
+
+    removed = set(removable[:counts['removed']])
+    rest = [i for i in picked if i not in removed]
+    renumbered = [i for i in rest if not roll[i]['cccd'].startswith('MISSING')][:counts['renumbered']]
+    edited = [i for i in rest if i not in renumbered][:counts['edited']]
+    for i in renumbered:
+        roll[i]['voter_card_number'] = f"R{roll[i]['voter_card_number']}"
+    for i in edited:
+        roll[i]['address'] = roll[i]['temporary_address'] = f"{rng.randint(100, 999)} ĐƯỜNG MỚI, TỔ 99"
+    for i in renumbered + edited:
+        voter = roll[i]
+        voter['search_text'] = voter_search_text(voter['name'], voter['address'], voter['permanent_address'],
+                                                 voter['temporary_address'], voter['cccd'], voter['voter_card_number'])
+    roll = [voter for i, voter in enumerate(roll) if i not in removed]
+
+    for k, voter in enumerate(synthetic_ward(counts['added'], seed + 2)):
+        voter['voting_status'] = 'chua-bau'
+        voter['voter_card_number'] = f"N{k:04d}"
+        roll.append(voter)
+    counts['removed'] = len(removed)
+    counts['renumbered'] = len(renumbered)
+    counts['edited'] = len(edited)
+    return roll, counts
+
+
+def snapshot(conn):
+    """{voter id: (voting_status, vote_qh, vote_t, vote_p)}"""
+    return {row[0]: row[1:] for row in conn.execute(
+        "SELECT id, voting_status, vote_qh, vote_t, vote_p FROM voters").fetchall()}
+
+
+def timed_write(sink, rows):
+    started = time.perf_counter()
+    sink.write(iter(rows))
+    return time.perf_counter() - started
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Incremental voter re-import vs delete-and-insert.')
+    parser.add_argument('--dsn', help='PostgreSQL server to create the scratch database on (default: $DATABASE_URL)')
+    parser.add_argument('--database', default=DATABASE, help='scratch database (dropped and recreated)')
+    parser.add_argument('--voters', type=int, default=100_000)
+    parser.add_argument('--edits', type=int, default=400, help='changes mixed into the new roll')
+    parser.add_argument('--seed', type=int, default=23)
+    parser.add_argument('--keep', action='store_true', help='keep the scratch database afterwards')
+    args = parser.parse_args(argv)
+
+    sys.stdout.reconfigure(encoding='utf-8')
+    recreate_database(args.dsn, args.database)
+    dsn = scratch_dsn(args.dsn, args.database)
+    failures = []
+    try:
+        with db.connect(dsn, autocommit=True) as conn:
+            apply_schema(conn)
+            load_ward(conn, args.voters, args.seed)
+            voted_cards = set(conn.execute(
+                "SELECT area_id, voter_card_number FROM voters WHERE voting_status <> 'chua-bau'").fetchall())
+            before = snapshot(conn)
+        roll, counts = edited_roll(args.voters, args.seed, args.edits, voted_cards)
+        print(f"{len(before)} voters loaded, {sum(s[0] != 'chua-bau' for s in before.values())} checked in; "
+              f"new roll of {len(roll)}: " + ', '.join(f"{n} {kind}" for kind, n in counts.items()))
+
+        dry = ReimportSink(dsn, dry_run=True)
+        dry_s = timed_write(dry, roll)
+        sink = ReimportSink(dsn)
+        apply_s = timed_write(sink, roll)
+        print(f"\n{describe(sink.changes, sink)}")
+        again = ReimportSink(dsn)
+        again_s = timed_write(again, roll)
+
+        expected = {'updated': counts['edited'] + counts['renumbered'], 'inserted': counts['added'],
+                    'deleted': counts['removed'], 'matched_by_cccd': counts['renumbered']}
+        for name, n in expected.items():
+            if getattr(sink.changes, name) != n:
+                failures.append(f"{name}: {getattr(sink.changes, name)}, expected {n}")
+        if dry.changes != sink.changes:
+            failures.append("the dry run reported different changes")
+        if again.changes.updated or again.changes.inserted or again.changes.deleted:
+            failures.append(f"second run not idempotent: {again.changes}")
+        with db.connect(dsn, autocommit=True) as conn:
+            after = snapshot(conn)
+            lost = sum(1 for voter_id, state in before.items() if voter_id in after and after[voter_id] != state)
+            lost += sum(1 for voter_id, state in before.items() if voter_id not in after and state[0] != 'chua-bau')
+            if lost:
+                failures.append(f"{lost} voters lost or changed their check-in / vote flags")
+            if len(after) != len(roll):
+                failures.append(f"{len(after)} voters after the re-import, the roll has {len(roll)}")
+
+            started = time.perf_counter()
+            conn.execute("DELETE FROM voters")
+            CopySink('voters', dsn=dsn).write(iter(roll))
+            full_s = time.perf_counter() - started
+            voted_after_full = conn.execute(
+                "SELECT count(*) FROM voters WHERE voting_status <> 'chua-bau'").fetchone()[0]
+    finally:
+        if not args.keep:
+            recreate_database(args.dsn, args.database, drop_only=True)
+
+    print(f"\n{'run':<34} {'seconds':>8}")
+    print(f"{'reimport --dry-run':<34} {dry_s:>8.2f}")
+    print(f"{'reimport':<34} {apply_s:>8.2f}")
+    print(f"{'reimport again (no changes)':<34} {again_s:>8.2f}")
+    print(f"{'DELETE all + insert (old way)':<34} {full_s:>8.2f}   check-ins left: {voted_after_full}")
+    for failure in failures:
+        print(f"  ⚠ {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
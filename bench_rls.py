@@ -0,0 +1,131 @@
+"""Measure what row-level security costs on voters, before and after rls_scope.sql.
+
+Loads a synthetic ward (bench_rpc_suite: same schema files and generator)
+into a scratch database, then runs the same statements as PostgREST would
+(role ``authenticated``, auth.uid() = a profile of each role) twice: with
+the policies setup.sql creates, and again after rls_scope.sql has replaced
+them. Roles: super_admin, nhap_lieu (both see everything through
+is_admin()) and to_bau_cu (one area).
+
+    select_all     SELECT count(*) FROM voters            whole visible roll
+    select_area    the voter list filtered on one area
+    select_page    first page of the voter list ordered by name
+    update_one     one check-in (UPDATE ... WHERE id), rolled back
+    update_area    UPDATE of every voter of the area, rolled back
+
+Row counts must match between the two runs (same permissions); a
+difference is printed as an error.
+
+Usage: python bench_rls.py [--dsn ...] [--voters 100000] [--repeat 10] [--keep]
+"""
+import argparse
+import statistics
+import sys
+import time
+
+import db
+import local_auth
+from bench_rpc_suite import apply_schema, load_ward, recreate_database, scratch_dsn
+
+DATABASE = 'baucu_rls_bench'
+RLS_FILE = 'rls_scope.sql'
+ROLES = ('super_admin', 'nhap_lieu', 'to_bau_cu')
+PAGE_SIZE = 50
+
+
+def cases(area, voter_id):
+    """(label, sql, params, result) for one area and one voter of it."""
+    return [
+        ('select_all', 'SELECT count(*) FROM voters', (), 'count'),
+        ('select_area', 'SELECT * FROM voters WHERE area_id = %s ORDER BY name, id', (area,), 'rows'),
+        ('select_page', 'SELECT * FROM voters ORDER BY name, id LIMIT %s', (PAGE_SIZE,), 'rows'),
+        ('update_one', "UPDATE voters SET voting_status = 'da-bau' WHERE id = %s", (voter_id,), 'rowcount'),
+        ('update_area', 'UPDATE voters SET vote_qh = NOT vote_qh WHERE area_id = %s', (area,), 'rowcount'),
+    ]
+
+
+def run_once(conn, sql, params, result):
+    """Run one statement as ``authenticated`` and roll it back; returns (ms, rows seen or changed)."""
+    with conn.transaction(force_rollback=True):
+        conn.execute("SET LOCAL ROLE authenticated")
+        started = time.perf_counter()
+        cur = conn.execute(sql, params)
+        if result == 'count':
+            rows = cur.fetchone()[0]
+        elif result == 'rows':
+            rows = len(cur.fetchall())
+        else:
+            rows = cur.rowcount
+        return (time.perf_counter() - started) * 1000, rows
+
+
+def measure(conn, profiles, area, voter_id, repeat):
+    """{(role, case): {'p50_ms', 'p95_ms', 'rows'}} with the policies currently installed."""
+    results = {}
+    for role, profile_id in profiles.items():
+        local_auth.act_as(conn, profile_id)
+        for label, sql, params, result in cases(area, voter_id):
+            run_once(conn, sql, params, result)
+            samples = []
+            for _ in range(repeat):
+                ms, rows = run_once(conn, sql, params, result)
+                samples.append(ms)
+            results[role, label] = {'p50_ms': statistics.median(samples),
+                                    'p95_ms': statistics.quantiles(samples, n=20)[-1] if repeat > 1 else samples[0],
+                                    'rows': rows}
+    local_auth.act_as(conn, None)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Row-level security overhead on voters, before/after rls_scope.sql.')
+    parser.add_argument('--dsn', help='PostgreSQL server to create the scratch database on (default: $DATABASE_URL)')
+    parser.add_argument('--database', default=DATABASE, help='scratch database (dropped and recreated)')
+    parser.add_argument('--voters', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=10, help='timed runs per statement')
+    parser.add_argument('--seed', type=int, default=21)
+    parser.add_argument('--keep', action='store_true', help='keep the scratch database afterwards')
+    args = parser.parse_args(argv)
+
+    sys.stdout.reconfigure(encoding='utf-8')
+    recreate_database(args.dsn, args.database)
+    try:
+        with db.connect(scratch_dsn(args.dsn, args.database), autocommit=True) as conn:
+            apply_schema(conn)
+            # Supabase grants new tables to the API roles by default; a plain server does not
+            conn.execute("GRANT ALL ON ALL TABLES IN SCHEMA public TO authenticated")
+            counts = load_ward(conn, args.voters, args.seed)
+            area, voter_id = conn.execute(
+                "SELECT area_id, min(id::text) FROM voters GROUP BY area_id "
+                "ORDER BY count(*) DESC, area_id LIMIT 1").fetchone()
+            profiles = {role: local_auth.create_profile(conn, role, area_id=None if role == 'super_admin' else area,
+                                                        username=f"rls-{role}")
+                        for role in ROLES}
+            print(f"{counts['voters']} voters, {counts['areas']} areas; to_bau_cu / nhap_lieu assigned to {area}")
+
+            before = measure(conn, profiles, area, voter_id, args.repeat)
+            with open(RLS_FILE, encoding='utf-8') as f:
+                conn.execute(f.read())
+            conn.execute("ANALYZE voters")
+            after = measure(conn, profiles, area, voter_id, args.repeat)
+    finally:
+        if not args.keep:
+            recreate_database(args.dsn, args.database, drop_only=True)
+
+    print(f"\n{'role':<12} {'statement':<12} {'rows':>7} {'before p50':>11} {'after p50':>10} {'after p95':>10} {'speedup':>8}")
+    mismatches = 0
+    for (role, label), old in before.items():
+        new = after[role, label]
+        flag = ''
+        if old['rows'] != new['rows']:
+            mismatches += 1
+            flag = f"  ⚠ rows {old['rows']} -> {new['rows']}"
+        print(f"{role:<12} {label:<12} {new['rows']:>7} {old['p50_ms']:>9.2f}ms {new['p50_ms']:>8.2f}ms "
+              f"{new['p95_ms']:>8.2f}ms {old['p50_ms'] / new['p50_ms']:>7.1f}x{flag}")
+    if mismatches:
+        print(f"\n{mismatches} statements see different rows after {RLS_FILE}")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
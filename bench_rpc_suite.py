@@ -0,0 +1,353 @@
+"""Benchmark suite for the aggregation RPCs on synthetic wards of 10k / 100k / 1M voters.
+
+For every scale the suite loads a synthetic ward into a scratch database
+next to the one in ``--dsn`` (schema from SCHEMA_FILES, applied in order;
+locations.json is synced right after locations.sql) and times:
+
+    get_election_summary
+    get_aggregated_stats      every view mode
+    get_voters_paged          first / 10th / middle / last page, one area and the whole roll
+    get_voters_page           the same pages by keyset cursor, for comparison
+    search_voters             name prefix, unaccented substring, card number, misspelling
+
+Each RPC is called ``--repeat`` times after a warm-up and p50/p95 are
+recorded, together with the EXPLAIN (ANALYZE, BUFFERS) plan of every
+statement the function runs. The RPCs are PL/pgSQL, so a plain EXPLAIN of
+the call would only show the call itself: plans come from auto_explain
+with nested statements, captured in a separate call so they do not skew
+the timings.
+
+The output is a JSON baseline meant to be kept next to a schema change and
+diffed: plan nodes are stored one line each (node, relation, index, rows,
+buffers), without timings.
+
+    python bench_rpc_suite.py -o before.json
+    ... change rpc_aggregation.sql ...
+    python bench_rpc_suite.py -o after.json --compare before.json
+
+Synthetic ward: names and the mixed dob formats of the real roll
+(synthetic_data.py) parsed by the real importer (import_voters.map_voter_row),
+so areas, units and khu phố follow locations.json; about TURNOUT of them
+have voted. Candidates (5-8 per unit and level), voting_results for every
+area and area_stats are filled as well.
+
+A fresh database only needs setup.sql from SETUP_FRESH_MARKER on (the lines
+above it migrate older deployments). Local PostgreSQL builds often lack
+pgcrypto, which only the user-management functions of setup.sql use, and
+Supabase's auth schema: the first is skipped with a note, the second comes
+from local_auth.
+
+Usage: python bench_rpc_suite.py [--dsn ...] [--scales 10000,100000,1000000] [--repeat 20] [-o rpc_baseline.json] [--compare old.json]
+"""
+import argparse
+import datetime
+import hashlib
+import itertools
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+
+import db
+import local_auth
+import locations
+from bench_voters_paging import cursor_before
+from import_voters import detect_area, is_stt, map_voter_row
+from synthetic_data import vietnamese_name, voter_sheet_rows
+
+SCHEMA_FILES = (
+    'setup.sql',
+    'add_election_levels.sql',
+    'fix_voter_addresses.sql',
+    'add_birth_date.sql',
+    'add_scratched_column.sql',
+    'add_unvoted_column.sql',
+    'voter_counters.sql',
+    'locations.sql',
+    'rpc_aggregation.sql',
+    'voter_search.sql',
+)
+SETUP_FRESH_MARKER = '-- 1. EXTENSIONS'
+DEFAULT_SCALES = (10_000, 100_000, 1_000_000)
+DATABASE = 'baucu_rpc_bench'
+BASELINE_FILE = 'rpc_baseline.json'
+VIEW_MODES = ('area', 'unit', 'neighborhood', 'group')
+CANDIDATE_LEVELS = ('phuong', 'thanh-pho', 'quoc-hoi')
+PAGE_SIZE = 50
+SEARCH_LIMIT = 20
+TURNOUT = 0.65
+SLOWER = 1.25  # --compare flags p50 ratios above this
+AUTO_EXPLAIN = {'log_analyze': 'on', 'log_buffers': 'on', 'log_timing': 'off',
+                'log_nested_statements': 'on', 'log_format': 'json'}
+
+
+def scratch_dsn(dsn, database):
+    from psycopg.conninfo import make_conninfo
+    return make_conninfo(dsn or os.environ.get('DATABASE_URL', ''), dbname=database)
+
+
+def recreate_database(dsn, database, drop_only=False):
+    with db.connect(dsn, autocommit=True) as conn:
+        conn.execute(f'DROP DATABASE IF EXISTS "{database}"')
+        if not drop_only:
+            conn.execute(f'CREATE DATABASE "{database}"')
+
+
+def apply_schema(conn):
+    """Apply SCHEMA_FILES to an empty database; returns {file: sha256 prefix}."""
+    local_auth.ensure_auth_shim(conn)
+    has_pgcrypto = conn.execute(
+        "SELECT EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'pgcrypto')").fetchone()[0]
+    if not has_pgcrypto:
+        print("(pgcrypto is not available here: skipped, only create/update_system_user need it)")
+    hashes = {}
+    for path in SCHEMA_FILES:
+        with open(path, encoding='utf-8') as f:
+            sql = f.read()
+        hashes[path] = hashlib.sha256(sql.encode('utf-8')).hexdigest()[:12]
+        if path == 'setup.sql':
+            sql = sql[sql.index(SETUP_FRESH_MARKER):]
+        if not has_pgcrypto:
+            sql = sql.replace('CREATE EXTENSION IF NOT EXISTS pgcrypto;', '')
+        conn.execute(sql)
+        if path == 'locations.sql':
+            locations.sync(conn, locations.load())
+    return hashes
+
+
+def synthetic_ward(n, seed):
+    """Yield voters records for ``n`` synthetic voters spread over AREA_COUNT areas."""
+    rng = random.Random(seed)
+    area = 'kv01'
+    for index, row in enumerate(voter_sheet_rows(n, seed=seed)):
+        if not is_stt(row[0]):
+            area = detect_area(row) or area
+            continue
+        voter = map_voter_row(row, index, area)
+        voter['voting_status'] = 'da-bau' if rng.random() < TURNOUT else 'chua-bau'
+        yield voter
+
+
+def copy_rows(conn, table, columns, rows):
+    with conn.cursor().copy(f"COPY {table} ({', '.join(columns)}) FROM STDIN") as copy:
+        for row in rows:
+            copy.write_row(row)
+
+
+def load_ward(conn, n, seed):
+    """Replace voters, candidates, voting_results and area_stats; returns row counts."""
+    conn.execute("TRUNCATE voters, candidates, voting_results, area_stats")
+    voters = synthetic_ward(n, seed)
+    first = next(voters)
+    columns = list(first)
+    copy_rows(conn, 'voters', columns, ([v[c] for c in columns] for v in itertools.chain([first], voters)))
+
+    rng = random.Random(seed)
+    areas = conn.execute("SELECT area_id, unit_id, count(*), count(*) FILTER (WHERE voting_status = 'da-bau') "
+                         "FROM voters GROUP BY area_id, unit_id ORDER BY area_id").fetchall()
+    candidates, results = [], []
+    for level in CANDIDATE_LEVELS:
+        by_unit = {}
+        for unit_id in sorted({a[1] for a in areas}):
+            by_unit[unit_id] = [str(uuid.uuid4()) for _ in range(rng.randint(5, 8))]
+            candidates.extend((cid, vietnamese_name(rng), level, unit_id) for cid in by_unit[unit_id])
+        for area_id, unit_id, _, voted in areas:
+            results.extend((area_id, cid, rng.randint(0, voted)) for cid in by_unit[unit_id])
+    copy_rows(conn, 'candidates', ('id', 'name', 'level', 'unit_id'), candidates)
+    copy_rows(conn, 'voting_results', ('area_id', 'candidate_id', 'votes'), results)
+    copy_rows(conn, 'area_stats', ('area_id', 'total_voters', 'issued_votes', 'received_votes',
+                                   'valid_votes', 'invalid_votes', 'is_locked'),
+              ((area_id, total, voted, voted, voted - voted // 50, voted // 50, rng.random() < 0.5)
+               for area_id, _, total, voted in areas))
+    conn.execute("VACUUM ANALYZE")
+    return {'voters': n, 'areas': len(areas), 'candidates': len(candidates), 'voting_results': len(results)}
+
+
+def rpc_cases(conn):
+    """(label, sql, params) for every measured call at the current scale."""
+    cases = [('get_election_summary', 'SELECT get_election_summary()', ())]
+    cases += [(f"get_aggregated_stats:{mode}", 'SELECT get_aggregated_stats(%s)', (mode,)) for mode in VIEW_MODES]
+    # The largest area: the detail modal of the slowest row on the dashboard
+    area = conn.execute("SELECT area_id FROM voters GROUP BY area_id "
+                        "ORDER BY count(*) DESC, area_id LIMIT 1").fetchone()[0]
+    for label, column, value in (('area', 'area_id', area), ('all', None, None)):
+        where = f"WHERE {column} = %s" if column else ''
+        total = conn.execute(f"SELECT count(*) FROM voters {where}", (value,) if column else ()).fetchone()[0]
+        last = max((total - 1) // PAGE_SIZE, 0)
+        for depth, page in (('first', 0), ('p10', min(9, last)), ('middle', last // 2), ('last', last)):
+            cases.append((f"get_voters_paged:{label}:{depth}",
+                          'SELECT * FROM get_voters_paged(%s, %s, %s, %s, %s)',
+                          (column or '', value or '', 'all', page * PAGE_SIZE, PAGE_SIZE)))
+            cases.append((f"get_voters_page:{label}:{depth}",
+                          'SELECT get_voters_page(%s, %s, %s, %s, %s)',
+                          (column or '', value or '', 'all',
+                           cursor_before(conn, column, value, page * PAGE_SIZE), PAGE_SIZE)))
+    # Queries typed into the voter list search box, taken from a real row
+    name, card = conn.execute("SELECT search_name, voter_card_number FROM voters "
+                              "WHERE area_id = %s ORDER BY id LIMIT 1", (area,)).fetchone()
+    words = name.split()
+    searches = (('prefix', ' '.join(words[:2]), None), ('substring', ' '.join(words[-2:]), None),
+                ('card', card, area), ('typo', words[-1][:-1] + 'x', None))
+    for label, query, area_id in searches:
+        cases.append((f"search_voters:{label}", 'SELECT search_voters(%s, %s, %s)', (query, SEARCH_LIMIT, area_id)))
+    return cases
+
+
+def time_case(conn, sql, params, repeat):
+    conn.execute(sql, params).fetchall()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        conn.execute(sql, params).fetchall()
+        samples.append((time.perf_counter() - started) * 1000)
+    p95 = statistics.quantiles(samples, n=20)[18] if len(samples) > 1 else samples[0]
+    return {'p50_ms': round(statistics.median(samples), 3), 'p95_ms': round(p95, 3),
+            'min_ms': round(min(samples), 3)}
+
+
+def enable_plan_capture(conn):
+    """Load auto_explain on this connection; False when the server does not ship it."""
+    try:
+        conn.execute("LOAD 'auto_explain'")
+    except Exception as e:
+        print(f"(auto_explain is not available, plans show the top-level call only: {e})")
+        return False
+    for setting, value in AUTO_EXPLAIN.items():
+        conn.execute(f"SET auto_explain.{setting} = {value}")
+    return True
+
+
+def capture_plans(conn, sql, params, nested):
+    """EXPLAIN (ANALYZE, BUFFERS) plans of every statement run by one call, outer call last."""
+    if not nested:
+        plan = conn.execute(f"EXPLAIN (ANALYZE, BUFFERS, TIMING OFF, FORMAT JSON) {sql}", params).fetchone()[0][0]
+        return [dict(plan, **{'Query Text': sql})]
+    plans = []
+
+    def collect(diag):
+        message = diag.message_primary or ''
+        if message.startswith('duration:') and 'plan:' in message:
+            plans.append(json.loads(message[message.index('{'):]))
+
+    conn.add_notice_handler(collect)
+    conn.execute("SET client_min_messages = log")
+    conn.execute("SET auto_explain.log_min_duration = 0")
+    try:
+        conn.execute(sql, params).fetchall()
+    finally:
+        conn.execute("RESET auto_explain.log_min_duration")
+        conn.execute("RESET client_min_messages")
+        conn.remove_notice_handler(collect)
+    return plans
+
+
+def plan_lines(plan):
+    """One line per plan node, indented by depth, e.g. 'Index Scan voters using idx_voters_area rows=2222 hit=41'."""
+    lines = []
+
+    def walk(node, depth):
+        text = node['Node Type']
+        if 'Relation Name' in node:
+            text += f" {node['Relation Name']}"
+        if 'Index Name' in node:
+            text += f" using {node['Index Name']}"
+        text += f" rows={node.get('Actual Rows', 0)}"
+        hit, read = node.get('Shared Hit Blocks', 0), node.get('Shared Read Blocks', 0)
+        if hit or read:
+            text += f" hit={hit} read={read}"
+        lines.append('  ' * depth + text)
+        for child in node.get('Plans', []):
+            walk(child, depth + 1)
+
+    walk(plan['Plan'], 0)
+    return lines
+
+
+def plan_record(plans):
+    # Outer call last; it includes the buffers of the statements nested in it
+    return {
+        'statements': len(plans),
+        'shared_buffers': plans[-1]['Plan'].get('Shared Hit Blocks', 0) + plans[-1]['Plan'].get('Shared Read Blocks', 0),
+        'plans': [{'query': ' '.join(p.get('Query Text', '').split())[:200], 'nodes': plan_lines(p)} for p in plans],
+    }
+
+
+def plan_shape(record):
+    """Node types, relations and indexes only: what --compare calls a plan change."""
+    return [[line.split(' rows=')[0] for line in p['nodes']] for p in record['plans']]
+
+
+def compare(old, new):
+    """Print p50/p95 changes and plan changes between two baselines."""
+    print(f"\nCompared with {old['meta']['created']}:")
+    for file, digest in new['meta']['schema'].items():
+        if old['meta']['schema'].get(file) != digest:
+            print(f"  {file} changed")
+    print(f"{'voters':>9}  {'rpc':<34} {'p50 before':>11} {'p50 now':>9} {'ratio':>6}  plan")
+    for scale, result in new['scales'].items():
+        before = old['scales'].get(scale, {}).get('rpcs', {})
+        for label, now in result['rpcs'].items():
+            prev = before.get(label)
+            if prev is None:
+                print(f"{scale:>9}  {label:<34} {'-':>11} {now['p50_ms']:>9.2f}")
+                continue
+            ratio = now['p50_ms'] / prev['p50_ms'] if prev['p50_ms'] else float('inf')
+            plan = 'same' if plan_shape(prev['plan']) == plan_shape(now['plan']) else 'CHANGED'
+            flag = ' ⚠' if ratio > SLOWER else ''
+            print(f"{scale:>9}  {label:<34} {prev['p50_ms']:>11.2f} {now['p50_ms']:>9.2f} {ratio:>5.2f}x  {plan}{flag}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the aggregation RPCs on synthetic wards.')
+    parser.add_argument('--dsn', help='PostgreSQL server to create the scratch database on (default: $DATABASE_URL)')
+    parser.add_argument('--database', default=DATABASE, help='scratch database (dropped and recreated)')
+    parser.add_argument('--scales', default=','.join(map(str, DEFAULT_SCALES)), help='comma-separated voter counts')
+    parser.add_argument('--repeat', type=int, default=20, help='timed calls per RPC')
+    parser.add_argument('--seed', type=int, default=18)
+    parser.add_argument('-o', '--output', default=BASELINE_FILE, help='JSON baseline to write')
+    parser.add_argument('--compare', help='earlier baseline to compare with')
+    parser.add_argument('--keep', action='store_true', help='keep the scratch database afterwards')
+    args = parser.parse_args(argv)
+
+    sys.stdout.reconfigure(encoding='utf-8')
+    scales = [int(s) for s in args.scales.split(',')]
+    baseline = {'meta': {'created': datetime.datetime.now().isoformat(timespec='seconds'),
+                         'repeat': args.repeat, 'page_size': PAGE_SIZE, 'seed': args.seed},
+                'scales': {}}
+
+    recreate_database(args.dsn, args.database)
+    try:
+        with db.connect(scratch_dsn(args.dsn, args.database), autocommit=True) as conn:
+            baseline['meta']['postgres'] = conn.execute("SHOW server_version").fetchone()[0]
+            baseline['meta']['schema'] = apply_schema(conn)
+            nested = enable_plan_capture(conn)
+            for n in scales:
+                started = time.perf_counter()
+                counts = load_ward(conn, n, args.seed)
+                print(f"\n{n} voters ({counts['areas']} areas, {counts['voting_results']} voting_results) "
+                      f"loaded in {time.perf_counter() - started:.1f} s")
+                rpcs = {}
+                for label, sql, params in rpc_cases(conn):
+                    rpcs[label] = time_case(conn, sql, params, args.repeat)
+                    rpcs[label]['plan'] = plan_record(capture_plans(conn, sql, params, nested))
+                    print(f"  {label:<34} p50 {rpcs[label]['p50_ms']:>9.2f} ms  p95 {rpcs[label]['p95_ms']:>9.2f} ms  "
+                          f"{rpcs[label]['plan']['shared_buffers']:>7} buffers")
+                baseline['scales'][str(n)] = {'rows': counts, 'rpcs': rpcs}
+    finally:
+        if not args.keep:
+            recreate_database(args.dsn, args.database, drop_only=True)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(baseline, f, ensure_ascii=False, indent=1)
+    print(f"\nBaseline written to {args.output}")
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            compare(json.load(f), baseline)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
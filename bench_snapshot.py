@@ -0,0 +1,156 @@
+"""Benchmark snapshot.py: export, memory-mapped reopening and local group-bys.
+
+Loads a synthetic ward (bench_rpc_suite: schema files, generator, 65%
+turnout) plus ``--logs`` audit rows into a scratch database, then:
+
+    export      one snapshot per compression (zstd, lz4, none): seconds,
+                MB written, peak RSS; content_sha256 must not depend on it
+    reopen      open_snapshot + read of two voters columns, cold and warm
+    group-bys   turnout per (area, gender) and check-ins per hour, as SQL
+                on the database and as pyarrow group_by on the snapshot
+    diff        a second snapshot after a few hundred edits; the counts
+                reported by snapshot.diff must match the edits
+
+Usage: python bench_snapshot.py [--dsn ...] [--voters 1000000] [--logs 500000] [--repeat 5] [--keep]
+"""
+import argparse
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+import db
+import snapshot
+from bench_rpc_suite import apply_schema, load_ward, recreate_database, scratch_dsn
+from instrumentation import peak_rss_mb
+
+DATABASE = 'baucu_snapshot_bench'
+EDITED = 300
+REMOVED = 40
+
+
+def load_logs(conn, n):
+    conn.execute(
+        "INSERT INTO system_logs (user_name, action, details, status, created_at) "
+        "SELECT 'Cán bộ ' || (i %% 300), 'CẬP NHẬT TRẠNG THÁI BẦU', 'Cử tri #' || i, 'success', "
+        "       NOW() - make_interval(secs => random() * 86400) "
+        "FROM generate_series(1, %s) AS i", (n,))
+
+
+def sql_cases():
+    return [
+        ('turnout', "SELECT area_id, gender, count(*), count(*) FILTER (WHERE voting_status = 'da-bau') "
+                    "FROM voters GROUP BY area_id, gender"),
+        ('checkins_hour', "SELECT date_trunc('hour', created_at), count(*) FROM system_logs GROUP BY 1"),
+    ]
+
+
+def arrow_cases(snap):
+    import pyarrow.compute as pc
+
+    def turnout():
+        voters = snap.read('voters', ['area_id', 'gender', 'voting_status'])
+        voted = pc.equal(voters['voting_status'], 'da-bau')
+        return voters.append_column('voted', voted).group_by(['area_id', 'gender']).aggregate(
+            [([], 'count_all'), ('voted', 'sum')])
+
+    def checkins_hour():
+        logs = snap.read('system_logs', ['created_at'])
+        hour = pc.floor_temporal(logs['created_at'], unit='hour')
+        return logs.append_column('hour', hour).group_by('hour').aggregate([([], 'count_all')])
+
+    return [('turnout', turnout), ('checkins_hour', checkins_hour)]
+
+
+def p50(fn, repeat):
+    fn()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='snapshot.py export, reopen, group-by and diff timings.')
+    parser.add_argument('--dsn', help='PostgreSQL server to create the scratch database on (default: $DATABASE_URL)')
+    parser.add_argument('--database', default=DATABASE, help='scratch database (dropped and recreated)')
+    parser.add_argument('--voters', type=int, default=1_000_000)
+    parser.add_argument('--logs', type=int, default=500_000)
+    parser.add_argument('--repeat', type=int, default=5, help='timed runs per group-by')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--keep', action='store_true', help='keep the scratch database afterwards')
+    args = parser.parse_args(argv)
+
+    sys.stdout.reconfigure(encoding='utf-8')
+    recreate_database(args.dsn, args.database)
+    dsn = scratch_dsn(args.dsn, args.database)
+    directory = tempfile.mkdtemp(prefix='snapshots-')
+    failures = []
+    try:
+        with db.connect(dsn, autocommit=True) as conn:
+            apply_schema(conn)
+            counts = load_ward(conn, args.voters, args.seed)
+            load_logs(conn, args.logs)
+            conn.execute("VACUUM ANALYZE system_logs")
+        print(f"{counts['voters']} voters, {counts['candidates']} candidates, {args.logs} log rows")
+
+        print(f"\n{'export':<10} {'seconds':>8} {'MB':>8} {'peak RSS MB':>12}")
+        hashes = {}
+        for compression in snapshot.COMPRESSIONS:
+            started = time.perf_counter()
+            path = snapshot.export(dsn, directory, compression=compression, name=compression)
+            elapsed = time.perf_counter() - started
+            entries = snapshot.open_snapshot(path).manifest['tables']
+            size = sum(e['bytes'] for e in entries.values())
+            print(f"{compression:<10} {elapsed:>8.2f} {size / 1e6:>8.1f} {peak_rss_mb():>12.0f}")
+            hashes[compression] = {t: e['content_sha256'] for t, e in entries.items()}
+        if len({tuple(sorted(h.items())) for h in hashes.values()}) != 1:
+            failures.append('content_sha256 differs between compressions')
+
+        print(f"\n{'reopen':<10} {'ms':>8}")
+        for compression in snapshot.COMPRESSIONS:
+            def reopen():
+                return snapshot.open_snapshot(f"{directory}/{compression}").read('voters', ['area_id', 'voting_status'])
+            print(f"{compression:<10} {p50(reopen, args.repeat):>8.2f}")
+
+        print(f"\n{'group-by':<14} {'sql ms':>8} {'zstd ms':>8} {'none ms':>8}")
+        snaps = {c: snapshot.open_snapshot(f"{directory}/{c}") for c in ('zstd', 'none')}
+        local = {c: dict(arrow_cases(s)) for c, s in snaps.items()}
+        with db.connect(dsn, autocommit=True) as conn:
+            for label, sql in sql_cases():
+                remote = p50(lambda: conn.execute(sql).fetchall(), args.repeat)
+                expected = len(conn.execute(sql).fetchall())
+                if local['none'][label]().num_rows != expected:
+                    failures.append(f"{label}: group count differs from SQL")
+                print(f"{label:<14} {remote:>8.1f} {p50(local['zstd'][label], args.repeat):>8.1f} "
+                      f"{p50(local['none'][label], args.repeat):>8.1f}")
+
+            conn.execute("UPDATE voters SET voting_status = 'da-bau' WHERE id IN "
+                         "(SELECT id FROM voters WHERE voting_status = 'chua-bau' LIMIT %s)", (EDITED,))
+            conn.execute("DELETE FROM voters WHERE id IN (SELECT id FROM voters ORDER BY id DESC LIMIT %s)", (REMOVED,))
+        after = snapshot.export(dsn, directory, name='after')
+        started = time.perf_counter()
+        result = snapshot.diff(f"{directory}/zstd", after)
+        elapsed = time.perf_counter() - started
+        voters = result['voters']
+        print(f"\ndiff: voters +{voters['added']} -{voters['removed']} ~{voters['changed']} "
+              f"({', '.join(sorted(voters['columns']))}), other tables "
+              f"{'unchanged' if all(r is None for t, r in result.items() if t != 'voters') else 'changed'}; "
+              f"{elapsed:.2f} s")
+        if (voters['added'], voters['removed']) != (0, REMOVED) or voters['columns'].get('voting_status', 0) > EDITED:
+            failures.append(f"diff reported {voters}, expected -{REMOVED} and at most {EDITED} changed")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+        if not args.keep:
+            recreate_database(args.dsn, args.database, drop_only=True)
+
+    for failure in failures:
+        print(f"  ⚠ {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
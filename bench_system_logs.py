@@ -0,0 +1,167 @@
+"""Measure the system_logs queries before and after system_logs_partitions.sql.
+
+Loads a scratch database (bench_rpc_suite schema files plus rls_scope.sql)
+with ``--logs`` audit rows spread over the last ``--days`` days, mostly
+check-ins as on election day, then times the statements the web app
+issues, as an admin through RLS (role ``authenticated``, like bench_rls):
+
+    latest_page     SystemLogs first page: newest 20
+    page_10         SystemLogs 10th page
+    action_page     SystemLogs filtered on one action
+    day_page        SystemLogs filtered on one day
+    search_page     SystemLogs text search (ilike) within one day
+    tray            NotificationTray: newest 10
+    trend_12h       Dashboard: check-ins of the last 12 hours
+    insert_batch    one flush of lib/logger.ts (20 rows), rolled back
+
+The old SystemLogs page loaded the whole table into the browser
+(``full_table``); it is timed before the migration only. After the
+migration archive_logs.py is run once against the scratch database
+(export every closed day, drop days older than ``--keep-days``) and its
+archive is checked against the rows it dropped.
+
+Usage: python bench_system_logs.py [--dsn ...] [--logs 1000000] [--days 14] [--repeat 10] [--keep]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+
+import archive_logs
+import db
+import local_auth
+from bench_rls import run_once
+from bench_rpc_suite import apply_schema, recreate_database, scratch_dsn
+
+DATABASE = 'baucu_logs_bench'
+PARTITION_FILE = 'system_logs_partitions.sql'
+CHECKIN_ACTION = 'CẬP NHẬT TRẠNG THÁI BẦU'
+ACTIONS = (CHECKIN_ACTION, 'ĐĂNG NHẬP', 'NHẬP DỮ LIỆU CỬ TRI', 'CẬP NHẬT KẾT QUẢ', 'KHÓA KHU VỰC', 'ĐĂNG XUẤT')
+PAGE_SIZE = 20
+
+
+def load_logs(conn, n, days):
+    """``n`` rows over the last ``days`` days: 80% check-ins, 3% errors."""
+    conn.execute(
+        "INSERT INTO system_logs (user_name, action, details, ip_address, status, created_at) "
+        "SELECT 'Cán bộ ' || (i %% 300), "
+        "       CASE WHEN i %% 5 = 0 THEN (%s::text[])[2 + (i / 5) %% %s] ELSE %s END, "
+        "       'Cử tri #' || i || ' kv' || lpad((1 + i %% 45)::text, 2, '0'), "
+        "       '10.0.' || (i %% 250) || '.' || (i %% 7), "
+        "       CASE WHEN i %% 33 = 0 THEN 'error' ELSE 'success' END, "
+        "       NOW() - make_interval(secs => random() * %s * 86400) "
+        "FROM generate_series(1, %s) AS i",
+        (list(ACTIONS), len(ACTIONS) - 1, CHECKIN_ACTION, days, n))
+    conn.execute("ANALYZE system_logs")
+
+
+def cases(conn):
+    """(label, sql, params, result); the day cases use yesterday (Vietnam time)."""
+    day = conn.execute("SELECT (NOW() AT TIME ZONE 'Asia/Ho_Chi_Minh')::DATE - 1").fetchone()[0]
+    day_range = ("created_at >= %s::timestamp AT TIME ZONE 'Asia/Ho_Chi_Minh' "
+                 "AND created_at < (%s::date + 1)::timestamp AT TIME ZONE 'Asia/Ho_Chi_Minh'")
+    page = f"ORDER BY created_at DESC LIMIT {PAGE_SIZE}"
+    values = ', '.join(['(%s, %s, %s, %s, %s)'] * PAGE_SIZE)
+    return [
+        ('latest_page', f"SELECT * FROM system_logs {page}", (), 'rows'),
+        ('page_10', f"SELECT * FROM system_logs {page} OFFSET {9 * PAGE_SIZE}", (), 'rows'),
+        ('action_page', f"SELECT * FROM system_logs WHERE action = %s {page}", ('KHÓA KHU VỰC',), 'rows'),
+        ('day_page', f"SELECT * FROM system_logs WHERE {day_range} {page}", (day, day), 'rows'),
+        ('search_page', f"SELECT * FROM system_logs WHERE {day_range} AND (user_name ILIKE %s OR details ILIKE %s) {page}",
+         (day, day, '%kv07%', '%kv07%'), 'rows'),
+        ('tray', "SELECT * FROM system_logs ORDER BY created_at DESC LIMIT 10", (), 'rows'),
+        ('trend_12h', "SELECT created_at FROM system_logs WHERE action = %s "
+                      "AND created_at >= NOW() - INTERVAL '12 hours' ORDER BY created_at", (CHECKIN_ACTION,), 'rows'),
+        ('insert_batch', f"INSERT INTO system_logs (user_name, action, details, ip_address, status) VALUES {values}",
+         tuple(v for i in range(PAGE_SIZE) for v in ('bench', CHECKIN_ACTION, f"#{i}", 'internal', 'success')),
+         'rowcount'),
+    ]
+
+
+def measure(conn, profile_id, repeat, extra=()):
+    """{case: {'p50_ms', 'p95_ms', 'rows'}} for the current table layout."""
+    local_auth.act_as(conn, profile_id)
+    results = {}
+    for label, sql, params, result in list(extra) + cases(conn):
+        run_once(conn, sql, params, result)
+        samples = []
+        for _ in range(repeat):
+            ms, rows = run_once(conn, sql, params, result)
+            samples.append(ms)
+        results[label] = {'p50_ms': statistics.median(samples),
+                          'p95_ms': statistics.quantiles(samples, n=20)[-1] if repeat > 1 else samples[0],
+                          'rows': rows}
+    local_auth.act_as(conn, None)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='system_logs queries before/after day partitioning.')
+    parser.add_argument('--dsn', help='PostgreSQL server to create the scratch database on (default: $DATABASE_URL)')
+    parser.add_argument('--database', default=DATABASE, help='scratch database (dropped and recreated)')
+    parser.add_argument('--logs', type=int, default=1_000_000)
+    parser.add_argument('--days', type=int, default=14, help='days the logs are spread over')
+    parser.add_argument('--keep-days', type=int, default=7, help='retention used for the archive_logs.py run')
+    parser.add_argument('--repeat', type=int, default=10, help='timed runs per statement')
+    parser.add_argument('--keep', action='store_true', help='keep the scratch database afterwards')
+    args = parser.parse_args(argv)
+
+    sys.stdout.reconfigure(encoding='utf-8')
+    recreate_database(args.dsn, args.database)
+    dsn = scratch_dsn(args.dsn, args.database)
+    failures = []
+    try:
+        with db.connect(dsn, autocommit=True) as conn:
+            apply_schema(conn)
+            with open('rls_scope.sql', encoding='utf-8') as f:
+                conn.execute(f.read())
+            conn.execute("GRANT ALL ON ALL TABLES IN SCHEMA public TO authenticated")
+            admin = local_auth.create_profile(conn, 'super_admin', username='logs-admin')
+            load_logs(conn, args.logs, args.days)
+            print(f"{args.logs} log rows over {args.days} days")
+
+            before = measure(conn, admin, args.repeat,
+                             extra=[('full_table', 'SELECT * FROM system_logs ORDER BY created_at DESC', (), 'rows')])
+            with open(PARTITION_FILE, encoding='utf-8') as f:
+                conn.execute(f.read())
+            conn.execute("ANALYZE system_logs")
+            parts = len(archive_logs.partitions(conn))
+            total = conn.execute("SELECT count(*) FROM system_logs").fetchone()[0]
+            print(f"migrated into {parts} day partitions ({total} rows)")
+            if total != args.logs:
+                failures.append(f"{total} rows after the migration, expected {args.logs}")
+            after = measure(conn, admin, args.repeat)
+
+            current = archive_logs.today(conn)
+            expired = [(name, archive_logs.row_count(conn, name)) for name, day in archive_logs.partitions(conn)
+                       if (current - day).days > args.keep_days]
+        with tempfile.TemporaryDirectory() as directory:
+            archived, dropped, _ = archive_logs.run(dsn, directory, keep_days=args.keep_days)
+            for name, rows in expired:
+                saved = archive_logs.archived_rows(archive_logs.archive_path(directory, name))
+                if saved != rows:
+                    failures.append(f"{name}: {rows} rows dropped, archive holds {saved}")
+            size = sum(os.path.getsize(os.path.join(directory, f)) for f in os.listdir(directory))
+        print(f"archive_logs.py: {archived} days archived ({size / 1e6:.1f} MB gzip), {dropped} dropped")
+        if dropped != len(expired):
+            failures.append(f"{dropped} partitions dropped, expected {len(expired)}")
+    finally:
+        if not args.keep:
+            recreate_database(args.dsn, args.database, drop_only=True)
+
+    print(f"\n{'statement':<14} {'rows':>8} {'before p50':>11} {'after p50':>10} {'after p95':>10} {'speedup':>8}")
+    for label, old in before.items():
+        new = after.get(label)
+        if new is None:
+            print(f"{label:<14} {old['rows']:>8} {old['p50_ms']:>9.2f}ms {'-':>10} {'-':>10} {'-':>8}")
+            continue
+        print(f"{label:<14} {new['rows']:>8} {old['p50_ms']:>9.2f}ms {new['p50_ms']:>8.2f}ms "
+              f"{new['p95_ms']:>8.2f}ms {old['p50_ms'] / new['p50_ms']:>7.1f}x")
+    for failure in failures:
+        print(f"  ⚠ {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
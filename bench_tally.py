@@ -0,0 +1,119 @@
+"""Benchmark tally_results on a synthetic city-scale election.
+
+Every level (phuong / thanh-pho / quoc-hoi) splits ``--areas`` areas into
+its own units with 3-8 candidates each, and every area reports a result
+row for each candidate of its units. The vectorized tally is checked
+against a straight port of the ResultCalculation.tsx loop, run per
+(level, unit).
+
+Usage: python bench_tally.py [--areas 3000] [--repeat 5]
+"""
+import argparse
+import statistics
+import sys
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from synthetic_data import DEM, HO, TEN
+from tally_results import delegate_count, tally
+
+# Units per level for a city with 3000 areas; scaled with --areas
+UNITS_PER_3000_AREAS = {'phuong': 150, 'thanh-pho': 30, 'quoc-hoi': 10}
+
+
+def synthetic_election(n_areas, seed=3):
+    rng = np.random.default_rng(seed)
+    areas = [f"kv{i:04d}" for i in range(1, n_areas + 1)]
+    candidates, results = [], []
+    for level, per_3000 in UNITS_PER_3000_AREAS.items():
+        n_units = max(1, per_3000 * n_areas // 3000)
+        unit_of_area = np.arange(n_areas) * n_units // n_areas
+        for unit in range(n_units):
+            unit_id = f"unit_{unit + 1}"
+            members = [{'id': str(uuid.UUID(int=int(rng.integers(2 ** 63)) << 64 | len(candidates) + k)),
+                        'name': f"{rng.choice(HO)} {rng.choice(DEM)} {rng.choice(TEN)}",
+                        'level': level, 'unit_id': unit_id}
+                       for k in range(int(rng.integers(3, 9)))]
+            candidates.extend(members)
+            unit_areas = np.flatnonzero(unit_of_area == unit)
+            # Coarse votes so that ties (including at the last seat) show up
+            votes = rng.integers(0, 40, (len(unit_areas), len(members))) * 5
+            for a, row in zip(unit_areas, votes):
+                results.extend({'area_id': areas[a], 'candidate_id': c['id'], 'votes': int(v)}
+                               for c, v in zip(members, row))
+    area_stats = pd.DataFrame({'area_id': areas,
+                               'valid_votes': rng.integers(150, 400, n_areas),
+                               'is_locked': True})
+    return pd.DataFrame(results), pd.DataFrame(candidates), area_stats
+
+
+def reference_tally(results, candidates):
+    """ResultCalculation.tsx fetchRealtimeData, grouped by (level, unit) instead of unit only."""
+    votes_by_candidate = {}
+    for r in results.itertuples():
+        votes_by_candidate[r.candidate_id] = votes_by_candidate.get(r.candidate_id, 0) + r.votes
+    out = {}
+    cand = candidates.to_dict('records')
+    for key in dict.fromkeys((c['level'], c['unit_id']) for c in cand):
+        unit_candidates = [c for c in cand if (c['level'], c['unit_id']) == key]
+        unit_total = sum(votes_by_candidate.get(c['id'], 0) for c in unit_candidates)
+        unit_results = [{'id': c['id'], 'total_votes': votes_by_candidate.get(c['id'], 0)} for c in unit_candidates]
+        unit_results.sort(key=lambda c: -c['total_votes'])
+        for idx, c in enumerate(unit_results):
+            v = c['total_votes']
+            out[c['id']] = (v, idx + 1, round(v / unit_total * 100, 2) if unit_total > 0 else 0)
+    return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--areas', type=int, default=3000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    results, candidates, area_stats = synthetic_election(args.areas)
+    print(f"{args.areas} areas, {len(candidates)} candidates, {len(results)} result rows")
+
+    samples = []
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        table, units = tally(results, candidates, area_stats)
+        samples.append((time.perf_counter() - started) * 1000)
+    print(f"tally_results.tally: median {statistics.median(samples):.1f} ms, best {min(samples):.1f} ms")
+
+    started = time.perf_counter()
+    expected = reference_tally(results, candidates)
+    print(f"reference loop:      {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    # The reference ranks ties by position (1, 2, 3); tally_results gives them
+    # the same rank. Compare votes/percentages exactly and ranks through the tie runs.
+    got = table.set_index('id')
+    bad = 0
+    for cand_id, (votes, ordinal, pct) in expected.items():
+        row = got.loc[cand_id]
+        same_rank = row['rank'] == ordinal or (row['tied'] and row['rank'] < ordinal)
+        if row['total_votes'] != votes or abs(row['percentage'] - pct) > 1e-9 or not same_rank:
+            bad += 1
+    seats_ok = (units['seats'] == delegate_count(units['candidates'])).all()
+    elected = table.groupby(['level', 'unit_id'])['elected'].sum()
+    seats = units.set_index(['level', 'unit_id'])['seats']
+    over = int((elected > seats.reindex(elected.index)).sum())
+    print(f"{len(units)} units, {int(units['seat_tie'].sum())} with a tie at the last seat, "
+          f"{int((~units['check_ok']).sum())} failing the ballot check")
+    print(f"mismatches vs reference: {bad}; units electing more than their seats: {over}; "
+          f"seat rule {'OK' if seats_ok else 'WRONG'}")
+
+    # Fresh database / snapshot taken before the candidates import
+    empty_table, empty_units = tally(results, candidates.iloc[:0], area_stats)
+    empty_ok = (empty_table.empty and empty_units.empty and not (~empty_units['check_ok']).any()
+                and empty_units.attrs['orphan_rows'] == len(results))
+    print(f"no candidates: {'OK' if empty_ok else 'WRONG'} "
+          f"({len(empty_table)} candidates, {len(empty_units)} units, {empty_units.attrs['orphan_rows']} orphan rows)")
+    return 1 if bad or over or not seats_ok or not empty_ok else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+"""Benchmark voter listing: OFFSET paging (get_voters_paged) vs keyset (get_voters_page).
+
+Needs a database with rpc_aggregation.sql, voter_counters.sql and voter_search.sql applied.
+If voters holds fewer than ``--rows`` rows, synthetic voters are COPYed in
+to make up the difference; everything runs in one transaction that is
+rolled back, so the database is left as it was.
+
+For each filter (one area and the whole roll) the script times page 1, a
+few deeper pages and the last page with both RPCs. The keyset call for
+page N starts from the cursor of the row just before that page, exactly
+as the detail modal does after N clicks on "next".
+
+Usage: python bench_voters_paging.py [--dsn ...] [--rows 100000] [--page-size 50] [--repeat 5]
+"""
+import argparse
+import base64
+import json
+import statistics
+import sys
+import time
+
+import db
+from bench_load_sinks import synthetic_voters
+
+
+def seed(conn, rows):
+    have = conn.execute('SELECT count(*) FROM voters').fetchone()[0]
+    if have >= rows:
+        return have
+    voters = synthetic_voters(rows - have)
+    columns = list(voters[0])
+    with conn.cursor().copy(f"COPY voters ({', '.join(columns)}) FROM STDIN") as copy:
+        for voter in voters:
+            copy.write_row([voter[c] for c in columns])
+    conn.execute('ANALYZE voters')
+    return conn.execute('SELECT count(*) FROM voters').fetchone()[0]
+
+
+def cursor_before(conn, column, value, offset):
+    """Cursor get_voters_page hands out for the row just before ``offset``."""
+    if offset == 0:
+        return None
+    where = f"WHERE {column} = %s" if column else ''
+    params = (value,) if column else ()
+    name, row_id = conn.execute(f"SELECT name, id FROM voters {where} ORDER BY name, id OFFSET %s LIMIT 1",
+                                (*params, offset - 1)).fetchone()
+    return base64.b64encode(json.dumps([name, str(row_id)]).encode('utf-8')).decode('ascii')
+
+
+def timed(conn, sql, params, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        conn.execute(sql, params).fetchall()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def bench_filter(conn, label, column, value, page_size, repeat):
+    where = f"WHERE {column} = %s" if column else ''
+    total = conn.execute(f"SELECT count(*) FROM voters {where}", (value,) if column else ()).fetchone()[0]
+    last = max((total - 1) // page_size, 0)
+    pages = sorted({0, 1, 10, 100, last // 2, last} & set(range(last + 1)))
+    print(f"\n{label}: {total} voters, {last + 1} pages of {page_size}")
+    print(f"  {'page':>6}  {'OFFSET ms':>10}  {'keyset ms':>10}")
+    for page in pages:
+        offset_ms = timed(conn, 'SELECT * FROM get_voters_paged(%s, %s, %s, %s, %s)',
+                          (column or '', value or '', 'all', page * page_size, page_size), repeat)
+        cursor = cursor_before(conn, column, value, page * page_size)
+        keyset_ms = timed(conn, 'SELECT get_voters_page(%s, %s, %s, %s, %s)',
+                          (column or '', value or '', 'all', cursor, page_size), repeat)
+        print(f"  {page + 1:>6}  {offset_ms:>10.2f}  {keyset_ms:>10.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark OFFSET vs keyset voter paging.')
+    parser.add_argument('--dsn', help='PostgreSQL connection string (default: $DATABASE_URL)')
+    parser.add_argument('--rows', type=int, default=100_000, help='minimum voters in the table while benchmarking')
+    parser.add_argument('--page-size', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=5, help='calls per measurement (median reported)')
+    args = parser.parse_args(argv)
+
+    sys.stdout.reconfigure(encoding='utf-8')
+    with db.connect(args.dsn) as conn:
+        try:
+            rows = seed(conn, args.rows)
+            print(f"voters holds {rows} rows")
+            area = conn.execute("SELECT area_id FROM voters WHERE area_id IS NOT NULL "
+                                "GROUP BY area_id ORDER BY count(*) DESC LIMIT 1").fetchone()[0]
+            bench_filter(conn, f"area_id = {area}", 'area_id', area, args.page_size, args.repeat)
+            bench_filter(conn, 'whole roll', None, None, args.page_size, args.repeat)
+        finally:
+            conn.rollback()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
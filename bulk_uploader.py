@@ -0,0 +1,257 @@
+"""Concurrent bulk uploader for the Supabase REST (PostgREST) API.
+
+Replaces the one-chunk-at-a-time urlopen loops of the import scripts:
+
+- keeps one persistent HTTP/1.1 connection per worker thread (no new TLS
+  handshake per chunk);
+- sends up to ``concurrency`` chunks in parallel;
+- grows or shrinks the chunk size from observed latency and error rate;
+- when the server rejects a chunk, bisects it to isolate the bad rows in
+  O(k log n) requests instead of retrying every row on its own;
+- never replays a plain INSERT whose outcome is unknown (connection lost
+  or timed out after the request was sent): the server may already have
+  committed it, so those rows are reported as failed instead. Upserts
+  (``Prefer: resolution=...``) are safe to replay and are retried. The one
+  exception is a reused keep-alive connection that the server had already
+  closed (reset before any status line): that is resent once on a fresh
+  connection.
+
+Usage:
+    uploader = BulkUploader(SUPABASE_URL, SUPABASE_KEY, 'voters')
+    report = uploader.upload(rows)
+    print(report.summary())
+"""
+import datetime
+import http.client
+import json
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
+
+import instrumentation
+
+# Status codes that mean "something in this payload is bad" -> bisect.
+DATA_ERROR_STATUSES = {400, 409, 422}
+# Status codes that are worth retrying as-is.
+TRANSIENT_STATUSES = {408, 429, 500, 502, 503, 504}
+
+
+def json_default(value):
+    """JSON encoding for dates (dob_date, timestamps) in row dicts."""
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class UploadError(Exception):
+    def __init__(self, status, detail):
+        super().__init__(f"HTTP {status}: {detail}")
+        self.status = status
+        self.detail = detail
+
+
+class UploadReport:
+    def __init__(self):
+        self.rows_ok = 0
+        self.failed_rows = []  # (row, error message)
+        self.requests = 0
+        self.retries = 0
+        self.bisections = 0
+        self.elapsed = 0.0
+        self.final_chunk_size = 0
+
+    @property
+    def rows_failed(self):
+        return len(self.failed_rows)
+
+    @property
+    def rows_per_sec(self):
+        return self.rows_ok / self.elapsed if self.elapsed else 0.0
+
+    def summary(self):
+        return (f"{self.rows_ok} rows ok, {self.rows_failed} failed, {self.requests} requests "
+                f"({self.retries} retries, {self.bisections} bisections) in {self.elapsed:.2f}s "
+                f"-> {self.rows_per_sec:,.0f} rows/s, final chunk {self.final_chunk_size}")
+
+
+class ChunkSizer:
+    """AIMD chunk-size controller driven by per-request latency and errors."""
+
+    def __init__(self, initial=200, minimum=10, maximum=2000, target_latency=1.0):
+        self.size = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target_latency = target_latency
+        self._lock = threading.Lock()
+
+    def current(self):
+        with self._lock:
+            return self.size
+
+    def observe(self, latency, ok):
+        with self._lock:
+            if not ok:
+                self.size = max(self.minimum, self.size // 2)
+            elif latency > self.target_latency:
+                self.size = max(self.minimum, int(self.size * 0.7))
+            elif latency < self.target_latency / 2:
+                self.size = min(self.maximum, self.size + max(10, self.size // 4))
+
+
+class BulkUploader:
+    def __init__(self, base_url, key, table, concurrency=4, initial_chunk=200, min_chunk=10,
+                 max_chunk=2000, target_latency=1.0, max_retries=3, timeout=60, prefer='return=minimal',
+                 query=''):
+        parts = urlsplit(base_url)
+        self.scheme = parts.scheme
+        self.host = parts.hostname
+        self.port = parts.port
+        self.path = f"{parts.path.rstrip('/')}/rest/v1/{table}" + (f"?{query}" if query else '')
+        self.headers = {
+            'apikey': key,
+            'Authorization': f'Bearer {key}',
+            'Content-Type': 'application/json',
+            'Prefer': prefer,
+            'Connection': 'keep-alive',
+        }
+        # An upsert can be replayed without duplicating rows; a plain insert cannot
+        self.idempotent = 'resolution=' in prefer
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.sizer = ChunkSizer(initial_chunk, min_chunk, max_chunk, target_latency)
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self._report = None
+
+    # --- connection pool (one keep-alive connection per worker thread) ---
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            cls = http.client.HTTPSConnection if self.scheme == 'https' else http.client.HTTPConnection
+            conn = cls(self.host, self.port, timeout=self.timeout)
+            self._local.conn = conn
+            self._local.served = 0
+        return conn
+
+    def _drop_connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def _count(self, **deltas):
+        with self._stats_lock:
+            for name, delta in deltas.items():
+                setattr(self._report, name, getattr(self._report, name) + delta)
+
+    # --- request handling ---
+
+    def _post(self, rows):
+        """POST one chunk, retrying transient failures. Raises UploadError."""
+        body = json.dumps(rows, ensure_ascii=False, default=json_default).encode('utf-8')
+        attempt = 0
+        stale_retried = False
+        while True:
+            self._count(requests=1)
+            instrumentation.count('http_requests')
+            instrumentation.count('bytes_sent', len(body))
+            started = time.perf_counter()
+            sent = answered = reused = False
+            try:
+                with instrumentation.stage('http'):
+                    conn = self._connection()
+                    reused = self._local.served > 0
+                    conn.request('POST', self.path, body=body, headers=self.headers)
+                    sent = True
+                    response = conn.getresponse()
+                    answered = True
+                    detail = response.read()
+                    status = response.status
+                    self._local.served += 1
+            except (OSError, http.client.HTTPException) as e:
+                self._drop_connection()
+                if (reused and not answered and not stale_retried
+                        and isinstance(e, (ConnectionResetError, BrokenPipeError))):
+                    # Keep-alive connection closed by the server while idle
+                    # (RemoteDisconnected is a ConnectionResetError): resend
+                    # once on a new connection, without backoff
+                    stale_retried = True
+                    self._count(retries=1)
+                    instrumentation.count('retries')
+                    continue
+                if sent and not self.idempotent:
+                    # The server may have committed the chunk before the
+                    # connection dropped; sending it again could duplicate it
+                    self.sizer.observe(time.perf_counter() - started, False)
+                    raise UploadError(None, f"{e} after the request was sent; rows may or may not "
+                                            f"have been written, not retried") from e
+                status, detail = None, str(e).encode()
+            latency = time.perf_counter() - started
+
+            if status is not None and status < 300:
+                self.sizer.observe(latency, True)
+                return
+            if status in DATA_ERROR_STATUSES:
+                # Bad payload, not server pressure: leave the chunk size alone
+                raise UploadError(status, detail.decode('utf-8', 'replace'))
+            self.sizer.observe(latency, False)
+            if status is not None and status not in TRANSIENT_STATUSES:
+                raise UploadError(status, detail.decode('utf-8', 'replace'))
+            if attempt >= self.max_retries:
+                raise UploadError(status, detail.decode('utf-8', 'replace'))
+            attempt += 1
+            self._count(retries=1)
+            instrumentation.count('retries')
+            time.sleep(min(8.0, 0.25 * 2 ** attempt) * (0.5 + random.random()))
+
+    def _send(self, rows):
+        """Send a chunk; on a data error bisect it to isolate the bad rows."""
+        try:
+            self._post(rows)
+            self._count(rows_ok=len(rows))
+        except UploadError as e:
+            if e.status in DATA_ERROR_STATUSES and len(rows) > 1:
+                self._count(bisections=1)
+                instrumentation.count('bisections')
+                mid = len(rows) // 2
+                self._send(rows[:mid])
+                self._send(rows[mid:])
+                return
+            with self._stats_lock:
+                self._report.failed_rows.extend((row, str(e)) for row in rows)
+
+    def upload(self, rows):
+        """Upload an iterable of row dicts and return an UploadReport.
+
+        The iterable is consumed lazily; at most ``2 * concurrency`` chunks are
+        held in memory at once.
+        """
+        self._report = report = UploadReport()
+        started = time.perf_counter()
+        it = iter(rows)
+        pending = set()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            exhausted = False
+            while not exhausted or pending:
+                while not exhausted and len(pending) < self.concurrency * 2:
+                    size = self.sizer.current()
+                    chunk = []
+                    for row in it:
+                        chunk.append(row)
+                        if len(chunk) >= size:
+                            break
+                    if not chunk:
+                        exhausted = True
+                        break
+                    pending.add(pool.submit(self._send, chunk))
+                if pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        future.result()
+        report.elapsed = time.perf_counter() - started
+        report.final_chunk_size = self.sizer.current()
+        return report
@@ -0,0 +1,195 @@
+"""Keep election aggregates current from the change_log delta feed.
+
+Instead of re-reading voters / area_stats / voting_results on every
+event, ChangeFeed loads them once and then applies only the rows returned
+by get_changes_since (change_log.sql). It keeps:
+
+    summary()       total / voted / male / female counts (as get_election_summary)
+    area_counts     per-area [total, voted, male_total, female_total, male_voted, female_voted]
+    area_status()   'done' (locked) / 'voting' (someone voted) / 'empty' per area,
+                    the quick-status map of Reports.tsx
+    candidate_votes total votes per candidate id
+
+Only the few voter columns the aggregates need are kept in memory.
+
+Usage: python change_feed.py [--dsn ...] [--interval 2] [--once] [--verify]
+"""
+import argparse
+import json
+import sys
+import time
+from collections import Counter
+
+import db
+import locations
+
+TABLES = ('voters', 'area_stats', 'voting_results')
+COUNTER_COLUMNS = ('total', 'voted', 'male_total', 'female_total', 'male_voted', 'female_voted')
+DELTA_LIMIT = 5000
+
+
+def _voter_contribution(gender, voting_status):
+    voted = voting_status == 'da-bau'
+    male, female = gender == 'Nam', gender == 'Nữ'
+    return (1, int(voted), int(male), int(female), int(male and voted), int(female and voted))
+
+
+class ChangeFeed:
+    def __init__(self, conn, tables=TABLES, limit=DELTA_LIMIT):
+        self.conn = conn
+        self.tables = list(tables)
+        self.limit = limit
+        self.version = None
+        self.voters = {}
+        self.area_counts = {}
+        self.area_stats = {}
+        self.results = {}
+        self.candidate_votes = Counter()
+        self.stats = Counter()
+
+    # --- voters ---
+    def _set_voter(self, voter_id, area_id=None, gender=None, voting_status=None, deleted=False):
+        old = self.voters.pop(voter_id, None)
+        if old is not None:
+            self._add_counts(old[0], _voter_contribution(old[1], old[2]), -1)
+        if not deleted:
+            self.voters[voter_id] = (area_id or '', gender, voting_status)
+            self._add_counts(area_id or '', _voter_contribution(gender, voting_status), 1)
+
+    def _add_counts(self, area_id, contribution, sign):
+        counts = self.area_counts.setdefault(area_id, [0] * len(COUNTER_COLUMNS))
+        for i, value in enumerate(contribution):
+            counts[i] += sign * value
+
+    # --- voting_results ---
+    def _set_result(self, result_id, candidate_id=None, votes=None, area_id=None, deleted=False):
+        old = self.results.pop(result_id, None)
+        if old is not None:
+            self.candidate_votes[old[1]] -= old[2]
+        if not deleted:
+            self.results[result_id] = (area_id, candidate_id, votes or 0)
+            self.candidate_votes[candidate_id] += votes or 0
+
+    def resync(self):
+        """Reload the watched tables; called on the first poll and when the feed says so."""
+        self.stats['resyncs'] += 1
+        if 'voters' in self.tables:
+            self.voters, self.area_counts = {}, {}
+            for voter_id, area_id, gender, status in self.conn.execute(
+                    "SELECT id::text, area_id, gender, voting_status FROM voters"):
+                self._set_voter(voter_id, area_id, gender, status)
+        if 'area_stats' in self.tables:
+            rows = self.conn.execute("SELECT to_jsonb(s) FROM area_stats s").fetchall()
+            self.area_stats = {r[0]['area_id']: r[0] for r in rows}
+        if 'voting_results' in self.tables:
+            self.results, self.candidate_votes = {}, Counter()
+            for result_id, area_id, candidate_id, votes in self.conn.execute(
+                    "SELECT id::text, area_id, candidate_id::text, votes FROM voting_results"):
+                self._set_result(result_id, candidate_id, votes, area_id)
+
+    def apply(self, changes):
+        """Apply one get_changes_since "changes" object; returns the number of rows touched."""
+        touched = 0
+        for table, delta in changes.items():
+            for key in delta['deletes']:
+                if table == 'voters':
+                    self._set_voter(key, deleted=True)
+                elif table == 'area_stats':
+                    self.area_stats.pop(key, None)
+                elif table == 'voting_results':
+                    self._set_result(key, deleted=True)
+            for row in delta['upserts']:
+                if table == 'voters':
+                    self._set_voter(row['id'], row['area_id'], row['gender'], row['voting_status'])
+                elif table == 'area_stats':
+                    self.area_stats[row['area_id']] = row
+                elif table == 'voting_results':
+                    self._set_result(row['id'], row['candidate_id'], row['votes'], row['area_id'])
+            touched += len(delta['deletes']) + len(delta['upserts'])
+        return touched
+
+    def poll(self):
+        """Fetch and apply the changes since the last poll; returns the number of rows touched."""
+        text = self.conn.execute("SELECT get_changes_since(%s, %s, %s)::text",
+                                 (self.version, self.tables, self.limit)).fetchone()[0]
+        self.stats['polls'] += 1
+        self.stats['bytes'] += len(text.encode('utf-8'))
+        response = json.loads(text)
+        if response['resync']:
+            # Snapshot is read after the version was taken: replayed keys just
+            # return their current rows again, so nothing is lost or doubled.
+            self.resync()
+            touched = len(self.voters) + len(self.area_stats) + len(self.results)
+        else:
+            touched = self.apply(response['changes'])
+            self.stats['changes'] += touched
+        self.version = response['version']
+        return touched
+
+    def summary(self):
+        totals = [sum(c[i] for c in self.area_counts.values()) for i in range(len(COUNTER_COLUMNS))]
+        return dict(zip(('total', 'voted', 'totalMale', 'totalFemale', 'maleVoted', 'femaleVoted'), totals))
+
+    def area_status(self):
+        areas = sorted(set(locations.load().areas()) | set(self.area_stats) | (set(self.area_counts) - {''}))
+        status = {}
+        for area_id in areas:
+            if self.area_stats.get(area_id, {}).get('is_locked'):
+                status[area_id] = 'done'
+            elif self.area_counts.get(area_id, [0, 0])[1] > 0:
+                status[area_id] = 'voting'
+            else:
+                status[area_id] = 'empty'
+        return status
+
+    def state(self):
+        """Comparable snapshot of everything derived (for --verify)."""
+        return {
+            'summary': self.summary(),
+            'area_counts': {k: v for k, v in self.area_counts.items() if any(v)},
+            'area_status': self.area_status(),
+            'candidate_votes': {k: v for k, v in self.candidate_votes.items() if v},
+        }
+
+
+def verify(feed):
+    """Compare the delta-maintained state with a fresh full load; returns the differing keys."""
+    fresh = ChangeFeed(feed.conn, feed.tables)
+    fresh.resync()
+    mine, truth = feed.state(), fresh.state()
+    return [key for key in truth if mine[key] != truth[key]]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Follow the change_log feed and keep aggregates current.')
+    parser.add_argument('--dsn', help='PostgreSQL connection string (default: $DATABASE_URL)')
+    parser.add_argument('--interval', type=float, default=2.0, help='seconds between polls')
+    parser.add_argument('--once', action='store_true', help='sync, print the summary and exit')
+    parser.add_argument('--verify', action='store_true', help='check the state against a full reload after each change')
+    args = parser.parse_args(argv)
+
+    sys.stdout.reconfigure(encoding='utf-8')
+    with db.connect(args.dsn, autocommit=True) as conn:
+        feed = ChangeFeed(conn)
+        while True:
+            started = time.perf_counter()
+            before = feed.stats['bytes']
+            touched = feed.poll()
+            if touched or feed.stats['polls'] == 1:
+                s = feed.summary()
+                status = Counter(feed.area_status().values())
+                print(f"version {feed.version}: {touched} dòng ({feed.stats['bytes'] - before} bytes, "
+                      f"{(time.perf_counter() - started) * 1000:.0f} ms) — đã bầu {s['voted']}/{s['total']}, "
+                      f"khu vực: {status['done']} đã khóa, {status['voting']} đang bầu, {status['empty']} chưa bầu")
+                if args.verify:
+                    bad = verify(feed)
+                    print(f"  ⚠ lệch so với tải lại toàn bộ: {', '.join(bad)}" if bad else "  ✓ khớp với tải lại toàn bộ")
+                    if bad and args.once:
+                        return 1
+            if args.once:
+                return 0
+            time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,197 @@
+-- ===================================================================
+-- NHẬT KÝ THAY ĐỔI (change_log) VÀ RPC get_changes_since
+-- ===================================================================
+-- Thay cho việc tải lại cả bảng mỗi khi có sự kiện realtime: client nhớ
+-- một số version, và get_changes_since(version) chỉ trả về các dòng của
+-- voters / area_stats / voting_results đã thay đổi kể từ version đó.
+--
+-- change_log chỉ ghi khóa của dòng bị đổi (không chép dữ liệu); RPC đọc
+-- trạng thái HIỆN TẠI của các dòng đó từ bảng gốc với quyền của người
+-- gọi (SECURITY INVOKER), nên RLS của voters vẫn được áp dụng. Dòng không
+-- còn đọc được (đã xóa hoặc ngoài phạm vi) được trả về trong "deletes".
+--
+-- version là xmin của snapshot (pg_snapshot_xmin): mọi giao dịch có id
+-- nhỏ hơn đã kết thúc, nên lần gọi sau lấy [version cũ, version mới) không
+-- bao giờ bỏ sót thay đổi của một giao dịch commit muộn.
+--
+-- Khi client cần tải lại toàn bộ (lần đầu, version quá cũ đã bị dọn,
+-- TRUNCATE, hoặc quá p_limit dòng thay đổi) RPC trả "resync": true cùng
+-- version mới; client tải lại dữ liệu rồi tiếp tục từ version đó.
+--
+-- Dọn nhật ký cũ (ví dụ mỗi đêm):  SELECT prune_change_log('1 day');
+-- Client Python: change_feed.py.  Client web: lib/changeFeed.ts.
+-- ===================================================================
+
+CREATE TABLE IF NOT EXISTS change_log (
+  seq BIGSERIAL PRIMARY KEY,
+  txid XID8 NOT NULL DEFAULT pg_current_xact_id(),
+  table_name TEXT NOT NULL,
+  op CHAR(1) NOT NULL CHECK (op IN ('I', 'U', 'D', 'T')),
+  row_key TEXT,
+  changed_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+CREATE INDEX IF NOT EXISTS idx_change_log_txid ON change_log(txid);
+
+-- horizon: version nhỏ nhất còn đủ nhật ký (tăng lên sau mỗi lần dọn)
+CREATE TABLE IF NOT EXISTS change_log_state (
+  id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+  horizon BIGINT NOT NULL DEFAULT 0
+);
+INSERT INTO change_log_state (id, horizon)
+VALUES (TRUE, pg_snapshot_xmin(pg_current_snapshot())::text::bigint)
+ON CONFLICT (id) DO NOTHING;
+
+-- Chỉ người dùng đã đăng nhập đọc được (khóa của dòng bị đổi cũng là dữ liệu)
+ALTER TABLE change_log ENABLE ROW LEVEL SECURITY;
+DROP POLICY IF EXISTS "Public read change_log" ON change_log;
+DROP POLICY IF EXISTS "Authenticated read change_log" ON change_log;
+CREATE POLICY "Authenticated read change_log" ON change_log
+FOR SELECT USING ((SELECT auth.uid()) IS NOT NULL);
+ALTER TABLE change_log_state ENABLE ROW LEVEL SECURITY;
+DROP POLICY IF EXISTS "Public read change_log_state" ON change_log_state;
+DROP POLICY IF EXISTS "Authenticated read change_log_state" ON change_log_state;
+CREATE POLICY "Authenticated read change_log_state" ON change_log_state
+FOR SELECT USING ((SELECT auth.uid()) IS NOT NULL);
+
+-- Ghi khóa các dòng một câu lệnh đã đổi; TG_ARGV[0] là cột khóa của bảng.
+-- UPDATE ghi cả khóa cũ lẫn mới (phòng trường hợp đổi khóa), mỗi khóa một lần.
+CREATE OR REPLACE FUNCTION change_log_capture()
+RETURNS TRIGGER AS $$
+DECLARE
+  v_source TEXT;
+BEGIN
+  IF TG_OP = 'TRUNCATE' THEN
+    INSERT INTO change_log (table_name, op) VALUES (TG_TABLE_NAME, 'T');
+    RETURN NULL;
+  END IF;
+
+  IF TG_OP = 'INSERT' THEN
+    v_source := format('SELECT %I FROM new_rows', TG_ARGV[0]);
+  ELSIF TG_OP = 'DELETE' THEN
+    v_source := format('SELECT %I FROM old_rows', TG_ARGV[0]);
+  ELSE
+    v_source := format('SELECT %1$I FROM new_rows UNION SELECT %1$I FROM old_rows', TG_ARGV[0]);
+  END IF;
+
+  EXECUTE format(
+    'INSERT INTO change_log (table_name, op, row_key) SELECT DISTINCT %L, %L, k::text FROM (%s) AS s(k)',
+    TG_TABLE_NAME, left(TG_OP, 1), v_source);
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- Transition table chỉ dùng được với trigger một sự kiện, nên mỗi bảng có 4 trigger
+DO $$
+DECLARE
+  t RECORD;
+BEGIN
+  FOR t IN SELECT * FROM (VALUES ('voters', 'id'), ('area_stats', 'area_id'), ('voting_results', 'id')) AS v(tbl, key_col)
+  LOOP
+    EXECUTE format('DROP TRIGGER IF EXISTS change_log_ins ON %I', t.tbl);
+    EXECUTE format('DROP TRIGGER IF EXISTS change_log_upd ON %I', t.tbl);
+    EXECUTE format('DROP TRIGGER IF EXISTS change_log_del ON %I', t.tbl);
+    EXECUTE format('DROP TRIGGER IF EXISTS change_log_trunc ON %I', t.tbl);
+    EXECUTE format('CREATE TRIGGER change_log_ins AFTER INSERT ON %I REFERENCING NEW TABLE AS new_rows '
+                   'FOR EACH STATEMENT EXECUTE FUNCTION change_log_capture(%L)', t.tbl, t.key_col);
+    EXECUTE format('CREATE TRIGGER change_log_upd AFTER UPDATE ON %I REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows '
+                   'FOR EACH STATEMENT EXECUTE FUNCTION change_log_capture(%L)', t.tbl, t.key_col);
+    EXECUTE format('CREATE TRIGGER change_log_del AFTER DELETE ON %I REFERENCING OLD TABLE AS old_rows '
+                   'FOR EACH STATEMENT EXECUTE FUNCTION change_log_capture(%L)', t.tbl, t.key_col);
+    EXECUTE format('CREATE TRIGGER change_log_trunc AFTER TRUNCATE ON %I '
+                   'FOR EACH STATEMENT EXECUTE FUNCTION change_log_capture(%L)', t.tbl, t.key_col);
+  END LOOP;
+END $$;
+
+-- RPC: get_changes_since(p_version, p_tables, p_limit)
+-- Trả về JSON:
+--   { "version": <số mới>, "resync": false,
+--     "changes": { "voters": { "upserts": [<dòng hiện tại>...], "deletes": [<khóa>...] }, ... } }
+-- p_version NULL (lần đầu) -> resync. p_tables NULL = cả ba bảng.
+DROP FUNCTION IF EXISTS get_changes_since(BIGINT, TEXT[], INTEGER);
+CREATE OR REPLACE FUNCTION get_changes_since(
+    p_version BIGINT,
+    p_tables TEXT[] DEFAULT NULL,
+    p_limit INTEGER DEFAULT 5000
+)
+RETURNS JSON AS $body$
+DECLARE
+    v_upto BIGINT := pg_snapshot_xmin(pg_current_snapshot())::text::bigint;
+    v_horizon BIGINT;
+    v_changes JSONB := '{}'::jsonb;
+    v_keys TEXT[];
+    v_rows JSONB;
+    v_key_count INTEGER;
+    v_truncated BOOLEAN;
+    t RECORD;
+BEGIN
+    SELECT horizon INTO v_horizon FROM change_log_state WHERE id;
+
+    IF p_version IS NULL OR p_version < v_horizon OR p_version > v_upto THEN
+        RETURN json_build_object('version', v_upto, 'resync', true);
+    END IF;
+
+    -- Cắt ngắn: quá nhiều khóa hoặc có TRUNCATE thì tải lại rẻ hơn áp từng dòng
+    SELECT count(DISTINCT (table_name, row_key)), bool_or(op = 'T')
+    INTO v_key_count, v_truncated
+    FROM change_log
+    WHERE txid >= p_version::text::xid8 AND txid < v_upto::text::xid8
+      AND (p_tables IS NULL OR table_name = ANY(p_tables));
+    IF v_key_count > LEAST(GREATEST(COALESCE(p_limit, 5000), 1), 50000) OR v_truncated THEN
+        RETURN json_build_object('version', v_upto, 'resync', true);
+    END IF;
+
+    FOR t IN SELECT * FROM (VALUES
+        ('voters', 'id', 'uuid'),
+        ('area_stats', 'area_id', 'text'),
+        ('voting_results', 'id', 'uuid')
+    ) AS v(tbl, key_col, key_type)
+    WHERE p_tables IS NULL OR v.tbl = ANY(p_tables)
+    LOOP
+        SELECT array_agg(DISTINCT row_key) INTO v_keys
+        FROM change_log
+        WHERE table_name = t.tbl
+          AND txid >= p_version::text::xid8 AND txid < v_upto::text::xid8;
+        CONTINUE WHEN v_keys IS NULL;
+
+        -- Dòng hiện tại của các khóa đã đổi, đọc dưới RLS của người gọi
+        EXECUTE format('SELECT COALESCE(jsonb_agg(to_jsonb(r)), ''[]'') FROM %I r WHERE r.%I = ANY($1::%s[])',
+                       t.tbl, t.key_col, t.key_type)
+        INTO v_rows USING v_keys;
+
+        v_changes := v_changes || jsonb_build_object(t.tbl, jsonb_build_object(
+            'upserts', v_rows,
+            'deletes', COALESCE((
+                SELECT jsonb_agg(d.k) FROM (
+                    SELECT unnest(v_keys) EXCEPT SELECT r->>t.key_col FROM jsonb_array_elements(v_rows) AS r
+                ) AS d(k)
+            ), '[]')));
+    END LOOP;
+
+    RETURN json_build_object('version', v_upto, 'resync', false, 'changes', v_changes);
+END;
+$body$ LANGUAGE plpgsql STABLE;
+
+-- Dọn nhật ký cũ hơn p_keep; client có version cũ hơn horizon sẽ nhận resync
+CREATE OR REPLACE FUNCTION prune_change_log(p_keep INTERVAL DEFAULT '1 day')
+RETURNS BIGINT AS $$
+DECLARE
+    v_horizon BIGINT;
+    v_deleted BIGINT;
+BEGIN
+    WITH gone AS (
+        DELETE FROM change_log WHERE changed_at < NOW() - p_keep RETURNING txid
+    )
+    SELECT count(*), max(txid::text::bigint) + 1 INTO v_deleted, v_horizon FROM gone;
+
+    IF v_horizon IS NOT NULL THEN
+        UPDATE change_log_state SET horizon = GREATEST(horizon, v_horizon) WHERE id;
+    END IF;
+    RETURN v_deleted;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- Không gọi qua API: xóa nhật ký buộc mọi client tải lại toàn bộ
+REVOKE EXECUTE ON FUNCTION prune_change_log(INTERVAL) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION prune_change_log(INTERVAL) TO service_role;
+
+NOTIFY pgrst, 'reload config';
@@ -0,0 +1,126 @@
+-- ===================================================================
+-- CHECK-IN HÀNG LOẠT CHO MÁY QUÉT TẠI KHU VỰC BỎ PHIẾU (checkin_batch)
+-- ===================================================================
+-- Thay cho mỗi lần quét một lệnh update({ voting_status }) riêng: máy quét
+-- gom các lượt quét (kể cả lúc mất mạng) và gửi một lần
+--
+--   checkin_batch('[{"event_id": "...", "voter_id": "...", "scanned_at": "...", "station": "kv01-1"},
+--                   {"event_id": "...", "area_id": "kv01", "voter_card_number": "0057", ...}]')
+--
+-- Cả lô được áp bằng MỘT câu lệnh UPDATE; quyền được kiểm tra một lần cho
+-- người gọi (không đánh giá policy RLS cho từng dòng). Kết quả trả về theo
+-- từng lượt quét, cùng thứ tự:
+--   checked_in   đã ghi nhận, cử tri chuyển sang 'da-bau'
+--   already      cử tri đã bầu trước đó (hoặc quét lặp trong cùng lô)
+--   duplicate    event_id đã gửi rồi (máy quét gửi lại sau khi mất kết nối)
+--   not_found    không tìm thấy cử tri
+--   forbidden    người gọi không được sửa cử tri này: như policy
+--                "Scope-based voter update", chỉ admin, hoặc nhap_lieu /
+--                to_bau_cu trong khu vực / đơn vị được phân công
+--                (không trả về tên và id của cử tri)
+--
+-- Mỗi lượt quét được lưu trong checkin_events (event_id do máy quét sinh
+-- ra, nên gửi lại bao nhiêu lần cũng chỉ tính một lần).
+-- Client: lib/checkinQueue.ts. Tải thử: python checkin_loadgen.py
+-- ===================================================================
+
+CREATE TABLE IF NOT EXISTS checkin_events (
+  event_id UUID PRIMARY KEY,
+  voter_id UUID,
+  station TEXT,
+  scanned_at TIMESTAMP WITH TIME ZONE,
+  received_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+  user_id UUID,
+  result TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_checkin_events_voter ON checkin_events(voter_id);
+
+ALTER TABLE checkin_events ENABLE ROW LEVEL SECURITY;
+
+-- Tra cứu theo số thẻ cử tri trong khu vực, bỏ số 0 ở đầu như VoterList
+CREATE INDEX IF NOT EXISTS idx_voters_area_card ON voters(area_id, (ltrim(voter_card_number, '0')));
+
+DROP FUNCTION IF EXISTS checkin_batch(JSONB);
+CREATE OR REPLACE FUNCTION checkin_batch(p_events JSONB)
+RETURNS JSON AS $body$
+DECLARE
+    v_profile RECORD;
+    v_all_scope BOOLEAN;
+    v_can_update BOOLEAN;
+    v_result JSON;
+BEGIN
+    SELECT role, area_id, unit_id, neighborhood_id INTO v_profile
+    FROM profiles WHERE id = auth.uid() AND status = 'active';
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'checkin_batch: caller has no active profile' USING ERRCODE = '42501';
+    END IF;
+    -- Cùng điều kiện với policy "Scope-based voter update" (rls_scope.sql)
+    v_all_scope := is_admin();
+    v_can_update := v_profile.role IN ('nhap_lieu', 'to_bau_cu');
+
+    IF jsonb_typeof(p_events) IS DISTINCT FROM 'array' OR jsonb_array_length(p_events) > 1000 THEN
+        RAISE EXCEPTION 'checkin_batch: expected a JSON array of at most 1000 events' USING ERRCODE = '22023';
+    END IF;
+
+    WITH ev AS (
+        SELECT e.*,
+               -- event_id đã gửi ở lần trước (máy quét gửi lại)
+               EXISTS (SELECT 1 FROM checkin_events c WHERE c.event_id = e.event_id) AS seen
+        FROM ROWS FROM (jsonb_to_recordset(p_events) AS (
+                 event_id UUID, voter_id UUID, area_id TEXT, voter_card_number TEXT, scanned_at TIMESTAMPTZ, station TEXT
+             )) WITH ORDINALITY AS e(event_id, voter_id, area_id, voter_card_number, scanned_at, station, ord)
+    ),
+    resolved AS (
+        SELECT ev.*, v.id AS vid, v.name, v.voting_status,
+               COALESCE(v_all_scope OR (v_can_update AND (v.area_id = v_profile.area_id
+                                                          OR v.unit_id = v_profile.unit_id)), FALSE) AS allowed,
+               -- Thứ tự các lượt quét mới của cùng một cử tri trong lô: chỉ lượt đầu được tính
+               row_number() OVER (PARTITION BY v.id, ev.seen ORDER BY ev.scanned_at, ev.ord) AS scan_no
+        FROM ev
+        LEFT JOIN LATERAL (
+            SELECT * FROM voters v
+            WHERE (ev.voter_id IS NOT NULL AND v.id = ev.voter_id)
+               OR (ev.voter_id IS NULL AND v.area_id = ev.area_id
+                   AND ltrim(v.voter_card_number, '0') = ltrim(ev.voter_card_number, '0'))
+            LIMIT 1
+        ) v ON TRUE
+    ),
+    updated AS (
+        UPDATE voters SET voting_status = 'da-bau'
+        FROM resolved r
+        WHERE voters.id = r.vid AND r.allowed AND NOT r.seen AND r.scan_no = 1
+          AND voters.voting_status IS DISTINCT FROM 'da-bau'
+        RETURNING voters.id
+    ),
+    outcome AS (
+        SELECT r.*,
+            CASE
+                WHEN r.seen THEN 'duplicate'
+                WHEN r.vid IS NULL THEN 'not_found'
+                WHEN NOT r.allowed THEN 'forbidden'
+                WHEN r.scan_no = 1 AND EXISTS (SELECT 1 FROM updated u WHERE u.id = r.vid) THEN 'checked_in'
+                ELSE 'already'
+            END AS status
+        FROM resolved r
+    ),
+    logged AS (
+        INSERT INTO checkin_events (event_id, voter_id, station, scanned_at, user_id, result)
+        SELECT DISTINCT ON (event_id) event_id, vid, station, scanned_at, auth.uid(), status
+        FROM outcome WHERE NOT seen AND event_id IS NOT NULL
+        ORDER BY event_id, ord
+        ON CONFLICT (event_id) DO NOTHING
+    )
+    SELECT COALESCE(json_agg(json_build_object(
+        'event_id', event_id, 'status', status,
+        'voter_id', CASE WHEN allowed THEN vid END, 'name', CASE WHEN allowed THEN name END
+    ) ORDER BY ord), '[]') INTO v_result
+    FROM outcome;
+
+    RETURN v_result;
+END;
+$body$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+REVOKE EXECUTE ON FUNCTION checkin_batch(JSONB) FROM PUBLIC, anon;
+GRANT EXECUTE ON FUNCTION checkin_batch(JSONB) TO authenticated;
+
+NOTIFY pgrst, 'reload config';
@@ -0,0 +1,227 @@
+"""Replay an election-morning arrival curve against the check-in path.
+
+One simulated scanning station per area (``--stations-per-area`` for
+more) checks in voters who have not voted yet, following the hourly
+turnout shape of ARRIVAL_CURVE between ``--start`` and ``--end``,
+compressed ``--speed`` times. Each run includes:
+
+    - repeat scans of the same voter (voter walks back to the table),
+    - scans by card number as well as by voter id, a few with unknown numbers,
+    - stations that lose the network for a while and flush their backlog
+      when they are back (``--offline``).
+
+Modes:
+    batch   stations buffer scans and call checkin_batch (checkin_batch.sql)
+            every ``--flush`` simulated seconds or FLUSH_SIZE scans, like
+            lib/checkinQueue.ts
+    single  one UPDATE voters SET voting_status per scan, the old path
+
+Needs checkin_batch.sql applied. auth.uid()/profiles come from local_auth
+when the database has none. Everything the run changes (voter status,
+checkin_events, station profiles) is put back at the end unless --keep.
+
+Usage: python checkin_loadgen.py [--dsn ...] [--mode batch|single] [--start 7 --end 9] [--speed 60]
+"""
+import argparse
+import datetime
+import json
+import random
+import statistics
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+import db
+import local_auth
+
+# Share of the day's voters arriving in each hour (polls open 07:00-19:00);
+# most people vote early, before work and right after opening.
+ARRIVAL_CURVE = {7: 0.22, 8: 0.20, 9: 0.14, 10: 0.10, 11: 0.07, 12: 0.04,
+                 13: 0.04, 14: 0.05, 15: 0.05, 16: 0.04, 17: 0.03, 18: 0.02}
+FLUSH_SIZE = 25
+REPEAT_SCAN_RATE = 0.03
+UNKNOWN_CARD_RATE = 0.005
+OFFLINE_MINUTES = 15
+ELECTION_DAY = datetime.datetime(2026, 5, 24, tzinfo=datetime.timezone(datetime.timedelta(hours=7)))
+
+
+def arrival_times(n, start_hour, end_hour, rng):
+    """n arrival offsets (seconds after start_hour) drawn from the hourly curve."""
+    hours = [h for h in ARRIVAL_CURVE if start_hour <= h < end_hour]
+    weights = [ARRIVAL_CURVE[h] for h in hours]
+    return sorted((h - start_hour) * 3600 + rng.random() * 3600 for h in rng.choices(hours, weights, k=n))
+
+
+def plan_station(voters, args, rng, station):
+    """Sorted (sim_seconds, event) list for one station's voters."""
+    events = []
+    times = arrival_times(len(voters), args.start, args.end, rng)
+    for t, (voter_id, area_id, card) in zip(times, voters):
+        by_card = card and rng.random() < 0.5
+        event = {'area_id': area_id, 'voter_card_number': card} if by_card else {'voter_id': voter_id}
+        events.append((t, event))
+        if rng.random() < REPEAT_SCAN_RATE:
+            events.append((t + rng.uniform(5, 60), dict(event)))
+        if rng.random() < UNKNOWN_CARD_RATE:
+            events.append((t + rng.uniform(1, 30), {'area_id': area_id, 'voter_card_number': '99999'}))
+    for t, event in events:
+        event.update(event_id=str(uuid.uuid4()), station=station,
+                     scanned_at=(ELECTION_DAY + datetime.timedelta(hours=args.start, seconds=t)).isoformat())
+    events.sort(key=lambda e: e[0])
+    return events
+
+
+class Station(threading.Thread):
+    def __init__(self, args, profile_id, events, offline, started, report):
+        super().__init__(daemon=True)
+        self.args = args
+        self.profile_id = profile_id
+        self.events = events
+        self.offline = offline
+        self.started = started
+        self.report = report
+
+    def wall(self, sim_seconds):
+        return self.started + sim_seconds / self.args.speed
+
+    def run(self):
+        args = self.args
+        with db.connect(args.dsn, autocommit=True) as conn:
+            local_auth.act_as(conn, self.profile_id)
+            buffer, last_flush = [], 0.0
+            for sim_t, event in self.events:
+                delay = self.wall(sim_t) - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                if args.mode == 'single':
+                    self.single(conn, event, sim_t)
+                    continue
+                buffer.append((sim_t, event))
+                is_offline = self.offline and self.offline[0] <= sim_t < self.offline[1]
+                if not is_offline and (len(buffer) >= FLUSH_SIZE or sim_t - last_flush >= args.flush):
+                    self.flush(conn, buffer)
+                    buffer, last_flush = [], sim_t
+            if buffer:
+                self.flush(conn, buffer)
+
+    def flush(self, conn, buffer):
+        sent = time.perf_counter()
+        results = conn.execute("SELECT checkin_batch(%s)",
+                               (json.dumps([e for _, e in buffer]),)).fetchone()[0]
+        done = time.perf_counter()
+        with self.report['lock']:
+            self.report['calls'].append((done - sent) * 1000)
+            # Scan-to-commit delay in simulated seconds (includes time spent offline)
+            sim_now = (done - self.started) * self.args.speed
+            self.report['lag'].extend(sim_now - t for t, _ in buffer)
+            self.report['status'].update(r['status'] for r in results)
+            self.report['checked_in'].extend(r['voter_id'] for r in results if r['status'] == 'checked_in')
+
+    def single(self, conn, event, sim_t):
+        sent = time.perf_counter()
+        if 'voter_id' in event:
+            rows = conn.execute("UPDATE voters SET voting_status = 'da-bau' WHERE id = %s "
+                                "AND voting_status IS DISTINCT FROM 'da-bau' RETURNING id::text",
+                                (event['voter_id'],)).fetchall()
+        else:
+            rows = conn.execute("UPDATE voters SET voting_status = 'da-bau' WHERE area_id = %s "
+                                "AND ltrim(voter_card_number, '0') = ltrim(%s, '0') "
+                                "AND voting_status IS DISTINCT FROM 'da-bau' RETURNING id::text",
+                                (event['area_id'], event['voter_card_number'])).fetchall()
+        done = time.perf_counter()
+        with self.report['lock']:
+            self.report['calls'].append((done - sent) * 1000)
+            self.report['lag'].append((done - self.started) * self.args.speed - sim_t)
+            self.report['status']['checked_in' if rows else 'already/not_found'] += 1
+            self.report['checked_in'].extend(r[0] for r in rows)
+
+
+def pct(values, q):
+    return statistics.quantiles(values, n=100)[q - 1] if len(values) > 1 else (values[0] if values else 0)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Election-morning load generator for voter check-in.')
+    parser.add_argument('--dsn', help='PostgreSQL connection string (default: $DATABASE_URL)')
+    parser.add_argument('--mode', choices=('batch', 'single'), default='batch')
+    parser.add_argument('--start', type=int, default=7, help='first simulated hour')
+    parser.add_argument('--end', type=int, default=9, help='simulated hour to stop at')
+    parser.add_argument('--speed', type=float, default=60, help='simulated seconds per wall second')
+    parser.add_argument('--turnout', type=float, default=0.9, help='share of remaining voters arriving over the whole day')
+    parser.add_argument('--stations-per-area', type=int, default=1)
+    parser.add_argument('--flush', type=float, default=15, help='simulated seconds between station flushes')
+    parser.add_argument('--offline', type=float, default=0.1, help='share of stations losing the network once')
+    parser.add_argument('--seed', type=int, default=17)
+    parser.add_argument('--keep', action='store_true', help='leave the check-ins in the database')
+    args = parser.parse_args(argv)
+
+    sys.stdout.reconfigure(encoding='utf-8')
+    rng = random.Random(args.seed)
+    day_share = sum(v for h, v in ARRIVAL_CURVE.items() if args.start <= h < args.end)
+
+    with db.connect(args.dsn, autocommit=True) as conn:
+        local_auth.ensure_auth_shim(conn)
+        pending = conn.execute("SELECT id::text, area_id, voter_card_number, voting_status FROM voters "
+                               "WHERE voting_status IS DISTINCT FROM 'da-bau' AND area_id IS NOT NULL").fetchall()
+        original = {r[0]: r[3] for r in pending}
+        by_area = {}
+        for voter_id, area_id, card, _ in pending:
+            by_area.setdefault(area_id, []).append((voter_id, area_id, card))
+
+        stations, profiles = [], []
+        for area_id, voters in sorted(by_area.items()):
+            rng.shuffle(voters)
+            arriving = voters[:int(len(voters) * args.turnout * day_share)]
+            profile_id = local_auth.create_profile(conn, 'to_bau_cu', area_id=area_id, username=f"loadgen-{area_id}")
+            profiles.append(profile_id)
+            for s in range(args.stations_per_area):
+                station = f"{area_id}-{s + 1}"
+                events = plan_station(arriving[s::args.stations_per_area], args, rng, station)
+                offline = None
+                if rng.random() < args.offline:
+                    begin = rng.uniform(0, (args.end - args.start) * 3600 - OFFLINE_MINUTES * 60)
+                    offline = (begin, begin + OFFLINE_MINUTES * 60)
+                stations.append((profile_id, events, offline))
+        scans = sum(len(e) for _, e, _ in stations)
+        print(f"{args.mode}: {len(stations)} stations, {scans} scans between {args.start}:00 and {args.end}:00 "
+              f"({(args.end - args.start) * 3600 / args.speed:.0f} s wall at {args.speed:g}x), "
+              f"{sum(1 for *_, o in stations if o)} stations offline for {OFFLINE_MINUTES} min")
+
+        report = {'lock': threading.Lock(), 'calls': [], 'lag': [], 'status': Counter(), 'checked_in': []}
+        voted_before = conn.execute("SELECT count(*) FROM voters WHERE voting_status = 'da-bau'").fetchone()[0]
+        started = time.perf_counter()
+        threads = [Station(args, profile_id, events, offline, started, report)
+                   for profile_id, events, offline in stations]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - started
+        voted_after = conn.execute("SELECT count(*) FROM voters WHERE voting_status = 'da-bau'").fetchone()[0]
+
+        calls, lag = report['calls'], report['lag']
+        print(f"{len(calls)} {'RPC calls' if args.mode == 'batch' else 'UPDATEs'} in {elapsed:.1f} s "
+              f"({scans / elapsed:.0f} scans/s wall); call latency p50 {pct(calls, 50):.1f} ms, "
+              f"p95 {pct(calls, 95):.1f} ms, p99 {pct(calls, 99):.1f} ms")
+        print(f"scan -> committed (simulated time): p50 {pct(lag, 50):.0f} s, p95 {pct(lag, 95):.0f} s, max {max(lag):.0f} s")
+        print("results: " + ", ".join(f"{k} {v}" for k, v in sorted(report['status'].items())))
+        checked_in = report['checked_in']
+        consistent = voted_after - voted_before == len(checked_in) == len(set(checked_in))
+        print(f"voters marked da-bau: +{voted_after - voted_before}, check-ins reported: {len(checked_in)} "
+              + ("✓" if consistent else "⚠ mismatch"))
+
+        if not args.keep:
+            with conn.transaction():
+                ids = list(set(checked_in))
+                conn.execute("UPDATE voters v SET voting_status = o.status FROM "
+                             "unnest(%s::uuid[], %s::text[]) AS o(id, status) WHERE v.id = o.id",
+                             (ids, [original[i] for i in ids]))
+                conn.execute("DELETE FROM checkin_events WHERE user_id = ANY(%s::uuid[])", (profiles,))
+                local_auth.delete_profiles(conn, profiles)
+    return 0 if consistent else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
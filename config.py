@@ -0,0 +1,7 @@
+"""Supabase project settings shared by the Python tools.
+
+Kept apart from the importers so that services such as aggregate_cache.py
+can read them without importing pandas/openpyxl.
+"""
+SUPABASE_URL = 'https://wimauldqyotovflfowjw.supabase.co'
+SUPABASE_KEY = 'sb_publishable_9Mn89B57Bd8-CGY59sluIQ_SWhWmelE'
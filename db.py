@@ -0,0 +1,36 @@
+"""Direct PostgreSQL access for the Python tools.
+
+The connection string comes from ``--dsn`` or the DATABASE_URL environment
+variable (Supabase: Project Settings -> Database -> Connection string).
+Requires psycopg 3: ``pip install "psycopg[binary]"``.
+"""
+import os
+
+
+def connect(dsn=None, autocommit=False):
+    try:
+        import psycopg
+    except ImportError as e:
+        raise RuntimeError('Direct database access needs psycopg 3: pip install "psycopg[binary]"') from e
+
+    dsn = dsn or os.environ.get('DATABASE_URL')
+    if not dsn:
+        raise RuntimeError('No database connection string: pass --dsn or set DATABASE_URL')
+    return psycopg.connect(dsn, autocommit=autocommit)
+
+
+def column_types(conn, table, columns):
+    """Return the SQL type name of each column of ``table`` (for binary COPY)."""
+    rows = conn.execute(
+        """
+        SELECT a.attname, format_type(a.atttypid, a.atttypmod)
+        FROM pg_attribute a
+        WHERE a.attrelid = %s::regclass AND a.attnum > 0 AND NOT a.attisdropped
+        """,
+        (table,),
+    ).fetchall()
+    types = dict(rows)
+    missing = [c for c in columns if c not in types]
+    if missing:
+        raise RuntimeError(f"{table} has no column(s): {', '.join(missing)}")
+    return [types[c] for c in columns]
@@ -0,0 +1,149 @@
+"""Find duplicate and near-duplicate voters in a roll or in the voters table.
+
+The voters table has no UNIQUE constraint on cccd any more (see setup.sql),
+so this is the place duplicates are caught. Three passes, all hash based:
+
+    cccd        exact match on the normalized CCCD/CMND number
+    card        exact match on the normalized voter card number within an area
+    name_dob    near duplicates: rows are blocked on diacritic-stripped name
+                + date of birth, and only rows inside one block are compared
+                (never all pairs); pairs already sharing a CCCD are ignored
+
+The result is a duplicate-cluster report in UTF-8 JSON.
+
+Usage:
+    python dedupe_voters.py roll.xlsx [-o duplicates_report.json]
+    python dedupe_voters.py voters.ndjson
+    python dedupe_voters.py --dsn postgresql://... (reads the voters table)
+"""
+import argparse
+import json
+import sys
+import time
+from difflib import SequenceMatcher
+from itertools import combinations
+
+import pandas as pd
+
+from normalize import card_series, cccd_series, dob_key_series, name_key_series
+
+REPORT_FILE = 'duplicates_report.json'
+FIELDS = ['id', 'name', 'dob', 'cccd', 'voter_card_number', 'area_id']
+# Pairwise name similarity is only computed for blocks up to this size
+MAX_SCORED_BLOCK = 50
+
+
+def load_voters(path=None, dsn=None):
+    """DataFrame with FIELDS from a roll workbook, an NDJSON dump or the database."""
+    if dsn:
+        import db
+        with db.connect(dsn) as conn:
+            rows = conn.execute(
+                "SELECT id::text, name, dob, cccd, voter_card_number, area_id FROM voters").fetchall()
+        return pd.DataFrame(rows, columns=FIELDS)
+    if path.lower().endswith(('.xlsx', '.xlsm')):
+        from import_voters import iter_voters
+        df = pd.DataFrame(iter_voters(path))
+    else:
+        df = pd.read_json(path, lines=True, dtype=False)
+    if 'id' not in df:
+        # Roll files have no ids yet: use the position in the file
+        df['id'] = range(1, len(df) + 1)
+    return df.reindex(columns=FIELDS)
+
+
+def add_keys(df):
+    df = df.reset_index(drop=True)
+    df['cccd_key'] = cccd_series(df['cccd'])
+    card = card_series(df['voter_card_number'])
+    df['card_key'] = (df['area_id'].fillna('').astype(str) + '|' + card).where(card != '', '')
+    name = name_key_series(df['name'])
+    dob = dob_key_series(df['dob'])
+    df['block_key'] = (name + '|' + dob).where((name != '') & (dob != ''), '')
+    return df
+
+
+def _groups(df, key):
+    """{key value: positions} for values shared by more than one row."""
+    keyed = df[key]
+    dup = keyed[(keyed != '') & keyed.duplicated(keep=False)]
+    if not len(dup):
+        return {}
+    rows = dup.index.to_numpy()
+    return {value: rows[positions] for value, positions in dup.groupby(dup, sort=False).indices.items()}
+
+
+def _members(columns, positions):
+    return [{field: columns[field][p] for field in FIELDS} for p in positions]
+
+
+def _name_similarity(names):
+    if len(names) > MAX_SCORED_BLOCK:
+        return None
+    return round(min(SequenceMatcher(None, a, b).ratio() for a, b in combinations(names, 2)), 3)
+
+
+def find_duplicates(df):
+    """Return the list of duplicate clusters in ``df`` (keys added by add_keys)."""
+    clusters = []
+    columns = {field: df[field].astype(object).where(df[field].notna(), None).to_numpy() for field in FIELDS}
+    for kind, key in (('cccd', 'cccd_key'), ('card', 'card_key')):
+        for value, positions in _groups(df, key).items():
+            clusters.append({'kind': kind, 'key': value, 'size': len(positions),
+                             'members': _members(columns, positions)})
+
+    cccd = df['cccd_key'].to_numpy()
+    for value, positions in _groups(df, 'block_key').items():
+        # Rows with the same CCCD are already an exact cluster
+        known = [cccd[p] for p in positions if cccd[p]]
+        if len(set(known)) + (len(positions) - len(known)) < 2:
+            continue
+        members = _members(columns, positions)
+        clusters.append({'kind': 'name_dob', 'key': value, 'size': len(positions),
+                         'name_similarity': _name_similarity([m['name'] or '' for m in members]),
+                         'members': members})
+    return clusters
+
+
+def write_report(path, total_rows, clusters, elapsed):
+    counts = {kind: sum(1 for c in clusters if c['kind'] == kind) for kind in ('cccd', 'card', 'name_dob')}
+    report = {
+        'total_rows': total_rows,
+        'cluster_counts': counts,
+        'duplicate_rows': sum(c['size'] for c in clusters),
+        'elapsed_seconds': round(elapsed, 3),
+        'clusters': clusters,
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2, default=str)
+    return counts
+
+
+def dedupe(df):
+    """Normalize, index and cluster ``df``; returns (clusters, seconds)."""
+    started = time.perf_counter()
+    clusters = find_duplicates(add_keys(df))
+    return clusters, time.perf_counter() - started
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Report duplicate and near-duplicate voters.')
+    parser.add_argument('path', nargs='?', help='voter roll (.xlsx) or NDJSON dump')
+    parser.add_argument('--dsn', help='read the voters table from this database instead')
+    parser.add_argument('-o', '--output', default=REPORT_FILE)
+    args = parser.parse_args(argv)
+    if not args.path and not args.dsn:
+        parser.error('give a roll/NDJSON path or --dsn')
+
+    sys.stdout.reconfigure(encoding='utf-8')
+    df = load_voters(args.path, args.dsn)
+    clusters, elapsed = dedupe(df)
+    counts = write_report(args.output, len(df), clusters, elapsed)
+    print(f"{len(df)} voters checked in {elapsed:.2f}s: {counts['cccd']} CCCD clusters, "
+          f"{counts['card']} voter card clusters, {counts['name_dob']} name+dob clusters")
+    print(f"Report written to {args.output}")
+    return 1 if clusters else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
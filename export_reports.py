@@ -0,0 +1,397 @@
+"""Build every election report at once: area minutes, unit roll-ups and the ward report.
+
+Batch version of the export buttons in Reports.tsx. area_stats,
+voting_results and candidates are fetched once. The report contents are
+assembled with pandas in the parent process, then each report is
+rendered to XLSX and PDF in a process pool:
+
+    Mẫu 15-BC   one per KVBP (locations.json)      kiểm phiếu tại khu vực
+    Mẫu 16-BC   one per đơn vị bầu cử            kết quả tại đơn vị, with the
+                                                 seat winners of tally_results
+    Mẫu 18-BC   one for the whole ward           tiến độ cử tri đi bầu
+
+XLSX files are written with openpyxl's write-only (streaming) workbook.
+PDFs embed a Vietnamese-capable TrueType font instead of the ASCII
+fallback of the browser export. The font is subset once per run (Latin
+and Vietnamese ranges only), which keeps every PDF small and fast to
+build. manifest.json and SHA256SUMS (``sha256sum -c SHA256SUMS``) list
+every file with its size and checksum.
+
+Requires openpyxl and, for PDFs, fpdf2: ``pip install openpyxl fpdf2``.
+
+Usage: python export_reports.py [--dsn ...] [-o reports] [--workers 4] [--formats xlsx,pdf] [--font path.ttf]
+"""
+import argparse
+import datetime
+import hashlib
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+import locations
+from tally_results import LEVELS, load_tables, tally
+
+OUTPUT_DIR = 'reports'
+FORMATS = ('xlsx', 'pdf')
+LEVEL_LABELS = {'phuong': 'HĐND Phường', 'thanh-pho': 'HĐND Thành phố', 'quoc-hoi': 'Đại biểu Quốc hội'}
+STAT_FIELDS = [
+    ('total_voters', 'Tổng số cử tri niêm yết'),
+    ('issued_votes', 'Số phiếu phát ra'),
+    ('received_votes', 'Số phiếu thu về'),
+    ('valid_votes', 'Số phiếu hợp lệ'),
+    ('invalid_votes', 'Số phiếu không hợp lệ'),
+]
+HEADER_LINES = ['HỘI ĐỒNG BẦU CỬ QUỐC GIA', 'ỦY BAN BẦU CỬ PHƯỜNG AN PHÚ']
+TERM_LINE = 'Kỳ bầu cử khóa 2026 - 2031'
+# (regular, bold) TrueType fonts with Vietnamese glyphs, first existing pair wins
+FONT_CANDIDATES = [
+    ('/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf', '/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf'),
+    (r'C:\Windows\Fonts\arial.ttf', r'C:\Windows\Fonts\arialbd.ttf'),
+    ('/Library/Fonts/Arial Unicode.ttf', '/Library/Fonts/Arial Unicode.ttf'),
+]
+# Basic Latin .. Latin Extended-B, combining marks, Latin Extended Additional, punctuation, ₫
+FONT_SUBSET = (list(range(0x20, 0x250)) + list(range(0x300, 0x370)) + list(range(0x1E00, 0x1F00))
+               + list(range(0x2000, 0x2070)) + [0x20AB])
+
+
+def area_name(area_id):
+    return f"KVBP số {area_id[2:]}"
+
+
+def unit_name(unit_id):
+    return f"Đơn vị số {unit_id.rsplit('_', 1)[-1]}"
+
+
+def load_voter_totals(dsn=None):
+    """Listed voters per area from voter_counters, for areas whose minutes are not entered yet."""
+    import db
+    with db.connect(dsn) as conn:
+        rows = conn.execute("SELECT scope_id, total FROM voter_counters WHERE scope = 'area'").fetchall()
+    return pd.Series(dict(rows), dtype='int64')
+
+
+def _area_frame(area_stats, voter_totals):
+    hierarchy = locations.load()
+    areas = hierarchy.areas() + sorted(set(area_stats['area_id']) - set(hierarchy.area_mapping))
+    stats = (area_stats.drop_duplicates('area_id').set_index('area_id')
+             .reindex(areas))
+    for field, _ in STAT_FIELDS:
+        stats[field] = stats[field].fillna(0).astype('int64')
+    listed = voter_totals.reindex(areas).fillna(0).astype('int64')
+    stats['total_voters'] = stats['total_voters'].where(stats['total_voters'] > 0, listed)
+    stats['is_locked'] = stats['is_locked'].fillna(False).astype(bool)
+    stats['unit_id'] = [hierarchy.area_mapping.get(a, ('', ''))[1] for a in areas]
+    return stats
+
+
+def _stats_rows(totals):
+    return [[label, int(totals[field])] for field, label in STAT_FIELDS]
+
+
+def _candidate_tables(votes, valid_votes, elected=None):
+    """One table per election level: STT, name, votes, % of valid ballots (as Reports.tsx)."""
+    tables = []
+    for level in LEVELS:
+        rows = votes[votes['level'] == level].sort_values('votes', ascending=False, kind='stable')
+        if rows.empty:
+            continue
+        header = ['STT', 'Họ và tên ứng cử viên', 'Số phiếu', 'Tỷ lệ (%)']
+        if elected is not None:
+            header.append('Kết quả')
+        body = []
+        for i, c in enumerate(rows.itertuples(), 1):
+            pct = round(c.votes / valid_votes * 100, 2) if valid_votes > 0 else 0.0
+            row = [i, c.name, int(c.votes), pct]
+            if elected is not None:
+                row.append(elected.get(c.id, ''))
+            body.append(row)
+        tables.append({'heading': f"II. KẾT QUẢ KIỂM PHIẾU — {LEVEL_LABELS.get(level, level)}",
+                       'header': header, 'rows': body})
+    return tables
+
+
+def build_reports(results, candidates, area_stats, voter_totals):
+    """Report specs (plain dicts, cheap to send to worker processes)."""
+    stats = _area_frame(area_stats, voter_totals)
+    generated = datetime.datetime.now().strftime('%H:%M %d/%m/%Y')
+
+    # (area, candidate of the area's unit) with the votes counted in that area
+    cells = (stats[['unit_id']].rename_axis('area_id').reset_index()
+             .merge(candidates[['id', 'name', 'level', 'unit_id']], on='unit_id')
+             .merge(results[['area_id', 'candidate_id', 'votes']].rename(columns={'candidate_id': 'id'}),
+                    on=['area_id', 'id'], how='left'))
+    cells['votes'] = cells['votes'].fillna(0).astype('int64')
+
+    table, _ = tally(results, candidates, area_stats)
+    elected = dict(zip(table['id'], table['elected'].map({True: 'Trúng cử', False: ''})))
+    elected.update({cid: 'Bằng phiếu' for cid in table.loc[table['seat_tie'], 'id']})
+
+    reports = []
+    by_area = dict(tuple(cells.groupby('area_id', sort=False)))
+    for area_id, row in stats.iterrows():
+        reports.append({
+            'file': f"mau-15-bc_{area_id}", 'code': 'Mẫu 15-BC', 'scope': 'area', 'target': area_id,
+            'title': f"Biên bản kết quả kiểm phiếu tại {area_name(area_id)}",
+            'subtitle': unit_name(row['unit_id']) if row['unit_id'] else '',
+            'locked': bool(row['is_locked']), 'generated': generated,
+            'stats': _stats_rows(row),
+            'tables': _candidate_tables(by_area.get(area_id, cells.iloc[:0]), row['valid_votes']),
+        })
+
+    unit_totals = stats[stats['unit_id'] != ''].groupby('unit_id', sort=False)
+    unit_votes = cells.groupby(['unit_id', 'id', 'name', 'level'], sort=False, as_index=False)['votes'].sum()
+    by_unit = dict(tuple(unit_votes.groupby('unit_id', sort=False)))
+    for unit_id, areas in unit_totals:
+        totals = areas[[f for f, _ in STAT_FIELDS]].sum()
+        reports.append({
+            'file': f"mau-16-bc_{unit_id}", 'code': 'Mẫu 16-BC', 'scope': 'unit', 'target': unit_id,
+            'title': f"Biên bản xác định kết quả bầu cử tại {unit_name(unit_id)}",
+            'subtitle': f"Tổng hợp {len(areas)} KVBP: {', '.join(a.upper() for a in areas.index)}",
+            'locked': bool(areas['is_locked'].all()), 'generated': generated,
+            'stats': _stats_rows(totals),
+            'tables': _candidate_tables(by_unit.get(unit_id, unit_votes.iloc[:0]), totals['valid_votes'], elected),
+        })
+
+    totals = stats[[f for f, _ in STAT_FIELDS]].sum()
+    progress = []
+    for i, (area_id, row) in enumerate(stats.iterrows(), 1):
+        turnout = round(row['received_votes'] / row['total_voters'] * 100, 2) if row['total_voters'] > 0 else 0.0
+        progress.append([i, area_name(area_id), unit_name(row['unit_id']) if row['unit_id'] else '',
+                         int(row['total_voters']), int(row['received_votes']), turnout,
+                         'Đã khóa' if row['is_locked'] else ''])
+    reports.append({
+        'file': 'mau-18-bc_ward', 'code': 'Mẫu 18-BC', 'scope': 'ward', 'target': 'ap',
+        'title': 'Báo cáo tiến độ cử tri đi bầu (Toàn phường)',
+        'subtitle': f"Tổng hợp số liệu từ {len(stats)} KVBP, đã khóa sổ {int(stats['is_locked'].sum())}",
+        'locked': bool(stats['is_locked'].all()), 'generated': generated,
+        'stats': _stats_rows(totals),
+        'tables': [{'heading': 'II. TIẾN ĐỘ THEO KHU VỰC BỎ PHIẾU',
+                    'header': ['STT', 'KVBP', 'Đơn vị', 'Cử tri', 'Phiếu thu về', 'Tỷ lệ (%)', 'Khóa sổ'],
+                    'rows': progress}],
+    })
+    return reports
+
+
+def _status_line(report):
+    state = 'ĐÃ KHÓA SỔ' if report['locked'] else 'CHƯA KHÓA SỔ (số liệu tạm thời)'
+    return f"Trạng thái: {state} — lập lúc {report['generated']}"
+
+
+def write_xlsx(report, path):
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet('Ket Qua')
+    for column, width in zip('ABCDEFG', (8, 40, 16, 14, 14, 12, 12)):
+        ws.column_dimensions[column].width = width
+
+    def bold(value):
+        cell = WriteOnlyCell(ws, value=value)
+        cell.font = Font(bold=True)
+        return cell
+
+    for line in HEADER_LINES:
+        ws.append([bold(line)])
+    ws.append([])
+    ws.append([bold(report['title'].upper())])
+    ws.append([TERM_LINE])
+    if report['subtitle']:
+        ws.append([report['subtitle']])
+    ws.append([_status_line(report)])
+    ws.append([])
+    ws.append([bold('I. SỐ LIỆU CỬ TRI VÀ PHIẾU BẦU')])
+    for label, value in report['stats']:
+        ws.append([label, value])
+    for table in report['tables']:
+        ws.append([])
+        ws.append([bold(table['heading'])])
+        ws.append([bold(h) for h in table['header']])
+        for row in table['rows']:
+            ws.append(row)
+    wb.save(path)
+
+
+def _pdf_text(value):
+    if isinstance(value, float):
+        return f"{value:.2f}"
+    if isinstance(value, int):
+        return f"{value:,}".replace(',', '.')
+    return str(value)
+
+
+def _pdf_grid(pdf, rows, weights, height=6):
+    """Bordered single-line cells; much cheaper than fpdf's wrapping table()."""
+    scale = pdf.epw / sum(weights)
+    widths = [w * scale for w in weights]
+    for row in rows:
+        if pdf.will_page_break(height):
+            pdf.add_page()
+        for i, (text, width) in enumerate(zip(row, widths)):
+            pdf.cell(width, height, str(text), border=1, align='L' if i == 1 or len(row) == 2 and i == 0 else 'R')
+        pdf.ln(height)
+
+
+def write_pdf(report, path, font):
+    from fpdf import FPDF
+    from fpdf.enums import XPos, YPos
+
+    pdf = FPDF(format='A4')
+    pdf.add_font('report', '', font[0])
+    pdf.add_font('report', 'B', font[1])
+    pdf.set_auto_page_break(True, margin=15)
+    pdf.add_page()
+    line = {'new_x': XPos.LMARGIN, 'new_y': YPos.NEXT}
+
+    pdf.set_font('report', 'B', 10)
+    for text in HEADER_LINES:
+        pdf.cell(0, 5, text, **line)
+    pdf.ln(8)
+    pdf.set_font('report', 'B', 14)
+    pdf.multi_cell(0, 7, report['title'].upper(), align='C', **line)
+    pdf.set_font('report', '', 10)
+    pdf.cell(0, 6, TERM_LINE, align='C', **line)
+    if report['subtitle']:
+        pdf.multi_cell(0, 5, report['subtitle'], align='C', **line)
+    pdf.cell(0, 6, _status_line(report), align='C', **line)
+    pdf.ln(4)
+
+    pdf.set_font('report', 'B', 10)
+    pdf.cell(0, 7, 'I. SỐ LIỆU CỬ TRI VÀ PHIẾU BẦU', **line)
+    pdf.set_font('report', '', 10)
+    _pdf_grid(pdf, [[label, _pdf_text(value)] for label, value in report['stats']], (3, 1))
+
+    for table in report['tables']:
+        pdf.ln(4)
+        pdf.set_font('report', 'B', 10)
+        pdf.cell(0, 7, table['heading'], **line)
+        widths = [4 if i == 1 else 1.2 if i else 0.6 for i in range(len(table['header']))]
+        pdf.set_font('report', 'B', 9)
+        _pdf_grid(pdf, [table['header']], widths)
+        pdf.set_font('report', '', 9)
+        _pdf_grid(pdf, [[_pdf_text(v) for v in row] for row in table['rows']], widths)
+    pdf.output(path)
+
+
+def subset_font(font, directory):
+    """Copy the (regular, bold) font pair reduced to the FONT_SUBSET code points.
+
+    fpdf2 parses the whole font file for every document, so embedding the
+    ~100 KB subset instead of a multi-megabyte font makes each PDF several
+    times faster to build (and smaller).
+    """
+    from fontTools import subset
+
+    logging.getLogger('fontTools.subset').setLevel(logging.ERROR)
+    paths = []
+    for index, source in enumerate(font):
+        options = subset.Options()
+        options.layout_features = ['*']
+        options.name_IDs = ['*']
+        options.notdef_outline = True
+        face = subset.load_font(source, options)
+        subsetter = subset.Subsetter(options)
+        subsetter.populate(unicodes=FONT_SUBSET)
+        subsetter.subset(face)
+        path = os.path.join(directory, f"report-font-{index}.ttf")
+        subset.save_font(face, path, options)
+        paths.append(path)
+    return tuple(paths)
+
+
+def find_font(path=None):
+    if path:
+        bold = path.replace('.ttf', '-Bold.ttf')
+        return (path, bold if os.path.exists(bold) else path)
+    for regular, bold in FONT_CANDIDATES:
+        if os.path.exists(regular) and os.path.exists(bold):
+            return regular, bold
+    raise RuntimeError('No TrueType font with Vietnamese glyphs found: pass --font path/to/font.ttf')
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def render_report(report, out_dir, formats, font):
+    """Render one report in every format; return its manifest entries."""
+    entries = []
+    for fmt in formats:
+        name = f"{report['file']}.{fmt}"
+        path = os.path.join(out_dir, name)
+        if fmt == 'xlsx':
+            write_xlsx(report, path)
+        else:
+            write_pdf(report, path, font)
+        entries.append({'file': name, 'code': report['code'], 'scope': report['scope'],
+                        'target': report['target'], 'locked': report['locked'],
+                        'bytes': os.path.getsize(path), 'sha256': _sha256(path)})
+    return entries
+
+
+def render_all(reports, out_dir, formats, font, workers=None):
+    if workers == 1:
+        return [entry for report in reports for entry in render_report(report, out_dir, formats, font)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(render_report, report, out_dir, formats, font) for report in reports]
+        return [entry for future in futures for entry in future.result()]
+
+
+def write_manifest(out_dir, entries, counts):
+    entries = sorted(entries, key=lambda e: e['file'])
+    manifest = {
+        'generated_at': datetime.datetime.now().isoformat(timespec='seconds'),
+        'source': counts,
+        'files': entries,
+    }
+    with open(os.path.join(out_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    with open(os.path.join(out_dir, 'SHA256SUMS'), 'w', encoding='utf-8') as f:
+        f.writelines(f"{e['sha256']}  {e['file']}\n" for e in entries)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Export every area, unit and ward report to XLSX/PDF.')
+    parser.add_argument('--dsn', help='PostgreSQL connection string (default: $DATABASE_URL)')
+    parser.add_argument('-o', '--output', default=OUTPUT_DIR, help='output directory')
+    parser.add_argument('--workers', type=int, default=None, help='render processes (default: CPU count)')
+    parser.add_argument('--formats', default=','.join(FORMATS), help='comma-separated: xlsx,pdf')
+    parser.add_argument('--font', help='TrueType font with Vietnamese glyphs (bold: same name with -Bold)')
+    args = parser.parse_args(argv)
+
+    formats = [f for f in args.formats.split(',') if f]
+    unknown = set(formats) - set(FORMATS)
+    if unknown:
+        parser.error(f"unknown format(s): {', '.join(sorted(unknown))}")
+
+    sys.stdout.reconfigure(encoding='utf-8')
+    started = time.perf_counter()
+    results, candidates, area_stats = load_tables(args.dsn)
+    voter_totals = load_voter_totals(args.dsn)
+    reports = build_reports(results, candidates, area_stats, voter_totals)
+    print(f"Loaded {len(results)} results, {len(candidates)} candidates, {len(area_stats)} area stats; "
+          f"{len(reports)} reports ({time.perf_counter() - started:.2f}s)")
+
+    os.makedirs(args.output, exist_ok=True)
+    with tempfile.TemporaryDirectory() as tmp:
+        font = subset_font(find_font(args.font), tmp) if 'pdf' in formats else None
+        entries = render_all(reports, args.output, formats, font, args.workers)
+    write_manifest(args.output, entries, {'voting_results': len(results), 'candidates': len(candidates),
+                                          'area_stats': len(area_stats)})
+    print(f"Wrote {len(entries)} files to {args.output}/ with manifest.json and SHA256SUMS "
+          f"in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
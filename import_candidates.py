@@ -1,12 +1,27 @@
 import pandas as pd
+import argparse
+import hashlib
+import os
 import json
+import unicodedata
 import urllib.request
 import datetime
+from concurrent.futures import ProcessPoolExecutor
+
+import instrumentation
+import locations
+from bulk_uploader import BulkUploader
+from config import SUPABASE_KEY, SUPABASE_URL
 
 # Configuration
 EXCEL_FILE = r'C:\Users\Admin\Downloads\DSDBCAPPHUONGCHINHTHUC.xlsx'
-SUPABASE_URL = 'https://wimauldqyotovflfowjw.supabase.co'
-SUPABASE_KEY = 'sb_publishable_9Mn89B57Bd8-CGY59sluIQ_SWhWmelE'
+CONTENT_FIELDS = ['gender', 'title', 'hometown']
+DELETE_CHUNK = 100
+# PostgREST caps a response at max-rows (1000 on Supabase); read in pages
+PAGE_SIZE = 1000
+# A sync that would delete more than this share of a level's candidates is
+# refused (an empty or mis-parsed workbook) unless --allow-delete-all
+MAX_DELETE_SHARE = 0.2
 
 def format_date(val):
     if pd.isna(val):
@@ -34,83 +49,244 @@ def delete_existing_phuong_candidates():
     except Exception as e:
         print(f"Cleanup error: {e}")
 
-def import_candidates():
-    # 1. Cleanup
-    delete_existing_phuong_candidates()
+def format_date_series(col):
+    """Vectorized format_date: dates become YYYY-MM-DD, text keeps its first word."""
+    text = col.astype(str).str.split(' ', n=1).str[0]
+    return text.where(col.notna(), None)
 
-    # 2. Extract and Upload
-    xl = pd.ExcelFile(EXCEL_FILE)
-    sheets = [s for s in xl.sheet_names if "Tổ" in s]
-    print(f"Detected sheets for units: {sheets}")
+def clean_text_series(col):
+    return col.astype('string').str.strip().fillna('')
 
-    all_candidates = []
+def sheet_unit(sheet):
+    """Unit id of a "Tổ N" sheet (unit_N)."""
+    return f"unit_{sheet.split(' ')[-1]}"
+
+def extract_sheet(xl, sheet):
+    """Extract the candidates of one "Tổ N" sheet column-wise."""
+    unit_id = sheet_unit(sheet)
+    df = pd.read_excel(xl, sheet_name=sheet, header=None)
+    # Data starts from row 12 (index 12); pad narrow sheets to the expected columns
+    df = df.iloc[12:].reindex(columns=range(11))
 
+    stt = df[0]
+    names = df[1].astype('string').str.strip().str.upper()
+    valid = (stt.notna() & stt.astype(str).str.strip().ne('')
+             & names.notna() & names.ne('NAN') & names.str.len().ge(2))
+    df = df[valid.fillna(False).astype(bool)]
+
+    frame = pd.DataFrame({
+        'name': names[df.index],
+        'level': 'phuong',
+        'unit_id': unit_id,
+        'dob': format_date_series(df[2]),
+        'gender': clean_text_series(df[3]),
+        'title': clean_text_series(df[10]),
+        'hometown': clean_text_series(df[7]),
+    })
+    frame = frame.astype(object).where(frame.notna(), None)
+    return sheet, frame.to_dict('records')
+
+def extract_sheets(path, sheets):
+    """Worker entry point: open the workbook once for a batch of sheets."""
+    with pd.ExcelFile(path) as xl:
+        return [extract_sheet(xl, sheet) for sheet in sheets]
+
+@instrumentation.timed('extract')
+def extract_candidates(path=EXCEL_FILE, workers=None):
+    """Extract candidates from every "Tổ" sheet, parsing sheets in parallel.
+
+    Results are merged in workbook sheet order, so the output is the same
+    whatever the number of workers.
+    """
+    with pd.ExcelFile(path) as xl:
+        sheets = [s for s in xl.sheet_names if "Tổ" in s]
+    print(f"Detected sheets for units: {sheets}")
     for sheet in sheets:
-        print(f"Processing {sheet}...")
-        # Get unit_id from sheet name (e.g., "Tổ 1" -> "unit_1")
-        unit_num = sheet.split(" ")[-1]
-        unit_id = f"unit_{unit_num}"
-        
-        # Read sheet
-        df = pd.read_excel(xl, sheet_name=sheet, header=None)
-        
-        # Data starts from row 12 (index 12)
-        for i in range(12, len(df)):
-            row = df.iloc[i]
-            
-            # STT is at index 0
-            if pd.isna(row[0]) or str(row[0]).strip() == "":
-                continue
-            
-            try:
-                candidate = {
-                    "name": str(row[1]).strip().upper(),
-                    "level": "phuong",
-                    "unit_id": unit_id,
-                    "dob": format_date(row[2]),
-                    "gender": str(row[3]).strip(),
-                    "title": str(row[10]).strip() if not pd.isna(row[10]) else "",
-                    "hometown": str(row[7]).strip() if not pd.isna(row[7]) else ""
-                }
-                
-                # Basic validation
-                if not candidate["name"] or candidate["name"] == "NAN" or len(candidate["name"]) < 2:
-                    continue
-                    
-                all_candidates.append(candidate)
-                print(f"  Mapped: {candidate['name']} ({unit_id})")
-            except Exception as e:
-                print(f"  Error mapping row {i} in {sheet}: {e}")
+        # Unknown unit (not in locations.json): stop before anything is parsed or uploaded
+        locations.load().get(sheet_unit(sheet), 'unit')
+
+    workers = min(workers or os.cpu_count() or 1, len(sheets))
+    if workers <= 1:
+        results = extract_sheets(path, sheets)
+    else:
+        # Contiguous batches so every worker parses the workbook index only once
+        size = -(-len(sheets) // workers)
+        batches = [sheets[i:i + size] for i in range(0, len(sheets), size)]
+        with ProcessPoolExecutor(max_workers=len(batches)) as pool:
+            results = [r for batch in pool.map(extract_sheets, [path] * len(batches), batches) for r in batch]
+
+    all_candidates = []
+    for sheet, candidates in results:
+        print(f"  {sheet}: {len(candidates)} candidates")
+        all_candidates.extend(candidates)
 
     print(f"Total candidates mapped: {len(all_candidates)}")
-    
-    if not all_candidates:
-        print("No candidates found to import.")
-        return
+    instrumentation.count('candidates_extracted', len(all_candidates))
+    return all_candidates
+
+def normalize_name(name):
+    return ' '.join(unicodedata.normalize('NFC', name or '').upper().split())
+
+def candidate_fingerprint(c):
+    """Identity of a candidate: normalized name, dob, unit and level."""
+    key = '|'.join([normalize_name(c.get('name')), c.get('dob') or '', c.get('unit_id') or '', c.get('level') or ''])
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+def candidate_content(c):
+    return tuple((c.get(field) or '').strip() for field in CONTENT_FIELDS)
 
-    # Upload in chunks of 50
-    chunk_size = 50
-    for i in range(0, len(all_candidates), chunk_size):
-        chunk = all_candidates[i:i + chunk_size]
-        payload = json.dumps(chunk).encode('utf-8')
-        
-        url = f"{SUPABASE_URL}/rest/v1/candidates"
-        headers = {
+def rest_request(method, path, payload=None):
+    req = urllib.request.Request(
+        f"{SUPABASE_URL}/rest/v1/{path}",
+        data=json.dumps(payload).encode('utf-8') if payload is not None else None,
+        headers={
             'apikey': SUPABASE_KEY,
             'Authorization': f'Bearer {SUPABASE_KEY}',
             'Content-Type': 'application/json'
-        }
-        
-        req = urllib.request.Request(url, data=payload, headers=headers, method='POST')
-        
-        try:
-            with urllib.request.urlopen(req) as response:
-                status = response.getcode()
-                print(f"Chunk {i//chunk_size + 1}: Status {status}")
-        except Exception as e:
-            print(f"Error uploading chunk {i//chunk_size + 1}: {e}")
-            if hasattr(e, 'read'):
-                print(f"  Detail: {e.read().decode()}")
+        },
+        method=method
+    )
+    instrumentation.count('http_requests')
+    with instrumentation.stage('http'), urllib.request.urlopen(req) as response:
+        body = response.read()
+    instrumentation.count('bytes_received', len(body))
+    return json.loads(body) if body else None
+
+def fetch_current_candidates(level):
+    # Oldest first, so the copy kept among duplicates does not depend on the
+    # order the server happens to return
+    fields = ','.join(['id', 'name', 'dob', 'unit_id', 'level'] + CONTENT_FIELDS)
+    return rest_request('GET', f"candidates?level=eq.{level}&select={fields}&order=created_at,id")
+
+def fetch_voted_candidate_ids(ids):
+    """Ids among ``ids`` that voting_results references (it has no foreign key)."""
+    voted = set()
+    for i in range(0, len(ids), DELETE_CHUNK):
+        chunk = ','.join(ids[i:i + DELETE_CHUNK])
+        offset = 0
+        while True:
+            page = rest_request('GET', f"voting_results?candidate_id=in.({chunk})&select=candidate_id"
+                                       f"&order=id&limit={PAGE_SIZE}&offset={offset}")
+            voted.update(row['candidate_id'] for row in page)
+            if len(page) < PAGE_SIZE:
+                break
+            offset += PAGE_SIZE
+    return voted
+
+def compute_candidate_delta(desired, current, voted=frozenset()):
+    """Return (inserts, updates, delete_ids) turning ``current`` into ``desired``.
+
+    Rows are matched by fingerprint so existing candidates keep their id;
+    updates carry the existing id and only rows whose content changed.
+    Among duplicates the oldest copy with results in ``voted`` is kept
+    (else the oldest copy); other copies with results are never deleted.
+    Candidates missing from ``desired`` are all in delete_ids, voted or not.
+    """
+    groups = {}
+    for row in current:
+        groups.setdefault(candidate_fingerprint(row), []).append(row)
+    existing = {fp: next((r for r in rows if r['id'] in voted), rows[0]) for fp, rows in groups.items()}
+
+    inserts, updates, seen = [], [], set()
+    for cand in desired:
+        fp = candidate_fingerprint(cand)
+        if fp in seen:
+            continue
+        seen.add(fp)
+        row = existing.get(fp)
+        if row is None:
+            inserts.append(cand)
+        elif candidate_content(row) != candidate_content(cand):
+            updates.append({'id': row['id'], **cand})
+
+    delete_ids = []
+    for fp, rows in groups.items():
+        if fp not in seen:
+            delete_ids.extend(r['id'] for r in rows)
+        else:
+            # Leftover duplicates from earlier delete-and-reinsert runs
+            delete_ids.extend(r['id'] for r in rows if r is not existing[fp] and r['id'] not in voted)
+    return inserts, updates, delete_ids
+
+def sync_candidates(desired, level='phuong', allow_delete_all=False):
+    """Apply only the difference between the workbook and the database."""
+    with instrumentation.stage('fetch_current'):
+        current = fetch_current_candidates(level)
+        voted = fetch_voted_candidate_ids([row['id'] for row in current])
+    with instrumentation.stage('delta'):
+        inserts, updates, delete_ids = compute_candidate_delta(desired, current, voted)
+    print(f"Sync ({level}): {len(current)} in database, {len(inserts)} to insert, "
+          f"{len(updates)} to update, {len(delete_ids)} to delete")
+    deleting = set(delete_ids)
+    removed_with_votes = [row for row in current if row['id'] in voted and row['id'] in deleting]
+    if removed_with_votes:
+        raise RuntimeError(
+            f"Refusing to sync: {len(removed_with_votes)} {level} candidates missing from the workbook "
+            f"already have voting_results ({', '.join(describe_candidate(r) for r in removed_with_votes[:5])})")
+    if delete_ids and not allow_delete_all and (not desired or len(delete_ids) > MAX_DELETE_SHARE * len(current)):
+        raise RuntimeError(
+            f"Refusing to delete {len(delete_ids)} of {len(current)} {level} candidates "
+            f"({len(desired)} found in the workbook): check the workbook, or pass --allow-delete-all")
+
+    if inserts:
+        with instrumentation.stage('insert'):
+            report = BulkUploader(SUPABASE_URL, SUPABASE_KEY, 'candidates').upload(inserts)
+        print(f"Insert: {report.summary()}")
+        instrumentation.count('inserted', report.rows_ok)
+        instrumentation.report_failures(report.failed_rows, describe_candidate)
+    if updates:
+        uploader = BulkUploader(SUPABASE_URL, SUPABASE_KEY, 'candidates', query='on_conflict=id',
+                                prefer='resolution=merge-duplicates,return=minimal')
+        with instrumentation.stage('update'):
+            report = uploader.upload(updates)
+        print(f"Update: {report.summary()}")
+        instrumentation.count('updated', report.rows_ok)
+        instrumentation.report_failures(report.failed_rows, describe_candidate)
+    with instrumentation.stage('delete'):
+        for i in range(0, len(delete_ids), DELETE_CHUNK):
+            ids = ','.join(delete_ids[i:i + DELETE_CHUNK])
+            rest_request('DELETE', f"candidates?id=in.({ids})")
+    instrumentation.count('deleted', len(delete_ids))
+    if delete_ids:
+        print(f"Deleted {len(delete_ids)} candidates no longer in the workbook")
+    return inserts, updates, delete_ids
+
+def describe_candidate(row):
+    return f"{row['name']} ({row['unit_id']})"
+
+def import_candidates(mode='sync', workers=None, allow_delete_all=False):
+    all_candidates = extract_candidates(workers=workers)
+
+    if mode == 'sync':
+        sync_candidates(all_candidates, level='phuong', allow_delete_all=allow_delete_all)
+        return
+    if mode != 'replace':
+        raise ValueError(f"unknown mode: {mode}")
+    if not all_candidates and not allow_delete_all:
+        print("No candidates found to import; existing candidates kept.")
+        return
+    delete_existing_phuong_candidates()
+    if not all_candidates:
+        print("No candidates found to import.")
+        return
+
+    with instrumentation.stage('insert'):
+        report = BulkUploader(SUPABASE_URL, SUPABASE_KEY, 'candidates').upload(all_candidates)
+    print(f"Upload: {report.summary()}")
+    instrumentation.count('inserted', report.rows_ok)
+    instrumentation.report_failures(report.failed_rows, describe_candidate)
 
 if __name__ == "__main__":
-    import_candidates()
+    parser = argparse.ArgumentParser(description='Import ward-level candidates from the official workbook.')
+    parser.add_argument('--replace', action='store_true',
+                        help='delete all ward candidates and re-insert them (breaks voting_results references)')
+    parser.add_argument('--workers', type=int, help='processes used to parse sheets (default: CPU count)')
+    parser.add_argument('--allow-delete-all', action='store_true',
+                        help=f'delete candidates even when the workbook is empty or more than '
+                             f'{MAX_DELETE_SHARE:.0%} of them would go')
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+    with instrumentation.Run('import_candidates', args) as run:
+        import_candidates(mode='replace' if args.replace else 'sync', workers=args.workers,
+                          allow_delete_all=args.allow_delete_all)
+    print(run.summary())
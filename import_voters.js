@@ -8,30 +8,56 @@ const SUPABASE_ANON_KEY = 'sb_publishable_9Mn89B57Bd8-CGY59sluIQ_SWhWmelE';
 
 const supabase = createClient(SUPABASE_URL, SUPABASE_ANON_KEY);
 
-// Master Data Mapping (Mini version)
-const LOCATIONS = [
-    { id: 'kv01', neighborhoodId: 'kp_1a', parentId: 'unit_1' },
-    { id: 'kv02', neighborhoodId: 'kp_1a', parentId: 'unit_1' },
-    { id: 'kv03', neighborhoodId: 'kp_1a', parentId: 'unit_1' },
-    { id: 'kv04', neighborhoodId: 'kp_1a', parentId: 'unit_1' },
-    { id: 'kv05', neighborhoodId: 'kp_1a', parentId: 'unit_1' },
-    { id: 'kv06', neighborhoodId: 'kp_4', parentId: 'unit_1' },
-    { id: 'kv07', neighborhoodId: 'kp_1b', parentId: 'unit_2' },
-    { id: 'kv16', neighborhoodId: 'kp_2', parentId: 'unit_4' },
-    { id: 'kv19', neighborhoodId: 'kp_3', parentId: 'unit_4' },
-    { id: 'kv21', neighborhoodId: 'kp_3', parentId: 'unit_4' },
-    // Add more as needed or use defaults
-];
+// Danh mục địa danh dùng chung (locations.json, cùng nguồn với types.ts / locations.py)
+const AREAS = new Map(
+    JSON.parse(fs.readFileSync(new URL('./locations.json', import.meta.url), 'utf8'))
+        .filter(l => l.type === 'area')
+        .map(l => [l.id, l])
+);
 
 function getMapping(areaId) {
     const normalized = areaId.toLowerCase().replace(/\s+/g, '');
-    const found = LOCATIONS.find(l => l.id === normalized);
+    const found = AREAS.get(normalized);
+    if (!found) {
+        // Không gán mặc định kp_1a/unit_1: KVBP lạ phải được thêm vào locations.json trước
+        throw new Error(`Khu vực ${areaId} không có trong locations.json`);
+    }
     return {
-        neighborhood_id: found?.neighborhoodId || 'kp_1a',
-        unit_id: found?.parentId || 'unit_1'
+        neighborhood_id: found.neighborhoodId,
+        unit_id: found.parentId
     };
 }
 
+// Chuẩn hóa ngày sinh giống normalize.parse_dob (Python) / add_birth_date.sql
+function parseDob(value) {
+    if (typeof value === 'number' && value >= 1900 && value <= 2100) {
+        // Ô chỉ ghi năm sinh dạng số
+        return { dob_date: null, birth_year: value };
+    }
+    if (typeof value === 'number' && value > 0) {
+        // Ô ngày tháng của Excel được sheet_to_json trả về dạng số serial
+        value = new Date(Date.UTC(1899, 11, 30) + Math.round(value) * 86400000);
+    }
+    if (value instanceof Date && !isNaN(value)) {
+        return { dob_date: value.toISOString().slice(0, 10), birth_year: value.getUTCFullYear() };
+    }
+    const text = String(value || '').trim();
+    let m = text.match(/^(\d{1,2})[\/.-](\d{1,2})[\/.-](\d{4})$/);
+    let y, mo, d;
+    if (m) {
+        [d, mo, y] = [Number(m[1]), Number(m[2]), Number(m[3])];
+    } else if ((m = text.match(/^(\d{4})-(\d{2})-(\d{2})(?:[ T]00:00:00)?$/))) {
+        [y, mo, d] = [Number(m[1]), Number(m[2]), Number(m[3])];
+    } else if (/^(?:19|20)\d{2}$/.test(text)) {
+        return { dob_date: null, birth_year: Number(text) };
+    } else {
+        return { dob_date: null, birth_year: null };
+    }
+    const date = new Date(Date.UTC(y, mo - 1, d));
+    const valid = date.getUTCFullYear() === y && date.getUTCMonth() === mo - 1 && date.getUTCDate() === d;
+    return { dob_date: valid ? date.toISOString().slice(0, 10) : null, birth_year: y };
+}
+
 async function importExcel(filePath) {
     if (!fs.existsSync(filePath)) {
         console.error(`File not found: ${filePath}`);
@@ -77,6 +103,7 @@ async function importExcel(filePath) {
 
         const voterCardNo = String(row[1] || row[0] || '').trim();
         const dob = String(row[3] || '').trim();
+        const { dob_date, birth_year } = parseDob(row[3]);
         const isFemale = (String(row[5] || '').toLowerCase() === 'x' || String(row[5] || '').toLowerCase().includes('nữ'));
         const gender = isFemale ? 'Nữ' : 'Nam';
         const cccd = String(row[6] || '').trim() || `MISSING_${Date.now()}_${i}`;
@@ -103,6 +130,8 @@ async function importExcel(filePath) {
         voters.push({
             name,
             dob,
+            dob_date,
+            birth_year,
             gender,
             cccd,
             ethnic,
@@ -0,0 +1,254 @@
+"""Streaming voter roll importer (Python replacement for import_voters.js).
+
+The workbook is opened in openpyxl read-only mode and walked one row at a
+time, so memory stays flat no matter how many voters the roll contains.
+Area headers ("Khu vực bỏ phiếu số: N") and the STT column are recognised
+on the fly while streaming.
+
+Stage times (parse, parse/map, http or copy/merge), row and byte counters
+and peak RSS go to a JSON run record with --metrics; progress is printed
+every few seconds instead of per row.
+
+This loads a new roll. To load a corrected roll over one that is already in
+the table, use reimport_voters.py: it writes only the differences and keeps
+check-ins.
+
+Voter rows before the first area header stop the import (UnknownLocation);
+--default-area files them under that area instead.
+
+Usage: python import_voters.py <path_to_excel> [--dry-run] [--diag diag_voters.txt] [--default-area kv01]
+                              [--sink rest|copy|copy-csv|ndjson:PATH|sqlite:PATH]
+                              [--metrics run.json] [--profile cprofile|sample]
+"""
+import argparse
+import datetime
+import re
+import sys
+import time
+
+from openpyxl import load_workbook
+
+import instrumentation
+import locations
+from config import SUPABASE_KEY, SUPABASE_URL
+from load_sinks import SINK_NAMES, make_sink
+from normalize import parse_dob, search_key, voter_search_text
+
+# Configuration
+DIAG_BUFFER_SIZE = 1 << 20
+
+AREA_HEADER_RE = re.compile(r'Khu vực bỏ phiếu số:\s*(\d+)', re.IGNORECASE)
+STT_RE = re.compile(r'^\d+$')
+GROUP_RE = re.compile(r'Tổ\s*(\d+)', re.IGNORECASE)
+HEADER_NAMES = {'HỌ VÀ TÊN', '(1)'}
+
+# Column mapping (same as import_voters.js):
+# 0: STT | 1: Số thẻ | 2: Họ tên | 3: Ngày sinh | 4: Nam | 5: Nữ | 6: CCCD | 7: Dân tộc
+# 8: Thường trú | 9: Tạm trú | 10: Nơi ở hiện tại | 11: QH | 12: Tỉnh | 13: Xã | 14: Ghi chú
+ROW_WIDTH = 15
+
+
+def get_mapping(area_id):
+    """Khu phố and unit of an area (locations.json); UnknownLocation for any other id."""
+    neighborhood_id, unit_id = locations.load().mapping(area_id)
+    return {'neighborhood_id': neighborhood_id, 'unit_id': unit_id}
+
+
+def cell_text(val):
+    if val is None:
+        return ''
+    if isinstance(val, (datetime.datetime, datetime.date)):
+        return val.strftime('%Y-%m-%d')
+    if isinstance(val, float) and val.is_integer():
+        return str(int(val))
+    return str(val).strip()
+
+
+def is_stt(val):
+    """True when the first cell holds a row number (the STT column)."""
+    if isinstance(val, int):
+        return True
+    if isinstance(val, float):
+        return val.is_integer()
+    return val is not None and bool(STT_RE.match(str(val).strip()))
+
+
+def detect_area(row):
+    """Return the area id announced by a header row, or None."""
+    for val in row:
+        if isinstance(val, str) and 'khu' in val.lower():
+            match = AREA_HEADER_RE.search(val)
+            if match:
+                return f"kv{int(match.group(1)):02d}"
+    return None
+
+
+class DiagWriter:
+    """Buffered replacement for the per-row fs.appendFileSync diagnostics."""
+
+    def __init__(self, path, buffer_size=DIAG_BUFFER_SIZE):
+        self.path = path
+        self._file = open(path, 'w', encoding='utf-8', buffering=buffer_size) if path else None
+
+    def row(self, index, row):
+        if self._file is not None:
+            self._file.write(f"ROW {index}: " + ' | '.join(f"[{i}]: {v}" for i, v in enumerate(row)) + '\n')
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def map_voter_row(row, index, area_id):
+    """Map one worksheet row to a voters record, or None when it is not a voter."""
+    if len(row) < ROW_WIDTH:
+        row = tuple(row) + (None,) * (ROW_WIDTH - len(row))
+
+    name = cell_text(row[2]).upper()
+    if not name or name in HEADER_NAMES:
+        return None
+
+    voter_card_no = cell_text(row[1]) or cell_text(row[0])
+    female_cell = cell_text(row[5]).lower()
+    gender = 'Nữ' if female_cell == 'x' or 'nữ' in female_cell else 'Nam'
+    cccd = cell_text(row[6]) or f"MISSING_{int(time.time() * 1000)}_{index}"
+    ethnic = cell_text(row[7]) or 'Kinh'
+
+    permanent_address = cell_text(row[8])
+    temporary_address = cell_text(row[9]) or cell_text(row[10])
+    address = temporary_address or permanent_address or 'CHƯA XÁC ĐỊNH'
+
+    group_match = GROUP_RE.search(address)
+    if area_id is None:
+        raise locations.UnknownLocation(None, 'area', f'row {index + 1}: voter "{name}" comes before the first '
+                                                      f'"Khu vực bỏ phiếu số" header')
+    mapping = get_mapping(area_id)
+    dob_date, birth_year = parse_dob(row[3])
+    address = address.upper()
+    permanent_address = permanent_address.upper()
+    temporary_address = temporary_address.upper()
+
+    return {
+        'name': name,
+        'dob': cell_text(row[3]),
+        'dob_date': dob_date,
+        'birth_year': birth_year,
+        'gender': gender,
+        'cccd': cccd,
+        'ethnic': ethnic,
+        'voter_card_number': voter_card_no,
+        'address': address,
+        'group_name': f"Tổ {group_match.group(1)}" if group_match else 'Tổ --',
+        'neighborhood_id': mapping['neighborhood_id'],
+        'unit_id': mapping['unit_id'],
+        'area_id': area_id,
+        'voting_status': 'chua-bau',
+        'residence_status': 'tam-tru' if temporary_address else 'thuong-tru',
+        'vote_qh': cell_text(row[11]).lower() != 'o',
+        'vote_t': cell_text(row[12]).lower() != 'o',
+        'vote_p': cell_text(row[13]).lower() != 'o',
+        'permanent_address': permanent_address,
+        'temporary_address': temporary_address,
+        'search_name': search_key(name),
+        'search_text': voter_search_text(name, address, permanent_address, temporary_address, cccd, voter_card_no),
+    }
+
+
+def iter_voters(path, diag=None, sheet=None, default_area=None):
+    """Stream voter records from the workbook at ``path``.
+
+    Only the current row is held in memory; ``diag`` is an optional
+    DiagWriter receiving every data row. Voters before the first area
+    header raise UnknownLocation unless ``default_area`` is given.
+    """
+    if default_area is not None:
+        locations.load().mapping(default_area)
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        ws = wb[sheet] if sheet else wb.worksheets[0]
+        current_area = default_area
+        for index, row in enumerate(ws.iter_rows(values_only=True)):
+            if not row:
+                continue
+            first = row[0]
+            if not is_stt(first):
+                # Only non-data rows can carry an area header
+                area = detect_area(row)
+                if area:
+                    # A KVBP missing from locations.json stops the import before its first voter
+                    locations.load().mapping(area)
+                    current_area = area
+                    print(f">>> Detected Area in header: {current_area}")
+                continue
+
+            if diag is not None:
+                diag.row(index, row)
+
+            with instrumentation.stage('map'):
+                voter = map_voter_row(row, index, current_area)
+            if voter is not None:
+                yield voter
+    finally:
+        wb.close()
+
+
+def location_hint(error):
+    """What to do about an UnknownLocation that stopped an import."""
+    if error.location_id is None:
+        return 'Check the workbook, or pass --default-area for rows before the first area header.'
+    return 'Add the area to locations.json (and run locations.py --sync) first.'
+
+
+def import_voters(path, dry_run=False, diag_path=None, sink='rest', dsn=None, concurrency=4, default_area=None):
+    start = time.perf_counter()
+    with DiagWriter(diag_path) as diag, instrumentation.Progress('parsed', unit='voters') as progress:
+        voters = progress.track(instrumentation.timed_iter(
+            'parse', iter_voters(path, diag=diag, default_area=default_area)))
+        if dry_run:
+            total = sum(1 for _ in voters)
+        else:
+            target = make_sink(sink, 'voters', base_url=SUPABASE_URL, key=SUPABASE_KEY, dsn=dsn,
+                               concurrency=concurrency)
+            result = target.write(voters)
+            total = result.rows_ok + result.rows_failed
+            print(f"Load: {result.summary()}")
+            instrumentation.count('rows_loaded', result.rows_ok)
+            instrumentation.report_failures(result.failed_rows, lambda row: f"{row['name']} | CCCD: {row['cccd']}")
+    instrumentation.count('rows', total)
+
+    elapsed = time.perf_counter() - start
+    rate = total / elapsed if elapsed else 0
+    print(f"Parsed {total} voters in {elapsed:.2f}s ({rate:,.0f} rows/s).")
+    return total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Stream a voter roll workbook into the voters table.')
+    parser.add_argument('path', help='path to the .xlsx voter roll')
+    parser.add_argument('--dry-run', action='store_true', help='parse only, do not load')
+    parser.add_argument('--diag', metavar='FILE', help='write per-row diagnostics to FILE')
+    parser.add_argument('--sink', default='rest', help=f"output: {', '.join(SINK_NAMES)} (default: rest)")
+    parser.add_argument('--dsn', help='PostgreSQL connection string for the copy sinks (default: $DATABASE_URL)')
+    parser.add_argument('--concurrency', type=int, default=4, help='parallel upload requests (rest sink)')
+    parser.add_argument('--default-area', help='area for voters before the first area header (default: stop)')
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args(argv)
+    try:
+        with instrumentation.Run('import_voters', args) as run:
+            import_voters(args.path, dry_run=args.dry_run, diag_path=args.diag, sink=args.sink, dsn=args.dsn,
+                          concurrency=args.concurrency, default_area=args.default_area)
+    except locations.UnknownLocation as e:
+        print(f"Import stopped: {e}. {location_hint(e)}")
+        return 1
+    print(run.summary())
+
+
+if __name__ == "__main__":
+    sys.exit(main())
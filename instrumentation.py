@@ -0,0 +1,436 @@
+"""Stage timers, counters and run records for the Python import tools.
+
+A ``Run`` collects, for one invocation of an importer or repair job:
+
+    stages     wall time per pipeline stage (calls, seconds, self seconds),
+               nested stages are named "parent/child"
+    counters   rows, bytes, requests, retries... (any name)
+    peak RSS   of the process, and of finished worker processes
+    profile    optional cProfile or stack-sampling output
+
+and writes it as one JSON run record (``--metrics FILE``), so two runs can
+be compared stage by stage (``python instrumentation.py compare a.json b.json``).
+
+Library code does not need the Run object: ``stage()``, ``count()`` and
+``timed()`` report to the active run and cost almost nothing when there is
+none. Stage time is summed over threads, so with the uploader's worker
+threads "http" can exceed the wall time of the run.
+
+Usage:
+    parser = argparse.ArgumentParser(...)
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+    with instrumentation.Run('import_voters', args) as run:
+        with stage('parse'):
+            ...
+        count('rows', n)
+
+Progress replaces per-row printing: at most one line every PROGRESS_INTERVAL
+seconds, plus a final one.
+"""
+import argparse
+import collections
+import datetime
+import functools
+import json
+import os
+import platform
+import sys
+import threading
+import time
+
+PROGRESS_INTERVAL = 2.0
+SAMPLE_INTERVAL = 0.005
+PROFILE_TOP = 25
+MAX_ERRORS = 1000
+FAILURES_PRINTED = 20
+PROFILERS = ('cprofile', 'sample')
+
+_active = None
+
+
+def peak_rss_mb(children=False):
+    """Peak resident set size in MB (None where it cannot be read)."""
+    try:
+        import resource
+    except ImportError:
+        # Windows: psutil when installed, no child figure
+        try:
+            import psutil
+            return None if children else psutil.Process().memory_info().peak_wset / 2 ** 20
+        except (ImportError, AttributeError):
+            return None
+    who = resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF
+    rss = resource.getrusage(who).ru_maxrss
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    return rss / 2 ** 20 if sys.platform == 'darwin' else rss / 1024
+
+
+class _Stage:
+    __slots__ = ('run', 'name', 'started', 'child')
+
+    def __init__(self, run, name):
+        self.run = run
+        self.name = name
+
+    def __enter__(self):
+        stack = self.run._stack()
+        if stack:
+            self.name = f"{stack[-1].name}/{self.name}"
+        self.child = 0.0
+        stack.append(self)
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.started
+        stack = self.run._stack()
+        stack.pop()
+        if stack:
+            stack[-1].child += elapsed
+        self.run._add_stage(self.name, elapsed, elapsed - self.child, top=not stack)
+        return False
+
+
+class Run:
+    """Instrumentation of one tool invocation; see the module docstring."""
+
+    def __init__(self, name, args=None, metrics=None, profile=None, profile_out=None):
+        self.name = name
+        self.metrics = metrics if args is None else getattr(args, 'metrics', None)
+        self.profile = profile if args is None else getattr(args, 'profile', None)
+        self.profile_out = profile_out if args is None else getattr(args, 'profile_out', None)
+        self.options = {k: v for k, v in vars(args).items() if k not in ('metrics', 'profile', 'profile_out')} if args else {}
+        self.stages = {}
+        self.counters = collections.Counter()
+        self.errors = []
+        self.info = {}
+        self.record = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._profiler = None
+
+    # --- collection ---
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _add_stage(self, name, elapsed, self_time, top):
+        with self._lock:
+            entry = self.stages.get(name)
+            if entry is None:
+                entry = self.stages[name] = {'calls': 0, 'seconds': 0.0, 'self_seconds': 0.0}
+            entry['calls'] += 1
+            entry['seconds'] += elapsed
+            entry['self_seconds'] += self_time
+        if top:
+            # Peak so far when the stage last ended; ru_maxrss only grows, so the
+            # stage where it jumps is the one that raised it
+            entry['peak_rss_mb'] = peak_rss_mb()
+
+    def stage(self, name):
+        return _Stage(self, name)
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] += n
+
+    def error(self, message, **fields):
+        """Keep a failure (row, chunk...) in the record instead of printing it."""
+        with self._lock:
+            self.counters['errors'] += 1
+            if len(self.errors) < MAX_ERRORS:
+                self.errors.append({'message': str(message), **fields})
+
+    def timed_iter(self, name, iterable):
+        """Yield from ``iterable``, timing the work spent producing each item as stage ``name``."""
+        it = iter(iterable)
+        while True:
+            with self.stage(name):
+                try:
+                    item = next(it)
+                except StopIteration:
+                    return
+            yield item
+
+    # --- lifecycle ---
+
+    def __enter__(self):
+        global _active
+        self.started_at = datetime.datetime.now().astimezone()
+        self.started = time.perf_counter()
+        self.cpu_started = time.process_time()
+        if self.profile == 'cprofile':
+            import cProfile
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        elif self.profile == 'sample':
+            self._profiler = StackSampler()
+            self._profiler.start()
+        _active = self
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        global _active
+        _active = None
+        elapsed = time.perf_counter() - self.started
+        profile = self._stop_profiler()
+        self.record = {
+            'tool': self.name,
+            'started': self.started_at.isoformat(timespec='seconds'),
+            'status': 'ok' if exc_type is None else f"{exc_type.__name__}: {exc}",
+            'elapsed_s': round(elapsed, 3),
+            'cpu_s': round(time.process_time() - self.cpu_started, 3),
+            'peak_rss_mb': _round(peak_rss_mb()),
+            'children_peak_rss_mb': _round(peak_rss_mb(children=True)),
+            'argv': sys.argv[1:],
+            'options': self.options,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'stages': {name: {k: _round(v) for k, v in entry.items()} for name, entry in self.stages.items()},
+            'counters': dict(self.counters),
+            'rates': {f"{name}_per_s": round(n / elapsed, 1) for name, n in self.counters.items() if elapsed},
+            **self.info,
+        }
+        if profile:
+            self.record['profile'] = profile
+        if self.errors:
+            self.record['errors'] = self.errors
+        if self.metrics:
+            with open(self.metrics, 'w', encoding='utf-8') as f:
+                json.dump(self.record, f, ensure_ascii=False, indent=1, default=str)
+            print(f"Run record written to {self.metrics}")
+        return False
+
+    def _stop_profiler(self):
+        if self._profiler is None:
+            return None
+        out = self.profile_out or f"{self.name}.{'prof' if self.profile == 'cprofile' else 'stacks.txt'}"
+        if self.profile == 'cprofile':
+            import io
+            import pstats
+            self._profiler.disable()
+            self._profiler.dump_stats(out)
+            text = io.StringIO()
+            pstats.Stats(self._profiler, stream=text).sort_stats('cumulative').print_stats(PROFILE_TOP)
+            top = [line.strip() for line in text.getvalue().splitlines()
+                   if line.strip()[:1].isdigit() and 'function calls' not in line]
+            return {'type': 'cprofile', 'file': out, 'top_cumulative': top}
+        self._profiler.stop()
+        self._profiler.write_collapsed(out)
+        return {'type': 'sample', 'file': out, 'interval_s': SAMPLE_INTERVAL,
+                'samples': self._profiler.samples, 'top_self': self._profiler.top(PROFILE_TOP)}
+
+    def summary(self):
+        """Stage table for the end of a run (the record has everything)."""
+        lines = [f"{'stage':<28} {'calls':>8} {'seconds':>9} {'self':>9}"]
+        for name, entry in sorted(self.stages.items()):
+            lines.append(f"{name:<28} {entry['calls']:>8} {entry['seconds']:>9.2f} {entry['self_seconds']:>9.2f}")
+        if self.counters:
+            lines.append(', '.join(f"{name} {n:,}" for name, n in sorted(self.counters.items())))
+        return '\n'.join(lines)
+
+
+def _round(value):
+    return round(value, 3) if isinstance(value, float) else value
+
+
+class _NullStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+def current():
+    """The active Run, or None."""
+    return _active
+
+
+def stage(name):
+    """Context manager timing stage ``name`` of the active run (no-op without one)."""
+    run = _active
+    return run.stage(name) if run is not None else _NULL_STAGE
+
+
+def count(name, n=1):
+    run = _active
+    if run is not None:
+        run.count(name, n)
+
+
+def error(message, **fields):
+    run = _active
+    if run is not None:
+        run.error(message, **fields)
+
+
+def timed(name):
+    """Decorator: time every call of the function as stage ``name``."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def timed_iter(name, iterable):
+    run = _active
+    return run.timed_iter(name, iterable) if run is not None else iterable
+
+
+def report_failures(failed_rows, describe, limit=FAILURES_PRINTED):
+    """Print the first ``limit`` (row, error) failures; all of them go to the run record."""
+    for i, (row, message) in enumerate(failed_rows):
+        error(message, row=describe(row))
+        if i < limit:
+            print(f"  Failed: {describe(row)}: {message}")
+    if len(failed_rows) > limit:
+        where = ' (all in the --metrics record)' if _active is not None and _active.metrics else ''
+        print(f"  ... and {len(failed_rows) - limit} more failed rows{where}")
+
+
+class StackSampler(threading.Thread):
+    """Low-overhead sampling profiler: records the main thread's stack every
+    SAMPLE_INTERVAL seconds. Output is in collapsed-stack format
+    ("frame;frame;frame count"), readable by flamegraph.pl and speedscope."""
+
+    def __init__(self, interval=SAMPLE_INTERVAL, thread_id=None):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.thread_id = thread_id or threading.main_thread().ident
+        self.stacks = collections.Counter()
+        self.samples = 0
+        self._halt = threading.Event()
+
+    def run(self):
+        while not self._halt.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+                self.samples += 1
+
+    def stop(self):
+        self._halt.set()
+        self.join()
+
+    def top(self, n):
+        leaf = collections.Counter()
+        for stack, hits in self.stacks.items():
+            leaf[stack.rsplit(';', 1)[-1]] += hits
+        return [{'frame': frame, 'share': round(hits / self.samples, 3)} for frame, hits in leaf.most_common(n)]
+
+    def write_collapsed(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, hits in self.stacks.most_common():
+                f.write(f"{stack} {hits}\n")
+
+
+class Progress:
+    """Rate-limited progress line: at most one print every ``interval`` seconds."""
+
+    def __init__(self, label, total=None, unit='rows', interval=PROGRESS_INTERVAL):
+        self.label = label
+        self.total = total
+        self.unit = unit
+        self.interval = interval
+        self.done = 0
+        self.fields = {}
+        self.started = self.last = time.perf_counter()
+
+    def update(self, n=1, **fields):
+        self.done += n
+        self.fields.update(fields)
+        now = time.perf_counter()
+        if now - self.last >= self.interval:
+            self.last = now
+            self._print(now)
+
+    def track(self, iterable):
+        """Yield from ``iterable``, counting every item."""
+        for item in iterable:
+            self.update()
+            yield item
+
+    def close(self):
+        self._print(time.perf_counter())
+
+    def _print(self, now):
+        elapsed = now - self.started
+        done = f"{self.done:,}/{self.total:,}" if self.total else f"{self.done:,}"
+        rate = self.done / elapsed if elapsed else 0.0
+        extra = ''.join(f", {k} {v:,}" if isinstance(v, int) else f", {k} {v}" for k, v in self.fields.items())
+        print(f"  {self.label}: {done} {self.unit}{extra} ({rate:,.0f}/s, {elapsed:.1f}s)", flush=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+def add_arguments(parser):
+    """Add --metrics / --profile / --profile-out to an argparse parser."""
+    group = parser.add_argument_group('instrumentation')
+    group.add_argument('--metrics', metavar='FILE', help='write a JSON run record (stages, counters, peak RSS) to FILE')
+    group.add_argument('--profile', choices=PROFILERS, help='profile the run: cProfile or stack sampling')
+    group.add_argument('--profile-out', metavar='FILE', help='profile output (default: <tool>.prof / <tool>.stacks.txt)')
+    return parser
+
+
+def compare(old, new):
+    """Print elapsed, peak RSS, stage and counter changes between two run records."""
+    def line(label, before, after, fmt='{:.2f}'):
+        if before is None and after is None:
+            return
+        ratio = f"{after / before:5.2f}x" if before and after is not None else ''
+        b = fmt.format(before) if before is not None else '-'
+        a = fmt.format(after) if after is not None else '-'
+        print(f"{label:<32} {b:>12} {a:>12} {ratio:>7}")
+
+    print(f"{old['tool']} {old['started']} -> {new['tool']} {new['started']}")
+    print(f"{'':<32} {'before':>12} {'after':>12}")
+    line('elapsed s', old['elapsed_s'], new['elapsed_s'])
+    line('cpu s', old.get('cpu_s'), new.get('cpu_s'))
+    line('peak RSS MB', old.get('peak_rss_mb'), new.get('peak_rss_mb'), '{:.1f}')
+    for name in sorted(set(old['stages']) | set(new['stages'])):
+        before, after = old['stages'].get(name, {}), new['stages'].get(name, {})
+        line(f"  {name} (self s)", before.get('self_seconds'), after.get('self_seconds'))
+    for name in sorted(set(old['counters']) | set(new['counters'])):
+        line(f"  {name}", old['counters'].get(name), new['counters'].get(name), '{:,}')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare two run records written with --metrics.')
+    sub = parser.add_subparsers(dest='command', required=True)
+    cmp = sub.add_parser('compare', help='compare two run records')
+    cmp.add_argument('before')
+    cmp.add_argument('after')
+    args = parser.parse_args(argv)
+
+    sys.stdout.reconfigure(encoding='utf-8')
+    with open(args.before, encoding='utf-8') as f:
+        old = json.load(f)
+    with open(args.after, encoding='utf-8') as f:
+        new = json.load(f)
+    compare(old, new)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,39 @@
+import { supabase, getEnvVar } from './supabaseClient';
+
+/**
+ * Đọc các RPC thống kê (get_election_summary, get_aggregated_stats) qua
+ * dịch vụ cache aggregate_cache.py nếu đã cấu hình VITE_AGGREGATE_URL.
+ *
+ * Dịch vụ gộp các yêu cầu giống nhau thành một lần gọi database và trả 304
+ * khi số liệu chưa đổi, nên mỗi sự kiện realtime không còn kéo theo một
+ * lượt truy vấn từ mọi trình duyệt. Khi chưa cấu hình hoặc dịch vụ lỗi thì
+ * gọi thẳng supabase.rpc như trước.
+ */
+const AGGREGATE_URL: string | undefined = getEnvVar('AGGREGATE_URL')?.replace(/\/$/, '');
+
+type AggregateRpc = 'get_election_summary' | 'get_aggregated_stats';
+
+// ETag + dữ liệu lần trước theo từng URL, để gửi If-None-Match
+const cache = new Map<string, { etag: string; data: any }>();
+
+export const fetchAggregate = async (name: AggregateRpc, params: Record<string, string> = {}) => {
+    if (AGGREGATE_URL) {
+        const query = new URLSearchParams(params).toString();
+        const url = `${AGGREGATE_URL}/rpc/${name}${query ? `?${query}` : ''}`;
+        const cached = cache.get(url);
+        try {
+            const res = await fetch(url, { headers: cached ? { 'If-None-Match': cached.etag } : {} });
+            if (res.status === 304 && cached) return { data: cached.data, error: null };
+            if (res.ok) {
+                const data = await res.json();
+                const etag = res.headers.get('ETag');
+                if (etag) cache.set(url, { etag, data });
+                return { data, error: null };
+            }
+            console.warn(`Aggregate cache trả về ${res.status} cho ${name}, gọi trực tiếp Supabase`);
+        } catch (err) {
+            console.warn('Không kết nối được aggregate cache, gọi trực tiếp Supabase:', err);
+        }
+    }
+    return supabase.rpc(name, params);
+};
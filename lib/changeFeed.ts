@@ -0,0 +1,46 @@
+import { supabase } from './supabaseClient';
+
+/**
+ * Client của RPC get_changes_since (change_log.sql).
+ *
+ * Mỗi feed nhớ version lần đọc trước; pull() chỉ trả về các dòng đã thay
+ * đổi kể từ đó (dòng hiện tại + khóa các dòng đã xóa/ngoài phạm vi), thay
+ * cho việc tải lại cả bảng mỗi khi có sự kiện realtime.
+ * resync = true nghĩa là phải tải lại toàn bộ (lần đầu, nhật ký đã bị dọn,
+ * hoặc quá nhiều thay đổi); sau khi tải lại cứ tiếp tục pull() như thường.
+ */
+export type ChangeTable = 'voters' | 'area_stats' | 'voting_results';
+
+export interface TableDelta {
+    upserts: any[];
+    deletes: string[];
+}
+
+export interface ChangeBatch {
+    resync: boolean;
+    changes: Partial<Record<ChangeTable, TableDelta>>;
+}
+
+export const createChangeFeed = (tables: ChangeTable[], limit = 2000) => {
+    let version: number | null = null;
+
+    return {
+        /** Bắt đầu lại từ đầu: lần pull() kế tiếp trả về resync. */
+        reset() {
+            version = null;
+        },
+
+        async pull(): Promise<ChangeBatch> {
+            const { data, error } = await supabase.rpc('get_changes_since', {
+                p_version: version, p_tables: tables, p_limit: limit
+            });
+            if (error || !data) {
+                console.error('RPC get_changes_since error:', error);
+                version = null;
+                return { resync: true, changes: {} };
+            }
+            version = data.version;
+            return { resync: data.resync, changes: data.changes || {} };
+        }
+    };
+};
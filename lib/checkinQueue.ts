@@ -0,0 +1,130 @@
+import { supabase } from './supabaseClient';
+
+/**
+ * Hàng đợi check-in của máy quét tại khu vực bỏ phiếu.
+ *
+ * Mỗi lượt quét được ghi vào localStorage ngay (không mất khi mất mạng
+ * hoặc tải lại trang) rồi gửi theo lô qua RPC checkin_batch
+ * (checkin_batch.sql): khi đủ FLUSH_SIZE lượt, sau FLUSH_DELAY_MS, hoặc
+ * khi có mạng trở lại. Mỗi lượt có event_id riêng nên gửi lại sau lỗi
+ * mạng không bao giờ bị tính hai lần.
+ */
+export type CheckinStatus = 'checked_in' | 'already' | 'duplicate' | 'not_found' | 'forbidden';
+
+export interface CheckinEvent {
+    event_id: string;
+    voter_id?: string;
+    area_id?: string;
+    voter_card_number?: string;
+    scanned_at: string;
+    station: string;
+}
+
+export interface CheckinResult {
+    event_id: string;
+    status: CheckinStatus;
+    voter_id: string | null;
+    name: string | null;
+}
+
+const STORAGE_KEY = 'checkin_queue';
+const STATION_KEY = 'checkin_station';
+const FLUSH_SIZE = 25;
+const FLUSH_DELAY_MS = 1500;
+const MAX_BATCH = 500;
+const MAX_RETRY_DELAY_MS = 30000;
+
+const newId = () =>
+    typeof crypto !== 'undefined' && 'randomUUID' in crypto
+        ? crypto.randomUUID()
+        : 'xxxxxxxx-xxxx-4xxx-yxxx-xxxxxxxxxxxx'.replace(/[xy]/g, c => {
+            const r = Math.random() * 16 | 0;
+            return (c === 'x' ? r : (r & 0x3) | 0x8).toString(16);
+        });
+
+// Mã máy quét: cố định cho mỗi trình duyệt, dùng để truy vết lượt quét
+const stationId = () => {
+    let id = localStorage.getItem(STATION_KEY);
+    if (!id) {
+        id = `st-${newId().slice(0, 8)}`;
+        localStorage.setItem(STATION_KEY, id);
+    }
+    return id;
+};
+
+const load = (): CheckinEvent[] => {
+    try {
+        return JSON.parse(localStorage.getItem(STORAGE_KEY) || '[]');
+    } catch {
+        return [];
+    }
+};
+
+let queue: CheckinEvent[] = load();
+let timer: ReturnType<typeof setTimeout> | null = null;
+let flushing = false;
+let retryDelay = FLUSH_DELAY_MS;
+const listeners = new Set<(results: CheckinResult[], pending: number) => void>();
+
+const save = () => localStorage.setItem(STORAGE_KEY, JSON.stringify(queue));
+
+const schedule = (delay: number) => {
+    if (timer) clearTimeout(timer);
+    timer = setTimeout(() => { timer = null; flushCheckins(); }, delay);
+};
+
+/** Gửi các lượt quét đang chờ; trả về kết quả của lô đã gửi (rỗng nếu chưa gửi được). */
+export const flushCheckins = async (): Promise<CheckinResult[]> => {
+    if (flushing || queue.length === 0) return [];
+    if (typeof navigator !== 'undefined' && navigator.onLine === false) return [];
+    flushing = true;
+    const batch = queue.slice(0, MAX_BATCH);
+    try {
+        const { data, error } = await supabase.rpc('checkin_batch', { p_events: batch });
+        if (error) throw error;
+        const sent = new Set(batch.map(e => e.event_id));
+        queue = queue.filter(e => !sent.has(e.event_id));
+        save();
+        retryDelay = FLUSH_DELAY_MS;
+        listeners.forEach(fn => fn(data as CheckinResult[], queue.length));
+        if (queue.length > 0) schedule(0);
+        return data as CheckinResult[];
+    } catch (err) {
+        // Giữ nguyên hàng đợi, thử lại chậm dần
+        console.warn('Chưa gửi được check-in, sẽ thử lại:', err);
+        retryDelay = Math.min(retryDelay * 2, MAX_RETRY_DELAY_MS);
+        schedule(retryDelay);
+        return [];
+    } finally {
+        flushing = false;
+    }
+};
+
+/** Ghi nhận một lượt quét (theo id cử tri, hoặc khu vực + số thẻ cử tri). */
+export const enqueueCheckin = (target: { voterId: string } | { areaId: string; cardNumber: string }) => {
+    const event: CheckinEvent = {
+        event_id: newId(),
+        scanned_at: new Date().toISOString(),
+        station: stationId(),
+        ...('voterId' in target
+            ? { voter_id: target.voterId }
+            : { area_id: target.areaId, voter_card_number: target.cardNumber })
+    };
+    queue.push(event);
+    save();
+    schedule(queue.length >= FLUSH_SIZE ? 0 : FLUSH_DELAY_MS);
+    return event.event_id;
+};
+
+export const pendingCheckins = () => queue.length;
+
+/** Nhận kết quả mỗi lô đã gửi; trả về hàm hủy đăng ký. */
+export const onCheckinResults = (fn: (results: CheckinResult[], pending: number) => void) => {
+    listeners.add(fn);
+    return () => { listeners.delete(fn); };
+};
+
+if (typeof window !== 'undefined') {
+    window.addEventListener('online', () => schedule(0));
+    if (queue.length > 0) schedule(FLUSH_DELAY_MS);
+}
@@ -9,24 +9,117 @@ export interface LogEntry {
 }
 
 /**
- * Ghi log hệ thống vào bảng system_logs
+ * Ghi log hệ thống vào bảng system_logs, theo lô.
+ *
+ * createLog không chờ mạng: sự kiện vào hàng đợi (lưu cả vào localStorage
+ * để không mất khi tải lại trang) và được gửi bằng một lệnh insert cho cả
+ * lô: khi đủ FLUSH_SIZE sự kiện, sau FLUSH_DELAY_MS, khi có mạng trở lại
+ * hoặc khi trang bị ẩn/đóng. Mỗi sự kiện có id và thời điểm riêng nên gửi
+ * lại sau lỗi mạng không tạo bản ghi trùng, và created_at là lúc thao
+ * tác chứ không phải lúc gửi.
  */
-export const createLog = async (entry: LogEntry) => {
+interface QueuedLog {
+    id: string;
+    user_name: string;
+    action: string;
+    details: string;
+    ip_address: string;
+    status: string;
+    created_at: string;
+}
+
+const STORAGE_KEY = 'audit_log_queue';
+const FLUSH_SIZE = 20;
+const FLUSH_DELAY_MS = 2000;
+const MAX_BATCH = 500;
+const MAX_QUEUE = 5000;
+const MAX_RETRY_DELAY_MS = 60000;
+
+const newId = () =>
+    typeof crypto !== 'undefined' && 'randomUUID' in crypto
+        ? crypto.randomUUID()
+        : 'xxxxxxxx-xxxx-4xxx-yxxx-xxxxxxxxxxxx'.replace(/[xy]/g, c => {
+            const r = Math.random() * 16 | 0;
+            return (c === 'x' ? r : (r & 0x3) | 0x8).toString(16);
+        });
+
+const load = (): QueuedLog[] => {
     try {
-        const { error } = await supabase.from('system_logs').insert([
-            {
-                user_name: entry.userName || 'System',
-                action: entry.action,
-                details: entry.details || '',
-                ip_address: entry.ipAddress || 'internal',
-                status: entry.status || 'success',
-            }
-        ]);
-
-        if (error) {
-            console.error('Lỗi khi ghi Audit Log:', error.message);
-        }
-    } catch (err) {
-        console.error('Lỗi không xác định khi ghi Audit Log:', err);
+        return JSON.parse(localStorage.getItem(STORAGE_KEY) || '[]');
+    } catch {
+        return [];
     }
 };
+
+let queue: QueuedLog[] = typeof localStorage !== 'undefined' ? load() : [];
+let timer: ReturnType<typeof setTimeout> | null = null;
+let flushing = false;
+let retryDelay = FLUSH_DELAY_MS;
+
+const save = () => {
+    try {
+        localStorage.setItem(STORAGE_KEY, JSON.stringify(queue));
+    } catch {
+        // localStorage đầy hoặc bị chặn: vẫn giữ hàng đợi trong bộ nhớ
+    }
+};
+
+const schedule = (delay: number) => {
+    if (timer) clearTimeout(timer);
+    timer = setTimeout(() => { timer = null; flushLogs(); }, delay);
+};
+
+/** Gửi các log đang chờ (một insert cho mỗi lô tối đa MAX_BATCH dòng). */
+export const flushLogs = async () => {
+    if (flushing || queue.length === 0) return;
+    if (typeof navigator !== 'undefined' && navigator.onLine === false) return;
+    flushing = true;
+    const batch = queue.slice(0, MAX_BATCH);
+    try {
+        const { error } = await supabase
+            .from('system_logs')
+            .upsert(batch, { onConflict: 'id,created_at', ignoreDuplicates: true });
+        if (error) throw error;
+        const sent = new Set(batch.map(e => e.id));
+        queue = queue.filter(e => !sent.has(e.id));
+        save();
+        retryDelay = FLUSH_DELAY_MS;
+        if (queue.length > 0) schedule(0);
+    } catch (err: any) {
+        console.error('Lỗi khi ghi Audit Log, sẽ thử lại:', err?.message || err);
+        retryDelay = Math.min(retryDelay * 2, MAX_RETRY_DELAY_MS);
+        schedule(retryDelay);
+    } finally {
+        flushing = false;
+    }
+};
+
+/**
+ * Ghi log hệ thống vào bảng system_logs (qua hàng đợi, không chặn giao diện)
+ */
+export const createLog = async (entry: LogEntry) => {
+    queue.push({
+        id: newId(),
+        user_name: entry.userName || 'System',
+        action: entry.action,
+        details: entry.details || '',
+        ip_address: entry.ipAddress || 'internal',
+        status: entry.status || 'success',
+        created_at: new Date().toISOString(),
+    });
+    // Mất mạng quá lâu: bỏ các log cũ nhất thay vì làm đầy localStorage
+    if (queue.length > MAX_QUEUE) queue = queue.slice(queue.length - MAX_QUEUE);
+    save();
+    schedule(queue.length >= FLUSH_SIZE ? 0 : FLUSH_DELAY_MS);
+};
+
+export const pendingLogs = () => queue.length;
+
+if (typeof window !== 'undefined') {
+    window.addEventListener('online', () => schedule(0));
+    // Trang bị ẩn (chuyển tab, khóa máy, đóng): gửi ngay, phần chưa kịp gửi còn trong localStorage
+    document.addEventListener('visibilitychange', () => {
+        if (document.visibilityState === 'hidden') flushLogs();
+    });
+    if (queue.length > 0) schedule(FLUSH_DELAY_MS);
+}
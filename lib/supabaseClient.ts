@@ -2,7 +2,7 @@
 import { createClient } from '@supabase/supabase-js';
 
 // Hàm helper để lấy biến môi trường an toàn trên nhiều môi trường build khác nhau (Vite, Webpack, etc.)
-const getEnvVar = (key: string) => {
+export const getEnvVar = (key: string) => {
   // 1. Ưu tiên import.meta.env (Vite standard)
   // @ts-ignore
   if (typeof import.meta !== 'undefined' && import.meta.env) {
@@ -0,0 +1,240 @@
+"""Output sinks for the Python import tools.
+
+Every importer produces a stream of row dicts; a sink decides where they go:
+
+    rest             Supabase REST API through BulkUploader (default)
+    copy             PostgreSQL COPY FROM STDIN (binary) into a temp staging
+                     table, then one set-based INSERT ... SELECT
+    copy-csv         same, CSV wire format
+    ndjson:PATH      newline-delimited JSON file (.gz compresses), for dry runs
+    sqlite:PATH      local SQLite database, for dry runs
+
+Usage:
+    sink = make_sink('copy', 'voters', dsn=...)
+    result = sink.write(rows)
+    print(result.summary())
+"""
+import csv
+import gzip
+import io
+import json
+import sqlite3
+import time
+from itertools import chain, islice
+
+import instrumentation
+from bulk_uploader import BulkUploader, json_default
+
+COPY_BUFFER_SIZE = 1 << 16
+CSV_NULL = '\\N'
+SQLITE_BATCH_SIZE = 5000
+
+
+class LoadResult:
+    def __init__(self, sink, rows_ok=0, failed_rows=None, elapsed=0.0, detail='', merged=None):
+        self.sink = sink
+        self.rows_ok = rows_ok
+        self.failed_rows = failed_rows or []
+        self.elapsed = elapsed
+        self.detail = detail
+        # rows affected by a staging merge (CopySink only)
+        self.merged = merged
+
+    @property
+    def rows_failed(self):
+        return len(self.failed_rows)
+
+    @property
+    def rows_per_sec(self):
+        return self.rows_ok / self.elapsed if self.elapsed else 0.0
+
+    def summary(self):
+        text = (f"[{self.sink}] {self.rows_ok} rows ok, {self.rows_failed} failed in {self.elapsed:.2f}s "
+                f"-> {self.rows_per_sec:,.0f} rows/s")
+        return f"{text} ({self.detail})" if self.detail else text
+
+
+def _peek_columns(rows, columns):
+    """Return (columns, iterator) using the first row's keys when columns is None."""
+    it = iter(rows)
+    first = next(it, None)
+    if first is None:
+        return columns or [], iter(())
+    return columns or list(first.keys()), chain([first], it)
+
+
+class RestSink:
+    name = 'rest'
+
+    def __init__(self, table, base_url, key, concurrency=4, **uploader_options):
+        self.uploader = BulkUploader(base_url, key, table, concurrency=concurrency, **uploader_options)
+
+    def write(self, rows):
+        report = self.uploader.upload(rows)
+        return LoadResult(self.name, report.rows_ok, report.failed_rows, report.elapsed,
+                          f"{report.requests} requests, {report.bisections} bisections")
+
+
+class CopySink:
+    """Stream rows with COPY into a temporary staging table, then merge them
+    into ``table`` with a single statement, all in one transaction.
+
+    ``conflict`` (a list of columns with a unique index) turns the merge into
+    an upsert. Subclasses can override ``merge`` for other set-based merges.
+    """
+
+    def __init__(self, table, dsn=None, columns=None, fmt='binary', conflict=None):
+        if fmt not in ('binary', 'csv'):
+            raise ValueError(f"unknown COPY format: {fmt}")
+        self.table = table
+        self.dsn = dsn
+        self.columns = columns
+        self.fmt = fmt
+        self.conflict = conflict
+        self.name = 'copy' if fmt == 'binary' else 'copy-csv'
+
+    @property
+    def stage(self):
+        return f"_stage_{self.table}"
+
+    def _copy_binary(self, cur, columns, types, rows):
+        from psycopg import sql
+        stmt = sql.SQL("COPY {} ({}) FROM STDIN (FORMAT BINARY)").format(
+            sql.Identifier(self.stage), sql.SQL(', ').join(map(sql.Identifier, columns)))
+        count = 0
+        with cur.copy(stmt) as copy:
+            copy.set_types(types)
+            for row in rows:
+                copy.write_row([row.get(c) for c in columns])
+                count += 1
+        return count
+
+    def _copy_csv(self, cur, columns, rows):
+        from psycopg import sql
+        stmt = sql.SQL("COPY {} ({}) FROM STDIN (FORMAT CSV, NULL '\\N')").format(
+            sql.Identifier(self.stage), sql.SQL(', ').join(map(sql.Identifier, columns)))
+        count = 0
+        buf = io.StringIO()
+        # csv writes None as "" (an empty string), so NULLs travel as an explicit \N marker
+        writer = csv.writer(buf, lineterminator='\n')
+        with cur.copy(stmt) as copy:
+            for row in rows:
+                writer.writerow([CSV_NULL if v is None else v for v in (row.get(c) for c in columns)])
+                count += 1
+                if buf.tell() >= COPY_BUFFER_SIZE:
+                    copy.write(buf.getvalue())
+                    buf.seek(0)
+                    buf.truncate()
+            if buf.tell():
+                copy.write(buf.getvalue())
+        return count
+
+    def merge(self, cur, columns):
+        """Move the staged rows into the target table; returns affected rows."""
+        from psycopg import sql
+        cols = sql.SQL(', ').join(map(sql.Identifier, columns))
+        stmt = sql.SQL("INSERT INTO {} ({}) SELECT {} FROM {}").format(
+            sql.Identifier(self.table), cols, cols, sql.Identifier(self.stage))
+        if self.conflict:
+            updates = [c for c in columns if c not in self.conflict]
+            stmt += sql.SQL(" ON CONFLICT ({}) DO ").format(sql.SQL(', ').join(map(sql.Identifier, self.conflict)))
+            if updates:
+                stmt += sql.SQL("UPDATE SET {}").format(sql.SQL(', ').join(
+                    sql.SQL("{} = EXCLUDED.{}").format(sql.Identifier(c), sql.Identifier(c)) for c in updates))
+            else:
+                stmt += sql.SQL("NOTHING")
+        cur.execute(stmt)
+        return cur.rowcount
+
+    def write(self, rows):
+        from psycopg import sql
+        import db
+
+        started = time.perf_counter()
+        columns, rows = _peek_columns(rows, self.columns)
+        if not columns:
+            return LoadResult(self.name, elapsed=time.perf_counter() - started, detail='nothing to load')
+
+        with db.connect(self.dsn) as conn, conn.cursor() as cur:
+            # Only the loaded columns, without constraints: the target table checks them on merge
+            cur.execute(sql.SQL("CREATE TEMP TABLE {} ON COMMIT DROP AS SELECT {} FROM {} WITH NO DATA").format(
+                sql.Identifier(self.stage), sql.SQL(', ').join(map(sql.Identifier, columns)),
+                sql.Identifier(self.table)))
+            with instrumentation.stage('copy'):
+                if self.fmt == 'binary':
+                    staged = self._copy_binary(cur, columns, db.column_types(conn, self.table, columns), rows)
+                else:
+                    staged = self._copy_csv(cur, columns, rows)
+            copied = time.perf_counter()
+            with instrumentation.stage('merge'):
+                merged = self.merge(cur, columns)
+        elapsed = time.perf_counter() - started
+        return LoadResult(self.name, staged, elapsed=elapsed, merged=merged,
+                          detail=f"copy {copied - started:.2f}s, merge {elapsed - (copied - started):.2f}s, "
+                                 f"{merged} rows merged")
+
+
+class NdjsonSink:
+    name = 'ndjson'
+
+    def __init__(self, path):
+        self.path = path
+
+    def write(self, rows):
+        started = time.perf_counter()
+        opener = gzip.open if self.path.endswith('.gz') else open
+        count = 0
+        with opener(self.path, 'wt', encoding='utf-8') as f:
+            for row in rows:
+                f.write(json.dumps(row, ensure_ascii=False, default=json_default))
+                f.write('\n')
+                count += 1
+        return LoadResult(self.name, count, elapsed=time.perf_counter() - started, detail=self.path)
+
+
+class SqliteSink:
+    name = 'sqlite'
+
+    def __init__(self, path, table, columns=None):
+        self.path = path
+        self.table = table
+        self.columns = columns
+
+    def write(self, rows):
+        started = time.perf_counter()
+        columns, rows = _peek_columns(rows, self.columns)
+        count = 0
+        conn = sqlite3.connect(self.path)
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=OFF')
+            if columns:
+                col_list = ', '.join(f'"{c}"' for c in columns)
+                conn.execute(f'CREATE TABLE IF NOT EXISTS "{self.table}" ({col_list})')
+                insert = f'INSERT INTO "{self.table}" ({col_list}) VALUES ({", ".join("?" * len(columns))})'
+                with conn:
+                    while True:
+                        batch = [tuple(row.get(c) for c in columns) for row in islice(rows, SQLITE_BATCH_SIZE)]
+                        if not batch:
+                            break
+                        conn.executemany(insert, batch)
+                        count += len(batch)
+        finally:
+            conn.close()
+        return LoadResult(self.name, count, elapsed=time.perf_counter() - started, detail=self.path)
+
+
+SINK_NAMES = ('rest', 'copy', 'copy-csv', 'ndjson:PATH', 'sqlite:PATH')
+
+
+def make_sink(spec, table, base_url=None, key=None, dsn=None, concurrency=4, conflict=None):
+    kind, _, path = spec.partition(':')
+    if kind == 'rest':
+        return RestSink(table, base_url, key, concurrency=concurrency)
+    if kind in ('copy', 'copy-csv'):
+        return CopySink(table, dsn=dsn, fmt='csv' if kind == 'copy-csv' else 'binary', conflict=conflict)
+    if kind == 'ndjson':
+        return NdjsonSink(path or f"{table}.ndjson")
+    if kind == 'sqlite':
+        return SqliteSink(path or f"{table}.sqlite3", table)
+    raise ValueError(f"unknown sink '{spec}', expected one of: {', '.join(SINK_NAMES)}")
@@ -0,0 +1,81 @@
+"""Supabase auth stand-in for running the RPCs against a plain PostgreSQL.
+
+On Supabase, ``auth.uid()`` reads the ``sub`` claim PostgREST puts into
+``request.jwt.claim.sub`` for every request. Locally there is no auth
+schema, so the benchmarks and load generators install the same function
+(only if it is missing) and act as a user by setting that claim on their
+connection. ``profiles`` is created with the setup.sql columns when it
+does not exist yet, and so are the pieces setup.sql grants on: the
+PostgREST roles, the ``extensions`` schema and a bare ``auth.users``.
+
+Never run ensure_auth_shim against the Supabase project: it already has
+the real auth schema and the function is left untouched there anyway.
+"""
+import uuid
+
+AUTH_SHIM_SQL = """
+CREATE SCHEMA IF NOT EXISTS auth;
+CREATE SCHEMA IF NOT EXISTS extensions;
+DO $$
+DECLARE
+  r TEXT;
+BEGIN
+  FOREACH r IN ARRAY ARRAY['anon', 'authenticated', 'authenticator', 'service_role'] LOOP
+    IF NOT EXISTS (SELECT 1 FROM pg_roles WHERE rolname = r) THEN
+      EXECUTE format('CREATE ROLE %I NOLOGIN', r);
+    END IF;
+  END LOOP;
+  IF to_regprocedure('auth.uid()') IS NULL THEN
+    CREATE FUNCTION auth.uid() RETURNS UUID AS
+      'SELECT nullif(current_setting(''request.jwt.claim.sub'', true), '''')::uuid'
+    LANGUAGE sql STABLE;
+  END IF;
+END $$;
+CREATE TABLE IF NOT EXISTS auth.users (
+  id UUID PRIMARY KEY,
+  instance_id UUID,
+  email TEXT,
+  encrypted_password TEXT,
+  raw_user_meta_data JSONB,
+  created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+CREATE TABLE IF NOT EXISTS profiles (
+  id UUID DEFAULT gen_random_uuid() PRIMARY KEY,
+  username TEXT UNIQUE,
+  full_name TEXT,
+  role TEXT CHECK (role IN ('super_admin', 'ban_chi_dao', 'to_bau_cu', 'nhap_lieu', 'giam_sat', 'khach', 'admin_phuong')),
+  unit_id TEXT,
+  area_id TEXT,
+  neighborhood_id TEXT,
+  phone TEXT,
+  email TEXT,
+  status TEXT DEFAULT 'active',
+  permissions JSONB,
+  last_active TIMESTAMP WITH TIME ZONE,
+  created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+"""
+
+
+def ensure_auth_shim(conn):
+    """Create auth.uid() and profiles if this database does not have them."""
+    conn.execute(AUTH_SHIM_SQL)
+
+
+def create_profile(conn, role, area_id=None, unit_id=None, neighborhood_id=None, username=None):
+    """Insert an active profile and return its id."""
+    profile_id = str(uuid.uuid4())
+    conn.execute(
+        "INSERT INTO profiles (id, username, full_name, role, area_id, unit_id, neighborhood_id, status) "
+        "VALUES (%s, %s, %s, %s, %s, %s, %s, 'active')",
+        (profile_id, username or f"bench-{profile_id[:8]}", username or role, role, area_id, unit_id, neighborhood_id))
+    return profile_id
+
+
+def delete_profiles(conn, profile_ids):
+    conn.execute("DELETE FROM profiles WHERE id = ANY(%s::uuid[])", (list(profile_ids),))
+
+
+def act_as(conn, profile_id):
+    """Make auth.uid() return ``profile_id`` on this connection (None = anonymous)."""
+    conn.execute("SELECT set_config('request.jwt.claim.sub', %s, false)", (profile_id or '',))
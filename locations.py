@@ -0,0 +1,205 @@
+"""Location hierarchy of the ward: ward -> unit (đơn vị) -> area (KVBP), plus khu phố.
+
+locations.json is the only place the hierarchy is written down. types.ts
+builds AN_PHU_LOCATIONS / NEIGHBORHOODS from it, the Python tools load it
+here, and ``--sync`` copies it into the locations table (locations.sql)
+that the RPCs join against.
+
+Hierarchy turns the node list into plain dicts once: node by id, the
+(neighborhood_id, unit_id) of every area, and the ancestors/descendants
+of every node (an area sits under its unit and its khu phố). "Unit of
+kv17" or "areas of kp_4" is then a single dict lookup. An id that is not
+in the hierarchy raises UnknownLocation. Importers used to file such
+voters under kp_1a / unit_1 without saying anything.
+
+    python locations.py --sync     write locations.json into the locations table
+    python locations.py --check    compare the table and voters with locations.json
+
+Usage: python locations.py [--dsn ...] [--sync] [--check]
+"""
+import argparse
+import functools
+import json
+import os
+import sys
+from collections import namedtuple
+
+import db
+
+LOCATIONS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'locations.json')
+NODE_TYPES = ('ward', 'unit', 'neighborhood', 'area')
+COLUMNS = ('id', 'name', 'type', 'parent_id', 'neighborhood_id', 'location_detail', 'groups', 'sort_order')
+
+
+class UnknownLocation(LookupError):
+    """``location_id`` is None when the input names no location at all (``detail`` says where)."""
+
+    def __init__(self, location_id, expected='location', detail=None):
+        super().__init__(detail or f"unknown {expected} '{location_id}': not in {os.path.basename(LOCATIONS_FILE)}")
+        self.location_id = location_id
+
+
+Location = namedtuple('Location', COLUMNS)
+
+
+class Hierarchy:
+    """Lookups over a list of Location nodes (checked for dangling parents and cycles)."""
+
+    def __init__(self, nodes):
+        self.nodes = {}
+        for node in nodes:
+            if node.type not in NODE_TYPES:
+                raise ValueError(f"{node.id}: unknown location type '{node.type}'")
+            if node.id in self.nodes:
+                raise ValueError(f"{node.id}: listed twice")
+            self.nodes[node.id] = node
+
+        # Direct parents: the unit (parent_id) and, for areas, the khu phố
+        self.parents = {}
+        for node in self.nodes.values():
+            parents = tuple(p for p in (node.parent_id, node.neighborhood_id) if p)
+            for parent in parents:
+                if parent not in self.nodes:
+                    raise ValueError(f"{node.id}: parent '{parent}' is not a location")
+            self.parents[node.id] = parents
+        self.ancestors = {node_id: self._ancestors(node_id) for node_id in self.nodes}
+        self.descendants = {node_id: [] for node_id in self.nodes}
+        for node in self.ordered():
+            for ancestor in self.ancestors[node.id]:
+                self.descendants[ancestor].append(node.id)
+
+        self.by_type = {t: [n.id for n in self.ordered() if n.type == t] for t in NODE_TYPES}
+        self.area_mapping = {}
+        for area_id in self.by_type['area']:
+            area = self.nodes[area_id]
+            parent_types = [self.nodes[p].type for p in self.parents[area_id]]
+            if parent_types != ['unit', 'neighborhood']:
+                raise ValueError(f"{area_id}: an area needs a unit parent and a khu phố")
+            self.area_mapping[area_id] = (area.neighborhood_id, area.parent_id)
+
+    def _ancestors(self, node_id):
+        seen, order, stack = {node_id}, [], list(self.parents[node_id])
+        while stack:
+            parent = stack.pop(0)
+            if parent == node_id:
+                raise ValueError(f"{node_id}: the hierarchy has a cycle")
+            if parent not in seen:
+                seen.add(parent)
+                order.append(parent)
+                stack.extend(self.parents[parent])
+        return tuple(order)
+
+    def ordered(self):
+        return sorted(self.nodes.values(), key=lambda n: n.sort_order)
+
+    def get(self, location_id, expected=None):
+        node = self.nodes.get(location_id)
+        if node is None or (expected and node.type != expected):
+            raise UnknownLocation(location_id, expected or 'location')
+        return node
+
+    def mapping(self, area_id):
+        """(neighborhood_id, unit_id) of an area; UnknownLocation when it is not one."""
+        try:
+            return self.area_mapping[area_id]
+        except KeyError:
+            raise UnknownLocation(area_id, 'area') from None
+
+    def areas(self, under=None):
+        """Area ids in list order, all of them or those below ``under`` (ward, unit or khu phố)."""
+        if under is None:
+            return list(self.by_type['area'])
+        self.get(under)
+        return [d for d in self.descendants[under] if self.nodes[d].type == 'area']
+
+    def rows(self):
+        return [tuple(node) for node in self.ordered()]
+
+
+def from_json(path=LOCATIONS_FILE):
+    with open(path, encoding='utf-8') as f:
+        items = json.load(f)
+    return Hierarchy(Location(item['id'], item['name'], item['type'], item.get('parentId'),
+                              item.get('neighborhoodId'), item.get('locationDetail'), item.get('groups'), order)
+                     for order, item in enumerate(items))
+
+
+@functools.lru_cache(maxsize=None)
+def load():
+    """The hierarchy from locations.json, read once per process."""
+    return from_json()
+
+
+def fetch(conn):
+    """The hierarchy as stored in the locations table."""
+    rows = conn.execute(f"SELECT {', '.join(COLUMNS)} FROM locations ORDER BY sort_order, id").fetchall()
+    return Hierarchy(Location(*row) for row in rows)
+
+
+def sync(conn, hierarchy):
+    """Make the locations table equal to ``hierarchy``; returns (upserted, deleted)."""
+    updates = ', '.join(f"{c} = EXCLUDED.{c}" for c in COLUMNS[1:])
+    with conn.transaction():
+        cur = conn.cursor()
+        cur.executemany(
+            f"INSERT INTO locations ({', '.join(COLUMNS)}) VALUES ({', '.join(['%s'] * len(COLUMNS))}) "
+            f"ON CONFLICT (id) DO UPDATE SET {updates} "
+            f"WHERE ({', '.join('locations.' + c for c in COLUMNS[1:])}) "
+            f"IS DISTINCT FROM ({', '.join('EXCLUDED.' + c for c in COLUMNS[1:])})",
+            hierarchy.rows())
+        upserted = cur.rowcount
+        deleted = conn.execute("DELETE FROM locations WHERE NOT (id = ANY(%s))", (list(hierarchy.nodes),)).rowcount
+    return upserted, deleted
+
+
+def check(conn, hierarchy):
+    """Differences between ``hierarchy``, the locations table and the voters table."""
+    problems = []
+    stored = {row[0]: row for row in conn.execute(f"SELECT {', '.join(COLUMNS)} FROM locations").fetchall()}
+    for row in hierarchy.rows():
+        if stored.pop(row[0], None) != row:
+            problems.append(f"locations: {row[0]} missing or different, run --sync")
+    problems += [f"locations: {location_id} is not in locations.json" for location_id in stored]
+
+    rows = conn.execute(
+        "SELECT area_id, unit_id, neighborhood_id, count(*) FROM voters "
+        "GROUP BY area_id, unit_id, neighborhood_id ORDER BY area_id").fetchall()
+    for area_id, unit_id, neighborhood_id, count in rows:
+        expected = hierarchy.area_mapping.get(area_id)
+        if expected is None:
+            problems.append(f"voters: {count} voters in unknown area {area_id!r}")
+        elif expected != (neighborhood_id, unit_id):
+            problems.append(f"voters: {count} voters of {area_id} filed under {neighborhood_id}/{unit_id}, "
+                            f"expected {expected[0]}/{expected[1]}")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Location hierarchy: sync locations.json into the database.')
+    parser.add_argument('--dsn', help='PostgreSQL connection string (default: $DATABASE_URL)')
+    parser.add_argument('--sync', action='store_true', help='write locations.json into the locations table')
+    parser.add_argument('--check', action='store_true', help='compare the locations table and voters with the file')
+    args = parser.parse_args(argv)
+
+    sys.stdout.reconfigure(encoding='utf-8')
+    hierarchy = load()
+    counts = ', '.join(f"{len(ids)} {t}" for t, ids in hierarchy.by_type.items())
+    print(f"{os.path.basename(LOCATIONS_FILE)}: {counts}")
+    if not (args.sync or args.check):
+        return 0
+
+    with db.connect(args.dsn, autocommit=True) as conn:
+        if args.sync:
+            upserted, deleted = sync(conn, hierarchy)
+            print(f"locations: {upserted} rows written, {deleted} removed")
+        if args.check:
+            problems = check(conn, hierarchy)
+            for problem in problems:
+                print(f"  {problem}")
+            print(f"{len(problems)} problems" if problems else "Database matches locations.json")
+            return 1 if problems else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
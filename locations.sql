@@ -0,0 +1,87 @@
+-- ===================================================================
+-- DANH MỤC ĐỊA DANH: locations (phường -> đơn vị -> KVBP, khu phố)
+-- ===================================================================
+-- Trước đây danh mục 45 KVBP nằm rải rác: AN_PHU_LOCATIONS (types.ts),
+-- AREA_MAPPING (import_voters.py), LOCATIONS rút gọn (import_voters.js) và
+-- 45 dòng UNION ALL trong init_all_area_stats.sql. Nay chỉ có một nguồn là
+-- locations.json; bảng này giữ cùng dữ liệu để SQL/RPC join vào.
+--
+--   locations         mỗi địa danh một dòng: parent_id là cấp trên (KVBP ->
+--                     đơn vị -> phường, khu phố -> phường), KVBP có thêm
+--                     neighborhood_id (khu phố)
+--   location_closure  mọi cặp (tổ tiên, hậu duệ), tự dựng lại khi locations
+--                     đổi, nên "các KVBP của unit_4 / kp_3" là một lần tra chỉ mục
+--
+-- Thứ tự chạy: file này -> python locations.py --sync (nạp locations.json)
+-- -> init_all_area_stats.sql, rpc_aggregation.sql.
+-- Kiểm tra bảng và cử tri khớp danh mục: python locations.py --check
+-- ===================================================================
+
+CREATE TABLE IF NOT EXISTS locations (
+  id TEXT PRIMARY KEY,
+  name TEXT NOT NULL,
+  type TEXT NOT NULL CHECK (type IN ('ward', 'unit', 'neighborhood', 'area')),
+  parent_id TEXT REFERENCES locations(id) DEFERRABLE INITIALLY DEFERRED,
+  neighborhood_id TEXT REFERENCES locations(id) DEFERRABLE INITIALLY DEFERRED,
+  location_detail TEXT,
+  groups TEXT,
+  sort_order INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_locations_type ON locations(type, sort_order);
+
+CREATE TABLE IF NOT EXISTS location_closure (
+  ancestor_id TEXT NOT NULL,
+  descendant_id TEXT NOT NULL,
+  depth INTEGER NOT NULL,
+  PRIMARY KEY (ancestor_id, descendant_id)
+);
+CREATE INDEX IF NOT EXISTS idx_location_closure_descendant ON location_closure(descendant_id);
+
+ALTER TABLE locations ENABLE ROW LEVEL SECURITY;
+DROP POLICY IF EXISTS "Public read locations" ON locations;
+CREATE POLICY "Public read locations" ON locations FOR SELECT USING (true);
+ALTER TABLE location_closure ENABLE ROW LEVEL SECURITY;
+DROP POLICY IF EXISTS "Public read location_closure" ON location_closure;
+CREATE POLICY "Public read location_closure" ON location_closure FOR SELECT USING (true);
+
+-- Dựng lại toàn bộ bảng closure (vài chục địa danh, rẻ hơn cập nhật từng cạnh).
+-- Cạnh cha: parent_id và, với KVBP, neighborhood_id; depth là khoảng cách ngắn nhất.
+CREATE OR REPLACE FUNCTION rebuild_location_closure()
+RETURNS TRIGGER AS $$
+BEGIN
+  DELETE FROM location_closure;
+  INSERT INTO location_closure (ancestor_id, descendant_id, depth)
+  WITH RECURSIVE edges AS (
+    SELECT parent_id AS ancestor_id, id AS descendant_id FROM locations WHERE parent_id IS NOT NULL
+    UNION
+    SELECT neighborhood_id, id FROM locations WHERE neighborhood_id IS NOT NULL
+  ),
+  walk (ancestor_id, descendant_id, depth, path) AS (
+    SELECT id, id, 0, ARRAY[id] FROM locations
+    UNION ALL
+    SELECT w.ancestor_id, e.descendant_id, w.depth + 1, w.path || e.descendant_id
+    FROM walk w JOIN edges e ON e.ancestor_id = w.descendant_id
+    WHERE NOT e.descendant_id = ANY(w.path)
+  )
+  SELECT ancestor_id, descendant_id, min(depth) FROM walk GROUP BY ancestor_id, descendant_id;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+DROP TRIGGER IF EXISTS locations_rebuild_closure ON locations;
+CREATE TRIGGER locations_rebuild_closure
+  AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON locations
+  FOR EACH STATEMENT EXECUTE FUNCTION rebuild_location_closure();
+
+-- Các KVBP thuộc một địa danh (phường, đơn vị, khu phố hoặc chính KVBP đó)
+CREATE OR REPLACE FUNCTION location_areas(p_location_id TEXT)
+RETURNS SETOF TEXT AS $$
+  SELECT c.descendant_id
+  FROM location_closure c JOIN locations l ON l.id = c.descendant_id
+  WHERE c.ancestor_id = p_location_id AND l.type = 'area'
+  ORDER BY l.sort_order
+$$ LANGUAGE sql STABLE;
+
+GRANT SELECT ON locations, location_closure TO anon, authenticated, service_role;
+
+NOTIFY pgrst, 'reload config';
@@ -0,0 +1,172 @@
+"""Normalization helpers shared by the import, validation and dedupe tools.
+
+Scalar functions work on one value; the ``*_series`` variants apply the
+same rule to a whole pandas Series.
+"""
+import datetime
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+
+def _diacritics_table():
+    """Translate table mapping every accented Latin letter to its base letter.
+
+    Covers Latin-1 through Latin Extended Additional (U+00C0-U+1EFF), which
+    holds all Vietnamese precomposed letters, plus đ/Đ which do not decompose.
+    """
+    table = {ord('đ'): 'd', ord('Đ'): 'D'}
+    for code in range(0x00C0, 0x1F00):
+        char = chr(code)
+        base = ''.join(c for c in unicodedata.normalize('NFD', char) if not unicodedata.combining(c))
+        if base != char and base.isascii() and base.isalpha():
+            table[code] = base
+    # Combining marks left over from decomposed (NFD) input
+    for code in range(0x0300, 0x0370):
+        table[code] = None
+    return table
+
+
+DIACRITICS_TABLE = _diacritics_table()
+SPACES_RE = re.compile(r'\s+')
+# Whitespace folded by search_key: an explicit set rather than \s, whose
+# meaning differs between Python (all Unicode spaces) and PostgreSQL (locale)
+SEARCH_SPACES_RE = re.compile(r'[ \t\n\r\f\v\xa0]+')
+NON_DIGITS_RE = re.compile(r'\D')
+CCCD_RE = re.compile(r'\d{9,12}')
+DOB_DMY_RE = re.compile(r'^(\d{1,2})[/.-](\d{1,2})[/.-](\d{4})$')
+DOB_ISO_RE = re.compile(r'^(\d{4})-(\d{2})-(\d{2})(?:[ T]00:00:00)?$')
+DOB_YEAR_RE = re.compile(r'^(?:19|20)\d{2}$')
+
+
+def strip_diacritics(text):
+    """'NGUYỄN THỊ ĐÀO' -> 'NGUYEN THI DAO'."""
+    return text.translate(DIACRITICS_TABLE)
+
+
+def name_key(name):
+    """Upper-case, diacritic-free, single-spaced form of a person's name."""
+    return SPACES_RE.sub(' ', strip_diacritics(name or '')).strip().upper()
+
+
+def search_key(text):
+    """Lower-case, diacritic-free, single-spaced search form ('NGUYỄN  VĂN A' -> 'nguyen van a').
+
+    Same rule as search_key() in voter_search.sql: only ASCII whitespace and
+    NBSP are folded; other Unicode spaces are kept as they are on both sides.
+    """
+    return SEARCH_SPACES_RE.sub(' ', strip_diacritics(text or '')).strip(' ').lower()
+
+
+def voter_search_text(name, address=None, permanent_address=None, temporary_address=None,
+                      cccd=None, voter_card_number=None):
+    """voters.search_text: name, address, the other addresses when they differ, CCCD and card number.
+
+    Same rule as voter_search_text() in voter_search.sql; import placeholders
+    (MISSING_<ts>_<row>) are left out.
+    """
+    parts = [name, address]
+    parts += [a for a in (permanent_address, temporary_address) if a != address]
+    if cccd and not str(cccd).upper().startswith('MISSING'):
+        parts.append(cccd)
+    parts.append(voter_card_number)
+    return search_key(' '.join(str(p) for p in parts if p))
+
+
+def normalize_cccd(value):
+    """Digits of a CCCD/CMND number, or '' when it is missing or not 9-12 digits.
+
+    Import placeholders (MISSING_<ts>_<row>) count as missing.
+    """
+    text = str(value or '').strip()
+    if text.upper().startswith('MISSING'):
+        return ''
+    digits = NON_DIGITS_RE.sub('', text)
+    return digits if CCCD_RE.fullmatch(digits) else ''
+
+
+def normalize_card(value):
+    """Voter card number without spaces, upper-cased ('kv22 - 0001' -> 'KV22-0001')."""
+    return SPACES_RE.sub('', str(value or '')).upper()
+
+
+def dob_key(value):
+    """Canonical date of birth: 'YYYY-MM-DD', 'YYYY' when only the year is known, else ''."""
+    text = str(value or '').strip()
+    match = DOB_ISO_RE.match(text)
+    if match:
+        return '-'.join(match.groups())
+    match = DOB_DMY_RE.match(text)
+    if match:
+        day, month, year = match.groups()
+        return f"{year}-{int(month):02d}-{int(day):02d}"
+    return text if DOB_YEAR_RE.match(text) else ''
+
+
+def parse_dob(value):
+    """(dob_date, birth_year) for any dob format in the data.
+
+    Bare years give (None, year); unparseable or impossible dates
+    (31/02/1980) give (None, year) when the year is readable, else (None, None).
+    """
+    if isinstance(value, datetime.datetime):
+        return value.date(), value.year
+    if isinstance(value, datetime.date):
+        return value, value.year
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    key = dob_key(value)
+    if not key:
+        return None, None
+    year = int(key[:4])
+    if len(key) == 4:
+        return None, year
+    try:
+        return datetime.date.fromisoformat(key), year
+    except ValueError:
+        return None, year
+
+
+def _per_unique(values, fn):
+    """Apply a scalar normalizer once per distinct value and broadcast back.
+
+    Rolls repeat names and dates of birth heavily, so hashing the column
+    with pd.factorize and normalizing the uniques is much cheaper than
+    running string operations on every row.
+    """
+    codes, uniques = pd.factorize(values, use_na_sentinel=True)
+    mapped = np.array([fn(v) for v in uniques] + [fn(None)], dtype=object)
+    return pd.Series(mapped[codes], index=values.index)
+
+
+def name_key_series(names):
+    return _per_unique(names, name_key)
+
+
+def cccd_series(values):
+    text = values.fillna('').astype(str)
+    clean = text.str.fullmatch(CCCD_RE)
+    if clean.all():
+        return text
+    fixed = text.copy()
+    fixed[~clean] = [normalize_cccd(v) for v in text[~clean]]
+    return fixed
+
+
+def card_series(values):
+    return _per_unique(values, normalize_card)
+
+
+def dob_key_series(values):
+    return _per_unique(values, dob_key)
+
+
+def parse_dob_series(values):
+    """DataFrame with ``dob_date`` (datetime64, NaT if unknown) and
+    ``birth_year`` (nullable Int16) for a Series of raw dob values."""
+    keys = dob_key_series(values)
+    dates = pd.to_datetime(keys.where(keys.str.len() == 10), format='%Y-%m-%d', errors='coerce')
+    years = pd.to_numeric(keys.str[:4].where(keys != ''), errors='coerce').astype('Int16')
+    return pd.DataFrame({'dob_date': dates, 'birth_year': years}, index=values.index)
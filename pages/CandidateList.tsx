@@ -282,23 +282,24 @@ export const CandidateList: React.FC<{ isLargeText?: boolean }> = ({ isLargeText
    const confirmImport = async () => {
       setIsSaving(true);
       try {
-         const { data: currentCandidates, error: fetchError } = await supabase.from('candidates').select('id, name');
+         const { data: currentCandidates, error: fetchError } = await supabase.from('candidates').select('id, name, dob, gender, title, unit_id, level');
          if (fetchError) throw fetchError;
 
          // Normalize Helper (Shared Logic)
          const normalize = (str: string) => globalNormalizeSpelling(str);
 
-         const dbMap = new Map<string, string>(); // Name -> ID
+         const dbMap = new Map<string, any>(); // Name -> Row
          currentCandidates?.forEach(c => {
-            if (c.name) dbMap.set(normalize(c.name), c.id);
+            if (c.name) dbMap.set(normalize(c.name), c);
          });
 
          const toUpsertWithId: any[] = [];
          const toInsertNew: any[] = [];
+         let unchangedCount = 0;
 
          previewData.forEach(pdfCand => {
             const normName = normalize(pdfCand.name);
-            const existingId = dbMap.get(normName);
+            const existing = dbMap.get(normName);
 
             const candidateData = {
                name: pdfCand.name.trim(),
@@ -309,8 +310,12 @@ export const CandidateList: React.FC<{ isLargeText?: boolean }> = ({ isLargeText
                level: pdfCand.level,
             };
 
-            if (existingId) {
-               toUpsertWithId.push({ id: existingId, ...candidateData });
+            if (existing) {
+               // Chỉ ghi những bản ghi thực sự thay đổi (giữ nguyên ID cho voting_results)
+               const changed = (Object.keys(candidateData) as (keyof typeof candidateData)[])
+                  .some(k => (existing[k] ?? '') !== (candidateData[k] ?? ''));
+               if (changed) toUpsertWithId.push({ id: existing.id, ...candidateData });
+               else unchangedCount++;
             } else {
                toInsertNew.push({ ...candidateData, neighborhood_id: null, areas: [], hometown: '' });
             }
@@ -319,7 +324,7 @@ export const CandidateList: React.FC<{ isLargeText?: boolean }> = ({ isLargeText
          if (toUpsertWithId.length > 0) await supabase.from('candidates').upsert(toUpsertWithId);
          if (toInsertNew.length > 0) await supabase.from('candidates').insert(toInsertNew);
 
-         showNotification(`Đã nhập liệu thành công!\n- Cập nhật: ${toUpsertWithId.length}\n- Thêm mới: ${toInsertNew.length}`);
+         showNotification(`Đã nhập liệu thành công!\n- Cập nhật: ${toUpsertWithId.length}\n- Thêm mới: ${toInsertNew.length}\n- Không đổi: ${unchangedCount}`);
          await fetchCandidates();
          setIsUploadModalOpen(false);
          setPreviewData([]);
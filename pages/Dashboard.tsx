@@ -1,6 +1,7 @@
 
 import React, { useState, useEffect, useMemo } from 'react';
 import { supabase } from '../lib/supabaseClient';
+import { fetchAggregate } from '../lib/aggregateClient';
 import { AN_PHU_LOCATIONS } from '../types';
 import {
    BarChart,
@@ -84,7 +85,7 @@ export const Dashboard: React.FC<{ isLargeText?: boolean }> = ({ isLargeText })
    const fetchRealtimeStats = async () => {
       try {
          // 1. Fetch Summary via updated RPC
-         const { data: summary, error: sErr } = await supabase.rpc('get_election_summary');
+         const { data: summary, error: sErr } = await fetchAggregate('get_election_summary');
          if (sErr) {
             console.error("RPC get_election_summary error:", sErr);
             throw sErr;
@@ -104,7 +105,7 @@ export const Dashboard: React.FC<{ isLargeText?: boolean }> = ({ isLargeText })
          }
 
          // 2. Fetch Aggregated Lists via RPC
-         const { data: unitStats, error: uErr } = await supabase.rpc('get_aggregated_stats', { p_view_mode: 'unit' });
+         const { data: unitStats, error: uErr } = await fetchAggregate('get_aggregated_stats', { p_view_mode: 'unit' });
          if (uErr) console.error("RPC get_aggregated_stats (unit) error:", uErr);
          if (unitStats) {
             setUnitChartData(unitStats.map((u: any) => ({
@@ -117,7 +118,7 @@ export const Dashboard: React.FC<{ isLargeText?: boolean }> = ({ isLargeText })
             })));
          }
 
-         const { data: areaStats, error: aErr } = await supabase.rpc('get_aggregated_stats', { p_view_mode: 'area' });
+         const { data: areaStats, error: aErr } = await fetchAggregate('get_aggregated_stats', { p_view_mode: 'area' });
          if (aErr) console.error("RPC get_aggregated_stats (area) error:", aErr);
          if (areaStats) {
             // ĐẢM BẢO HIỂN THỊ ĐỦ 45 KVBP TỪ MASTER DATA
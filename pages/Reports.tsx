@@ -1,5 +1,5 @@
 import React, { useState, useMemo, useEffect } from 'react';
-import { AN_PHU_LOCATIONS, NEIGHBORHOODS, LocationNode } from '../types';
+import { NEIGHBORHOODS, LocationNode, LOCATION_BY_ID, UNITS, AREAS, AREAS_BY_UNIT, AREAS_BY_NEIGHBORHOOD } from '../types';
 import { supabase } from '../lib/supabaseClient';
 import { useNotification } from '../contexts/NotificationContext';
 import { jsPDF } from 'jspdf';
@@ -134,14 +134,14 @@ export const Reports: React.FC<ReportsProps> = ({ isLargeText }) => {
       const { data: lockedData } = await supabase.from('area_stats').select('area_id, is_locked');
       const lockedSet = new Set(lockedData?.filter(s => s.is_locked).map(s => s.area_id));
 
-      // 2. Get Voting Activity from voters (lightweight query)
-      // Chỉ lấy những người đã bầu để giảm tải
-      const { data: votedData } = await supabase.from('voters').select('area_id').eq('voting_status', 'da-bau');
-      const activeAreasSet = new Set(votedData?.map(v => v.area_id));
+      // 2. Get Voting Activity from the per-area counters (voter_counters.sql): one row per area
+      const { data: votedData } = await supabase.from('voter_counters')
+        .select('scope_id').eq('scope', 'area').gt('voted', 0);
+      const activeAreasSet = new Set(votedData?.map(v => v.scope_id));
 
       const newStatusMap: Record<string, 'done' | 'voting' | 'empty'> = {};
 
-      AN_PHU_LOCATIONS.filter(l => l.type === 'area').forEach(area => {
+      AREAS.forEach(area => {
         if (lockedSet.has(area.id)) {
           newStatusMap[area.id] = 'done';
         } else if (activeAreasSet.has(area.id)) {
@@ -174,13 +174,9 @@ export const Reports: React.FC<ReportsProps> = ({ isLargeText }) => {
       if (report.level === 'area') {
         targetAreaIds = [report.targetId];
       } else if (report.level === 'unit') {
-        targetAreaIds = AN_PHU_LOCATIONS
-          .filter(l => l.type === 'area' && l.parentId === report.targetId)
-          .map(l => l.id);
+        targetAreaIds = (AREAS_BY_UNIT.get(report.targetId) || []).map(l => l.id);
       } else if (report.level === 'ward') {
-        targetAreaIds = AN_PHU_LOCATIONS
-          .filter(l => l.type === 'area')
-          .map(l => l.id);
+        targetAreaIds = AREAS.map(l => l.id);
       }
 
       // 2. Lấy thống kê chung (Area Stats) - Nơi chứa thông tin khóa sổ
@@ -248,7 +244,7 @@ export const Reports: React.FC<ReportsProps> = ({ isLargeText }) => {
       if (report.level === 'unit') {
         relevantCandidates = relevantCandidates.filter(c => c.unit_id === report.targetId);
       } else if (report.level === 'area') {
-        const areaNode = AN_PHU_LOCATIONS.find(l => l.id === report.targetId);
+        const areaNode = LOCATION_BY_ID.get(report.targetId);
         if (areaNode && areaNode.parentId) {
           relevantCandidates = relevantCandidates.filter(c => c.unit_id === areaNode.parentId);
         }
@@ -404,18 +400,14 @@ export const Reports: React.FC<ReportsProps> = ({ isLargeText }) => {
   const availableUnits = useMemo(() => {
     if (!newReportData.neighborhood) return [];
     // Filter units that have areas in the selected neighborhood
-    const relevantUnitIds = AN_PHU_LOCATIONS
-      .filter(l => l.type === 'area' && l.neighborhoodId === newReportData.neighborhood)
-      .map(l => l.parentId);
-    return AN_PHU_LOCATIONS.filter(l => l.type === 'unit' && relevantUnitIds.includes(l.id));
+    const relevantUnitIds = new Set((AREAS_BY_NEIGHBORHOOD.get(newReportData.neighborhood) || []).map(l => l.parentId));
+    return UNITS.filter(l => relevantUnitIds.has(l.id));
   }, [newReportData.neighborhood]);
   const availableAreas = useMemo(() => {
     if (!newReportData.unit) return [];
     // Filter areas belonging to both selected unit and selected neighborhood
-    return AN_PHU_LOCATIONS.filter(l =>
-      l.type === 'area' &&
-      l.parentId === newReportData.unit &&
-      (newReportData.neighborhood ? l.neighborhoodId === newReportData.neighborhood : true)
+    return (AREAS_BY_UNIT.get(newReportData.unit) || []).filter(l =>
+      newReportData.neighborhood ? l.neighborhoodId === newReportData.neighborhood : true
     );
   }, [newReportData.unit, newReportData.neighborhood]);
 
@@ -445,12 +437,12 @@ export const Reports: React.FC<ReportsProps> = ({ isLargeText }) => {
       if (!newReportData.area) { showNotification('Vui lòng chọn Khu vực bỏ phiếu'); return; }
       targetId = newReportData.area;
       level = 'area';
-      titleDetail = AN_PHU_LOCATIONS.find(l => l.id === targetId)?.name || targetId;
+      titleDetail = LOCATION_BY_ID.get(targetId)?.name || targetId;
     } else if (template.levelScope === 'unit') {
       if (!newReportData.unit) { showNotification('Vui lòng chọn Đơn vị bầu cử'); return; }
       targetId = newReportData.unit;
       level = 'unit';
-      titleDetail = AN_PHU_LOCATIONS.find(l => l.id === targetId)?.name || targetId;
+      titleDetail = LOCATION_BY_ID.get(targetId)?.name || targetId;
     } else {
       targetId = 'ap';
       level = 'ward';
@@ -519,7 +511,7 @@ export const Reports: React.FC<ReportsProps> = ({ isLargeText }) => {
             <button onClick={() => setShowQuickStats(false)} className="text-slate-500 hover:text-white"><span className="material-symbols-outlined">close</span></button>
           </div>
           <div className="grid grid-cols-5 sm:grid-cols-9 md:grid-cols-15 gap-2">
-            {AN_PHU_LOCATIONS.filter(l => l.type === 'area').map((area) => {
+            {AREAS.map((area) => {
               // Real-time status logic
               const status = areaStatusMap[area.id] || 'empty';
 
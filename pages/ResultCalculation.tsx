@@ -1,6 +1,7 @@
 
-import React, { useState, useEffect, useMemo } from 'react';
+import React, { useState, useEffect, useMemo, useRef } from 'react';
 import { supabase } from '../lib/supabaseClient';
+import { fetchAggregate } from '../lib/aggregateClient';
 import { AN_PHU_LOCATIONS, NEIGHBORHOODS } from '../types';
 import { getDelegateCount } from '../lib/voting';
 import {
@@ -73,6 +74,7 @@ const DetailModal: React.FC<{
   const [filter, setFilter] = useState<'all' | 'voted' | 'not-voted'>('not-voted');
   const [page, setPage] = useState(0);
   const [totalCount, setTotalCount] = useState(0);
+  const cursorsRef = useRef<(string | null)[]>([null]);
   const PAGE_SIZE = 50;
 
   useEffect(() => {
@@ -97,18 +99,22 @@ const DetailModal: React.FC<{
       const filterCol = viewMode === 'area' ? 'area_id' : viewMode === 'unit' ? 'unit_id' : viewMode === 'neighborhood' ? 'neighborhood_id' : 'group_name';
       const votingStatus = filter === 'voted' ? 'da-bau' : filter === 'not-voted' ? 'chua-bau' : 'all';
 
-      const { data, error } = await supabase.rpc('get_voters_paged', {
+      // Keyset paging: page N continues from the cursor returned with page N-1
+      if (pageNum === 0) cursorsRef.current = [null];
+      const { data, error } = await supabase.rpc('get_voters_page', {
         p_filter_col: filterCol,
         p_filter_val: item.rawId,
         p_voting_status: votingStatus,
-        p_offset: pageNum * PAGE_SIZE,
+        p_cursor: cursorsRef.current[pageNum] ?? null,
         p_limit: PAGE_SIZE
       });
 
-      if (data && data.length > 0) {
-        setVoters(data);
-        setTotalCount(data[0].total_count);
+      if (data) {
+        setVoters(data.voters || []);
+        setTotalCount(data.total || 0);
+        cursorsRef.current[pageNum + 1] = data.nextCursor;
       } else {
+        if (error) console.error(error);
         setVoters([]);
         setTotalCount(0);
       }
@@ -368,7 +374,7 @@ const DetailModal: React.FC<{
                 <span className="material-symbols-outlined text-sm">chevron_left</span>
               </button>
               <button
-                disabled={page === totalPages - 1 || loading}
+                disabled={page === totalPages - 1 || !cursorsRef.current[page + 1] || loading}
                 onClick={() => fetchVoters(page + 1)}
                 className="size-8 rounded-lg bg-white border border-slate-200 flex items-center justify-center disabled:opacity-30"
               >
@@ -482,12 +488,12 @@ export const ResultCalculation: React.FC<{ isLargeText?: boolean }> = ({ isLarge
   const fetchRealtimeData = async () => {
     try {
       // 1. Fetch High-level Summary via RPC
-      const { data: summaryData } = await supabase.rpc('get_election_summary');
+      const { data: summaryData } = await fetchAggregate('get_election_summary');
       if (summaryData) setSummary(summaryData);
 
       // 2. Fetch Aggregated List via RPC (Based on current viewMode)
       if (viewMode !== 'candidates') {
-        const { data: statsData } = await supabase.rpc('get_aggregated_stats', { p_view_mode: viewMode });
+        const { data: statsData } = await fetchAggregate('get_aggregated_stats', { p_view_mode: viewMode });
         setAggregatedStats(statsData || []);
       }
 
@@ -1,4 +1,4 @@
-import React, { useState, useEffect, useMemo } from 'react';
+import React, { useState, useEffect, useMemo, useRef } from 'react';
 import { supabase } from '../lib/supabaseClient';
 import { LogEntry } from '../types';
 
@@ -7,52 +7,97 @@ interface SystemLogsProps {
 }
 
 const ITEMS_PER_PAGE = 20;
+// Danh sách hành động cho bộ lọc lấy từ các log gần nhất
+const RECENT_ACTIONS_SAMPLE = 1000;
+const EXPORT_CHUNK = 1000;
+const EXPORT_LIMIT = 20000;
+
+const mapLog = (item: any): LogEntry => ({
+  id: item.id,
+  time: new Date(item.created_at).toLocaleString('vi-VN'),
+  user: item.user_name || 'Hệ thống',
+  action: item.action,
+  details: item.details,
+  ip: item.ip_address || '---',
+  status: item.status === 'error' ? 'failure' : 'success'
+});
 
 export const SystemLogs: React.FC<SystemLogsProps> = ({ isLargeText }) => {
   // --- STATE ---
   const [logs, setLogs] = useState<LogEntry[]>([]);
+  const [totalCount, setTotalCount] = useState(0);
+  const [actions, setActions] = useState<string[]>([]);
   const [loading, setLoading] = useState(true);
   const [currentPage, setCurrentPage] = useState(1);
+  const requestRef = useRef(0);
 
   // Filter States
   const [searchTerm, setSearchTerm] = useState('');
+  const [debouncedSearch, setDebouncedSearch] = useState('');
   const [filterDate, setFilterDate] = useState(''); // YYYY-MM
   const [filterAction, setFilterAction] = useState('all');
 
+  useEffect(() => {
+    const timer = setTimeout(() => setDebouncedSearch(searchTerm), 300);
+    return () => clearTimeout(timer);
+  }, [searchTerm]);
+
+  // Lọc và phân trang trên server (system_logs_partitions.sql): chỉ tải đúng một trang,
+  // lọc theo tháng chỉ đọc các phân vùng ngày của tháng đó.
+  const buildQuery = (columns: string, count?: 'estimated') => {
+    let query = supabase.from('system_logs').select(columns, count ? { count } : undefined);
+    if (filterAction !== 'all') query = query.eq('action', filterAction);
+    if (filterDate) {
+      const [year, month] = filterDate.split('-').map(Number);
+      query = query
+        .gte('created_at', new Date(year, month - 1, 1).toISOString())
+        .lt('created_at', new Date(year, month, 1).toISOString());
+    }
+    // Ký tự đặc biệt của cú pháp or() được thay bằng dấu cách
+    const term = debouncedSearch.trim().replace(/[%*,()]/g, ' ');
+    if (term) {
+      query = query.or(['user_name', 'action', 'details', 'ip_address'].map(c => `${c}.ilike.*${term}*`).join(','));
+    }
+    return query.order('created_at', { ascending: false });
+  };
+
   // --- INITIAL DATA & FETCHING ---
   useEffect(() => {
-    fetchLogs();
+    supabase
+      .from('system_logs')
+      .select('action')
+      .order('created_at', { ascending: false })
+      .limit(RECENT_ACTIONS_SAMPLE)
+      .then(({ data }) => {
+        if (data) setActions(Array.from(new Set(data.map(item => item.action).filter(Boolean))));
+      });
   }, []);
 
+  useEffect(() => {
+    fetchLogs();
+  }, [currentPage, debouncedSearch, filterAction, filterDate]);
+
   const fetchLogs = async () => {
+    // Bộ lọc đổi nhanh: chỉ kết quả của lần tải mới nhất được hiển thị
+    const request = ++requestRef.current;
     setLoading(true);
     try {
-      // Thử lấy dữ liệu từ bảng 'system_logs' trên Supabase
-      const { data, error } = await supabase
-        .from('system_logs')
-        .select('*')
-        .order('created_at', { ascending: false });
+      const from = (currentPage - 1) * ITEMS_PER_PAGE;
+      const { data, error, count } = await buildQuery('*', 'estimated').range(from, from + ITEMS_PER_PAGE - 1);
+      if (request !== requestRef.current) return;
 
       if (!error && data) {
-        // Map dữ liệu từ DB
-        const mappedLogs: LogEntry[] = data.map(item => ({
-          id: item.id,
-          time: new Date(item.created_at).toLocaleString('vi-VN'),
-          user: item.user_name || 'Hệ thống',
-          action: item.action,
-          details: item.details,
-          ip: item.ip_address || '---',
-          status: item.status === 'error' ? 'failure' : 'success'
-        }));
-        setLogs(mappedLogs);
+        setLogs(data.map(mapLog));
+        setTotalCount(count ?? data.length);
       } else {
         // Nếu lỗi hoặc rỗng, có thể để trống hoặc fallback (ở đây ta để trống nếu DB có bảng nhưng chưa có data)
-        setLogs([]); 
+        setLogs([]);
+        setTotalCount(0);
       }
     } catch (err) {
       console.error('Lỗi tải logs:', err);
     } finally {
-      setLoading(false);
+      if (request === requestRef.current) setLoading(false);
     }
   };
 
@@ -71,7 +116,8 @@ export const SystemLogs: React.FC<SystemLogsProps> = ({ isLargeText }) => {
       if (error) throw error;
 
       alert('Đã xóa toàn bộ nhật ký hệ thống thành công.');
-      setLogs([]); 
+      setLogs([]);
+      setTotalCount(0);
       setCurrentPage(1);
     } catch (err: any) {
       console.error('Lỗi xóa logs:', err);
@@ -81,54 +127,37 @@ export const SystemLogs: React.FC<SystemLogsProps> = ({ isLargeText }) => {
     }
   };
 
-  // --- FILTERING LOGIC ---
+  // --- FILTER OPTIONS ---
   const uniqueActions = useMemo(() => {
-      const actions = new Set(logs.map(l => l.action));
-      return Array.from(actions);
-  }, [logs]);
-
-  const filteredLogs = useMemo(() => {
-    return logs.filter(log => {
-      // 1. Search Text
-      const searchContent = `${log.user} ${log.action} ${log.details} ${log.ip}`.toLowerCase();
-      const matchSearch = searchContent.includes(searchTerm.toLowerCase());
-
-      // 2. Filter Action
-      const matchAction = filterAction === 'all' || log.action === filterAction;
-
-      // 3. Filter Date (So sánh chuỗi hoặc Date object tùy format)
-      // Log time format: "HH:mm:ss DD/MM/YYYY" hoặc "DD/MM/YYYY ..."
-      let matchDate = true;
-      if (filterDate) {
-          const [year, month] = filterDate.split('-');
-          const datePart = log.time.split(' ')[1] || log.time.split(' ')[0]; // lấy phần ngày
-          if (datePart.includes('/')) {
-             const [d, m, y] = datePart.split('/');
-             matchDate = parseInt(m) === parseInt(month) && parseInt(y) === parseInt(year);
-          }
-      }
-
-      return matchSearch && matchAction && matchDate;
-    });
-  }, [logs, searchTerm, filterAction, filterDate]);
+      return filterAction !== 'all' && !actions.includes(filterAction) ? [filterAction, ...actions] : actions;
+  }, [actions, filterAction]);
 
   // --- PAGINATION LOGIC ---
-  const totalPages = Math.ceil(filteredLogs.length / ITEMS_PER_PAGE);
-  const paginatedLogs = filteredLogs.slice(
-    (currentPage - 1) * ITEMS_PER_PAGE,
-    currentPage * ITEMS_PER_PAGE
-  );
+  const totalPages = Math.ceil(totalCount / ITEMS_PER_PAGE);
+  const paginatedLogs = logs;
 
   useEffect(() => {
       setCurrentPage(1); // Reset trang khi filter thay đổi
-  }, [searchTerm, filterAction, filterDate]);
+  }, [debouncedSearch, filterAction, filterDate]);
 
   // --- EXPORT FUNCTION ---
-  const handleExport = () => {
+  // Tải theo từng đoạn EXPORT_CHUNK dòng (giới hạn số dòng mỗi lần gọi API), tối đa EXPORT_LIMIT dòng
+  const handleExport = async () => {
+    const rows: LogEntry[] = [];
+    for (let from = 0; from < EXPORT_LIMIT; from += EXPORT_CHUNK) {
+      const { data, error } = await buildQuery('*').range(from, from + EXPORT_CHUNK - 1);
+      if (error) {
+        alert('Không thể xuất nhật ký: ' + error.message);
+        return;
+      }
+      rows.push(...(data || []).map(mapLog));
+      if (!data || data.length < EXPORT_CHUNK) break;
+    }
+
     const headers = ['Thời gian', 'Người dùng', 'Hành động', 'Chi tiết', 'IP', 'Trạng thái'];
     const csvContent = [
         headers.join(','),
-        ...filteredLogs.map(log => [
+        ...rows.map(log => [
             `"${log.time}"`,
             `"${log.user}"`,
             `"${log.action}"`,
@@ -326,8 +355,8 @@ export const SystemLogs: React.FC<SystemLogsProps> = ({ isLargeText }) => {
         {totalPages > 1 && (
             <div className="px-8 py-5 bg-slate-50 dark:bg-slate-800/50 border-t border-slate-100 dark:border-slate-800 flex justify-between items-center">
             <p className="text-[10px] font-bold text-slate-500 uppercase tracking-widest">
-                Đang xem {(currentPage - 1) * ITEMS_PER_PAGE + 1} - {Math.min(currentPage * ITEMS_PER_PAGE, filteredLogs.length)} 
-                <span className="mx-1 text-slate-300">/</span> {filteredLogs.length} bản ghi
+                Đang xem {(currentPage - 1) * ITEMS_PER_PAGE + 1} - {Math.min(currentPage * ITEMS_PER_PAGE, totalCount)} 
+                <span className="mx-1 text-slate-300">/</span> {totalCount} bản ghi
             </p>
             <div className="flex gap-2">
                 <button 
@@ -1,6 +1,6 @@
 import React, { useState } from 'react';
 import { supabase } from '../lib/supabaseClient';
-import { AN_PHU_LOCATIONS } from '../types';
+import { LOCATION_BY_ID } from '../types';
 import { createLog } from '../lib/logger';
 import { useAuth } from '../contexts/AuthContext';
 import { useNotification } from '../contexts/NotificationContext';
@@ -59,20 +59,21 @@ export const VoterImport: React.FC<VoterImportProps> = ({ onBack, isLargeText })
     setImportLogs(prev => [{ msg, type }, ...prev].slice(0, 100));
   };
 
-  // CHUẨN HÓA: Truy xuất Đơn vị từ bộ Master Data dựa trên KVBP
-  const getUnitIdFromAreaId = (areaId: string): string => {
+  // CHUẨN HÓA: Truy xuất Đơn vị / Khu phố từ bộ Master Data (locations.json) dựa trên KVBP.
+  // KVBP không có trong danh mục thì dừng nhập (trước đây lặng lẽ gán unit_1 / kp_1a).
+  const getAreaNode = (areaId: string) => {
     // Normalize areaId for lookup (e.g., "KV 22" -> "kv22")
     const normalized = areaId.toLowerCase().replace(/\s+/g, '').replace(/[^a-z0-9]/g, '');
-    const found = AN_PHU_LOCATIONS.find(l => l.id.toLowerCase() === normalized);
-    return found?.parentId || 'unit_1';
+    const found = LOCATION_BY_ID.get(normalized);
+    if (!found || found.type !== 'area') {
+      throw new Error(`Khu vực "${areaId}" không có trong danh mục KVBP (locations.json)`);
+    }
+    return found;
   };
 
-  // CHUẨN HÓA: Truy xuất Khu phố từ bộ Master Data
-  const getNeighborhoodIdFromAreaId = (areaId: string): string => {
-    const normalized = areaId.toLowerCase().replace(/\s+/g, '').replace(/[^a-z0-9]/g, '');
-    const found = AN_PHU_LOCATIONS.find(l => l.id.toLowerCase() === normalized);
-    return found?.neighborhoodId || 'kp_1a'; // Mặc định kp_1a
-  };
+  const getUnitIdFromAreaId = (areaId: string): string => getAreaNode(areaId).parentId!;
+
+  const getNeighborhoodIdFromAreaId = (areaId: string): string => getAreaNode(areaId).neighborhoodId!;
 
   const handleClearData = async () => {
     showConfirm('CẢNH BÁO: Xóa toàn bộ dữ liệu cử tri hiện tại?', {
@@ -133,6 +134,7 @@ export const VoterImport: React.FC<VoterImportProps> = ({ onBack, isLargeText })
     try {
       const lines = rawData.trim().split('\n');
       const votersList: ParsedVoter[] = [];
+      const seenCccd = new Set<string>(); // CCCD đã có trong votersList, tra cứu O(1)
       const failedList: FailedRecord[] = [];
       let processedCount = 0;
       let skippedCount = 0;
@@ -249,6 +251,7 @@ export const VoterImport: React.FC<VoterImportProps> = ({ onBack, isLargeText })
             const groupMatch = address.match(/Tổ\s*(\d+)/i);
             if (groupMatch) groupName = `Tổ ${groupMatch[1]}`;
 
+            seenCccd.add(cccd);
             votersList.push({
               name, dob, gender, cccd, ethnic,
               voter_card_number: voterCardNo,
@@ -512,7 +515,7 @@ export const VoterImport: React.FC<VoterImportProps> = ({ onBack, isLargeText })
         };
 
         // Check for duplicates
-        if (votersList.some(v => v.cccd === cccd)) {
+        if (seenCccd.has(cccd)) {
           addLog(`Cảnh báo: Phát hiện CCCD trùng lặp trong file: ${cccd} (${name}). Vẫn tiếp tục thêm.`, 'info');
         }
 
@@ -527,6 +530,7 @@ export const VoterImport: React.FC<VoterImportProps> = ({ onBack, isLargeText })
             parsedData: parsedVoter
           });
         } else {
+          seenCccd.add(cccd);
           votersList.push(parsedVoter);
         }
       });
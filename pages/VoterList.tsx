@@ -1,9 +1,11 @@
 
-import React, { useState, useEffect, useMemo } from 'react';
+import React, { useState, useEffect, useMemo, useRef } from 'react';
 import { Voter, AN_PHU_LOCATIONS, NEIGHBORHOODS, VotingStatus, ResidenceStatus } from '../types';
 import { supabase } from '../lib/supabaseClient';
 import { useAuth } from '../contexts/AuthContext';
 import { createLog } from '../lib/logger';
+import { createChangeFeed } from '../lib/changeFeed';
+import { enqueueCheckin, onCheckinResults } from '../lib/checkinQueue';
 import { QRScanner } from '../components/QRScanner';
 import { useNotification } from '../contexts/NotificationContext';
 
@@ -14,6 +16,16 @@ interface VoterListProps {
 }
 
 const ITEMS_PER_PAGE = 50;
+const SEARCH_LIMIT = 100;
+
+const toVoter = (v: any): Voter => ({
+    id: v.id, name: v.name, dob: v.dob, gender: v.gender, cccd: v.cccd, ethnic: v.ethnic,
+    voterCardNumber: v.voter_card_number, address: v.address, neighborhoodId: v.neighborhood_id,
+    unitId: v.unit_id, areaId: v.area_id, group: v.group_name, residenceStatus: v.residence_status,
+    votingStatus: v.voting_status, status: 'hop-le',
+    voteQH: v.vote_qh, voteT: v.vote_t, voteP: v.vote_p,
+    permanentAddress: v.permanent_address, temporaryAddress: v.temporary_address
+}) as any;
 
 export const VoterList: React.FC<VoterListProps> = ({ onImportClick, isLargeText, setIsLargeText }) => {
     const { profile } = useAuth();
@@ -26,6 +38,9 @@ export const VoterList: React.FC<VoterListProps> = ({ onImportClick, isLargeText
     // --- FILTER STATES ---
     const [searchTerm, setSearchTerm] = useState('');
     const [debouncedSearch, setDebouncedSearch] = useState('');
+    const [searchResults, setSearchResults] = useState<Voter[] | null>(null);
+    const [searchUnavailable, setSearchUnavailable] = useState(false);
+    const [searchNonce, setSearchNonce] = useState(0);
     const [currentPage, setCurrentPage] = useState(1);
 
     // Debounce search term
@@ -140,21 +155,109 @@ export const VoterList: React.FC<VoterListProps> = ({ onImportClick, isLargeText
 
 
     // --- DATA FETCHING & REALTIME ---
+    // Sự kiện realtime chỉ là tín hiệu: dữ liệu đổi được lấy qua change feed
+    // (chỉ các dòng vừa thay đổi) thay vì tải lại cả danh sách.
+    const feedRef = useRef(createChangeFeed(['voters']));
+    // Bộ lọc mà danh sách `voters` đang chứa; khi đang tìm trên server thì không
+    // tải danh sách, chỉ tải lại khi thôi tìm mà bộ lọc đã đổi.
+    const loadedFiltersRef = useRef<string | null>(null);
+    const filtersKey = JSON.stringify([filterNeighborhood, filterUnit, filterArea, filterGroup, filterResidence, filterVoting]);
+    const serverSearch = debouncedSearch.trim() !== '' && !searchUnavailable;
+
     useEffect(() => {
-        fetchVoters();
+        if (!serverSearch && loadedFiltersRef.current !== filtersKey) fetchVoters();
+        let timer: ReturnType<typeof setTimeout>;
         const sub = supabase.channel('voter-list-realtime')
-            .on('postgres_changes', { event: '*', schema: 'public', table: 'voters' }, (payload) => {
-                // Optimistic UI update or Refetch
-                fetchVoters();
+            .on('postgres_changes', { event: '*', schema: 'public', table: 'voters' }, () => {
+                // Gom các sự kiện dồn dập (check-in liên tục) thành một lần đọc
+                clearTimeout(timer);
+                timer = setTimeout(applyVoterChanges, 250);
             })
             .subscribe();
-        return () => { supabase.removeChannel(sub); };
-    }, [filterNeighborhood, filterUnit, filterArea, filterGroup, filterResidence, filterVoting]);
+        return () => { clearTimeout(timer); supabase.removeChannel(sub); };
+    }, [filtersKey, serverSearch]);
+
+    // Tìm kiếm không dấu trên server (voter_search.sql): "nguyen van a" khớp "NGUYỄN VĂN A",
+    // kết quả đã xếp hạng và đủ cột để hiển thị; lỗi RPC (chưa chạy migration) thì
+    // quay về tải danh sách và lọc trên máy.
+    useEffect(() => {
+        const query = debouncedSearch.trim();
+        setSearchResults(null);
+        if (!query || searchUnavailable) return;
+        let cancelled = false;
+        supabase.rpc('search_voters', {
+            p_query: query,
+            p_limit: SEARCH_LIMIT,
+            p_area_id: filterArea !== 'all' ? filterArea : null,
+            p_unit_id: filterUnit !== 'all' ? filterUnit : null,
+            p_neighborhood_id: filterNeighborhood !== 'all' ? filterNeighborhood : null,
+            p_group_name: filterGroup || null,
+            p_voting_status: filterVoting !== 'all' ? filterVoting : null,
+            p_residence_status: filterResidence !== 'all' ? filterResidence : null
+        }).then(({ data, error }) => {
+            if (cancelled) return;
+            if (error) {
+                console.error('Lỗi tìm kiếm:', error.message);
+                setSearchUnavailable(true);
+                return;
+            }
+            setSearchResults((data?.voters || []).map(toVoter));
+        });
+        return () => { cancelled = true; };
+    }, [debouncedSearch, filtersKey, searchUnavailable, searchNonce]);
+
+    // Tải lại những gì đang hiển thị: kết quả tìm kiếm, hoặc danh sách
+    const refresh = () => {
+        if (serverSearch) {
+            setSearchNonce(n => n + 1);
+        } else {
+            fetchVoters();
+        }
+    };
 
     useEffect(() => { setCurrentPage(1); }, [searchTerm, filterNeighborhood, filterUnit, filterArea, filterGroup, filterResidence, filterVoting, filterCardNumber]);
 
+    const matchesFilters = (v: any) =>
+        (filterNeighborhood === 'all' || v.neighborhood_id === filterNeighborhood) &&
+        (filterUnit === 'all' || v.unit_id === filterUnit) &&
+        (filterArea === 'all' || v.area_id === filterArea) &&
+        (!filterGroup || v.group_name === filterGroup) &&
+        (filterResidence === 'all' || v.residence_status === filterResidence) &&
+        (filterVoting === 'all' || v.voting_status === filterVoting);
+
+    const applyVoterChanges = async () => {
+        const { resync, changes } = await feedRef.current.pull();
+        if (resync) {
+            loadedFiltersRef.current = null;
+            refresh();
+            return;
+        }
+        const delta = changes.voters;
+        if (!delta) return;
+        const updated = new Map<string, Voter>(delta.upserts.filter(matchesFilters).map(r => [r.id, toVoter(r)]));
+        const removed = new Set<string>([...delta.deletes, ...delta.upserts.filter(r => !updated.has(r.id)).map(r => r.id)]);
+        // Kết quả tìm kiếm: cập nhật tại chỗ, không thêm người mới (cần tìm lại)
+        setSearchResults(current => current && current
+            .filter(v => !removed.has(v.id))
+            .map(v => updated.get(v.id) || v));
+        // Danh sách của bộ lọc cũ (đổi bộ lọc khi đang tìm) sẽ được tải lại khi thôi tìm
+        if (loadedFiltersRef.current !== filtersKey) return;
+        setVoters(current => {
+            const next = current.filter(v => !removed.has(v.id)).map(v => {
+                const row = updated.get(v.id);
+                if (row) updated.delete(v.id);
+                return row || v;
+            });
+            if (updated.size === 0) return next;
+            return [...next, ...updated.values()].sort((a, b) => a.name.localeCompare(b.name, 'vi'));
+        });
+    };
+
     const fetchVoters = async () => {
         setLoading(true);
+        // Lấy version trước khi đọc danh sách: thay đổi xảy ra trong lúc đọc sẽ có ở lần pull sau
+        feedRef.current.reset();
+        await feedRef.current.pull();
         let query = supabase.from('voters').select('*');
 
         // Áp dụng filter server-side
@@ -168,31 +271,54 @@ export const VoterList: React.FC<VoterListProps> = ({ onImportClick, isLargeText
         const { data, error } = await query.order('name', { ascending: true });
 
         if (!error && data) {
-            setVoters(data.map(v => ({
-                id: v.id, name: v.name, dob: v.dob, gender: v.gender, cccd: v.cccd, ethnic: v.ethnic,
-                voterCardNumber: v.voter_card_number, address: v.address, neighborhoodId: v.neighborhood_id,
-                unitId: v.unit_id, areaId: v.area_id, group: v.group_name, residenceStatus: v.residence_status,
-                votingStatus: v.voting_status, status: 'hop-le',
-                voteQH: v.vote_qh, voteT: v.vote_t, voteP: v.vote_p,
-                permanentAddress: v.permanent_address, temporaryAddress: v.temporary_address
-            })) as any);
+            setVoters(data.map(toVoter));
+            loadedFiltersRef.current = filtersKey;
         }
         setLoading(false);
     };
 
+    // Lượt check-in bị từ chối (ngoài phạm vi / không tìm thấy): hoàn lại trạng thái đã hiển thị
+    useEffect(() => onCheckinResults(results => {
+        const rejected = results.filter(r => r.status === 'forbidden' || r.status === 'not_found');
+        if (rejected.length === 0) return;
+        const ids = new Set(rejected.map(r => r.voter_id));
+        const revert = (v: Voter) => ids.has(v.id) ? { ...v, votingStatus: 'chua-bau' as VotingStatus } : v;
+        setVoters(current => current.map(revert));
+        setSearchResults(current => current && current.map(revert));
+        showNotification(`${rejected.length} lượt check-in không được ghi nhận (ngoài phạm vi được phân công)`);
+    }), []);
+
     // --- ACTIONS ---
+    const shownVoter = (voterId: string) =>
+        (serverSearch && searchResults?.find(v => v.id === voterId)) || voters.find(v => v.id === voterId);
+
     const handleUpdateVotingStatus = async (voterId: string, status: VotingStatus) => {
         // Optimistic Update
-        setVoters(current => current.map(v => v.id === voterId ? { ...v, votingStatus: status } : v));
+        const apply = (v: Voter) => v.id === voterId ? { ...v, votingStatus: status } : v;
+        setVoters(current => current.map(apply));
+        setSearchResults(current => current && current.map(apply));
+
+        if (status === 'da-bau') {
+            // Check-in đi qua hàng đợi gửi theo lô, vẫn ghi nhận khi mất mạng (lib/checkinQueue.ts)
+            enqueueCheckin({ voterId });
+            const voter = shownVoter(voterId);
+            createLog({
+                userName: profile?.fullName || profile?.role,
+                action: 'CẬP NHẬT TRẠNG THÁI BẦU',
+                details: `Cử tri: ${voter?.name} (${voter?.cccd}) -> Đã bầu`,
+                status: 'success'
+            });
+            return;
+        }
 
         const { error } = await supabase.from('voters').update({ voting_status: status }).eq('id', voterId);
 
         if (error) {
             console.error('Lỗi cập nhật:', error.message);
-            fetchVoters(); // Revert on error
+            refresh(); // Revert on error
         } else {
             // LOGGING
-            const voter = voters.find(v => v.id === voterId);
+            const voter = shownVoter(voterId);
             createLog({
                 userName: profile?.fullName || profile?.role,
                 action: 'CẬP NHẬT TRẠNG THÁI BẦU',
@@ -216,7 +342,7 @@ export const VoterList: React.FC<VoterListProps> = ({ onImportClick, isLargeText
                         details: `Xóa cử tri: ${name} (CCCD: ${cccd})`,
                         status: 'success'
                     });
-                    fetchVoters();
+                    refresh();
                 }
             }
         });
@@ -259,7 +385,7 @@ export const VoterList: React.FC<VoterListProps> = ({ onImportClick, isLargeText
             if (error) throw error;
             setIsEditModalOpen(false);
             setEditingVoter(null);
-            fetchVoters();
+            refresh();
         } catch (err: any) {
             showNotification('Lỗi: ' + err.message);
         } finally {
@@ -283,7 +409,7 @@ export const VoterList: React.FC<VoterListProps> = ({ onImportClick, isLargeText
 
     // --- CLIENT-SIDE FILTERING (SEARCH) ---
     const filteredVoters = useMemo(() => {
-        let result = voters;
+        let result = serverSearch ? searchResults || [] : voters;
 
         // Apply card number filter first (exact match with zero-padding normalization)
         if (filterCardNumber.trim()) {
@@ -294,9 +420,10 @@ export const VoterList: React.FC<VoterListProps> = ({ onImportClick, isLargeText
             });
         }
 
-        // Then apply search term (debounced)
+        // Then apply search term (debounced): server results are already ranked;
+        // without the RPC, filter the downloaded list
         const search = debouncedSearch.toLowerCase().trim();
-        if (search) {
+        if (search && !serverSearch) {
             result = result.filter(v => {
                 const nameMatch = v.name.toLowerCase().includes(search);
                 const cccdMatch = v.cccd?.includes(search);
@@ -313,7 +440,7 @@ export const VoterList: React.FC<VoterListProps> = ({ onImportClick, isLargeText
         }
 
         return result;
-    }, [voters, debouncedSearch, filterCardNumber]);
+    }, [voters, debouncedSearch, serverSearch, searchResults, filterCardNumber]);
 
     const paginatedVoters = filteredVoters.slice(
         (currentPage - 1) * ITEMS_PER_PAGE,
@@ -469,7 +596,7 @@ export const VoterList: React.FC<VoterListProps> = ({ onImportClick, isLargeText
                             </tr>
                         </thead>
                         <tbody className="divide-y divide-slate-100 bg-white">
-                            {loading ? (
+                            {loading || (serverSearch && searchResults === null) ? (
                                 <tr><td colSpan={5} className="py-20 text-center"><span className="material-symbols-outlined animate-spin text-3xl text-primary">sync</span></td></tr>
                             ) : paginatedVoters.length === 0 ? (
                                 <tr><td colSpan={5} className="py-20 text-center italic text-slate-400">Không tìm thấy cử tri</td></tr>
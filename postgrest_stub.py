@@ -0,0 +1,228 @@
+"""In-memory PostgREST-compatible stub for exercising the import tools offline.
+
+Implements the subset of the Supabase REST API the Python tools use:
+``GET``/``POST``/``PATCH``/``DELETE`` on ``/rest/v1/<table>`` with ``eq.``
+and ``in.()`` filters, ``select=`` column lists, and upserts via
+``Prefer: resolution=merge-duplicates`` + ``on_conflict=``.
+
+Latency and failures can be injected to test retry and bisection logic:
+
+    stub = PostgrestStub(latency=0.02, per_row_latency=0.0001, error_rate=0.05,
+                         reject=lambda row: row.get('cccd', '').startswith('BAD'))
+    base_url = stub.start()
+    ...
+    stub.stop()
+
+Run standalone: python postgrest_stub.py [--port 54321] [--latency 0.02] [--error-rate 0.05]
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+
+def _parse_filter(expr):
+    op, _, value = expr.partition('.')
+    if op == 'in':
+        values = [v.strip().strip('"') for v in value.strip('()').split(',') if v.strip()]
+        return lambda cell: str(cell) in values
+    if op == 'eq':
+        return lambda cell: str(cell) == value
+    if op == 'neq':
+        return lambda cell: str(cell) != value
+    if op == 'gt':
+        return lambda cell: cell is not None and str(cell) > value
+    if op == 'is' and value == 'null':
+        return lambda cell: cell is None
+    raise ValueError(f"unsupported filter: {expr}")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, payload=None, headers=None):
+        body = b'' if payload is None else json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _route(self):
+        parts = urlsplit(self.path)
+        if not parts.path.startswith('/rest/v1/'):
+            return None, (None, []), {}
+        table = parts.path[len('/rest/v1/'):]
+        params = parse_qsl(parts.query, keep_blank_values=True)
+        select = None
+        filters = []
+        options = {}
+        for name, value in params:
+            if name == 'select':
+                select = [c.strip() for c in value.split(',')] if value != '*' else None
+            elif name in ('on_conflict', 'limit', 'order'):
+                options[name] = value
+            else:
+                filters.append((name, _parse_filter(value)))
+        return table, (select, filters), options
+
+    def _read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return json.loads(self.rfile.read(length) or b'null')
+
+    def _matches(self, row, filters):
+        return all(pred(row.get(col)) for col, pred in filters)
+
+    def _begin(self):
+        stub = self.server.stub
+        with stub.lock:
+            stub.requests += 1
+        return stub
+
+    def _inject(self, stub, rows=0):
+        delay = stub.latency + stub.per_row_latency * rows
+        if delay:
+            time.sleep(delay)
+        if stub.error_rate and random.random() < stub.error_rate:
+            self._reply(503, {'message': 'injected failure'})
+            return True
+        return False
+
+    def do_GET(self):
+        stub = self._begin()
+        table, (select, filters), options = self._route()
+        if table is None:
+            return self._reply(404)
+        if self._inject(stub):
+            return
+        with stub.lock:
+            rows = [r for r in stub.tables.get(table, []) if self._matches(r, filters)]
+        if 'limit' in options:
+            rows = rows[:int(options['limit'])]
+        if select:
+            rows = [{c: r.get(c) for c in select} for r in rows]
+        self._reply(200, rows)
+
+    def do_POST(self):
+        stub = self._begin()
+        table, _, options = self._route()
+        if table is None:
+            return self._reply(404)
+        payload = self._read_body()
+        rows = payload if isinstance(payload, list) else [payload]
+        if self._inject(stub, len(rows)):
+            return
+        bad = next((r for r in rows if stub.reject and stub.reject(r)), None)
+        if bad is not None:
+            return self._reply(400, {'message': 'row rejected', 'details': json.dumps(bad, ensure_ascii=False)})
+
+        upsert = 'merge-duplicates' in (self.headers.get('Prefer') or '')
+        key = options.get('on_conflict', 'id')
+        with stub.lock:
+            target = stub.tables.setdefault(table, [])
+            index = {r.get(key): r for r in target} if upsert else None
+            for row in rows:
+                row = dict(row)
+                if upsert and row.get(key) in index:
+                    index[row[key]].update(row)
+                    continue
+                row.setdefault('id', str(uuid.uuid4()))
+                target.append(row)
+            stub.rows_written += len(rows)
+        self._reply(201)
+
+    def do_PATCH(self):
+        stub = self._begin()
+        table, (_, filters), _ = self._route()
+        if table is None:
+            return self._reply(404)
+        changes = self._read_body()
+        if self._inject(stub):
+            return
+        with stub.lock:
+            for row in stub.tables.get(table, []):
+                if self._matches(row, filters):
+                    row.update(changes)
+                    stub.rows_written += 1
+        self._reply(204)
+
+    def do_DELETE(self):
+        stub = self._begin()
+        table, (_, filters), _ = self._route()
+        if table is None:
+            return self._reply(404)
+        if self._inject(stub):
+            return
+        with stub.lock:
+            rows = stub.tables.get(table, [])
+            kept = [r for r in rows if not self._matches(r, filters)]
+            stub.rows_written += len(rows) - len(kept)
+            stub.tables[table] = kept
+        self._reply(204)
+
+
+class PostgrestStub:
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, per_row_latency=0.0, error_rate=0.0, reject=None):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.per_row_latency = per_row_latency
+        self.error_rate = error_rate
+        self.reject = reject
+        self.tables = {}
+        self.requests = 0
+        self.rows_written = 0
+        self.lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self._server.server_address[1]}"
+
+    def start(self):
+        self._server = ThreadingHTTPServer((self.host, self.port), _Handler)
+        self._server.daemon_threads = True
+        self._server.stub = self
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self.url
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Run a local PostgREST-compatible stub.')
+    parser.add_argument('--port', type=int, default=54321)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--per-row-latency', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    args = parser.parse_args()
+    stub = PostgrestStub(port=args.port, latency=args.latency, per_row_latency=args.per_row_latency,
+                         error_rate=args.error_rate)
+    print(f"Stub listening on {stub.start()}/rest/v1/ (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        stub.stop()
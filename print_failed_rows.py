@@ -1,20 +1,127 @@
+"""Print the failed rows of an analysis_result report.
+
+The report is parsed incrementally: top-level counts are read as they
+appear and ``failed_rows`` is decoded one object at a time from a small
+buffer, so multi-hundred-MB reports never have to fit in memory.
+
+Usage: python print_failed_rows.py [analysis_result_final.json] [--limit N]
+"""
+import argparse
+import codecs
 import json
 import sys
 
-sys.stdout.reconfigure(encoding='utf-8')
-
-try:
-    with open('analysis_result_final.json', 'r', encoding='utf-8') as f:
-        data = json.load(f)
-        
-    print(f"Total Failed (Force Addable): {data['failed_count']}")
-    print(f"Valid Rows: {data['valid_count']}")
-    
-    print("\n--- DETAILED FAILED ROWS ---")
-    for r in data['failed_rows']:
-        # Show specific content to distinguish Junk vs Real
-        print(f"Row {r['row']}: {r['reason']}")
-        print(f"  Snippet: {r['content'][:50]}...")
-
-except Exception as e:
-    print(f"Error: {e}")
+READ_SIZE = 1 << 16
+WHITESPACE = ' \t\r\n'
+
+
+class _Stream:
+    """Character buffer over a text file with JSON-aware helpers."""
+
+    def __init__(self, f):
+        self.f = f
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        if self.eof:
+            return False
+        chunk = self.f.read(READ_SIZE)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Next non-whitespace character (not consumed), or '' at the end."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"expected {char!r} in report, got {self.peek()!r}")
+        self.pos += 1
+
+    def value(self, decoder=json.JSONDecoder()):
+        """Decode one JSON value, reading more input until it is complete."""
+        self.peek()
+        while True:
+            try:
+                value, end = decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # A number at the end of the buffer may continue in the next chunk
+            if end == len(self.buf) and not self.eof and self._fill():
+                continue
+            self.pos = end
+            return value
+
+
+def iter_report(path):
+    """Yield (key, value) for top-level scalars and (key, item) for each list item."""
+    with open(path, 'rb') as raw:
+        head = raw.read(4)
+    if head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        encoding = 'utf-16'
+    else:
+        encoding = 'utf-8-sig'
+
+    with open(path, 'r', encoding=encoding) as f:
+        stream = _Stream(f)
+        stream.expect('{')
+        while stream.peek() != '}':
+            key = stream.value()
+            stream.expect(':')
+            if stream.peek() == '[':
+                stream.expect('[')
+                while stream.peek() != ']':
+                    yield key, stream.value()
+                    if stream.peek() == ',':
+                        stream.expect(',')
+                stream.expect(']')
+            else:
+                yield key, stream.value()
+            if stream.peek() == ',':
+                stream.expect(',')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Print failed rows from an analysis_result report.')
+    parser.add_argument('path', nargs='?', default='analysis_result_final.json')
+    parser.add_argument('--limit', type=int, help='stop after N failed rows')
+    args = parser.parse_args(argv)
+
+    sys.stdout.reconfigure(encoding='utf-8')
+    printed = 0
+    try:
+        for key, value in iter_report(args.path):
+            if key == 'failed_count':
+                print(f"Total Failed (Force Addable): {value}")
+            elif key == 'valid_count':
+                print(f"Valid Rows: {value}")
+            elif key == 'failed_rows':
+                if printed == 0:
+                    print("\n--- DETAILED FAILED ROWS ---")
+                if args.limit is not None and printed >= args.limit:
+                    break
+                # Show specific content to distinguish Junk vs Real
+                print(f"Row {value['row']}: {value['reason']}")
+                print(f"  Snippet: {value['content'][:50]}...")
+                printed += 1
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
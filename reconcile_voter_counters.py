@@ -0,0 +1,136 @@
+"""Check the trigger-maintained voter_counters against the voters table.
+
+Generalizes the "✓ OK / ⚠ Mismatch" query of init_all_area_stats.sql to
+every counter scope (area, unit, neighborhood, group, birth_year) and every
+counter column. Ground truth is counted in keyset batches of voters, all
+inside one REPEATABLE READ snapshot that also reads the counters, so the
+comparison is exact even while check-ins keep arriving.
+
+With --fix each mismatch is corrected by adding (truth - counter) to the
+counter row, rather than overwriting it, so changes committed after the
+snapshot are kept.
+
+Usage: python reconcile_voter_counters.py [--dsn ...] [--batch 50000] [--fix] [--verbose]
+"""
+import argparse
+import sys
+import time
+
+import db
+
+COLUMNS = ('total', 'voted', 'male_total', 'female_total', 'male_voted', 'female_voted')
+ZERO = (0,) * len(COLUMNS)
+BATCH_SIZE = 50_000
+MIN_UUID = '00000000-0000-0000-0000-000000000000'
+
+TRUTH_SQL = """
+SELECT k.scope, k.scope_id,
+       count(*),
+       count(*) FILTER (WHERE v.voting_status = 'da-bau'),
+       count(*) FILTER (WHERE v.gender = 'Nam'),
+       count(*) FILTER (WHERE v.gender = 'Nữ'),
+       count(*) FILTER (WHERE v.gender = 'Nam' AND v.voting_status = 'da-bau'),
+       count(*) FILTER (WHERE v.gender = 'Nữ' AND v.voting_status = 'da-bau')
+FROM voters v
+CROSS JOIN LATERAL voter_counter_keys(v.area_id, v.unit_id, v.neighborhood_id, v.group_name, v.birth_year) k
+WHERE v.id > %(after)s AND (%(upto)s::uuid IS NULL OR v.id <= %(upto)s::uuid)
+GROUP BY k.scope, k.scope_id
+"""
+
+
+def read_counters(conn):
+    rows = conn.execute(f"SELECT scope, scope_id, {', '.join(COLUMNS)} FROM voter_counters").fetchall()
+    return {(r[0], r[1]): tuple(r[2:]) for r in rows}
+
+
+def count_truth(conn, batch_size=BATCH_SIZE, progress=True):
+    """Ground-truth counters, summed over keyset batches of voters."""
+    truth = {}
+    after = MIN_UUID
+    scanned = 0
+    while True:
+        upto = conn.execute("SELECT id FROM voters WHERE id > %s ORDER BY id OFFSET %s LIMIT 1",
+                            (after, batch_size - 1)).fetchone()
+        upto = upto[0] if upto else None
+        for row in conn.execute(TRUTH_SQL, {'after': after, 'upto': upto}):
+            key = (row[0], row[1])
+            previous = truth.get(key, ZERO)
+            truth[key] = tuple(a + b for a, b in zip(previous, row[2:]))
+        if upto is None:
+            break
+        after = upto
+        scanned += batch_size
+        if progress:
+            print(f"  ... {scanned} voters counted")
+    return truth
+
+
+def compare(counters, truth):
+    """Return [(scope, scope_id, counter, truth)] for every row that differs."""
+    mismatches = []
+    for key in sorted(counters.keys() | truth.keys()):
+        have = counters.get(key, ZERO)
+        want = truth.get(key, ZERO)
+        if have != want:
+            mismatches.append((key[0], key[1], have, want))
+    return mismatches
+
+
+def apply_fixes(conn, mismatches):
+    """Add (truth - counter) to each mismatching row, in key order."""
+    insert_cols = ', '.join(COLUMNS)
+    updates = ', '.join(f"{c} = voter_counters.{c} + EXCLUDED.{c}" for c in COLUMNS)
+    stmt = (f"INSERT INTO voter_counters (scope, scope_id, {insert_cols}, updated_at) "
+            f"VALUES (%s, %s, {', '.join(['%s'] * len(COLUMNS))}, NOW()) "
+            f"ON CONFLICT (scope, scope_id) DO UPDATE SET {updates}, updated_at = NOW()")
+    with conn.transaction(), conn.cursor() as cur:
+        cur.executemany(stmt, [(scope, scope_id, *(w - h for h, w in zip(have, want)))
+                               for scope, scope_id, have, want in mismatches])
+
+
+def reconcile(conn, batch_size=BATCH_SIZE, fix=False):
+    started = time.perf_counter()
+    with conn.transaction():
+        conn.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY")
+        counters = read_counters(conn)
+        truth = count_truth(conn, batch_size)
+    mismatches = compare(counters, truth)
+    if fix and mismatches:
+        apply_fixes(conn, mismatches)
+    return counters, truth, mismatches, time.perf_counter() - started
+
+
+def _fmt(values):
+    return ' '.join(f"{v:>7}" for v in values)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Verify (and optionally fix) voter_counters.')
+    parser.add_argument('--dsn', help='PostgreSQL connection string (default: $DATABASE_URL)')
+    parser.add_argument('--batch', type=int, default=BATCH_SIZE, help='voters counted per query')
+    parser.add_argument('--fix', action='store_true', help='correct mismatching counters')
+    parser.add_argument('--verbose', action='store_true', help='list matching rows too')
+    args = parser.parse_args(argv)
+
+    sys.stdout.reconfigure(encoding='utf-8')
+    with db.connect(args.dsn, autocommit=True) as conn:
+        counters, truth, mismatches, elapsed = reconcile(conn, args.batch, fix=args.fix)
+
+    header = f"{'scope':<13} {'scope_id':<16} " + ' '.join(f"{c[:7]:>7}" for c in COLUMNS)
+    print(header)
+    bad = {(m[0], m[1]): m for m in mismatches}
+    for key in sorted(counters.keys() | truth.keys()):
+        if key in bad:
+            _, _, have, want = bad[key]
+            print(f"{key[0]:<13} {key[1]:<16} {_fmt(have)}  ⚠ Mismatch, actual: {_fmt(want)}")
+        elif args.verbose:
+            print(f"{key[0]:<13} {key[1]:<16} {_fmt(counters[key])}  ✓ OK")
+
+    action = ' (fixed)' if args.fix and mismatches else ''
+    print(f"{len(counters.keys() | truth.keys())} counter rows checked in {elapsed:.2f}s, "
+          f"{len(mismatches)} mismatches{action}")
+    return 1 if mismatches and not args.fix else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,240 @@
+"""Re-import a voter roll by applying only the differences to the voters table.
+
+The web import (VoterImport.tsx) replaces the roll by deleting every voter
+and inserting everything again: indexes and statistics are rebuilt, every
+trigger fires for every row and, on election day, all check-ins
+(voting_status) are lost. This tool loads the new roll into a staging
+table instead (CopySink: COPY, one transaction) and diffs it against
+voters in SQL:
+
+    match     a roll row keeps the id of the voter with the same card number
+              (leading zeros ignored) in the same area; rows left over are
+              then paired on CCCD when it is unique on both sides, so a
+              voter moved to another area keeps its id and check-in
+    compare   md5 fingerprint of the roll columns (CCCD placeholders
+              MISSING_* count as empty); equal fingerprints are not touched
+    apply     one INSERT for new voters, one UPDATE for changed voters,
+              one DELETE for voters of the roll's areas that are gone
+
+voting_status and vote_qh / vote_t / vote_p are never compared or written
+unless --overwrite-voting is given, and voters who already voted are not
+deleted either. Areas that do not appear in the roll are left alone, so a
+workbook for a few areas only re-imports those areas.
+
+Input is the roll workbook (import_voters.iter_voters) or the NDJSON dump
+written by ``import_voters.py --sink ndjson:PATH``.
+
+Usage: python reimport_voters.py <roll.xlsx|voters.ndjson> [--dsn ...] [--dry-run]
+                                [--keep-missing] [--overwrite-voting] [--default-area kv01] [--metrics run.json]
+"""
+import argparse
+import gzip
+import json
+import sys
+import time
+from collections import namedtuple
+
+import instrumentation
+import locations
+from load_sinks import CopySink
+
+VOTING_COLUMNS = ('voting_status', 'vote_qh', 'vote_t', 'vote_p')
+# Filled from other columns (and by triggers): written, but not part of the fingerprint
+DERIVED_COLUMNS = ('dob_date', 'birth_year', 'search_name', 'search_text')
+CARD_KEY = "NULLIF(ltrim({0}voter_card_number, '0'), '')"
+CCCD_KEY = "CASE WHEN {0}cccd LIKE 'MISSING%' THEN NULL ELSE NULLIF({0}cccd, '') END"
+
+Changes = namedtuple('Changes', 'staged areas matched matched_by_cccd unchanged updated inserted missing deleted '
+                                'kept_voted column_changes')
+
+
+class ReimportSink(CopySink):
+    """Stage the roll with COPY, then apply the set-based diff described above.
+
+    ``changes`` holds the Changes of the last write; with ``dry_run`` the
+    diff is computed but voters is not modified.
+    """
+
+    def __init__(self, dsn=None, fmt='binary', dry_run=False, delete_missing=True, overwrite_voting=False):
+        super().__init__('voters', dsn=dsn, fmt=fmt)
+        self.dry_run = dry_run
+        self.delete_missing = delete_missing
+        self.overwrite_voting = overwrite_voting
+        self.changes = None
+
+    def fingerprint(self, columns, alias=''):
+        prefix = f"{alias}." if alias else ''
+        compared = [c for c in columns if c not in DERIVED_COLUMNS
+                    and (self.overwrite_voting or c not in VOTING_COLUMNS)]
+        values = [CCCD_KEY.format(prefix) if c == 'cccd' else prefix + c for c in compared]
+        return f"md5(ROW({', '.join(values)})::text)", compared
+
+    def merge(self, cur, columns):
+        missing = {'area_id', 'voter_card_number', 'cccd'} - set(columns)
+        if missing:
+            raise ValueError(f"roll rows need {', '.join(sorted(missing))} to be matched")
+        fingerprint, compared = self.fingerprint(columns, 's')
+
+        with instrumentation.stage('fingerprint'):
+            cur.execute(
+                f"CREATE TEMP TABLE _reimport ON COMMIT DROP AS "
+                f"SELECT s.*, row_number() OVER (PARTITION BY s.area_id, s.card_key ORDER BY s.seq) AS dup "
+                f"FROM (SELECT s.*, row_number() OVER () AS seq, {CARD_KEY.format('s.')} AS card_key, "
+                f"{CCCD_KEY.format('s.')} AS cccd_key, {fingerprint} AS row_hash FROM {self.stage} s) s")
+            # Duplicated card numbers pair up in order: the n-th roll row with the n-th oldest voter
+            cur.execute(
+                f"CREATE TEMP TABLE _reimport_current ON COMMIT DROP AS "
+                f"SELECT s.id, s.area_id, s.voting_status, "
+                f"{CARD_KEY.format('s.')} AS card_key, {CCCD_KEY.format('s.')} AS cccd_key, "
+                f"row_number() OVER (PARTITION BY s.area_id, {CARD_KEY.format('s.')} ORDER BY s.created_at, s.id) AS dup, "
+                f"{fingerprint} AS row_hash FROM voters s")
+            cur.execute("ANALYZE _reimport (seq, area_id, card_key, cccd_key, dup)")
+            cur.execute("ANALYZE _reimport_current")
+
+        # Matches live in a narrow table: the staged rows themselves are never rewritten
+        with instrumentation.stage('match'):
+            cur.execute(
+                "CREATE TEMP TABLE _reimport_match ON COMMIT DROP AS "
+                "SELECT r.seq, c.id AS voter_id, r.row_hash <> c.row_hash AS changed "
+                "FROM _reimport r JOIN _reimport_current c "
+                "ON c.area_id = r.area_id AND c.card_key = r.card_key AND c.dup = r.dup")
+            cur.execute(
+                "WITH new AS (SELECT cccd_key, min(seq) AS seq FROM _reimport r "
+                "             WHERE cccd_key IS NOT NULL AND NOT EXISTS (SELECT 1 FROM _reimport_match m WHERE m.seq = r.seq) "
+                "             GROUP BY cccd_key HAVING count(*) = 1), "
+                "     old AS (SELECT cccd_key, min(id::text)::uuid AS id FROM _reimport_current c "
+                "             WHERE cccd_key IS NOT NULL "
+                "             AND NOT EXISTS (SELECT 1 FROM _reimport_match m WHERE m.voter_id = c.id) "
+                "             GROUP BY cccd_key HAVING count(*) = 1) "
+                "INSERT INTO _reimport_match (seq, voter_id, changed) "
+                "SELECT new.seq, old.id, r.row_hash <> c.row_hash FROM new JOIN old USING (cccd_key) "
+                "JOIN _reimport r ON r.seq = new.seq JOIN _reimport_current c ON c.id = old.id")
+            matched_by_cccd = cur.rowcount
+
+        with instrumentation.stage('diff'):
+            staged, areas = cur.execute("SELECT count(*), count(DISTINCT area_id) FROM _reimport").fetchone()
+            matched, unchanged = cur.execute(
+                "SELECT count(*), count(*) FILTER (WHERE NOT changed) FROM _reimport_match").fetchone()
+            diffs = ', '.join(
+                f"count(*) FILTER (WHERE {CCCD_KEY.format('r.')} IS DISTINCT FROM {CCCD_KEY.format('v.')})"
+                if c == 'cccd' else f"count(*) FILTER (WHERE r.{c} IS DISTINCT FROM v.{c})" for c in compared)
+            per_column = cur.execute(
+                f"SELECT {diffs} FROM _reimport_match m JOIN _reimport r USING (seq) "
+                f"JOIN voters v ON v.id = m.voter_id WHERE m.changed").fetchone()
+            cur.execute(
+                "CREATE TEMP TABLE _reimport_gone ON COMMIT DROP AS "
+                "SELECT c.id, c.voting_status FROM _reimport_current c "
+                "WHERE c.area_id IN (SELECT DISTINCT area_id FROM _reimport) "
+                "AND NOT EXISTS (SELECT 1 FROM _reimport_match m WHERE m.voter_id = c.id)")
+            kept_voted = 0
+            if not self.overwrite_voting:
+                kept_voted = cur.execute(
+                    "DELETE FROM _reimport_gone WHERE voting_status IS DISTINCT FROM 'chua-bau'").rowcount
+            gone = cur.execute("SELECT count(*) FROM _reimport_gone").fetchone()[0]
+        column_changes = {c: n for c, n in zip(compared, per_column) if n}
+        inserted = staged - matched
+        updated = matched - unchanged
+        deleted = gone if self.delete_missing else 0
+
+        if not self.dry_run:
+            written = [c for c in columns if self.overwrite_voting or c not in VOTING_COLUMNS]
+            # A placeholder CCCD in both the roll and the table keeps the stored placeholder
+            assignments = ', '.join(
+                f"cccd = CASE WHEN r.cccd_key IS NULL AND v.cccd LIKE 'MISSING%' THEN v.cccd ELSE r.cccd END"
+                if c == 'cccd' else f"{c} = r.{c}" for c in written)
+            with instrumentation.stage('apply'):
+                if self.delete_missing:
+                    cur.execute("DELETE FROM voters v USING _reimport_gone g WHERE v.id = g.id")
+                cur.execute(
+                    f"UPDATE voters v SET {assignments} FROM _reimport_match m JOIN _reimport r USING (seq) "
+                    f"WHERE v.id = m.voter_id AND m.changed")
+                cur.execute(
+                    f"INSERT INTO voters ({', '.join(columns)}) SELECT {', '.join(columns)} FROM _reimport r "
+                    f"WHERE NOT EXISTS (SELECT 1 FROM _reimport_match m WHERE m.seq = r.seq) ORDER BY seq")
+
+        self.changes = Changes(staged, areas, matched, matched_by_cccd, unchanged, updated, inserted, gone, deleted,
+                               kept_voted, column_changes)
+        return 0 if self.dry_run else inserted + updated + deleted
+
+
+def read_ndjson(path):
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def read_roll(path, default_area=None):
+    """(rows, COPY format): NDJSON has dates as text, which only the CSV format accepts."""
+    if path.lower().endswith(('.xlsx', '.xlsm')):
+        from import_voters import iter_voters
+        return iter_voters(path, default_area=default_area), 'binary'
+    return read_ndjson(path), 'csv'
+
+
+def describe(changes, sink):
+    lines = [
+        f"Roll: {changes.staged} voters in {changes.areas} areas",
+        f"  unchanged  {changes.unchanged}",
+        f"  updated    {changes.updated}",
+        f"  inserted   {changes.inserted}",
+        f"  deleted    {changes.deleted}" if sink.delete_missing else
+        f"  deleted    0 ({changes.missing} voters not in the roll kept: --keep-missing)",
+    ]
+    if changes.matched_by_cccd:
+        lines.append(f"  {changes.matched_by_cccd} voters matched on CCCD (new card number or area)")
+    if changes.column_changes:
+        lines.append('  changed columns: ' + ', '.join(f"{c} {n}" for c, n in
+                                                       sorted(changes.column_changes.items(), key=lambda i: -i[1])))
+    if changes.kept_voted:
+        lines.append(f"  {changes.kept_voted} voters missing from the roll already have a check-in: kept "
+                     f"(--overwrite-voting deletes them)")
+    return '\n'.join(lines)
+
+
+def reimport(path, dsn=None, dry_run=False, delete_missing=True, overwrite_voting=False, default_area=None):
+    started = time.perf_counter()
+    rows, fmt = read_roll(path, default_area)
+    sink = ReimportSink(dsn, fmt=fmt, dry_run=dry_run, delete_missing=delete_missing,
+                        overwrite_voting=overwrite_voting)
+    with instrumentation.Progress('parsed', unit='voters') as progress:
+        result = sink.write(progress.track(instrumentation.timed_iter('parse', rows)))
+    if sink.changes is None:
+        print("The roll has no voters: nothing to do.")
+        return None
+    print(describe(sink.changes, sink))
+    print(f"Load: {result.summary()}")
+    for name in ('updated', 'inserted', 'deleted'):
+        instrumentation.count(f"rows_{name}", getattr(sink.changes, name))
+    print(f"Done in {time.perf_counter() - started:.2f}s{' [dry run: voters not modified]' if dry_run else ''}.")
+    return sink.changes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Re-import a voter roll, writing only the differences.')
+    parser.add_argument('path', help='voter roll workbook (.xlsx) or NDJSON dump')
+    parser.add_argument('--dsn', help='PostgreSQL connection string (default: $DATABASE_URL)')
+    parser.add_argument('--dry-run', action='store_true', help='print the change summary, do not modify voters')
+    parser.add_argument('--keep-missing', action='store_true', help='do not delete voters that left the roll')
+    parser.add_argument('--overwrite-voting', action='store_true',
+                        help='also take voting_status / vote_qh / vote_t / vote_p from the roll (resets check-ins)')
+    parser.add_argument('--default-area', help='workbook only: area for voters before the first area header '
+                                               '(default: stop)')
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    sys.stdout.reconfigure(encoding='utf-8')
+    try:
+        with instrumentation.Run('reimport_voters', args) as run:
+            reimport(args.path, args.dsn, dry_run=args.dry_run, delete_missing=not args.keep_missing,
+                     overwrite_voting=args.overwrite_voting, default_area=args.default_area)
+    except locations.UnknownLocation as e:
+        from import_voters import location_hint
+        print(f"Re-import stopped: {e}. {location_hint(e)}")
+        return 1
+    print(run.summary())
+
+
+if __name__ == "__main__":
+    sys.exit(main())
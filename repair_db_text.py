@@ -0,0 +1,211 @@
+"""Find and repair CP1252-as-UTF-8 mojibake in database text columns.
+
+Uses the same byte-level rules as repair_mojibake.py. Each table is walked
+in primary-key order with keyset pagination (``WHERE id > last``), and only
+rows whose columns look corrupted are fetched. Fixes are applied as one
+``UPDATE ... FROM (VALUES ...)`` per page, each page in its own short
+transaction. A row is only updated if it still holds the value that was read.
+
+The last committed id per table is stored in a checkpoint file, so an
+interrupted run continues where it stopped with --resume.
+
+repair_text only replaces runs that decode to plausible Vietnamese, so
+correct names next to an NBSP or a curly quote are left alone. As a last
+look before writing to production, --dry-run prints before/after values
+(up to --samples) for every row whose repaired value still contains
+characters outside the Vietnamese Latin set.
+
+Usage:
+    python repair_db_text.py --dry-run --report mojibake_report.ndjson
+    python repair_db_text.py [--tables voters,candidates] [--page 1000] [--resume] [--metrics run.json]
+"""
+import argparse
+import json
+import os
+import sys
+
+import db
+import instrumentation
+from repair_mojibake import BYTE_CHARS, repair_text, unusual_chars
+
+TARGETS = {
+    'voters': ['name', 'address'],
+    'candidates': ['name', 'title', 'hometown'],
+    'system_logs': ['details'],
+}
+CHECKPOINT_FILE = 'repair_db_text.checkpoint.json'
+PAGE_SIZE = 1000
+SAMPLES = 20
+
+
+def _pg_class(lo, hi):
+    return '[' + ''.join(BYTE_CHARS[b] for b in range(lo, hi + 1)) + ']'
+
+
+# POSIX regex equivalent of repair_mojibake.MOJIBAKE_RE, used to skip clean
+# rows on the server before the exact check in Python.
+_CONT = _pg_class(0x80, 0xBF)
+PG_MOJIBAKE_PATTERN = (f"{_pg_class(0xC2, 0xDF)}{_CONT}"
+                       f"|{_pg_class(0xE0, 0xEF)}{_CONT}{_CONT}"
+                       f"|{_pg_class(0xF0, 0xF4)}{_CONT}{_CONT}{_CONT}")
+
+
+def load_checkpoint(path):
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return {}
+
+
+def save_checkpoint(path, checkpoint):
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(checkpoint, f, indent=2)
+    os.replace(tmp, path)
+
+
+def fetch_page(conn, table, columns, after, limit):
+    from psycopg import sql
+    suspect = sql.SQL(' OR ').join(sql.SQL("{} ~ %(re)s").format(sql.Identifier(c)) for c in columns)
+    stmt = sql.SQL("SELECT id::text, {cols} FROM {table} WHERE id > %(after)s AND ({suspect}) ORDER BY id LIMIT %(limit)s").format(
+        cols=sql.SQL(', ').join(map(sql.Identifier, columns)), table=sql.Identifier(table), suspect=suspect)
+    return conn.execute(stmt, {'re': PG_MOJIBAKE_PATTERN, 'after': after, 'limit': limit}).fetchall()
+
+
+def repair_rows(rows, columns):
+    """Return [(id, old_values, new_values)] for rows that actually change."""
+    changes = []
+    for row in rows:
+        old = row[1:]
+        new = tuple(repair_text(v)[0] if isinstance(v, str) else v for v in old)
+        if new != old:
+            changes.append((row[0], old, new))
+    return changes
+
+
+def apply_changes(conn, table, columns, changes):
+    """Bulk UPDATE ... FROM (VALUES ...), guarded by the values that were read."""
+    from psycopg import sql
+    width = 1 + 2 * len(columns)
+    values = sql.SQL(', ').join(
+        sql.SQL('(') + sql.SQL(', ').join([sql.SQL('%s::uuid')] + [sql.SQL('%s')] * (width - 1)) + sql.SQL(')')
+        for _ in changes)
+    new_cols = [sql.Identifier(f"new_{c}") for c in columns]
+    old_cols = [sql.Identifier(f"old_{c}") for c in columns]
+    stmt = sql.SQL(
+        "UPDATE {table} AS t SET {sets} FROM (VALUES {values}) AS v (id, {new_cols}, {old_cols}) "
+        "WHERE t.id = v.id AND ({cur}) IS NOT DISTINCT FROM ({old})"
+    ).format(
+        table=sql.Identifier(table),
+        sets=sql.SQL(', ').join(sql.SQL("{} = v.{}").format(sql.Identifier(c), n) for c, n in zip(columns, new_cols)),
+        values=values,
+        new_cols=sql.SQL(', ').join(new_cols),
+        old_cols=sql.SQL(', ').join(old_cols),
+        cur=sql.SQL(', ').join(sql.SQL("t.{}").format(sql.Identifier(c)) for c in columns),
+        old=sql.SQL(', ').join(sql.SQL("v.{}").format(o) for o in old_cols),
+    )
+    params = []
+    for row_id, old, new in changes:
+        params.append(row_id)
+        params.extend(new)
+        params.extend(old)
+    return conn.execute(stmt, params).rowcount
+
+
+def unusual_changes(table, columns, changes):
+    """[(table, id, column, before, after, unusual chars)] for repaired values outside the Vietnamese Latin set."""
+    found = []
+    for row_id, old, new in changes:
+        for column, before, after in zip(columns, old, new):
+            if before != after and isinstance(after, str) and unusual_chars(after):
+                found.append((table, row_id, column, before, after, ''.join(sorted(set(unusual_chars(after))))))
+    return found
+
+
+def repair_table(conn, table, columns, page_size=PAGE_SIZE, dry_run=False, report=None,
+                 checkpoint=None, checkpoint_path=CHECKPOINT_FILE, unusual=None):
+    """Returns (rows scanned, rows to fix, rows updated); ``unusual`` collects unusual_changes."""
+    after = (checkpoint or {}).get(table, '00000000-0000-0000-0000-000000000000')
+    scanned = fixed = updated = 0
+    progress = instrumentation.Progress(table, unit='suspect rows')
+    while True:
+        with conn.transaction():
+            with instrumentation.stage('fetch'):
+                rows = fetch_page(conn, table, columns, after, page_size)
+            if not rows:
+                break
+            with instrumentation.stage('repair'):
+                changes = repair_rows(rows, columns)
+            if changes and not dry_run:
+                with instrumentation.stage('update'):
+                    updated += apply_changes(conn, table, columns, changes)
+        scanned += len(rows)
+        fixed += len(changes)
+        after = rows[-1][0]
+        if unusual is not None:
+            unusual.extend(unusual_changes(table, columns, changes))
+
+        if report is not None:
+            for row_id, old, new in changes:
+                for column, before, after_value in zip(columns, old, new):
+                    if before != after_value:
+                        report.write(json.dumps({'table': table, 'id': row_id, 'column': column,
+                                                 'before': before, 'after': after_value}, ensure_ascii=False) + '\n')
+        if checkpoint is not None and not dry_run:
+            checkpoint[table] = after
+            save_checkpoint(checkpoint_path, checkpoint)
+        progress.update(len(rows), to_fix=fixed, updated=updated)
+
+    progress.close()
+    instrumentation.count('rows_scanned', scanned)
+    instrumentation.count('rows_fixed', fixed)
+    instrumentation.count('rows_updated', updated)
+    if checkpoint is not None and not dry_run:
+        checkpoint[table] = 'done'
+        save_checkpoint(checkpoint_path, checkpoint)
+    return scanned, fixed, updated
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Repair mojibake in database text columns.')
+    parser.add_argument('--dsn', help='PostgreSQL connection string (default: $DATABASE_URL)')
+    parser.add_argument('--tables', default=','.join(TARGETS), help='comma-separated tables to scan')
+    parser.add_argument('--page', type=int, default=PAGE_SIZE, help='rows per page / transaction')
+    parser.add_argument('--dry-run', action='store_true', help='report what would change, write nothing')
+    parser.add_argument('--report', metavar='FILE', help='write every change as NDJSON to FILE')
+    parser.add_argument('--samples', type=int, default=SAMPLES,
+                        help='with --dry-run, print up to N repaired values with characters outside the Vietnamese Latin set')
+    parser.add_argument('--resume', action='store_true', help=f'continue from {CHECKPOINT_FILE}')
+    parser.add_argument('--checkpoint', default=CHECKPOINT_FILE)
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    checkpoint = load_checkpoint(args.checkpoint) if args.resume else {}
+    unusual = [] if args.dry_run else None
+    report = open(args.report, 'w', encoding='utf-8') if args.report else None
+    try:
+        with instrumentation.Run('repair_db_text', args), db.connect(args.dsn, autocommit=True) as conn:
+            for table in args.tables.split(','):
+                if checkpoint.get(table) == 'done':
+                    print(f"{table}: already done (checkpoint)")
+                    continue
+                print(f"{table} ({', '.join(TARGETS[table])}){' [dry run]' if args.dry_run else ''}")
+                scanned, fixed, updated = repair_table(
+                    conn, table, TARGETS[table], page_size=args.page, dry_run=args.dry_run, report=report,
+                    checkpoint=checkpoint, checkpoint_path=args.checkpoint, unusual=unusual)
+                print(f"{table}: {fixed} rows {'would be ' if args.dry_run else ''}repaired"
+                      + ('' if args.dry_run else f", {updated} updated"))
+    finally:
+        if report is not None:
+            report.close()
+
+    if unusual:
+        print(f"\n{len(unusual)} repaired values contain characters outside the Vietnamese Latin set:")
+        for table, row_id, column, before, after, chars in unusual[:args.samples]:
+            print(f"  {table}.{column} {row_id} [{chars}]\n    before: {before!r}\n    after:  {after!r}")
+        if len(unusual) > args.samples:
+            print(f"  ... and {len(unusual) - args.samples} more" + (f" (all changes are in {args.report})" if args.report else ''))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,243 @@
+"""Repair UTF-8 text that was decoded as Windows-1252 ("NGUYá»„N" -> "NGUYỄN").
+
+Replaces repair_encoding.py, repair_and_update.py, repair_line_by_line.py,
+repair_remaining.py and final_fix.py with one engine:
+
+- a precomputed table maps each of the 256 CP1252/Latin-1 characters back
+  to its original byte, applied with str.translate (no per-character loop);
+- a compiled regex finds only well-formed mojibake runs (a UTF-8 lead byte
+  followed by the right number of continuation bytes), and a run is only
+  replaced when it decodes to plausible Vietnamese text, so correct text
+  ("PHÚ" + NBSP, "Ô°C") is never touched and a second pass changes nothing
+  (``--self-check`` runs the known cases in SELF_CHECK);
+- files are scanned concurrently in a process pool and rewritten atomically.
+
+Usage: python repair_mojibake.py [PATH ...] [--check] [--verbose] [--workers N] [--self-check]
+"""
+import argparse
+import codecs
+import os
+import re
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+EXTENSIONS = ('.tsx', '.ts', '.sql', '.json')
+# (input, expected repair): mojibake that must be repaired, and correct
+# Vietnamese with mojibake-shaped neighbours that must be left alone
+SELF_CHECK = (
+    ('NGUYá»„N VÄ‚N A', 'NGUYỄN VĂN A'),
+    ('Ä\x90á»– THá»Š LÃŠ', 'ĐỖ THỊ LÊ'),
+    ('TRÆ¯á»œNG', 'TRƯỜNG'),
+    ('NhiÃªt Ä‘á»™ 30Â°C', 'Nhiêt độ 30°C'),
+    ('â€œAN PHÃšâ€\x9d', '“AN PHÚ”'),
+    ('Sá»‘Â\xa0nhÃ\xa0', 'Số\xa0nhà'),
+    ('AN PHÚ\xa0HƯNG', 'AN PHÚ\xa0HƯNG'),
+    ('ĐỖ THỊ LÊ\xa0ANH', 'ĐỖ THỊ LÊ\xa0ANH'),
+    ('“AN PHÚ”', '“AN PHÚ”'),
+    ('‘PHÚ’ – LÊ…', '‘PHÚ’ – LÊ…'),
+    ('Ô°C', 'Ô°C'),
+    ('NHIỆT ĐỘ 30°C, Ô°C', 'NHIỆT ĐỘ 30°C, Ô°C'),
+    ('PHÚ\xa0á»„N', 'PHÚ\xa0ỄN'),
+)
+SKIP_DIRS = {'node_modules', '.git', 'dist', 'build', '__pycache__', '.venv', 'venv'}
+
+
+def _byte_chars():
+    """Character each byte 0x00-0xFF turns into when UTF-8 is misread as CP1252.
+
+    Bytes CP1252 leaves undefined (0x81, 0x8D, 0x8F, 0x90, 0x9D) survive as
+    the matching C1 control character, as Windows tools do.
+    """
+    chars = []
+    for b in range(256):
+        try:
+            chars.append(bytes([b]).decode('cp1252'))
+        except UnicodeDecodeError:
+            chars.append(chr(b))
+    return chars
+
+
+BYTE_CHARS = _byte_chars()
+# char -> Latin-1 char with the same code as the original byte
+TO_BYTES = str.maketrans({c: chr(b) for b, c in enumerate(BYTE_CHARS) if ord(c) != b})
+
+
+def _char_class(lo, hi):
+    return '[' + ''.join(re.escape(BYTE_CHARS[b]) for b in range(lo, hi + 1)) + ']'
+
+
+_CONT = _char_class(0x80, 0xBF)
+MOJIBAKE_RE = re.compile(
+    f"{_char_class(0xC2, 0xDF)}{_CONT}"
+    f"|{_char_class(0xE0, 0xEF)}{_CONT}{{2}}"
+    f"|{_char_class(0xF0, 0xF4)}{_CONT}{{3}}"
+)
+# Runs of adjacent sequences are repaired together
+MOJIBAKE_RUN_RE = re.compile(f"(?:{MOJIBAKE_RE.pattern})+")
+# What repaired text may contain: Latin-1 Supplement, Latin Extended-A/B
+# (Ơ, Ư, Đ), combining diacritics, Latin Extended Additional (Vietnamese
+# tone marks), punctuation, currency (₫, €) and letterlike symbols (№).
+# Correct Vietnamese next to an NBSP, a curly quote or ° also has the shape
+# of mojibake ("PHÚ\xa0", "PHÚ”", "Ô°") but decodes to Arabic, Armenian,
+# IPA or CJK letters, which these ranges leave out.
+PLAUSIBLE_RANGES = ((0x00A0, 0x024F), (0x0300, 0x036F), (0x1E00, 0x1EFF),
+                    (0x2000, 0x206F), (0x20A0, 0x20CF), (0x2100, 0x214F))
+PLAUSIBLE_RE = re.compile('[' + ''.join(f"\\u{lo:04x}-\\u{hi:04x}" for lo, hi in PLAUSIBLE_RANGES) + ']+')
+
+# Outside ASCII and PLAUSIBLE_RANGES: not expected in Vietnamese text
+UNUSUAL_RE = re.compile('[^\\x00-\\x7f' + PLAUSIBLE_RE.pattern[1:-2] + ']')
+
+
+def unusual_chars(text):
+    """Characters of ``text`` outside the Vietnamese Latin set (ASCII + PLAUSIBLE_RANGES)."""
+    return UNUSUAL_RE.findall(text)
+
+
+def _decode(run):
+    try:
+        return run.translate(TO_BYTES).encode('latin-1').decode('utf-8')
+    except UnicodeDecodeError:
+        # Looks like mojibake but is not valid UTF-8 (e.g. overlong)
+        return None
+
+
+def _plausible(run, fixed):
+    """``fixed`` is only letters and symbols Vietnamese text uses, and looks less like mojibake than ``run``."""
+    return (fixed is not None and PLAUSIBLE_RE.fullmatch(fixed) is not None
+            and len(MOJIBAKE_RE.findall(fixed)) < len(MOJIBAKE_RE.findall(run)))
+
+
+def _fix_sequence(match):
+    fixed = _decode(match.group(0))
+    return fixed if _plausible(match.group(0), fixed) else match.group(0)
+
+
+def _fix_run(match):
+    run = match.group(0)
+    fixed = _decode(run)
+    if _plausible(run, fixed):
+        return fixed
+    # A false match glued to real mojibake ("Ú\xa0" + "á»…"): repair the sequences one by one
+    return MOJIBAKE_RE.sub(_fix_sequence, run)
+
+
+def repair_text(text):
+    """Return (fixed_text, number_of_runs_repaired)."""
+    count = 0
+
+    def fix(match):
+        nonlocal count
+        fixed = _fix_run(match)
+        if fixed != match.group(0):
+            count += 1
+        return fixed
+
+    fixed = MOJIBAKE_RUN_RE.sub(fix, text)
+    return fixed, count
+
+
+def has_mojibake(text):
+    return any(_fix_run(m) != m.group(0) for m in MOJIBAKE_RUN_RE.finditer(text))
+
+
+def self_check():
+    """Failures of SELF_CHECK: [(input, expected, got)], also checking a second pass changes nothing."""
+    failures = []
+    for text, expected in SELF_CHECK:
+        fixed, _ = repair_text(text)
+        again, count = repair_text(fixed)
+        if fixed != expected or count:
+            failures.append((text, expected, fixed if fixed != expected else again))
+    return failures
+
+
+def _atomic_write(path, text):
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(prefix='.repair-', dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8', newline='') as f:
+            f.write(text)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def repair_file(path, check=False):
+    """Repair one file; returns (path, fixes, seconds, error)."""
+    started = time.perf_counter()
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+        if data.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+            return path, 0, time.perf_counter() - started, 'UTF-16 encoded, not scanned'
+        text = data.decode('utf-8')
+        fixed, count = repair_text(text)
+        if count and not check:
+            _atomic_write(path, fixed)
+        return path, count, time.perf_counter() - started, None
+    except (OSError, UnicodeDecodeError) as e:
+        return path, 0, time.perf_counter() - started, str(e)
+
+
+def iter_files(paths, extensions=EXTENSIONS):
+    for root in paths:
+        if os.path.isfile(root):
+            yield root
+            continue
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS]
+            for name in filenames:
+                if name.endswith(extensions):
+                    yield os.path.join(dirpath, name)
+
+
+def repair_tree(paths, check=False, workers=None):
+    files = sorted(iter_files(paths))
+    if not files:
+        return []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(repair_file, files, [check] * len(files), chunksize=8))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Repair CP1252-as-UTF-8 mojibake in source files.')
+    parser.add_argument('paths', nargs='*', default=['.'])
+    parser.add_argument('--check', action='store_true', help='report only; exit 1 if anything needs repair')
+    parser.add_argument('--verbose', action='store_true', help='print timing for every scanned file')
+    parser.add_argument('--workers', type=int, help='worker processes (default: CPU count)')
+    parser.add_argument('--self-check', action='store_true', help='run the SELF_CHECK cases and exit')
+    args = parser.parse_args(argv)
+
+    if args.self_check:
+        failures = self_check()
+        for text, expected, got in failures:
+            print(f"  FAIL  {text!r}: expected {expected!r}, got {got!r}")
+        print(f"{len(SELF_CHECK) - len(failures)}/{len(SELF_CHECK)} cases pass.")
+        return 1 if failures else 0
+
+    started = time.perf_counter()
+    results = repair_tree(args.paths, check=args.check, workers=args.workers)
+    elapsed = time.perf_counter() - started
+
+    changed = 0
+    for path, count, seconds, error in results:
+        if error:
+            print(f"  ERROR  {path}: {error}")
+        elif count or args.verbose:
+            action = 'would fix' if args.check else 'fixed'
+            print(f"  {seconds * 1000:7.2f} ms  {path}" + (f"  ({action} {count} runs)" if count else ''))
+        changed += bool(count)
+
+    slowest = sorted(results, key=lambda r: r[2], reverse=True)[:3]
+    if slowest and not args.verbose:
+        print("Slowest: " + ', '.join(f"{p} {s * 1000:.1f} ms" for p, _, s, _ in slowest))
+    print(f"Scanned {len(results)} files in {elapsed:.3f}s, {changed} "
+          f"{'need repair' if args.check else 'repaired'}.")
+    return 1 if args.check and changed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+-- ===================================================================
+-- RLS NHẸ: PHÂN QUYỀN TÍNH MỘT LẦN CHO MỖI CÂU LỆNH
+-- ===================================================================
+-- Các policy trong setup.sql (và các bản fix_*_rls*.sql) đều gọi is_admin()
+-- hoặc EXISTS (SELECT 1 FROM profiles WHERE id = auth.uid() AND ...
+-- voters.area_id ...). is_admin() là hàm plpgsql VOLATILE, còn EXISTS tham
+-- chiếu cột của dòng đang xét, nên Postgres tra profiles lại cho TỪNG dòng
+-- khi quét/cập nhật voters: đọc 100k cử tri là 100k lần tra profiles.
+--
+-- File này thêm các hàm STABLE đọc hồ sơ (đang hoạt động) của người gọi:
+--   current_profile_role()          vai trò
+--   current_profile_area()          khu vực được phân công
+--   current_profile_unit()          đơn vị
+--   current_profile_neighborhood()  khu phố
+--   is_admin()                      vai trò quản lý / nhập liệu (viết lại, STABLE)
+-- và dựng lại policy của profiles, voters, candidates, area_stats,
+-- voting_results, system_logs với cùng quyền như setup.sql, nhưng mỗi hàm
+-- được bọc trong (SELECT ...): Postgres tính một lần cho cả câu lệnh
+-- (InitPlan) rồi chỉ so sánh cột, và có thể dùng chỉ mục area_id/unit_id.
+-- Hồ sơ bị khóa/xóa cho kết quả NULL nên không khớp policy nào, như cũ.
+--
+-- Thứ tự chạy: sau setup.sql. setup.sql và các fix_*_rls*.sql tạo lại
+-- policy kiểu cũ: chạy lại file này sau mỗi lần chạy chúng.
+-- Đo trước/sau: python bench_rls.py
+-- ===================================================================
+
+CREATE OR REPLACE FUNCTION current_profile_role()
+RETURNS TEXT AS $$
+  SELECT role FROM profiles WHERE id = auth.uid() AND status = 'active'
+$$ LANGUAGE sql STABLE SECURITY DEFINER SET search_path = public;
+
+CREATE OR REPLACE FUNCTION current_profile_area()
+RETURNS TEXT AS $$
+  SELECT area_id FROM profiles WHERE id = auth.uid() AND status = 'active'
+$$ LANGUAGE sql STABLE SECURITY DEFINER SET search_path = public;
+
+CREATE OR REPLACE FUNCTION current_profile_unit()
+RETURNS TEXT AS $$
+  SELECT unit_id FROM profiles WHERE id = auth.uid() AND status = 'active'
+$$ LANGUAGE sql STABLE SECURITY DEFINER SET search_path = public;
+
+CREATE OR REPLACE FUNCTION current_profile_neighborhood()
+RETURNS TEXT AS $$
+  SELECT neighborhood_id FROM profiles WHERE id = auth.uid() AND status = 'active'
+$$ LANGUAGE sql STABLE SECURITY DEFINER SET search_path = public;
+
+-- Cùng chữ ký với bản cũ nên các RPC / script đang gọi is_admin() không phải đổi
+CREATE OR REPLACE FUNCTION is_admin()
+RETURNS BOOLEAN AS $$
+  SELECT COALESCE(current_profile_role() IN ('super_admin', 'ban_chi_dao', 'admin_phuong', 'nhap_lieu'), FALSE)
+$$ LANGUAGE sql STABLE SECURITY DEFINER SET search_path = public;
+
+GRANT EXECUTE ON FUNCTION current_profile_role(), current_profile_area(), current_profile_unit(),
+  current_profile_neighborhood(), is_admin() TO anon, authenticated, service_role;
+
+-- Xóa mọi policy cũ của các bảng này (kể cả policy "khẩn cấp" của các fix_*.sql)
+DO $$
+DECLARE
+    pol RECORD;
+BEGIN
+    FOR pol IN (SELECT policyname, tablename FROM pg_policies WHERE schemaname = 'public'
+                AND tablename IN ('profiles', 'voters', 'candidates', 'area_stats', 'voting_results', 'system_logs')) LOOP
+        EXECUTE format('DROP POLICY IF EXISTS %I ON %I', pol.policyname, pol.tablename);
+    END LOOP;
+END $$;
+
+-- --- PROFILES ---
+CREATE POLICY "Admins can manage all profiles" ON profiles
+FOR ALL USING ((SELECT is_admin()));
+
+CREATE POLICY "Users can view all profiles" ON profiles
+FOR SELECT USING ((SELECT auth.uid()) IS NOT NULL);
+
+-- --- VOTERS ---
+CREATE POLICY "Admins can manage all voters" ON voters
+FOR ALL USING ((SELECT is_admin()));
+
+CREATE POLICY "Scope-based voter access" ON voters
+FOR SELECT USING (
+  voters.area_id = (SELECT current_profile_area())
+  OR voters.unit_id = (SELECT current_profile_unit())
+  OR voters.neighborhood_id = (SELECT current_profile_neighborhood())
+);
+
+CREATE POLICY "Scope-based voter update" ON voters
+FOR UPDATE USING (
+  (SELECT current_profile_role()) IN ('nhap_lieu', 'to_bau_cu')
+  AND (voters.area_id = (SELECT current_profile_area()) OR voters.unit_id = (SELECT current_profile_unit()))
+);
+
+CREATE POLICY "Scope-based voter insert" ON voters
+FOR INSERT WITH CHECK (
+  (SELECT is_admin())
+  OR ((SELECT current_profile_role()) = 'to_bau_cu'
+      AND (voters.area_id = (SELECT current_profile_area()) OR voters.unit_id = (SELECT current_profile_unit())))
+);
+
+-- --- CANDIDATES ---
+CREATE POLICY "Admins can manage candidates" ON candidates
+FOR ALL USING ((SELECT is_admin()));
+
+CREATE POLICY "Authenticated users can view candidates" ON candidates
+FOR SELECT USING ((SELECT auth.uid()) IS NOT NULL);
+
+CREATE POLICY "Data entry can update candidates" ON candidates
+FOR UPDATE USING ((SELECT current_profile_role()) IN ('nhap_lieu', 'to_bau_cu', 'ban_chi_dao', 'admin_phuong'))
+WITH CHECK ((SELECT current_profile_role()) IN ('nhap_lieu', 'to_bau_cu', 'ban_chi_dao', 'admin_phuong'));
+
+CREATE POLICY "Data entry can insert candidates" ON candidates
+FOR INSERT WITH CHECK ((SELECT current_profile_role()) IN ('nhap_lieu', 'to_bau_cu', 'ban_chi_dao', 'admin_phuong'));
+
+-- --- AREA_STATS ---
+CREATE POLICY "Admins can manage area_stats" ON area_stats
+FOR ALL USING ((SELECT is_admin()));
+
+CREATE POLICY "Scope-based area_stats access" ON area_stats
+FOR SELECT USING (area_stats.area_id = (SELECT current_profile_area()) OR (SELECT is_admin()));
+
+CREATE POLICY "Scope-based area_stats update" ON area_stats
+FOR ALL USING (
+  (SELECT current_profile_role()) IN ('nhap_lieu', 'to_bau_cu')
+  AND area_stats.area_id = (SELECT current_profile_area())
+)
+WITH CHECK (
+  (SELECT current_profile_role()) IN ('nhap_lieu', 'to_bau_cu')
+  AND area_stats.area_id = (SELECT current_profile_area())
+);
+
+-- --- VOTING_RESULTS ---
+CREATE POLICY "Admins can manage voting_results" ON voting_results
+FOR ALL USING ((SELECT is_admin()));
+
+CREATE POLICY "Scope-based voting_results access" ON voting_results
+FOR SELECT USING (voting_results.area_id = (SELECT current_profile_area()) OR (SELECT is_admin()));
+
+CREATE POLICY "Scope-based voting_results update" ON voting_results
+FOR ALL USING (
+  (SELECT current_profile_role()) IN ('nhap_lieu', 'to_bau_cu')
+  AND voting_results.area_id = (SELECT current_profile_area())
+)
+WITH CHECK (
+  (SELECT current_profile_role()) IN ('nhap_lieu', 'to_bau_cu')
+  AND voting_results.area_id = (SELECT current_profile_area())
+);
+
+-- --- SYSTEM_LOGS ---
+CREATE POLICY "Admins can view all logs" ON system_logs
+FOR SELECT USING ((SELECT is_admin()));
+
+CREATE POLICY "Users can insert own logs" ON system_logs
+FOR INSERT WITH CHECK ((SELECT auth.uid()) IS NOT NULL);
+
+NOTIFY pgrst, 'reload config';
@@ -1,9 +1,16 @@
 -- PERFORMANCE INDEXES FOR VARYING DATA SCALES (UP TO 100K+)
-CREATE INDEX IF NOT EXISTS idx_voters_area_id ON voters(area_id);
+-- (filter column, name, id): one index serves both the equality filter and the
+-- keyset ORDER BY name, id of get_voters_page, so page N reads only its own rows.
+DROP INDEX IF EXISTS idx_voters_area_id;
+DROP INDEX IF EXISTS idx_voters_unit_id;
+DROP INDEX IF EXISTS idx_voters_neighborhood_id;
+DROP INDEX IF EXISTS idx_voters_group_name;
+CREATE INDEX IF NOT EXISTS idx_voters_area_name ON voters(area_id, name, id);
+CREATE INDEX IF NOT EXISTS idx_voters_unit_name ON voters(unit_id, name, id);
+CREATE INDEX IF NOT EXISTS idx_voters_neighborhood_name ON voters(neighborhood_id, name, id);
+CREATE INDEX IF NOT EXISTS idx_voters_group_name_name ON voters(group_name, name, id);
+CREATE INDEX IF NOT EXISTS idx_voters_name_id ON voters(name, id);
 CREATE INDEX IF NOT EXISTS idx_voters_voting_status ON voters(voting_status);
-CREATE INDEX IF NOT EXISTS idx_voters_unit_id ON voters(unit_id);
-CREATE INDEX IF NOT EXISTS idx_voters_neighborhood_id ON voters(neighborhood_id);
-CREATE INDEX IF NOT EXISTS idx_voters_group_name ON voters(group_name);
 
 -- Ensure area_stats table has all necessary columns for robust aggregation
 DO $$ 
@@ -23,6 +30,10 @@ BEGIN
     END IF;
 END $$;
 
+-- Các RPC thống kê đọc bộ đếm voter_counters (voter_counters.sql, chạy trước file này),
+-- nên chi phí mỗi lần gọi là O(số khu vực), không phụ thuộc số cử tri. Thứ tự các dòng
+-- theo danh mục locations (locations.sql); mã không có trong danh mục xếp cuối.
+
 -- 1. RPC: get_election_summary()
 -- Returns high-level numbers for the dashboard cards
 DROP FUNCTION IF EXISTS get_election_summary();
@@ -39,52 +50,41 @@ DECLARE
     v_locked_count BIGINT;
     v_total_areas BIGINT;
     v_completed_count BIGINT;
+    v_year INTEGER;
 BEGIN
-    -- 1. Get base stats from voters table
+    -- 1. Base stats: sum of the per-area counters (scope_id '' = voters without area)
     SELECT 
-        count(*), 
-        count(*) FILTER (WHERE voting_status = 'da-bau'),
-        count(*) FILTER (WHERE gender = 'Nam'),
-        count(*) FILTER (WHERE gender = 'Nữ'),
-        count(*) FILTER (WHERE gender = 'Nam' AND voting_status = 'da-bau'),
-        count(*) FILTER (WHERE gender = 'Nữ' AND voting_status = 'da-bau')
+        COALESCE(sum(total), 0),
+        COALESCE(sum(voted), 0),
+        COALESCE(sum(male_total), 0),
+        COALESCE(sum(female_total), 0),
+        COALESCE(sum(male_voted), 0),
+        COALESCE(sum(female_voted), 0)
     INTO 
         v_total_voters, v_voted_voters,
         v_total_male, v_total_female,
         v_male_voted, v_female_voted
-    FROM voters;
+    FROM voter_counters WHERE scope = 'area';
 
-    -- 2. Age stats (Realtime from da-bau)
-    WITH age_calc AS (
-        SELECT 
-            CASE 
-                WHEN TRIM(dob) ~ '^\d{2}/\d{2}/\d{4}$' THEN EXTRACT(YEAR FROM CURRENT_DATE) - EXTRACT(YEAR FROM to_date(TRIM(dob), 'DD/MM/YYYY'))
-                WHEN TRIM(dob) ~ '^\d{4}-\d{2}-\d{2}$' THEN EXTRACT(YEAR FROM CURRENT_DATE) - EXTRACT(YEAR FROM to_date(TRIM(dob), 'YYYY-MM-DD'))
-                WHEN TRIM(dob) ~ '^\d{4}$' THEN EXTRACT(YEAR FROM CURRENT_DATE) - TRIM(dob)::int
-                ELSE 0
-            END as age
-        FROM voters
-        WHERE voting_status = 'da-bau'
-    )
+    -- 2. Age stats (Realtime from da-bau): integer ranges over the birth-year counters
+    v_year := EXTRACT(YEAR FROM CURRENT_DATE)::int;
     SELECT json_build_object(
-        '18-30', count(*) FILTER (WHERE age >= 18 AND age <= 30),
-        '31-45', count(*) FILTER (WHERE age >= 31 AND age <= 45),
-        '46-60', count(*) FILTER (WHERE age >= 46 AND age <= 60),
-        'Trên 60', count(*) FILTER (WHERE age > 60)
-    ) INTO v_age_stats FROM age_calc;
+        '18-30', COALESCE(sum(voted) FILTER (WHERE birth_year BETWEEN v_year - 30 AND v_year - 18), 0),
+        '31-45', COALESCE(sum(voted) FILTER (WHERE birth_year BETWEEN v_year - 45 AND v_year - 31), 0),
+        '46-60', COALESCE(sum(voted) FILTER (WHERE birth_year BETWEEN v_year - 60 AND v_year - 46), 0),
+        'Trên 60', COALESCE(sum(voted) FILTER (WHERE birth_year < v_year - 60), 0)
+    ) INTO v_age_stats
+    FROM (SELECT scope_id::int AS birth_year, voted FROM voter_counters WHERE scope = 'birth_year') b;
 
-    -- 3. Area/Lock stats
-    SELECT count(*), count(*) FILTER (WHERE is_locked = TRUE)
-    INTO v_total_areas, v_locked_count
-    FROM (SELECT DISTINCT area_id FROM voters WHERE area_id IS NOT NULL) a
-    LEFT JOIN area_stats s ON a.area_id = s.area_id;
-
-    -- Completed areas (>90%)
-    SELECT count(*) INTO v_completed_count
-    FROM (
-        SELECT area_id, count(*), count(*) FILTER (WHERE voting_status = 'da-bau') as voted
-        FROM voters GROUP BY area_id
-    ) t WHERE count > 0 AND (voted::float / count) >= 0.9;
+    -- 3. Area/Lock stats and completed areas (>90%)
+    SELECT
+        count(*),
+        count(*) FILTER (WHERE s.is_locked = TRUE),
+        count(*) FILTER (WHERE (c.voted::float / c.total) >= 0.9)
+    INTO v_total_areas, v_locked_count, v_completed_count
+    FROM voter_counters c
+    LEFT JOIN area_stats s ON c.scope_id = s.area_id
+    WHERE c.scope = 'area' AND c.scope_id <> '' AND c.total > 0;
 
     RETURN json_build_object(
         'total', v_total_voters,
@@ -112,45 +112,31 @@ BEGIN
     IF p_view_mode = 'area' THEN
         SELECT json_agg(t) INTO result FROM (
             SELECT 
-                a.area_id as "rawId", a.area_id as "id",
+                c.scope_id as "rawId", c.scope_id as "id",
                 COALESCE(s.is_locked, FALSE) as "isLocked",
-                CASE WHEN COALESCE(s.is_locked, FALSE) THEN s.total_voters ELSE (SELECT count(*) FROM voters v WHERE v.area_id = a.area_id) END as "total",
-                CASE WHEN COALESCE(s.is_locked, FALSE) THEN s.received_votes ELSE (SELECT count(*) FROM voters v WHERE v.area_id = a.area_id AND v.voting_status = 'da-bau') END as "voted",
-                CASE WHEN COALESCE(s.is_locked, FALSE) THEN COALESCE(s.male_voted, 0) ELSE (SELECT count(*) FROM voters v WHERE v.area_id = a.area_id AND v.voting_status = 'da-bau' AND v.gender = 'Nam') END as "maleVoted",
-                CASE WHEN COALESCE(s.is_locked, FALSE) THEN COALESCE(s.female_voted, 0) ELSE (SELECT count(*) FROM voters v WHERE v.area_id = a.area_id AND v.voting_status = 'da-bau' AND v.gender = 'Nữ') END as "femaleVoted",
+                CASE WHEN COALESCE(s.is_locked, FALSE) THEN s.total_voters ELSE c.total END as "total",
+                CASE WHEN COALESCE(s.is_locked, FALSE) THEN s.received_votes ELSE c.voted END as "voted",
+                CASE WHEN COALESCE(s.is_locked, FALSE) THEN COALESCE(s.male_voted, 0) ELSE c.male_voted END as "maleVoted",
+                CASE WHEN COALESCE(s.is_locked, FALSE) THEN COALESCE(s.female_voted, 0) ELSE c.female_voted END as "femaleVoted",
                 COALESCE(s.valid_votes, 0) as "validVotes", COALESCE(s.unvoted_votes, 0) as "unvotedVotes"
-            FROM (SELECT DISTINCT area_id FROM voters WHERE area_id IS NOT NULL) a
-            LEFT JOIN area_stats s ON a.area_id = s.area_id
-        ) t;
-    ELSIF p_view_mode = 'unit' THEN
-        SELECT json_agg(t) INTO result FROM (
-            SELECT 
-                unit_id as "rawId", unit_id as "id", FALSE as "isLocked",
-                count(*) as "total",
-                count(*) FILTER (WHERE voting_status = 'da-bau') as "voted",
-                count(*) FILTER (WHERE voting_status = 'da-bau' AND gender = 'Nam') as "maleVoted",
-                count(*) FILTER (WHERE voting_status = 'da-bau' AND gender = 'Nữ') as "femaleVoted"
-            FROM voters WHERE unit_id IS NOT NULL GROUP BY unit_id
+            FROM voter_counters c
+            LEFT JOIN area_stats s ON c.scope_id = s.area_id
+            LEFT JOIN locations l ON l.id = c.scope_id
+            WHERE c.scope = 'area' AND c.scope_id <> '' AND c.total > 0
+            ORDER BY l.sort_order NULLS LAST, c.scope_id
         ) t;
-    ELSIF p_view_mode = 'neighborhood' THEN
+    ELSIF p_view_mode IN ('unit', 'neighborhood', 'group') THEN
         SELECT json_agg(t) INTO result FROM (
             SELECT 
-                neighborhood_id as "rawId", neighborhood_id as "id", FALSE as "isLocked",
-                count(*) as "total",
-                count(*) FILTER (WHERE voting_status = 'da-bau') as "voted",
-                count(*) FILTER (WHERE voting_status = 'da-bau' AND gender = 'Nam') as "maleVoted",
-                count(*) FILTER (WHERE voting_status = 'da-bau' AND gender = 'Nữ') as "femaleVoted"
-            FROM voters WHERE neighborhood_id IS NOT NULL GROUP BY neighborhood_id
-        ) t;
-    ELSIF p_view_mode = 'group' THEN
-        SELECT json_agg(t) INTO result FROM (
-            SELECT 
-                group_name as "rawId", group_name as "id", FALSE as "isLocked",
-                count(*) as "total",
-                count(*) FILTER (WHERE voting_status = 'da-bau') as "voted",
-                count(*) FILTER (WHERE voting_status = 'da-bau' AND gender = 'Nam') as "maleVoted",
-                count(*) FILTER (WHERE voting_status = 'da-bau' AND gender = 'Nữ') as "femaleVoted"
-            FROM voters WHERE group_name IS NOT NULL GROUP BY group_name
+                c.scope_id as "rawId", c.scope_id as "id", FALSE as "isLocked",
+                c.total as "total",
+                c.voted as "voted",
+                c.male_voted as "maleVoted",
+                c.female_voted as "femaleVoted"
+            FROM voter_counters c
+            LEFT JOIN locations l ON l.id = c.scope_id
+            WHERE c.scope = p_view_mode AND c.total > 0
+            ORDER BY l.sort_order NULLS LAST, c.scope_id
         ) t;
     ELSE
         result := '[]'::json;
@@ -161,7 +147,7 @@ END;
 $$ LANGUAGE plpgsql SECURITY DEFINER;
 
 -- 3. RPC: get_voters_paged
--- For detail modal, supports high-scale 100k+ rows with paging
+-- OFFSET paging with a full count per call; kept for older clients, use get_voters_page
 DROP FUNCTION IF EXISTS get_voters_paged(TEXT, TEXT, TEXT, INTEGER, INTEGER);
 CREATE OR REPLACE FUNCTION get_voters_paged(
     p_filter_col TEXT, 
@@ -214,3 +200,99 @@ BEGIN
     LIMIT p_limit OFFSET p_offset;
 END;
 $body$ LANGUAGE plpgsql SECURITY DEFINER;
+
+-- 4. RPC: get_voters_page (keyset)
+-- For detail modal: rows ordered by (name, id), continued from an opaque cursor.
+-- Page N costs the same as page 1 (index range scan from the cursor), and the
+-- total comes from voter_counters instead of count(*) over the filtered rows.
+-- Returns { "voters": [...], "nextCursor": text | null, "total": bigint }.
+DROP FUNCTION IF EXISTS get_voters_page(TEXT, TEXT, TEXT, TEXT, INTEGER);
+CREATE OR REPLACE FUNCTION get_voters_page(
+    p_filter_col TEXT,
+    p_filter_val TEXT,
+    p_voting_status TEXT DEFAULT 'all',
+    p_cursor TEXT DEFAULT NULL,
+    p_limit INTEGER DEFAULT 100
+)
+RETURNS JSON AS $body$
+DECLARE
+    v_scope TEXT;
+    v_where TEXT := 'TRUE';
+    v_after JSON;
+    v_limit INTEGER := LEAST(GREATEST(COALESCE(p_limit, 100), 1), 1000);
+    v_rows JSON;
+    v_more BOOLEAN;
+    v_last_name TEXT;
+    v_last_id UUID;
+    v_total BIGINT;
+BEGIN
+    v_scope := CASE p_filter_col
+        WHEN 'area_id' THEN 'area'
+        WHEN 'unit_id' THEN 'unit'
+        WHEN 'neighborhood_id' THEN 'neighborhood'
+        WHEN 'group_name' THEN 'group'
+    END;
+    IF v_scope IS NOT NULL THEN
+        v_where := format('v.%I = %L', p_filter_col, p_filter_val);
+    END IF;
+
+    -- Same split as the counters: anything other than 'da-bau' counts as not voted
+    IF p_voting_status = 'da-bau' THEN
+        v_where := v_where || ' AND v.voting_status = ''da-bau''';
+    ELSIF p_voting_status = 'chua-bau' THEN
+        v_where := v_where || ' AND v.voting_status IS DISTINCT FROM ''da-bau''';
+    END IF;
+
+    -- Cursor = base64 of the JSON array [name, id] of the last row already shown
+    IF p_cursor IS NOT NULL AND p_cursor <> '' THEN
+        BEGIN
+            v_after := convert_from(decode(p_cursor, 'base64'), 'UTF8')::json;
+            v_where := v_where || format(' AND (v.name, v.id) > (%L, %L::uuid)', v_after->>0, v_after->>1);
+        EXCEPTION WHEN OTHERS THEN
+            RAISE EXCEPTION 'get_voters_page: invalid cursor' USING ERRCODE = '22023';
+        END;
+    END IF;
+
+    -- Read one row past the page to know whether another page exists
+    EXECUTE format($q$
+        SELECT
+            COALESCE(json_agg(to_jsonb(p) - 'rn' ORDER BY p.rn) FILTER (WHERE p.rn <= %1$s), '[]'::json),
+            count(*) > %1$s,
+            (array_agg(p.name ORDER BY p.rn DESC) FILTER (WHERE p.rn <= %1$s))[1],
+            (array_agg(p.id ORDER BY p.rn DESC) FILTER (WHERE p.rn <= %1$s))[1]
+        FROM (
+            SELECT v.id, v.name, v.cccd, v.voter_card_number, v.area_id, v.neighborhood_id, v.group_name,
+                   v.voting_status, v.vote_qh, v.vote_t, v.vote_p,
+                   row_number() OVER (ORDER BY v.name, v.id) AS rn
+            FROM (
+                SELECT * FROM voters v WHERE %2$s ORDER BY v.name, v.id LIMIT %1$s + 1
+            ) v
+        ) p
+    $q$, v_limit, v_where)
+    INTO v_rows, v_more, v_last_name, v_last_id;
+
+    IF v_scope IS NULL THEN
+        SELECT CASE p_voting_status
+                   WHEN 'da-bau' THEN COALESCE(sum(voted), 0)
+                   WHEN 'chua-bau' THEN COALESCE(sum(total - voted), 0)
+                   ELSE COALESCE(sum(total), 0) END
+        INTO v_total FROM voter_counters WHERE scope = 'area';
+    ELSE
+        SELECT CASE p_voting_status
+                   WHEN 'da-bau' THEN voted
+                   WHEN 'chua-bau' THEN total - voted
+                   ELSE total END
+        INTO v_total FROM voter_counters WHERE scope = v_scope AND scope_id = p_filter_val;
+    END IF;
+
+    RETURN json_build_object(
+        'voters', v_rows,
+        'nextCursor', CASE WHEN v_more THEN
+            replace(encode(convert_to(json_build_array(v_last_name, v_last_id)::text, 'UTF8'), 'base64'), E'\n', '')
+        END,
+        'total', COALESCE(v_total, 0)
+    );
+END;
+$body$ LANGUAGE plpgsql STABLE SECURITY DEFINER;
+
+NOTIFY pgrst, 'reload config';
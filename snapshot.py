@@ -0,0 +1,381 @@
+"""Columnar, memory-mapped snapshots of the election tables for offline analysis.
+
+``export`` copies voters, candidates, area_stats, voting_results and
+system_logs into one directory per snapshot:
+
+    snapshots/20261018-1324/
+        voters.arrow ...      Arrow IPC files (zstd by default), one per table
+        manifest.json         taken_at, and per table: rows, primary key,
+                              columns (PostgreSQL and Arrow types), bytes,
+                              sha256 of the file, content_sha256
+        SHA256SUMS
+
+All tables are read in one REPEATABLE READ, READ ONLY transaction, so the
+snapshot is a single point in time. Each table is streamed: ``COPY (SELECT
+... ORDER BY primary key) TO STDOUT (FORMAT csv)`` is parsed block by block
+by pyarrow's CSV reader and written as record batches, so memory stays at a
+few blocks whatever the table size. content_sha256 is the SHA-256 of that
+ordered CSV stream: equal for equal table contents, whatever the
+compression or the pyarrow version.
+
+``open_snapshot`` memory-maps the files: reopening costs nothing and only
+the columns asked for are read. With ``--compression none`` the Arrow
+columns are zero-copy views of the mapped file; compressed files are
+decompressed column by column on read.
+
+    snap = snapshot.open_snapshot('snapshots')      # latest snapshot
+    voters = snap.to_pandas('voters', ['area_id', 'voting_status'])
+
+``diff`` compares two snapshots table by table (rows added, removed and
+changed, per column), matching rows on the primary key; tables with the
+same content_sha256 are skipped.
+
+Requires pyarrow: ``pip install pyarrow``.
+
+Usage:
+    python snapshot.py export [--dsn ...] [--dir snapshots] [--tables voters,...] [--compression zstd]
+    python snapshot.py diff OLD NEW [--table voters] [--show 10]
+    python snapshot.py verify [SNAPSHOT]
+"""
+import argparse
+import datetime
+import hashlib
+import io
+import json
+import os
+import sys
+
+import instrumentation
+
+SNAPSHOT_DIR = 'snapshots'
+TABLES = ('voters', 'candidates', 'area_stats', 'voting_results', 'system_logs')
+COMPRESSIONS = ('zstd', 'lz4', 'none')
+MANIFEST = 'manifest.json'
+BLOCK_SIZE = 1 << 22  # bytes of CSV per record batch
+SHOW_CHANGES = 10
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+    except ImportError as e:
+        raise RuntimeError('Snapshots need pyarrow: pip install pyarrow') from e
+    return pyarrow
+
+
+def arrow_type(pg_type):
+    """Arrow type of a PostgreSQL column (format_type); unknown types are kept as text."""
+    pa = _pyarrow()
+    if pg_type.endswith('[]'):
+        return pa.list_(arrow_type(pg_type[:-2]))
+    return {
+        'smallint': pa.int16(),
+        'integer': pa.int32(),
+        'bigint': pa.int64(),
+        'real': pa.float32(),
+        'double precision': pa.float64(),
+        'boolean': pa.bool_(),
+        'date': pa.date32(),
+        'timestamp with time zone': pa.timestamp('us', tz='UTC'),
+        'timestamp without time zone': pa.timestamp('us'),
+    }.get(pg_type, pa.string())
+
+
+def table_layout(conn, table):
+    """([(column, pg_type)], primary key columns) of ``table``."""
+    columns = conn.execute(
+        "SELECT a.attname, format_type(a.atttypid, a.atttypmod) FROM pg_attribute a "
+        "WHERE a.attrelid = %s::regclass AND a.attnum > 0 AND NOT a.attisdropped ORDER BY a.attnum",
+        (table,)).fetchall()
+    key = conn.execute(
+        "SELECT a.attname FROM pg_index i "
+        "JOIN LATERAL unnest(i.indkey) WITH ORDINALITY AS k(attnum, n) ON TRUE "
+        "JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = k.attnum "
+        "WHERE i.indrelid = %s::regclass AND i.indisprimary ORDER BY k.n",
+        (table,)).fetchall()
+    return columns, [k for (k,) in key]
+
+
+class _CopyStream(io.RawIOBase):
+    """Readable file over a COPY TO STDOUT, hashing every byte that goes through."""
+
+    def __init__(self, copy):
+        self.copy = copy
+        self.digest = hashlib.sha256()
+        self.pending = memoryview(b'')
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        # COPY hands out one row per chunk: fill the whole buffer, or the
+        # CSV reader makes a record batch of every row
+        view = memoryview(buffer)
+        filled = 0
+        while filled < len(view):
+            if not self.pending:
+                chunk = self.copy.read()
+                if not chunk:
+                    break
+                self.digest.update(chunk)
+                self.pending = memoryview(chunk)
+            n = min(len(view) - filled, len(self.pending))
+            view[filled:filled + n] = self.pending[:n]
+            self.pending = self.pending[n:]
+            filled += n
+        return filled
+
+
+def _list_column(values, type_):
+    """JSON-encoded arrays (array_to_json) -> Arrow list column."""
+    pa = _pyarrow()
+    return pa.array([None if v is None else json.loads(v) for v in values.to_pylist()], type=type_)
+
+
+def export_table(conn, table, path, compression='zstd'):
+    """Stream ``table`` into the Arrow IPC file ``path``; returns its manifest entry."""
+    pa = _pyarrow()
+    import pyarrow.csv as pacsv
+
+    columns, key = table_layout(conn, table)
+    if not columns:
+        raise RuntimeError(f"{table} does not exist")
+    schema = pa.schema([(name, arrow_type(pg_type)) for name, pg_type in columns])
+    lists = [f.name for f in schema if pa.types.is_list(f.type)]
+    # The CSV reader sees arrays as JSON text; they become list columns per batch
+    csv_types = {f.name: pa.string() if f.name in lists else f.type for f in schema}
+    select = ', '.join(f'array_to_json("{c}")::text AS "{c}"' if c in lists else f'"{c}"' for c, _ in columns)
+    order = ', '.join(f'"{k}"' for k in key) or ', '.join(f'"{c}"' for c, _ in columns)
+
+    options = pacsv.ConvertOptions(column_types=csv_types, true_values=['t'], false_values=['f'],
+                                   strings_can_be_null=True, quoted_strings_can_be_null=False)
+    write_options = pa.ipc.IpcWriteOptions(compression=None if compression == 'none' else compression)
+    rows = 0
+    tmp = f"{path}.tmp"
+    with conn.cursor().copy(f'COPY (SELECT {select} FROM "{table}" ORDER BY {order}) TO STDOUT '
+                            f'(FORMAT csv, HEADER true)') as copy:
+        stream = _CopyStream(copy)
+        reader = pacsv.open_csv(stream, read_options=pacsv.ReadOptions(block_size=BLOCK_SIZE),
+                                convert_options=options)
+        with pa.OSFile(tmp, 'wb') as sink, pa.ipc.new_file(sink, schema, options=write_options) as writer:
+            for batch in reader:
+                if lists:
+                    arrays = [_list_column(batch.column(f.name), f.type) if f.name in lists
+                              else batch.column(f.name) for f in schema]
+                    batch = pa.RecordBatch.from_arrays(arrays, schema=schema)
+                writer.write_batch(batch)
+                rows += batch.num_rows
+                instrumentation.count('rows', batch.num_rows)
+        # Drain the end of the COPY so the stream hash covers all of it
+        while stream.readinto(bytearray(BLOCK_SIZE)):
+            pass
+    os.replace(tmp, path)
+    return {'file': os.path.basename(path), 'rows': rows, 'key': key,
+            'columns': [{'name': name, 'pg_type': pg_type, 'arrow_type': str(arrow_type(pg_type))}
+                        for name, pg_type in columns],
+            'bytes': os.path.getsize(path), 'sha256': _sha256(path),
+            'content_sha256': stream.digest.hexdigest()}
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def export(dsn=None, directory=SNAPSHOT_DIR, tables=TABLES, compression='zstd', name=None):
+    """Write a snapshot of ``tables`` under ``directory``; returns its path."""
+    import db
+
+    name = name or datetime.datetime.now().strftime('%Y%m%d-%H%M%S')
+    out_dir = os.path.join(directory, name)
+    os.makedirs(out_dir, exist_ok=False)
+    entries = {}
+    with db.connect(dsn) as conn:
+        # One consistent view of every table, in a fixed text format for the CSV reader and the hash
+        conn.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY")
+        conn.execute("SET LOCAL TIME ZONE 'UTC'")
+        conn.execute("SET LOCAL DateStyle = 'ISO, YMD'")
+        conn.execute("SET LOCAL extra_float_digits = 3")
+        taken_at = conn.execute("SELECT NOW()").fetchone()[0]
+        for table in tables:
+            with instrumentation.stage(table):
+                entry = export_table(conn, table, os.path.join(out_dir, f"{table}.arrow"), compression)
+            entries[table] = entry
+            instrumentation.count('bytes', entry['bytes'])
+        conn.rollback()
+
+    manifest = {'taken_at': taken_at.isoformat(), 'compression': compression, 'tables': entries}
+    with open(os.path.join(out_dir, MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    with open(os.path.join(out_dir, 'SHA256SUMS'), 'w', encoding='utf-8') as f:
+        f.writelines(f"{e['sha256']}  {e['file']}\n" for e in entries.values())
+    return out_dir
+
+
+def latest(directory=SNAPSHOT_DIR):
+    """Path of the newest snapshot under ``directory``."""
+    names = sorted(n for n in os.listdir(directory) if os.path.exists(os.path.join(directory, n, MANIFEST)))
+    if not names:
+        raise RuntimeError(f"No snapshot in {directory}")
+    return os.path.join(directory, names[-1])
+
+
+class Snapshot:
+    """A snapshot directory; tables are memory-mapped on read."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, MANIFEST), encoding='utf-8') as f:
+            self.manifest = json.load(f)
+
+    @property
+    def tables(self):
+        return list(self.manifest['tables'])
+
+    def entry(self, table):
+        try:
+            return self.manifest['tables'][table]
+        except KeyError:
+            raise KeyError(f"{self.path} has no table {table!r} (it has {', '.join(self.tables)})") from None
+
+    def read(self, table, columns=None):
+        """pyarrow Table of ``table``, only ``columns`` when given."""
+        pa = _pyarrow()
+        source = pa.memory_map(os.path.join(self.path, self.entry(table)['file']))
+        reader = pa.ipc.open_file(source)
+        if columns is None:
+            return reader.read_all()
+        fields = [reader.schema.get_field_index(c) for c in columns]
+        missing = [c for c, i in zip(columns, fields) if i < 0]
+        if missing:
+            raise KeyError(f"{table} has no column(s): {', '.join(missing)}")
+        options = pa.ipc.IpcReadOptions(included_fields=sorted(fields))
+        return pa.ipc.open_file(source, options=options).read_all().select(list(columns))
+
+    def to_pandas(self, table, columns=None):
+        return self.read(table, columns).to_pandas()
+
+    def verify(self):
+        """[file] whose sha256 does not match the manifest."""
+        return [e['file'] for e in self.manifest['tables'].values()
+                if _sha256(os.path.join(self.path, e['file'])) != e['sha256']]
+
+
+def open_snapshot(path=SNAPSHOT_DIR):
+    """Snapshot at ``path``, or the newest one when ``path`` is a directory of snapshots."""
+    if not os.path.exists(os.path.join(path, MANIFEST)):
+        path = latest(path)
+    return Snapshot(path)
+
+
+def _same(a, b):
+    """Boolean array: a[i] and b[i] are equal (two NULLs are equal)."""
+    pa = _pyarrow()
+    import pyarrow.compute as pc
+
+    if pa.types.is_list(a.type):
+        return pa.array([x == y for x, y in zip(a.to_pylist(), b.to_pylist())], type=pa.bool_())
+    both_null = pc.and_(pc.is_null(a), pc.is_null(b))
+    return pc.or_(pc.fill_null(pc.equal(a, b), False), both_null)
+
+
+def diff_table(old, new, key, show=SHOW_CHANGES):
+    """{'added', 'removed', 'changed', 'columns': {column: rows changed}, 'examples': [...]}
+    between two pyarrow Tables with the same columns, rows matched on ``key``."""
+    pa = _pyarrow()
+    import pyarrow.compute as pc
+
+    left = old.select(key).append_column('_old', pa.array(range(old.num_rows), pa.int64()))
+    right = new.select(key).append_column('_new', pa.array(range(new.num_rows), pa.int64()))
+    joined = left.join(right, key, join_type='full outer')
+    removed = joined.filter(pc.is_null(joined['_new']))
+    added = joined.filter(pc.is_null(joined['_old']))
+    both = joined.filter(pc.and_(pc.is_valid(joined['_old']), pc.is_valid(joined['_new'])))
+    i_old, i_new = both['_old'], both['_new']
+
+    columns = {}
+    changed = pa.array([False] * both.num_rows, pa.bool_())
+    for name in old.column_names:
+        if name in key or name not in new.column_names:
+            continue
+        differs = pc.invert(_same(old[name].take(i_old), new[name].take(i_new)))
+        n = pc.sum(differs).as_py() or 0
+        if n:
+            columns[name] = n
+            changed = pc.or_(changed, differs)
+    examples = both.filter(changed).select(key).slice(0, show).to_pylist() if show else []
+    return {'added': added.num_rows, 'removed': removed.num_rows, 'changed': pc.sum(changed).as_py() or 0,
+            'columns': columns, 'examples': examples}
+
+
+def diff(old_path, new_path, tables=None, show=SHOW_CHANGES):
+    """{table: diff_table result, or None when the content hashes match}."""
+    old, new = open_snapshot(old_path), open_snapshot(new_path)
+    result = {}
+    for table in tables or [t for t in old.tables if t in new.tables]:
+        a, b = old.entry(table), new.entry(table)
+        if a['content_sha256'] == b['content_sha256']:
+            result[table] = None
+            continue
+        if a['key'] != b['key'] or not a['key']:
+            raise RuntimeError(f"{table}: primary key differs between the snapshots or is missing")
+        with instrumentation.stage(table):
+            result[table] = diff_table(old.read(table), new.read(table), a['key'], show)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Columnar snapshots of the election tables.')
+    sub = parser.add_subparsers(dest='command', required=True)
+    exp = sub.add_parser('export', help='write a new snapshot')
+    exp.add_argument('--dsn', help='PostgreSQL connection string (default: $DATABASE_URL)')
+    exp.add_argument('--dir', default=SNAPSHOT_DIR, help='directory holding the snapshots')
+    exp.add_argument('--name', help='snapshot name (default: YYYYMMDD-HHMMSS)')
+    exp.add_argument('--tables', default=','.join(TABLES), help='comma-separated tables')
+    exp.add_argument('--compression', choices=COMPRESSIONS, default='zstd',
+                     help='Arrow buffer compression; none keeps reads zero-copy')
+    instrumentation.add_arguments(exp)
+    dif = sub.add_parser('diff', help='compare two snapshots')
+    dif.add_argument('old')
+    dif.add_argument('new')
+    dif.add_argument('--table', action='append', help='only this table (repeatable)')
+    dif.add_argument('--show', type=int, default=SHOW_CHANGES, help='changed keys printed per table')
+    ver = sub.add_parser('verify', help='check the files of a snapshot against its manifest')
+    ver.add_argument('path', nargs='?', default=SNAPSHOT_DIR)
+    args = parser.parse_args(argv)
+
+    sys.stdout.reconfigure(encoding='utf-8')
+    if args.command == 'export':
+        tables = [t.strip() for t in args.tables.split(',') if t.strip()]
+        with instrumentation.Run('snapshot', args):
+            path = export(args.dsn, args.dir, tables, args.compression, args.name)
+        for table, entry in Snapshot(path).manifest['tables'].items():
+            print(f"  {table}: {entry['rows']} rows, {entry['bytes'] / 1e6:.1f} MB")
+        print(f"Snapshot: {path}")
+        return 0
+
+    if args.command == 'verify':
+        snap = open_snapshot(args.path)
+        bad = snap.verify()
+        for name in bad:
+            print(f"  ⚠ {name}: sha256 does not match {MANIFEST}")
+        print(f"{snap.path}: {len(snap.tables) - len(bad)}/{len(snap.tables)} files intact")
+        return 1 if bad else 0
+
+    for table, result in diff(args.old, args.new, args.table, args.show).items():
+        if result is None:
+            print(f"{table}: unchanged")
+            continue
+        print(f"{table}: +{result['added']} -{result['removed']} ~{result['changed']}")
+        for column, n in sorted(result['columns'].items(), key=lambda c: -c[1]):
+            print(f"    {column:<20} {n:>8}")
+        for key in result['examples']:
+            print(f"    changed: {key}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
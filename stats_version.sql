@@ -0,0 +1,99 @@
+-- ===================================================================
+-- BỘ ĐẾM PHIÊN BẢN SỐ LIỆU THỐNG KÊ (stats_version)
+-- ===================================================================
+-- Dịch vụ cache aggregate_cache.py chỉ cần đọc một số nguyên
+-- (get_stats_version) để biết kết quả get_election_summary /
+-- get_aggregated_stats đã lưu còn dùng được hay không. Số này tăng sau mọi
+-- thay đổi của voter_counters (mọi lần check-in, nhập, sửa, xóa cử tri)
+-- và của area_stats (nhập/khóa biên bản).
+--
+-- Không có một dòng chung cho mọi lần check-in (hai lượt check-in song
+-- song sẽ phải chờ nhau trên khóa của dòng đó): mỗi dòng voter_counters có
+-- cột version riêng, tăng ngay trong lệnh UPDATE bộ đếm đang khóa sẵn dòng
+-- đó. get_stats_version = tổng version của voter_counters + dòng
+-- stats_version, dòng này chỉ tăng khi:
+--   area_stats đổi            (ít: nhập biên bản)
+--   dòng voter_counters bị xóa  (TRUNCATE voters, rebuild_voter_counters):
+--                             tăng thêm đúng tổng version đã mất + 1, nên
+--                             get_stats_version không bao giờ giảm
+--
+-- version nằm trong bảng (không dùng SEQUENCE) nên chỉ thay đổi khi giao
+-- dịch COMMIT: ai đọc được version mới thì cũng đọc được dữ liệu mới.
+--
+-- Chạy SAU voter_counters.sql.
+-- ===================================================================
+
+CREATE TABLE IF NOT EXISTS stats_version (
+  id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+  version BIGINT NOT NULL DEFAULT 0,
+  updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+INSERT INTO stats_version (id) VALUES (TRUE) ON CONFLICT (id) DO NOTHING;
+
+ALTER TABLE stats_version ENABLE ROW LEVEL SECURITY;
+DROP POLICY IF EXISTS "Public read stats_version" ON stats_version;
+CREATE POLICY "Public read stats_version" ON stats_version FOR SELECT USING (true);
+
+ALTER TABLE voter_counters ADD COLUMN IF NOT EXISTS version BIGINT NOT NULL DEFAULT 1;
+
+CREATE OR REPLACE FUNCTION bump_stats_version()
+RETURNS TRIGGER AS $$
+BEGIN
+  UPDATE stats_version SET version = version + 1, updated_at = NOW() WHERE id;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- Dòng bộ đếm được cập nhật: tăng version của chính dòng đó
+CREATE OR REPLACE FUNCTION voter_counters_bump_version()
+RETURNS TRIGGER AS $$
+BEGIN
+  NEW.version := OLD.version + 1;
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Dòng bộ đếm bị xóa: chuyển phần version đã mất sang dòng stats_version
+CREATE OR REPLACE FUNCTION voter_counters_keep_version()
+RETURNS TRIGGER AS $$
+BEGIN
+  IF TG_OP = 'TRUNCATE' THEN
+    UPDATE stats_version SET updated_at = NOW(),
+      version = version + 1 + (SELECT COALESCE(sum(version), 0) FROM voter_counters) WHERE id;
+  ELSE
+    UPDATE stats_version SET updated_at = NOW(),
+      version = version + 1 + (SELECT COALESCE(sum(version), 0) FROM old_counters) WHERE id;
+  END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+DROP TRIGGER IF EXISTS stats_version_voter_counters ON voter_counters;
+DROP TRIGGER IF EXISTS voter_counters_version ON voter_counters;
+CREATE TRIGGER voter_counters_version
+  BEFORE UPDATE ON voter_counters
+  FOR EACH ROW EXECUTE FUNCTION voter_counters_bump_version();
+
+DROP TRIGGER IF EXISTS stats_version_voter_counters_delete ON voter_counters;
+CREATE TRIGGER stats_version_voter_counters_delete
+  AFTER DELETE ON voter_counters
+  REFERENCING OLD TABLE AS old_counters
+  FOR EACH STATEMENT EXECUTE FUNCTION voter_counters_keep_version();
+
+DROP TRIGGER IF EXISTS stats_version_voter_counters_truncate ON voter_counters;
+CREATE TRIGGER stats_version_voter_counters_truncate
+  BEFORE TRUNCATE ON voter_counters
+  FOR EACH STATEMENT EXECUTE FUNCTION voter_counters_keep_version();
+
+DROP TRIGGER IF EXISTS stats_version_area_stats ON area_stats;
+CREATE TRIGGER stats_version_area_stats
+  AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON area_stats
+  FOR EACH STATEMENT EXECUTE FUNCTION bump_stats_version();
+
+CREATE OR REPLACE FUNCTION get_stats_version()
+RETURNS BIGINT AS $$
+  SELECT (SELECT version FROM stats_version WHERE id)
+       + (SELECT COALESCE(sum(version), 0) FROM voter_counters)::BIGINT;
+$$ LANGUAGE sql STABLE SECURITY DEFINER SET search_path = public;
+
+NOTIFY pgrst, 'reload config';
@@ -0,0 +1,99 @@
+"""Synthetic An Phu election data used by the benchmark scripts.
+
+Rows mimic the layout of the official voter roll workbook (see the column
+mapping in import_voters.py) so the real parsers can be exercised at scale
+without touching personal data.
+"""
+import random
+
+HO = ['NGUYỄN', 'TRẦN', 'LÊ', 'PHẠM', 'HOÀNG', 'HUỲNH', 'PHAN', 'VŨ', 'VÕ', 'ĐẶNG',
+      'BÙI', 'ĐỖ', 'HỒ', 'NGÔ', 'DƯƠNG', 'LÝ', 'LƯU', 'TRƯƠNG', 'ĐINH', 'MAI']
+DEM = ['VĂN', 'THỊ', 'HỮU', 'ĐỨC', 'MINH', 'NGỌC', 'THANH', 'QUỐC', 'XUÂN', 'THU',
+       'HOÀNG', 'KIM', 'TẤN', 'GIA', 'BẢO']
+TEN = ['AN', 'BÌNH', 'CƯỜNG', 'DŨNG', 'GIANG', 'HÀ', 'HẢI', 'HIỀN', 'HÒA', 'HÙNG',
+       'HƯƠNG', 'KHOA', 'LAN', 'LINH', 'LONG', 'MAI', 'NAM', 'NGA', 'NGUYỆT', 'PHÚC',
+       'PHƯƠNG', 'QUANG', 'SƠN', 'TÂM', 'THẢO', 'THẮNG', 'TRANG', 'TRINH', 'TUẤN', 'YẾN']
+STREETS = ['đường D3', 'đường N7', 'đường N5', 'đường ĐT743', 'đường Nguyễn Văn Tiết',
+           'đường Bình Phước', 'đường An Phú 18']
+NEIGHBORHOODS = ['Khu phố 1A', 'Khu phố 1B', 'Khu phố 2', 'Khu phố 3', 'Khu phố 4',
+                 'Bình Phước A', 'Bình Phước B']
+
+AREA_COUNT = 45
+
+
+def vietnamese_name(rng):
+    return f"{rng.choice(HO)} {rng.choice(DEM)} {rng.choice(TEN)}"
+
+
+def mixed_dob(rng):
+    """Return a date of birth in one of the formats found in the real data."""
+    year = rng.randint(1930, 2008)
+    month = rng.randint(1, 12)
+    day = rng.randint(1, 28)
+    style = rng.random()
+    if style < 0.55:
+        return f"{day:02d}/{month:02d}/{year}"
+    if style < 0.85:
+        return f"{year}-{month:02d}-{day:02d} 00:00:00"
+    if style < 0.95:
+        return f"{year}-{month:02d}-{day:02d}"
+    return str(year)
+
+
+def cccd(rng):
+    return f"0{rng.randint(10, 99)}{rng.randint(0, 1)}{rng.randint(10, 99)}{rng.randint(0, 999999):06d}"
+
+
+def area_id(num):
+    return f"kv{num:02d}"
+
+
+def voter_sheet_rows(n, seed=42, areas=AREA_COUNT):
+    """Yield worksheet rows (tuples) for ``n`` voters, including title rows,
+    per-area "Khu vực bỏ phiếu số" headers and column headings."""
+    rng = random.Random(seed)
+    yield ('DANH SÁCH CỬ TRI',)
+    per_area = max(1, n // areas)
+    stt = 0
+    for i in range(n):
+        if i % per_area == 0 and (i // per_area) < areas:
+            num = i // per_area + 1
+            yield (None, f"Khu vực bỏ phiếu số: {num}")
+            yield ('STT', 'Số thẻ', 'Họ và tên', 'Ngày sinh', 'Nam', 'Nữ', 'Số CCCD',
+                   'Dân tộc', 'Thường trú', 'Tạm trú', 'Nơi ở hiện nay', 'QH', 'Tỉnh', 'Xã', 'Ghi chú')
+            yield tuple(f"({k})" for k in range(1, 16))
+            stt = 0
+        stt += 1
+        female = rng.random() < 0.52
+        group = rng.randint(1, 30)
+        address = f"{rng.randint(1, 99)}/{rng.choice('ABCD')}{rng.randint(1, 9)} {rng.choice(STREETS)}, Tổ {group} {rng.choice(NEIGHBORHOODS)}"
+        temporary = rng.random() < 0.2
+        yield (
+            stt,
+            f"{stt:04d}",
+            vietnamese_name(rng),
+            mixed_dob(rng),
+            None if female else 'x',
+            'x' if female else None,
+            cccd(rng) if rng.random() > 0.002 else None,
+            'Kinh' if rng.random() > 0.03 else 'Hoa',
+            None if temporary else address,
+            address if temporary else None,
+            None,
+            'x' if rng.random() > 0.01 else 'o',
+            'x',
+            'x',
+            None,
+        )
+
+
+def write_voter_workbook(path, n, seed=42):
+    """Write a synthetic roll of ``n`` voters to ``path`` with constant memory."""
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet('DSCT')
+    for row in voter_sheet_rows(n, seed=seed):
+        ws.append(row)
+    wb.save(path)
+    return path
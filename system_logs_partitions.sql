@@ -0,0 +1,142 @@
+-- ===================================================================
+-- NHẬT KÝ HỆ THỐNG PHÂN VÙNG THEO NGÀY: system_logs
+-- ===================================================================
+-- system_logs (setup.sql) là một bảng heap duy nhất, chỉ có khóa UUID,
+-- không chỉ mục thời gian: trang Nhật ký hệ thống, khay thông báo và biểu
+-- đồ của Dashboard đều sắp xếp/lọc theo created_at trên toàn bảng, và bảng
+-- lớn thêm sau mỗi lượt check-in trong ngày bầu cử.
+--
+-- File này dựng lại system_logs thành bảng phân vùng theo ngày (giờ Việt
+-- Nam) trên created_at, cùng tên và cùng cột nên client không phải đổi:
+--   system_logs_YYYYMMDD   một phân vùng cho mỗi ngày
+--   system_logs_default    hứng dòng của ngày chưa có phân vùng; hàm
+--                          ensure_system_log_partitions chuyển chúng về
+--                          đúng phân vùng khi tạo ngày đó
+--   chỉ mục (created_at, action, status) trên mọi phân vùng
+-- Truy vấn theo khoảng thời gian chỉ đọc các ngày liên quan; trang mới
+-- nhất là một lần quét chỉ mục ngược từ ngày hôm nay.
+--
+-- Dữ liệu cũ được chép sang (mỗi ngày có dữ liệu một phân vùng) rồi bảng
+-- cũ bị xóa. Chạy lại file này không làm gì thêm.
+--
+-- Thứ tự chạy: sau setup.sql (và rls_scope.sql nếu dùng). Mỗi đêm:
+--   python archive_logs.py    tạo trước phân vùng các ngày tới, lưu các
+--                             ngày đã qua ra NDJSON nén, xóa ngày quá hạn
+-- Supabase Realtime: bảng phân vùng cần publish_via_partition_root,
+-- bật bên dưới nếu có publication supabase_realtime.
+-- ===================================================================
+
+DO $$
+BEGIN
+  IF EXISTS (SELECT 1 FROM pg_class WHERE oid = to_regclass('public.system_logs') AND relkind = 'r') THEN
+    ALTER TABLE system_logs RENAME TO system_logs_unpartitioned;
+  END IF;
+END $$;
+
+CREATE TABLE IF NOT EXISTS system_logs (
+  id UUID NOT NULL DEFAULT gen_random_uuid(),
+  user_name TEXT,
+  action TEXT,
+  details TEXT,
+  ip_address TEXT,
+  status TEXT DEFAULT 'success',
+  created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+  PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+
+CREATE TABLE IF NOT EXISTS system_logs_default PARTITION OF system_logs DEFAULT;
+CREATE INDEX IF NOT EXISTS idx_system_logs_created_action_status ON system_logs (created_at, action, status);
+
+-- Phân vùng chỉ được đọc qua system_logs (RLS của bảng cha); đọc thẳng qua API thì không thấy gì
+CREATE OR REPLACE FUNCTION protect_system_log_partition(p_name TEXT)
+RETURNS VOID AS $$
+BEGIN
+  EXECUTE format('ALTER TABLE %I ENABLE ROW LEVEL SECURITY', p_name);
+  EXECUTE format('REVOKE ALL ON %I FROM anon, authenticated', p_name);
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- Tạo phân vùng cho p_days ngày kể từ p_from (mặc định: hôm nay, giờ Việt Nam);
+-- trả về số phân vùng mới. Ngày đã có dòng nằm trong system_logs_default thì
+-- các dòng đó được chuyển sang phân vùng mới trước khi gắn vào.
+CREATE OR REPLACE FUNCTION ensure_system_log_partitions(p_from DATE DEFAULT NULL, p_days INTEGER DEFAULT 7)
+RETURNS INTEGER AS $$
+DECLARE
+  v_from DATE := COALESCE(p_from, (NOW() AT TIME ZONE 'Asia/Ho_Chi_Minh')::DATE);
+  v_day DATE;
+  v_name TEXT;
+  v_lo TIMESTAMPTZ;
+  v_hi TIMESTAMPTZ;
+  v_created INTEGER := 0;
+BEGIN
+  FOR v_day IN SELECT d::DATE FROM generate_series(v_from, v_from + p_days - 1, INTERVAL '1 day') AS d LOOP
+    v_name := 'system_logs_' || to_char(v_day, 'YYYYMMDD');
+    CONTINUE WHEN to_regclass('public.' || v_name) IS NOT NULL;
+    v_lo := v_day::TIMESTAMP AT TIME ZONE 'Asia/Ho_Chi_Minh';
+    v_hi := (v_day + 1)::TIMESTAMP AT TIME ZONE 'Asia/Ho_Chi_Minh';
+
+    IF EXISTS (SELECT 1 FROM system_logs_default WHERE created_at >= v_lo AND created_at < v_hi) THEN
+      EXECUTE format('CREATE TABLE %I (LIKE system_logs INCLUDING DEFAULTS)', v_name);
+      EXECUTE format(
+        'WITH moved AS (DELETE FROM system_logs_default WHERE created_at >= %L AND created_at < %L RETURNING *) '
+        'INSERT INTO %I SELECT * FROM moved', v_lo, v_hi, v_name);
+      EXECUTE format('ALTER TABLE system_logs ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)', v_name, v_lo, v_hi);
+    ELSE
+      EXECUTE format('CREATE TABLE %I PARTITION OF system_logs FOR VALUES FROM (%L) TO (%L)', v_name, v_lo, v_hi);
+    END IF;
+    PERFORM protect_system_log_partition(v_name);
+    v_created := v_created + 1;
+  END LOOP;
+  RETURN v_created;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+REVOKE EXECUTE ON FUNCTION protect_system_log_partition(TEXT), ensure_system_log_partitions(DATE, INTEGER)
+  FROM PUBLIC, anon, authenticated;
+
+-- Chép nhật ký từ bảng cũ (một lần)
+DO $$
+DECLARE
+  v_day DATE;
+BEGIN
+  IF to_regclass('public.system_logs_unpartitioned') IS NOT NULL THEN
+    FOR v_day IN SELECT DISTINCT (COALESCE(created_at, NOW()) AT TIME ZONE 'Asia/Ho_Chi_Minh')::DATE
+                 FROM system_logs_unpartitioned LOOP
+      PERFORM ensure_system_log_partitions(v_day, 1);
+    END LOOP;
+    INSERT INTO system_logs (id, user_name, action, details, ip_address, status, created_at)
+    SELECT COALESCE(id, gen_random_uuid()), user_name, action, details, ip_address, status, COALESCE(created_at, NOW())
+    FROM system_logs_unpartitioned;
+    DROP TABLE system_logs_unpartitioned;
+  END IF;
+END $$;
+
+SELECT ensure_system_log_partitions();
+SELECT protect_system_log_partition('system_logs_default');
+
+-- Cùng quyền như setup.sql / rls_scope.sql
+ALTER TABLE system_logs ENABLE ROW LEVEL SECURITY;
+DROP POLICY IF EXISTS "Admins can view all logs" ON system_logs;
+DROP POLICY IF EXISTS "Users can insert own logs" ON system_logs;
+
+CREATE POLICY "Admins can view all logs" ON system_logs
+FOR SELECT USING ((SELECT is_admin()));
+
+CREATE POLICY "Users can insert own logs" ON system_logs
+FOR INSERT WITH CHECK ((SELECT auth.uid()) IS NOT NULL);
+
+GRANT SELECT, INSERT ON system_logs TO authenticated;
+GRANT ALL ON system_logs TO service_role;
+
+DO $$
+BEGIN
+  IF EXISTS (SELECT 1 FROM pg_publication WHERE pubname = 'supabase_realtime') THEN
+    ALTER PUBLICATION supabase_realtime SET (publish_via_partition_root = true);
+    IF NOT EXISTS (SELECT 1 FROM pg_publication_tables
+                   WHERE pubname = 'supabase_realtime' AND schemaname = 'public' AND tablename = 'system_logs') THEN
+      ALTER PUBLICATION supabase_realtime ADD TABLE system_logs;
+    END IF;
+  END IF;
+END $$;
+
+NOTIFY pgrst, 'reload config';
@@ -0,0 +1,205 @@
+"""Offline tally of the election results: per-unit totals, ranks and seat winners.
+
+Independent cross-check of the candidate view of ResultCalculation.tsx.
+voting_results, candidates and area_stats are loaded once into arrays, and
+every figure comes from vectorized group-bys (np.bincount / np.lexsort)
+keyed on (level, unit_id). Each election level (phuong / thanh-pho /
+quoc-hoi) is tallied on its own, even where units share an id.
+
+For every candidate:
+    total_votes   sum of voting_results.votes over all areas
+    percentage    share of the unit's candidate votes, 2 decimals (as the UI)
+    rank          1 + number of candidates in the unit with more votes
+    tied          another candidate of the unit has the same vote count
+    elected       the candidate's whole tie group fits inside the unit's seats
+    seat_tie      a tie straddles the last seat: not decidable by votes alone
+
+For every unit:
+    seats         getDelegateCount (lib/voting.ts) of the candidate count
+    valid_ballots sum of area_stats.valid_votes over the areas reporting
+                  results for the unit
+    check_ok      total candidate votes <= valid_ballots x seats (the
+                  "KIỂM TRA KẾT QUẢ KIỂM PHIẾU" rule)
+
+With ``--snapshot`` the three tables come from a snapshot.py snapshot
+instead of the database.
+
+Usage: python tally_results.py [--dsn ... | --snapshot snapshots] [--level phuong] [-o tally_report.json]
+"""
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+REPORT_FILE = 'tally_report.json'
+LEVELS = ('phuong', 'thanh-pho', 'quoc-hoi')
+AREA_STATS_COLUMNS = ['area_id', 'total_voters', 'issued_votes', 'received_votes', 'valid_votes',
+                      'invalid_votes', 'unvoted_votes', 'is_locked']
+
+
+def delegate_count(candidate_count):
+    """Vectorized lib/voting.ts#getDelegateCount: >=7 -> 4, >=5 -> 3, >=4 -> 2, else 0."""
+    n = np.asarray(candidate_count)
+    return np.select([n >= 7, n >= 5, n >= 4], [4, 3, 2], default=0)
+
+
+def load_tables(dsn=None, snapshot=None):
+    """(results, candidates, area_stats) DataFrames read from the database, or from ``snapshot``."""
+    if snapshot:
+        import snapshot as snapshots
+        snap = snapshots.open_snapshot(snapshot)
+        return (snap.to_pandas('voting_results', ['area_id', 'candidate_id', 'votes']),
+                snap.to_pandas('candidates', ['id', 'name', 'level', 'unit_id']),
+                snap.to_pandas('area_stats', AREA_STATS_COLUMNS))
+
+    import db
+    with db.connect(dsn) as conn:
+        results = pd.DataFrame(
+            conn.execute("SELECT area_id, candidate_id::text, votes FROM voting_results").fetchall(),
+            columns=['area_id', 'candidate_id', 'votes'])
+        candidates = pd.DataFrame(
+            conn.execute("SELECT id::text, name, level, unit_id FROM candidates").fetchall(),
+            columns=['id', 'name', 'level', 'unit_id'])
+        area_stats = pd.DataFrame(
+            conn.execute(f"SELECT {', '.join(AREA_STATS_COLUMNS)} FROM area_stats").fetchall(),
+            columns=AREA_STATS_COLUMNS)
+    return results, candidates, area_stats
+
+
+def tally(results, candidates, area_stats):
+    """Return (candidate table, unit table) DataFrames.
+
+    Result rows whose candidate is unknown are ignored (the UI drops them
+    the same way); their count is in ``unit_table.attrs['orphan_rows']``.
+    """
+    candidates = candidates.reset_index(drop=True)
+    n = len(candidates)
+    unit_codes, units = pd.factorize(pd.MultiIndex.from_arrays(
+        [candidates['level'].fillna(''), candidates['unit_id'].fillna('')]))
+    n_units = len(units)
+
+    cand_pos = pd.Index(candidates['id']).get_indexer(results['candidate_id'])
+    known = cand_pos >= 0
+    cand_pos = cand_pos[known]
+    row_votes = results['votes'].fillna(0).to_numpy(dtype=np.int64)[known]
+    votes = np.bincount(cand_pos, weights=row_votes, minlength=n).astype(np.int64)
+
+    unit_votes = np.bincount(unit_codes, weights=votes, minlength=n_units).astype(np.int64)
+    unit_size = np.bincount(unit_codes, minlength=n_units)
+    seats = delegate_count(unit_size)
+
+    # Within each unit, order by votes descending; lexsort is stable, so equal
+    # votes keep the candidates' table order like Array.prototype.sort in the UI.
+    order = np.lexsort((-votes, unit_codes))
+    g, v = unit_codes[order], votes[order]
+    # [:n]: with no candidates at all (fresh database, snapshot taken before
+    # the candidates import) every array stays empty and so do both tables
+    new_unit = np.r_[True, g[1:] != g[:-1]][:n]
+    new_run = new_unit | np.r_[True, v[1:] != v[:-1]][:n]
+    position = np.arange(n) - np.maximum.accumulate(np.where(new_unit, np.arange(n), 0))
+    run_id = np.cumsum(new_run) - 1
+    run_start = position[new_run][run_id]
+    run_size = np.bincount(run_id)[run_id]
+
+    rank = np.empty(n, dtype=np.int64)
+    rank[order] = run_start + 1
+    last_of_tie = np.empty(n, dtype=np.int64)
+    last_of_tie[order] = run_start + run_size
+    tied = np.empty(n, dtype=bool)
+    tied[order] = run_size > 1
+
+    cand_seats = seats[unit_codes]
+    totals = unit_votes[unit_codes]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        percentage = np.where(totals > 0, np.round(votes / totals * 100, 2), 0.0)
+
+    table = pd.DataFrame({
+        'id': candidates['id'],
+        'name': candidates['name'],
+        'level': candidates['level'],
+        'unit_id': candidates['unit_id'],
+        'total_votes': votes,
+        'percentage': percentage,
+        'rank': rank,
+        'tied': tied,
+        'elected': (last_of_tie <= cand_seats) & (votes > 0),
+        'seat_tie': (rank <= cand_seats) & (last_of_tie > cand_seats) & (votes > 0),
+    })
+
+    # Valid ballots: every area that reported results for a unit counts once per unit
+    area_codes, areas = pd.factorize(results['area_id'][known])
+    n_areas = max(len(areas), 1)
+    pairs = np.unique(unit_codes[cand_pos] * n_areas + area_codes)
+    valid = (area_stats.drop_duplicates('area_id').set_index('area_id')['valid_votes']
+             .reindex(areas).fillna(0).to_numpy(dtype=np.int64))
+    valid_ballots = np.bincount(pairs // n_areas, weights=valid[pairs % n_areas],
+                                minlength=n_units).astype(np.int64)
+
+    unit_table = pd.DataFrame({
+        'level': units.get_level_values(0),
+        'unit_id': units.get_level_values(1),
+        'candidates': unit_size,
+        'seats': seats,
+        'total_votes': unit_votes,
+        'valid_ballots': valid_ballots,
+        'max_votes': valid_ballots * seats,
+        'check_ok': unit_votes <= valid_ballots * seats,
+        'seat_tie': np.bincount(unit_codes, weights=table['seat_tie'].to_numpy(dtype=float), minlength=n_units) > 0,
+    })
+    unit_table.attrs['orphan_rows'] = int((~known).sum())
+    return (table.sort_values(['level', 'unit_id', 'rank'], kind='stable').reset_index(drop=True),
+            unit_table.sort_values(['level', 'unit_id']).reset_index(drop=True))
+
+
+def write_report(path, table, units, elapsed):
+    by_unit = {key: group.drop(columns=['level', 'unit_id']).to_dict('records')
+               for key, group in table.groupby(['level', 'unit_id'], sort=False)}
+    report = {
+        'elapsed_ms': round(elapsed * 1000, 2),
+        'orphan_rows': units.attrs.get('orphan_rows', 0),
+        'failed_checks': int((~units['check_ok']).sum()),
+        'units': [dict(unit, results=by_unit.get((unit['level'], unit['unit_id']), []))
+                  for unit in units.to_dict('records')],
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2, default=int)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Tally candidate votes and seat winners per unit.')
+    parser.add_argument('--dsn', help='PostgreSQL connection string (default: $DATABASE_URL)')
+    parser.add_argument('--snapshot', help='read a snapshot.py snapshot (or the newest in a directory) instead')
+    parser.add_argument('--level', choices=LEVELS, help='only print this election level')
+    parser.add_argument('-o', '--output', default=REPORT_FILE, help='JSON report path')
+    args = parser.parse_args(argv)
+
+    sys.stdout.reconfigure(encoding='utf-8')
+    results, candidates, area_stats = load_tables(args.dsn, args.snapshot)
+    started = time.perf_counter()
+    table, units = tally(results, candidates, area_stats)
+    elapsed = time.perf_counter() - started
+
+    for unit in units.itertuples():
+        if args.level and unit.level != args.level:
+            continue
+        mark = '✓' if unit.check_ok else '⚠'
+        print(f"\n[{unit.level}] {unit.unit_id}: {unit.candidates} ứng cử viên, bầu {unit.seats} — "
+              f"{unit.total_votes} {'<=' if unit.check_ok else '>'} {unit.valid_ballots} x {unit.seats} {mark}")
+        rows = table[(table['level'] == unit.level) & (table['unit_id'] == unit.unit_id)]
+        for c in rows.itertuples():
+            flag = ' TRÚNG CỬ' if c.elected else ' (bằng phiếu ở ghế cuối)' if c.seat_tie else ''
+            print(f"  {c.rank:>3}. {c.name:<32} {c.total_votes:>8} {c.percentage:>6.2f}%{flag}")
+
+    write_report(args.output, table, units, elapsed)
+    failed = int((~units['check_ok']).sum())
+    print(f"\n{len(table)} candidates in {len(units)} units tallied in {elapsed * 1000:.1f} ms; "
+          f"{failed} units fail the ballot check, {int(units['seat_tie'].sum())} have a tie at the last seat. "
+          f"Report: {args.output}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,337 @@
+"""Pre-flight validation of a voter roll, producing the analysis_result report.
+
+Runs the rules of pages/VoterImport.tsx over every row without importing
+anything:
+
+- CCCD: 9-12 digits (the CCCD column, or anywhere in the line for raw text)
+- name present (at least 2 characters)
+- dob in one of the accepted formats (DD/MM/YYYY, YYYY-MM-DD, YYYY)
+- gender: exactly one of the Nam / Nữ columns marked
+- area: a "Khu vực bỏ phiếu số: N" header (or KV column) seen before the
+  row, naming a known area
+- QH / T / P flags: x, o, 0 or empty
+
+The roll is streamed (openpyxl read-only, or a pasted text file); only the
+area header context is tracked sequentially. Rows are shipped in chunks to
+worker processes, where every rule is a vectorized pandas check against
+precompiled patterns. The report is written as UTF-8 JSON with the
+analysis_result schema; failed rows are spooled to disk, so the report can
+be far larger than memory.
+
+Usage: python validate_voters.py <roll.xlsx|roll.txt> [-o analysis_result_final.json]
+                                [--workers N] [--chunk 5000] [--default-area kv01]
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import locations
+from import_voters import cell_text, detect_area, is_stt
+
+CHUNK_SIZE = 5000
+REPORT_FILE = 'analysis_result_final.json'
+
+REASON_CCCD = 'Không tìm thấy số CCCD hợp lệ (9-12 số)'
+REASON_NAME = 'Không tìm thấy Họ Tên hợp lệ.'
+REASON_DOB = 'Ngày sinh không đúng định dạng (DD/MM/YYYY, YYYY-MM-DD hoặc YYYY)'
+REASON_GENDER = 'Cột giới tính không hợp lệ (cần đánh dấu đúng một cột Nam hoặc Nữ)'
+REASON_NO_AREA = 'Không xác định được Khu vực bỏ phiếu (dòng nằm trước tiêu đề khu vực)'
+REASON_UNKNOWN_AREA = 'Khu vực bỏ phiếu không có trong danh mục'
+REASON_FLAGS = 'Cờ bầu cử QH/T/P không hợp lệ (chỉ nhận x, o hoặc để trống)'
+
+# Same patterns as VoterImport.tsx
+TEXT_AREA_HEADER_RE = re.compile(r'^\s*(?:Khu vực|KVBP|KV)\s*(?:bỏ phiếu\s*)?(?:số\s*)?[:\s]*(\d+)\s*$', re.IGNORECASE)
+NEW_RECORD_RE = re.compile(r'^\d+')
+JUNK_PATTERN = (r'DANH SÁCH CỬ TRI|Tổng số|Người lập biểu|Danh sách này được lập|Cử tri tham gia bầu cử'
+                r'|^(?:\(\d+\)\s*)+$')
+HEADER_ROW_PATTERN = r'Họ và tên.*Ngày sinh|Ngày sinh.*Họ và tên'
+CCCD_SEARCH_PATTERN = r'\b\d{9,12}\b'
+CCCD_PATTERN = r'\d{9,12}'
+DOB_PATTERN = (r'\d{1,2}[/.-]\d{1,2}[/.-](?:\d{2}|\d{4})'
+               r'|\d{4}-\d{2}-\d{2}(?:[ T]00:00:00)?'
+               r'|(?:19|20)\d{2}')
+KV_COLUMN_RE = re.compile(r'KV\s*\d+', re.IGNORECASE)
+FLAG_VALUES = ['', 'x', 'o', '0']
+KNOWN_AREAS = locations.load().areas()
+
+# Record columns shipped to the workers
+FIELDS = ['row', 'content', 'record', 'tabular', 'name', 'dob', 'nam', 'nu', 'cccd', 'qh', 't', 'p', 'area']
+
+
+def row_content(cells):
+    """Cells joined by spaces, as shown in the report's ``content``."""
+    return ' '.join(s for s in (str(v).strip() for v in cells if v is not None) if s)
+
+
+def make_record(row_no, content, cells, area):
+    """Flatten one row into the tuple layout of FIELDS.
+
+    ``cells`` is None for raw text lines that are not tab separated; those
+    only get the content-level checks, like the regex fallback of the page.
+    """
+    record = bool(NEW_RECORD_RE.match(content))
+    if cells is None:
+        return (row_no, content, record, False, '', '', '', '', '', '', '', '', area)
+    cells = [cell_text(v) for v in cells] + [''] * max(0, 15 - len(cells))
+    flags_at = 11
+    if KV_COLUMN_RE.search(cells[11]):
+        area = re.sub(r'[^a-z0-9]', '', cells[11].lower())
+        flags_at = 12
+    return (row_no, content, record and is_stt(cells[0]), True, cells[2], cells[3], cells[4], cells[5], cells[6],
+            cells[flags_at], cells[flags_at + 1], cells[flags_at + 2], area)
+
+
+def iter_workbook_records(path, sheet=None, default_area=None):
+    from openpyxl import load_workbook
+
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        ws = wb[sheet] if sheet else wb.worksheets[0]
+        area = default_area
+        for row_no, row in enumerate(ws.iter_rows(values_only=True), start=1):
+            if not row:
+                continue
+            content = row_content(row)
+            if not content:
+                continue
+            if not is_stt(row[0]):
+                header = detect_area(row) or _text_area(content)
+                if header:
+                    area = header
+                    continue
+            yield make_record(row_no, content, row, area)
+    finally:
+        wb.close()
+
+
+def _text_area(line):
+    match = TEXT_AREA_HEADER_RE.match(line)
+    return f"kv{int(match.group(1)):02d}" if match else None
+
+
+def iter_text_records(path, default_area=None):
+    """Records from a pasted roll, re-joining wrapped lines like the import page."""
+    def combined():
+        buffer = ''
+        with open(path, 'r', encoding='utf-8-sig') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                if _text_area(line):
+                    if buffer:
+                        yield buffer
+                    yield line
+                    buffer = ''
+                elif NEW_RECORD_RE.match(line):
+                    if buffer:
+                        yield buffer
+                    buffer = line
+                elif buffer:
+                    buffer += ' ' + line
+                else:
+                    yield line
+        if buffer:
+            yield buffer
+
+    area = default_area
+    for row_no, line in enumerate(combined(), start=1):
+        header = _text_area(line)
+        if header:
+            area = header
+            continue
+        cols = line.split('\t') if '\t' in line else None
+        if cols is not None and len(cols) < 7:
+            cols = None
+        content = row_content(cols) if cols is not None else line
+        yield make_record(row_no, content, cols, area)
+
+
+def iter_records(path, sheet=None, default_area=None):
+    if path.lower().endswith(('.xlsx', '.xlsm')):
+        return iter_workbook_records(path, sheet, default_area)
+    return iter_text_records(path, default_area)
+
+
+def validate_chunk(records):
+    """Apply every rule to a chunk of records.
+
+    Returns (processed, valid, failed, skipped) where failed is a list of
+    (row, reason, content) and skipped a list of (row, content).
+    """
+    df = pd.DataFrame.from_records(records, columns=FIELDS)
+    content = df['content']
+
+    junk = content.str.contains(JUNK_PATTERN, regex=True) | content.str.contains(HEADER_ROW_PATTERN, regex=True)
+    df = df[~junk]
+    content = df['content']
+    tabular_record = df['record'] & df['tabular']
+
+    cccd_ok = np.where(tabular_record, df['cccd'].str.fullmatch(CCCD_PATTERN),
+                       content.str.contains(CCCD_SEARCH_PATTERN, regex=True)).astype(bool)
+    # Short fragments without a CCCD are skipped, not reported (as in the page)
+    skipped = ~cccd_ok & (content.str.len() <= 20)
+
+    dob = df['dob']
+    area = df['area'].fillna('')
+    flags = df[['qh', 't', 'p']].apply(lambda s: s.str.lower())
+    checks = [
+        (~cccd_ok, REASON_CCCD),
+        (tabular_record & (df['name'].str.len() < 2), REASON_NAME),
+        (tabular_record & (dob != '') & ~dob.str.fullmatch(DOB_PATTERN), REASON_DOB),
+        (tabular_record & ((df['nam'] != '') == (df['nu'] != '')), REASON_GENDER),
+        (df['record'] & (area == ''), REASON_NO_AREA),
+        (df['record'] & (area != '') & ~area.isin(KNOWN_AREAS), REASON_UNKNOWN_AREA),
+        (tabular_record & ~flags.isin(FLAG_VALUES).all(axis=1), REASON_FLAGS),
+    ]
+    reasons = pd.Series('', index=df.index)
+    for mask, reason in checks:
+        mask = np.asarray(mask, dtype=bool) & ~skipped.to_numpy()
+        reasons = reasons.mask(mask & (reasons != ''), reasons + '; ' + reason)
+        reasons = reasons.mask(mask & (reasons == ''), reason)
+    failed_mask = reasons != ''
+
+    failed = list(zip(df['row'][failed_mask].tolist(), reasons[failed_mask].tolist(),
+                      content[failed_mask].tolist()))
+    skipped_rows = list(zip(df['row'][skipped].tolist(), content[skipped].tolist()))
+    processed = len(df)
+    return processed, processed - len(failed) - len(skipped_rows), failed, skipped_rows
+
+
+def iter_chunks(records, size):
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def run_chunks(chunks, workers=None):
+    """Validate chunks, in order; at most 2 chunks per worker are in flight."""
+    if workers == 1:
+        for chunk in chunks:
+            yield validate_chunk(chunk)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        window = 2 * (workers or os.cpu_count() or 1)
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(validate_chunk, chunk))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+class ReportWriter:
+    """Write the analysis_result JSON without holding the row lists in memory.
+
+    Failed and skipped rows go to temporary spool files as they arrive; on
+    close the counts are written first and the spooled rows are copied after
+    them, so readers can show the totals before streaming the rows.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.total_rows = self.valid_count = 0
+        self.failed_count = self.skipped_count = 0
+        self.reasons = Counter()
+        directory = os.path.dirname(os.path.abspath(path))
+        self._failed = tempfile.TemporaryFile('w+', encoding='utf-8', dir=directory)
+        self._skipped = tempfile.TemporaryFile('w+', encoding='utf-8', dir=directory)
+
+    @staticmethod
+    def _item(f, first, obj):
+        text = json.dumps(obj, ensure_ascii=False, indent=2)
+        f.write(('\n' if first else ',\n') + '    ' + text.replace('\n', '\n    '))
+
+    def add(self, processed, valid, failed, skipped):
+        self.total_rows += processed
+        self.valid_count += valid
+        for row, reason, content in failed:
+            self._item(self._failed, not self.failed_count, {'row': row, 'reason': reason, 'content': content})
+            self.failed_count += 1
+            self.reasons.update(reason.split('; '))
+        for row, content in skipped:
+            self._item(self._skipped, not self.skipped_count, {'row': row, 'content': content})
+            self.skipped_count += 1
+
+    @staticmethod
+    def _copy_list(out, spool, count):
+        if not count:
+            out.write('[]')
+            return
+        out.write('[')
+        spool.seek(0)
+        while True:
+            block = spool.read(1 << 20)
+            if not block:
+                break
+            out.write(block)
+        out.write('\n  ]')
+
+    def close(self):
+        tmp = f"{self.path}.tmp"
+        with open(tmp, 'w', encoding='utf-8', newline='\n') as out:
+            out.write('{\n')
+            for key in ('total_rows', 'failed_count', 'valid_count', 'skipped_count'):
+                out.write(f'  "{key}": {getattr(self, key)},\n')
+            out.write('  "failed_rows": ')
+            self._copy_list(out, self._failed, self.failed_count)
+            out.write(',\n  "skipped_rows": ')
+            self._copy_list(out, self._skipped, self.skipped_count)
+            out.write('\n}\n')
+        os.replace(tmp, self.path)
+        self._failed.close()
+        self._skipped.close()
+
+
+def validate_roll(path, output=REPORT_FILE, workers=None, chunk_size=CHUNK_SIZE, sheet=None, default_area=None):
+    started = time.perf_counter()
+    writer = ReportWriter(output)
+    try:
+        chunks = iter_chunks(iter_records(path, sheet, default_area), chunk_size)
+        for result in run_chunks(chunks, workers):
+            writer.add(*result)
+    finally:
+        writer.close()
+    writer.elapsed = time.perf_counter() - started
+    return writer
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Validate a voter roll and write the analysis_result report.')
+    parser.add_argument('path', help='voter roll (.xlsx) or pasted text file')
+    parser.add_argument('-o', '--output', default=REPORT_FILE)
+    parser.add_argument('--sheet', help='worksheet name (default: first sheet)')
+    parser.add_argument('--workers', type=int, help='worker processes (default: CPU count, 1 = in-process)')
+    parser.add_argument('--chunk', type=int, default=CHUNK_SIZE, help='rows per worker task')
+    parser.add_argument('--default-area', help='area for rows before the first area header (default: report them)')
+    args = parser.parse_args(argv)
+
+    sys.stdout.reconfigure(encoding='utf-8')
+    report = validate_roll(args.path, args.output, workers=args.workers, chunk_size=args.chunk,
+                           sheet=args.sheet, default_area=args.default_area)
+    print(f"Rows: {report.total_rows}, valid: {report.valid_count}, failed: {report.failed_count}, "
+          f"skipped: {report.skipped_count} in {report.elapsed:.2f}s "
+          f"({report.total_rows / report.elapsed if report.elapsed else 0:,.0f} rows/s)")
+    for reason, count in report.reasons.most_common():
+        print(f"  {count:>8}  {reason}")
+    print(f"Report written to {args.output}")
+    return 1 if report.failed_count else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
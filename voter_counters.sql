@@ -0,0 +1,159 @@
+-- ===================================================================
+-- BỘ ĐẾM CỬ TRI CẬP NHẬT TĂNG DẦN (voter_counters)
+-- ===================================================================
+-- Thay cho việc đếm lại toàn bộ bảng voters mỗi lần Dashboard tải lại:
+-- mỗi lệnh INSERT/UPDATE/DELETE trên voters cộng/trừ phần chênh lệch vào
+-- bảng voter_counters, theo từng phạm vi:
+--   area          area_id (cử tri chưa có khu vực nằm ở scope_id = '')
+--   unit          unit_id
+--   neighborhood  neighborhood_id
+--   group         group_name
+--   birth_year    voters.birth_year, dùng cho thống kê độ tuổi
+--
+-- Trigger là FOR EACH STATEMENT với transition table, nên một lần nạp
+-- hàng loạt (COPY, INSERT ... SELECT) chỉ cập nhật mỗi dòng bộ đếm một lần.
+-- Các RPC trong rpc_aggregation.sql chỉ đọc bảng này: O(số khu vực).
+--
+-- Chạy SAU add_birth_date.sql và TRƯỚC rpc_aggregation.sql. Kiểm tra/sửa lệch số liệu:
+--   python reconcile_voter_counters.py [--fix]
+-- ===================================================================
+
+CREATE TABLE IF NOT EXISTS voter_counters (
+  scope TEXT NOT NULL CHECK (scope IN ('area', 'unit', 'neighborhood', 'group', 'birth_year')),
+  scope_id TEXT NOT NULL,
+  total BIGINT NOT NULL DEFAULT 0,
+  voted BIGINT NOT NULL DEFAULT 0,
+  male_total BIGINT NOT NULL DEFAULT 0,
+  female_total BIGINT NOT NULL DEFAULT 0,
+  male_voted BIGINT NOT NULL DEFAULT 0,
+  female_voted BIGINT NOT NULL DEFAULT 0,
+  updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+  PRIMARY KEY (scope, scope_id)
+);
+
+ALTER TABLE voter_counters ENABLE ROW LEVEL SECURITY;
+DROP POLICY IF EXISTS "Public read voter_counters" ON voter_counters;
+CREATE POLICY "Public read voter_counters" ON voter_counters FOR SELECT USING (true);
+
+DROP FUNCTION IF EXISTS voter_counter_keys(TEXT, TEXT, TEXT, TEXT, TEXT);
+
+-- Các dòng bộ đếm mà một cử tri thuộc về (dùng chung cho trigger, rebuild và đối soát)
+CREATE OR REPLACE FUNCTION voter_counter_keys(
+  p_area_id TEXT, p_unit_id TEXT, p_neighborhood_id TEXT, p_group_name TEXT, p_birth_year INTEGER
+)
+RETURNS TABLE (scope TEXT, scope_id TEXT) AS $$
+  SELECT k.scope, k.scope_id FROM (VALUES
+    ('area', COALESCE(p_area_id, '')),
+    ('unit', p_unit_id),
+    ('neighborhood', p_neighborhood_id),
+    ('group', p_group_name),
+    ('birth_year', p_birth_year::text)
+  ) AS k(scope, scope_id)
+  WHERE k.scope_id IS NOT NULL
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Cộng dồn chênh lệch của một câu lệnh; %s là nguồn (sign, cột voters) đọc từ transition table.
+-- ORDER BY cố định thứ tự khóa dòng bộ đếm để hai giao dịch song song không deadlock.
+CREATE OR REPLACE FUNCTION voter_counters_apply()
+RETURNS TRIGGER AS $$
+DECLARE
+  v_source TEXT;
+BEGIN
+  IF TG_OP = 'INSERT' THEN
+    v_source := 'SELECT 1 AS sign, * FROM new_voters';
+  ELSIF TG_OP = 'DELETE' THEN
+    v_source := 'SELECT -1 AS sign, * FROM old_voters';
+  ELSE
+    v_source := 'SELECT 1 AS sign, * FROM new_voters UNION ALL SELECT -1, * FROM old_voters';
+  END IF;
+
+  EXECUTE format($sql$
+    INSERT INTO voter_counters AS c (scope, scope_id, total, voted, male_total, female_total, male_voted, female_voted, updated_at)
+    SELECT * FROM (
+      SELECT k.scope, k.scope_id,
+        COALESCE(sum(d.sign), 0) AS total,
+        COALESCE(sum(d.sign) FILTER (WHERE d.voting_status = 'da-bau'), 0) AS voted,
+        COALESCE(sum(d.sign) FILTER (WHERE d.gender = 'Nam'), 0) AS male_total,
+        COALESCE(sum(d.sign) FILTER (WHERE d.gender = 'Nữ'), 0) AS female_total,
+        COALESCE(sum(d.sign) FILTER (WHERE d.gender = 'Nam' AND d.voting_status = 'da-bau'), 0) AS male_voted,
+        COALESCE(sum(d.sign) FILTER (WHERE d.gender = 'Nữ' AND d.voting_status = 'da-bau'), 0) AS female_voted,
+        NOW() AS updated_at
+      FROM (%s) d
+      CROSS JOIN LATERAL voter_counter_keys(d.area_id, d.unit_id, d.neighborhood_id, d.group_name, d.birth_year) k
+      GROUP BY k.scope, k.scope_id
+    ) delta
+    -- UPDATE không đổi cột nào được đếm (sửa tên, địa chỉ...) thì không ghi gì
+    WHERE (total, voted, male_total, female_total, male_voted, female_voted) <> (0, 0, 0, 0, 0, 0)
+    ORDER BY scope, scope_id
+    ON CONFLICT (scope, scope_id) DO UPDATE SET
+      total = c.total + EXCLUDED.total,
+      voted = c.voted + EXCLUDED.voted,
+      male_total = c.male_total + EXCLUDED.male_total,
+      female_total = c.female_total + EXCLUDED.female_total,
+      male_voted = c.male_voted + EXCLUDED.male_voted,
+      female_voted = c.female_voted + EXCLUDED.female_voted,
+      updated_at = NOW()
+  $sql$, v_source);
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+DROP TRIGGER IF EXISTS voter_counters_insert ON voters;
+DROP TRIGGER IF EXISTS voter_counters_update ON voters;
+DROP TRIGGER IF EXISTS voter_counters_delete ON voters;
+
+CREATE TRIGGER voter_counters_insert AFTER INSERT ON voters
+  REFERENCING NEW TABLE AS new_voters
+  FOR EACH STATEMENT EXECUTE FUNCTION voter_counters_apply();
+CREATE TRIGGER voter_counters_update AFTER UPDATE ON voters
+  REFERENCING OLD TABLE AS old_voters NEW TABLE AS new_voters
+  FOR EACH STATEMENT EXECUTE FUNCTION voter_counters_apply();
+CREATE TRIGGER voter_counters_delete AFTER DELETE ON voters
+  REFERENCING OLD TABLE AS old_voters
+  FOR EACH STATEMENT EXECUTE FUNCTION voter_counters_apply();
+
+-- TRUNCATE không có transition table: xóa luôn bộ đếm
+CREATE OR REPLACE FUNCTION voter_counters_truncate()
+RETURNS TRIGGER AS $$
+BEGIN
+  DELETE FROM voter_counters;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+DROP TRIGGER IF EXISTS voter_counters_truncate ON voters;
+CREATE TRIGGER voter_counters_truncate AFTER TRUNCATE ON voters
+  FOR EACH STATEMENT EXECUTE FUNCTION voter_counters_truncate();
+
+-- Đếm lại từ đầu (khóa ghi trên voters trong lúc đếm)
+CREATE OR REPLACE FUNCTION rebuild_voter_counters()
+RETURNS BIGINT AS $$
+DECLARE
+  v_rows BIGINT;
+BEGIN
+  LOCK TABLE voters IN SHARE MODE;
+  DELETE FROM voter_counters;
+  INSERT INTO voter_counters (scope, scope_id, total, voted, male_total, female_total, male_voted, female_voted)
+  SELECT k.scope, k.scope_id,
+    count(*),
+    count(*) FILTER (WHERE v.voting_status = 'da-bau'),
+    count(*) FILTER (WHERE v.gender = 'Nam'),
+    count(*) FILTER (WHERE v.gender = 'Nữ'),
+    count(*) FILTER (WHERE v.gender = 'Nam' AND v.voting_status = 'da-bau'),
+    count(*) FILTER (WHERE v.gender = 'Nữ' AND v.voting_status = 'da-bau')
+  FROM voters v
+  CROSS JOIN LATERAL voter_counter_keys(v.area_id, v.unit_id, v.neighborhood_id, v.group_name, v.birth_year) k
+  GROUP BY k.scope, k.scope_id;
+  GET DIAGNOSTICS v_rows = ROW_COUNT;
+  RETURN v_rows;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- Chỉ chạy từ SQL editor (service role): gọi qua API sẽ khóa
+-- voters (chặn mọi lượt check-in) trong lúc đếm
+REVOKE EXECUTE ON FUNCTION rebuild_voter_counters() FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION rebuild_voter_counters() TO service_role;
+
+SELECT rebuild_voter_counters();
+
+NOTIFY pgrst, 'reload config';
@@ -0,0 +1,249 @@
+-- ===================================================================
+-- TÌM KIẾM CỬ TRI KHÔNG DẤU: voters.search_name / voters.search_text
+-- ===================================================================
+-- Trang Danh sách cử tri trước đây tải cả danh sách (theo bộ lọc) về trình
+-- duyệt rồi lọc bằng includes(), nên "nguyen van a" không khớp
+-- "NGUYỄN VĂN A" và phải tải hết dữ liệu chỉ để tìm một người. Thêm:
+--   search_name  khóa tìm kiếm của họ tên: chữ thường, bỏ dấu, một dấu cách
+--   search_text  họ tên + địa chỉ (thường trú/tạm trú nếu khác) + CCCD + số thẻ
+--   search_voters(...)  RPC tìm kiếm có xếp hạng, tối đa 100 kết quả
+--
+-- Khóa giống hệt normalize.search_key / voter_search_text (Python): cùng
+-- bảng bỏ dấu (Latin-1 đến Latin Extended Additional, cộng đ/Đ, cộng dấu
+-- tổ hợp U+0300-U+036F của chuỗi NFD) và cùng tập khoảng trắng được gộp:
+-- dấu cách, \t \n \r \f \v và NBSP (U+00A0, có trong dữ liệu). Không dùng
+-- \s: \s của PostgreSQL phụ thuộc locale và không gồm NBSP, còn \s của
+-- Python gồm mọi khoảng trắng Unicode.
+--
+-- Thứ tự chạy:
+--   1. File này
+--   2. python backfill_search_keys.py       (điền cho dữ liệu đã có, theo lô;
+--      thêm --all nếu khóa đã được điền bằng bản trước, khi NBSP chưa được gộp)
+--
+-- Các importer Python ghi sẵn search_name/search_text; trigger bên dưới chỉ
+-- điền khi client không gửi (trang Nhập cử tri, sửa cử tri).
+--
+-- pg_trgm (có sẵn trên Supabase) cho chỉ mục trigram dùng khi tìm chuỗi con
+-- và tìm gần đúng. PostgreSQL không có pg_trgm vẫn chạy được file này: bỏ
+-- qua chỉ mục trigram và bước tìm gần đúng.
+-- ===================================================================
+
+DO $$
+BEGIN
+  IF EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm') THEN
+    CREATE EXTENSION IF NOT EXISTS pg_trgm;
+  ELSE
+    RAISE NOTICE 'pg_trgm không có trên máy chủ này: bỏ qua chỉ mục trigram';
+  END IF;
+END $$;
+
+-- COLLATE "C": so sánh theo byte, để một chỉ mục B-tree phục vụ cả
+-- LIKE 'tiền tố%' lẫn ORDER BY (khóa đã là ASCII chữ thường)
+ALTER TABLE voters ADD COLUMN IF NOT EXISTS search_name TEXT COLLATE "C";
+ALTER TABLE voters ADD COLUMN IF NOT EXISTS search_text TEXT COLLATE "C";
+
+COMMENT ON COLUMN voters.search_name IS 'Họ tên không dấu, chữ thường (tìm kiếm)';
+COMMENT ON COLUMN voters.search_text IS 'Họ tên, địa chỉ, CCCD, số thẻ không dấu, chữ thường (tìm kiếm)';
+
+-- Cùng quy tắc với normalize.search_key (Python)
+CREATE OR REPLACE FUNCTION search_key(p_text TEXT)
+RETURNS TEXT AS $fn$
+  SELECT btrim(regexp_replace(lower(regexp_replace(translate(COALESCE(p_text, ''),
+      chr(160) || 'ÀÁÂÃÄÅÇÈÉÊËÌÍÎÏÑÒÓÔÕÖÙÚÛÜÝàáâãäåçèéêëìíîïñòóôõöùúûüýÿĀāĂăĄąĆćĈĉĊ'
+      || 'ċČčĎďĐđĒēĔĕĖėĘęĚěĜĝĞğĠġĢģĤĥĨĩĪīĬĭĮįİĴĵĶķĹĺĻļĽľŃńŅņŇňŌōŎŏŐőŔŕŖŗŘř'
+      || 'ŚśŜŝŞşŠšŢţŤťŨũŪūŬŭŮůŰűŲųŴŵŶŷŸŹźŻżŽžƠơƯưǍǎǏǐǑǒǓǔǕǖǗǘǙǚǛǜǞǟǠǡǦǧǨǩǪ'
+      || 'ǫǬǭǰǴǵǸǹǺǻȀȁȂȃȄȅȆȇȈȉȊȋȌȍȎȏȐȑȒȓȔȕȖȗȘșȚțȞȟȦȧȨȩȪȫȬȭȮȯȰȱȲȳḀḁḂḃḄḅḆḇḈ'
+      || 'ḉḊḋḌḍḎḏḐḑḒḓḔḕḖḗḘḙḚḛḜḝḞḟḠḡḢḣḤḥḦḧḨḩḪḫḬḭḮḯḰḱḲḳḴḵḶḷḸḹḺḻḼḽḾḿṀṁṂṃṄṅṆṇṈ'
+      || 'ṉṊṋṌṍṎṏṐṑṒṓṔṕṖṗṘṙṚṛṜṝṞṟṠṡṢṣṤṥṦṧṨṩṪṫṬṭṮṯṰṱṲṳṴṵṶṷṸṹṺṻṼṽṾṿẀẁẂẃẄẅẆẇẈ'
+      || 'ẉẊẋẌẍẎẏẐẑẒẓẔẕẖẗẘẙẠạẢảẤấẦầẨẩẪẫẬậẮắẰằẲẳẴẵẶặẸẹẺẻẼẽẾếỀềỂểỄễỆệỈỉỊịỌọỎ'
+      || 'ỏỐốỒồỔổỖỗỘộỚớỜờỞởỠỡỢợỤụỦủỨứỪừỬửỮữỰựỲỳỴỵỶỷỸỹ',
+      ' ' || 'AAAAAACEEEEIIIINOOOOOUUUUYaaaaaaceeeeiiiinooooouuuuyyAaAaAaCcCcC'
+      || 'cCcDdDdEeEeEeEeEeGgGgGgGgHhIiIiIiIiIJjKkLlLlLlNnNnNnOoOoOoRrRrRr'
+      || 'SsSsSsSsTtTtUuUuUuUuUuUuWwYyYZzZzZzOoUuAaIiOoUuUuUuUuUuAaAaGgKkO'
+      || 'oOojGgNnAaAaAaEeEeIiIiOoOoRrRrUuUuSsTtHhAaEeOoOoOoOoYyAaBbBbBbC'
+      || 'cDdDdDdDdDdEeEeEeEeEeFfGgHhHhHhHhHhIiIiKkKkKkLlLlLlLlMmMmMmNnNnN'
+      || 'nNnOoOoOoOoPpPpRrRrRrRrSsSsSsSsSsTtTtTtTtUuUuUuUuUuVvVvWwWwWwWwW'
+      || 'wXxXxYyZzZzZzhtwyAaAaAaAaAaAaAaAaAaAaAaAaEeEeEeEeEeEeEeEeIiIiOoO'
+      || 'oOoOoOoOoOoOoOoOoOoOoUuUuUuUuUuUuUuYyYyYyYy'),
+    '[\u0300-\u036f]', '', 'g')), '[ \t\n\r\f\v]+', ' ', 'g'))
+$fn$ LANGUAGE sql IMMUTABLE PARALLEL SAFE;
+
+-- Cùng quy tắc với normalize.voter_search_text (Python)
+CREATE OR REPLACE FUNCTION voter_search_text(
+    p_name TEXT, p_address TEXT, p_permanent_address TEXT, p_temporary_address TEXT,
+    p_cccd TEXT, p_voter_card_number TEXT)
+RETURNS TEXT AS $fn$
+  SELECT search_key(concat_ws(' ', p_name, p_address,
+    CASE WHEN p_permanent_address IS DISTINCT FROM p_address THEN p_permanent_address END,
+    CASE WHEN p_temporary_address IS DISTINCT FROM p_address THEN p_temporary_address END,
+    CASE WHEN upper(p_cccd) NOT LIKE 'MISSING%' THEN p_cccd END,
+    p_voter_card_number))
+$fn$ LANGUAGE sql IMMUTABLE PARALLEL SAFE;
+
+CREATE OR REPLACE FUNCTION voters_fill_search_keys()
+RETURNS TRIGGER AS $$
+BEGIN
+  IF (TG_OP = 'INSERT' AND NEW.search_name IS NULL AND NEW.search_text IS NULL)
+     OR (TG_OP = 'UPDATE'
+         AND (NEW.name, NEW.address, NEW.permanent_address, NEW.temporary_address, NEW.cccd, NEW.voter_card_number)
+             IS DISTINCT FROM (OLD.name, OLD.address, OLD.permanent_address, OLD.temporary_address, OLD.cccd, OLD.voter_card_number)
+         AND NEW.search_name IS NOT DISTINCT FROM OLD.search_name
+         AND NEW.search_text IS NOT DISTINCT FROM OLD.search_text) THEN
+    NEW.search_name := search_key(NEW.name);
+    NEW.search_text := voter_search_text(NEW.name, NEW.address, NEW.permanent_address, NEW.temporary_address,
+                                         NEW.cccd, NEW.voter_card_number);
+  END IF;
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS voters_fill_search_keys ON voters;
+CREATE TRIGGER voters_fill_search_keys
+  BEFORE INSERT OR UPDATE OF name, address, permanent_address, temporary_address, cccd, voter_card_number ON voters
+  FOR EACH ROW EXECUTE FUNCTION voters_fill_search_keys();
+
+-- Tiền tố họ tên (đã sắp xếp sẵn theo search_name, id)
+CREATE INDEX IF NOT EXISTS idx_voters_search_name ON voters(search_name, id);
+-- Số thẻ cử tri không kèm khu vực (tìm nhanh theo số)
+CREATE INDEX IF NOT EXISTS idx_voters_card_key ON voters((ltrim(voter_card_number, '0')));
+
+DO $$
+BEGIN
+  IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm') THEN
+    -- Chuỗi con (LIKE '%...%') và tìm gần đúng (<%) trên họ tên, địa chỉ, CCCD, số thẻ
+    CREATE INDEX IF NOT EXISTS idx_voters_search_trgm ON voters USING gin (search_text gin_trgm_ops);
+  END IF;
+END $$;
+
+-- Thoát ký tự đặc biệt của LIKE trong chuỗi người dùng nhập
+CREATE OR REPLACE FUNCTION like_escape(p_text TEXT)
+RETURNS TEXT AS $fn$
+  SELECT replace(replace(replace(p_text, '\', '\\'), '%', '\%'), '_', '\_')
+$fn$ LANGUAGE sql IMMUTABLE PARALLEL SAFE;
+
+-- RPC: search_voters
+-- Kết quả theo thứ tự:
+--   rank 0  số thẻ cử tri trùng (khi chuỗi tìm chỉ gồm chữ số)
+--   rank 1  họ tên bắt đầu bằng chuỗi tìm ("nguyen van" -> NGUYỄN VĂN A, NGUYỄN VĂN BÌNH...)
+--   rank 2  mọi từ của chuỗi tìm có trong họ tên/địa chỉ/CCCD/số thẻ ("van a", "to 5", "0790")
+--   rank 3  gần đúng, sai chính tả nhẹ ("nguyen vn a"), chỉ khi có pg_trgm
+-- Mỗi bước chỉ chạy khi các bước trước chưa đủ p_limit kết quả và đều dùng
+-- chỉ mục với LIMIT, nên thời gian không phụ thuộc số cử tri.
+-- Trả về { "voters": [{ "id", "rank", các cột hiển thị }...], "query": khóa đã
+-- chuẩn hóa }: trang danh sách hiển thị thẳng kết quả này, không tải cả danh
+-- sách cử tri khi đang tìm. Chỉ gồm các cột trang danh sách dùng (không có
+-- search_name/search_text...).
+-- SECURITY INVOKER: chạy dưới RLS của người gọi, chỉ thấy cử tri trong phạm
+-- vi của mình (chính sách InitPlan của rls_scope.sql nên không tốn thêm).
+DROP FUNCTION IF EXISTS search_voters(TEXT, INTEGER, TEXT, TEXT, TEXT, TEXT, TEXT, TEXT);
+CREATE OR REPLACE FUNCTION search_voters(
+    p_query TEXT,
+    p_limit INTEGER DEFAULT 20,
+    p_area_id TEXT DEFAULT NULL,
+    p_unit_id TEXT DEFAULT NULL,
+    p_neighborhood_id TEXT DEFAULT NULL,
+    p_group_name TEXT DEFAULT NULL,
+    p_voting_status TEXT DEFAULT NULL,
+    p_residence_status TEXT DEFAULT NULL
+)
+RETURNS JSON AS $body$
+DECLARE
+    v_query TEXT := search_key(p_query);
+    v_limit INTEGER := LEAST(GREATEST(COALESCE(p_limit, 20), 1), 100);
+    v_scope TEXT := 'TRUE';
+    v_tokens TEXT[];
+    v_contains TEXT;
+    v_ids UUID[] := '{}';
+    v_ranks INTEGER[] := '{}';
+    v_found UUID[];
+    v_result JSON;
+BEGIN
+    IF v_query = '' THEN
+        RETURN json_build_object('voters', '[]'::json, 'query', v_query);
+    END IF;
+
+    IF p_area_id IS NOT NULL THEN v_scope := v_scope || format(' AND v.area_id = %L', p_area_id); END IF;
+    IF p_unit_id IS NOT NULL THEN v_scope := v_scope || format(' AND v.unit_id = %L', p_unit_id); END IF;
+    IF p_neighborhood_id IS NOT NULL THEN v_scope := v_scope || format(' AND v.neighborhood_id = %L', p_neighborhood_id); END IF;
+    IF p_group_name IS NOT NULL THEN v_scope := v_scope || format(' AND v.group_name = %L', p_group_name); END IF;
+    IF p_residence_status IS NOT NULL THEN v_scope := v_scope || format(' AND v.residence_status = %L', p_residence_status); END IF;
+    -- Cùng cách chia với bộ đếm: khác 'da-bau' là chưa bầu
+    IF p_voting_status = 'da-bau' THEN
+        v_scope := v_scope || ' AND v.voting_status = ''da-bau''';
+    ELSIF p_voting_status = 'chua-bau' THEN
+        v_scope := v_scope || ' AND v.voting_status IS DISTINCT FROM ''da-bau''';
+    END IF;
+
+    -- rank 0: số thẻ cử tri (bỏ số 0 đầu, như cách so sánh ở trang danh sách)
+    IF v_query ~ '^\d+$' THEN
+        EXECUTE format('SELECT array_agg(v.id) FROM (SELECT v.id FROM voters v WHERE %s '
+                       'AND ltrim(v.voter_card_number, ''0'') = %L LIMIT %s) v',
+                       v_scope, COALESCE(NULLIF(ltrim(v_query, '0'), ''), '0'), v_limit)
+            INTO v_found;
+        v_ids := v_ids || COALESCE(v_found, '{}');
+        v_ranks := v_ranks || array_fill(0, ARRAY[COALESCE(cardinality(v_found), 0)]);
+    END IF;
+
+    -- rank 1: tiền tố họ tên, theo thứ tự chỉ mục
+    IF cardinality(v_ids) < v_limit THEN
+        EXECUTE format('SELECT array_agg(v.id ORDER BY v.search_name, v.id) FROM (SELECT v.id, v.search_name FROM voters v '
+                       'WHERE %s AND v.search_name LIKE %L AND v.id <> ALL(%L::uuid[]) '
+                       'ORDER BY v.search_name, v.id LIMIT %s) v',
+                       v_scope, like_escape(v_query) || '%', v_ids, v_limit - cardinality(v_ids))
+            INTO v_found;
+        v_ids := v_ids || COALESCE(v_found, '{}');
+        v_ranks := v_ranks || array_fill(1, ARRAY[COALESCE(cardinality(v_found), 0)]);
+    END IF;
+
+    -- rank 2: mọi từ đều có mặt. Cần một từ >= 3 ký tự (trigram) hoặc phạm vi
+    -- hẹp (khu vực/tổ), nếu không sẽ phải quét cả bảng.
+    SELECT array_agg(t) INTO v_tokens FROM unnest(string_to_array(v_query, ' ')) t;
+    IF cardinality(v_ids) < v_limit
+       AND ((SELECT max(length(t)) FROM unnest(v_tokens) t) >= 3 OR p_area_id IS NOT NULL OR p_group_name IS NOT NULL) THEN
+        SELECT string_agg(format('v.search_text LIKE %L', '%' || like_escape(t) || '%'), ' AND ')
+            INTO v_contains FROM unnest(v_tokens) t;
+        -- Lấy dư rồi xếp: từ bắt đầu họ tên trước, họ tên gần chuỗi tìm hơn trước
+        EXECUTE format('SELECT array_agg(v.id ORDER BY v.word_start DESC, v.name_distance, v.search_name, v.id) '
+                       'FROM (SELECT v.id, v.search_name, '
+                       '  v.search_name LIKE %L OR v.search_name LIKE %L AS word_start, '
+                       '  abs(length(v.search_name) - length(%L)) AS name_distance '
+                       '  FROM voters v WHERE %s AND %s AND v.id <> ALL(%L::uuid[]) LIMIT %s) v',
+                       like_escape(v_query) || '%', '% ' || like_escape(v_query) || '%', v_query,
+                       v_scope, v_contains, v_ids, (v_limit - cardinality(v_ids)) * 3)
+            INTO v_found;
+        v_found := v_found[1:v_limit - cardinality(v_ids)];
+        v_ids := v_ids || COALESCE(v_found, '{}');
+        v_ranks := v_ranks || array_fill(2, ARRAY[COALESCE(cardinality(v_found), 0)]);
+    END IF;
+
+    -- rank 3: gần đúng theo trigram (word_similarity), chỉ khi có pg_trgm
+    IF cardinality(v_ids) < v_limit AND length(v_query) >= 3
+       AND to_regprocedure('word_similarity(text, text)') IS NOT NULL THEN
+        EXECUTE format('SELECT array_agg(v.id ORDER BY v.score DESC, v.id) FROM ('
+                       '  SELECT v.id, word_similarity(%L, v.search_text) AS score FROM voters v '
+                       '  WHERE %s AND %L <%% v.search_text AND v.id <> ALL(%L::uuid[]) '
+                       '  ORDER BY score DESC LIMIT %s) v',
+                       v_query, v_scope, v_query, v_ids, v_limit - cardinality(v_ids))
+            INTO v_found;
+        v_ids := v_ids || COALESCE(v_found, '{}');
+        v_ranks := v_ranks || array_fill(3, ARRAY[COALESCE(cardinality(v_found), 0)]);
+    END IF;
+
+    SELECT COALESCE(json_agg(r ORDER BY h.ord), '[]'::json)
+    INTO v_result
+    FROM unnest(v_ids, v_ranks) WITH ORDINALITY AS h(id, rank, ord)
+    CROSS JOIN LATERAL (
+        SELECT v.id, h.rank, v.name, v.dob, v.gender, v.cccd, v.ethnic, v.voter_card_number, v.address,
+               v.permanent_address, v.temporary_address, v.neighborhood_id, v.unit_id, v.area_id,
+               v.group_name, v.residence_status, v.voting_status, v.vote_qh, v.vote_t, v.vote_p
+        FROM voters v WHERE v.id = h.id
+    ) r;
+
+    RETURN json_build_object('voters', v_result, 'query', v_query);
+END;
+$body$ LANGUAGE plpgsql STABLE SECURITY INVOKER SET search_path = public, extensions;
+
+REVOKE EXECUTE ON FUNCTION search_voters(TEXT, INTEGER, TEXT, TEXT, TEXT, TEXT, TEXT, TEXT) FROM PUBLIC, anon;
+GRANT EXECUTE ON FUNCTION search_voters(TEXT, INTEGER, TEXT, TEXT, TEXT, TEXT, TEXT, TEXT) TO authenticated;
+
+NOTIFY pgrst, 'reload config';